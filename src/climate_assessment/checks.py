@@ -11,7 +11,7 @@ from .climate import (
     DEFAULT_FAIR_VERSION,
     DEFAULT_MAGICC_VERSION,
 )
-from .utils import _diff_variables
+from .history import get_historical_values
 
 # output file location
 OUT_FOLDER_NAME = "output"
@@ -310,116 +310,178 @@ def co2_energyandindustrialprocesses(df):
     return df, co2_sector_detail
 
 
-def _check_difference(df_scen, co2_total, co2_other, scenario, model):
-    difference = _diff_variables(df_scen, co2_total, co2_other, out_variable="not used")
+def _get_reporting_scenarios(ts, variables):
+    # mask of the rows of ``ts`` whose scenario reports any of ``variables``
+    scenarios = _get_model_scenario(ts.index)
+    reported = ts.index.get_level_values("variable").isin(variables)
 
-    if (difference.timeseries() == 0).all().all():
-        message = (
-            "%s is the same as %s for scenario `%s` produced by `%s` hence is removed"
-        )
-        LOGGER.info(message, co2_total, co2_other, scenario, model)
-        df_scen = df_scen.filter(variable=co2_total, keep=False)
+    return scenarios.isin(scenarios[reported])
+
+
+def _sum_variables(ts, rows, variable):
+    # sum the timeseries in ``rows`` of each scenario and region into ``variable``
+    groups = [n for n in ts.index.names if n != "variable"]
+    out = ts[rows].groupby(level=groups).sum(min_count=1)
+    out = pd.concat({variable: out}, names=["variable"])
+
+    return out.reorder_levels(ts.index.names)
+
+
+def _add_co2_energyandindustrialprocesses(ts):
+    # wide timeseries version of co2_energyandindustrialprocesses for all
+    # scenarios at once
+    co2_eip = "Emissions|CO2|Energy and Industrial Processes"
+    components = ["Emissions|CO2|Energy", "Emissions|CO2|Industrial Processes"]
+
+    to_aggregate = ~_get_reporting_scenarios(ts, [co2_eip])
+    for component in components:
+        to_aggregate &= _get_reporting_scenarios(ts, [component])
+
+    rows = to_aggregate & ts.index.get_level_values("variable").isin(components)
+    if not rows.any():
+        return ts
+
+    return pd.concat([ts, _sum_variables(ts, rows, co2_eip)])
+
+
+def _get_model_scenario(idx):
+    return idx.droplevel([n for n in idx.names if n not in ("model", "scenario")])
+
+
+def _get_same_as(ts, scenarios, co2_total, co2_other):
+    # scenarios in which co2_total is the same as co2_other, i.e. the
+    # difference is zero in every year reported in the scenario
+    def _get_ts(v):
+        out = ts[ts.index.get_level_values("variable") == v]
+        out = out[_get_model_scenario(out.index).isin(scenarios)]
+
+        return out.reset_index("variable", drop=True)
+
+    base, other = _get_ts(co2_total).align(_get_ts(co2_other))
+    difference = base - other
 
-    return df_scen
+    all_nan_rows = difference.isna().all(axis=1)
+    if all_nan_rows.any():
+        raise ValueError(f"Mismatched inputs: {difference[all_nan_rows]}")
+
+    # years which aren't reported in the scenario at all aren't compared
+    groups = ["model", "scenario"]
+    reported = difference.notna().groupby(level=groups).transform("any")
+    same = ((difference == 0) | ~reported).groupby(level=groups).all().all(axis=1)
+
+    return same.index[same]
 
 
 def check_reported_co2(df, filename, output_csv=False, outdir="output"):
     """
     Check CO2 reporting.
+
+    If a scenario reports total CO2 as well as both CO2 from energy and
+    industrial processes and AFOLU CO2, or total CO2 is the same as either of
+    them, total CO2 is removed. Scenarios which then report neither CO2 from
+    energy and industrial processes nor total CO2 in all the required years
+    are removed.
     """
-    df_withco2 = []
-    df_noco2 = []
-    # TODO: find better way than doing loop
-    for model, scenario in df.index:
-        df_scen = df.filter(model=model, scenario=scenario)
-
-        co2_total = "Emissions|CO2"
-        has_co2_total = co2_total in df_scen.variable
-        co2_energy = "Emissions|CO2|Energy and Industrial Processes"
-        has_co2_energy = co2_energy in df_scen.variable
-        co2_afolu = "Emissions|CO2|AFOLU"
-        has_co2_afolu = co2_afolu in df_scen.variable
-
-        if has_co2_total and has_co2_energy and has_co2_afolu:
+    co2_total = "Emissions|CO2"
+    co2_energy = "Emissions|CO2|Energy and Industrial Processes"
+    co2_afolu = "Emissions|CO2|AFOLU"
+    required_years = [2020, 2030, 2040, 2050, 2060, 2070, 2080, 2090, 2100]
+
+    ts = df.timeseries()
+    ts_variables = ts.index.get_level_values("variable")
+    scenarios = df.index
+
+    def _reports(variable):
+        return scenarios.isin(_get_model_scenario(ts.index[ts_variables == variable]))
+
+    has_co2_total = _reports(co2_total)
+    has_co2_energy = _reports(co2_energy)
+    has_co2_afolu = _reports(co2_afolu)
+
+    all_reported = has_co2_total & has_co2_energy & has_co2_afolu
+    for model, scenario in scenarios[all_reported]:
+        message = (
+            "%s is provided in addition to "
+            "%s and %s for scenario "
+            "`%s` produced by `%s` hence is removed to "
+            "avoid any potential inconsistencies being introduced "
+            "during harmonization"
+        )
+        LOGGER.info(message, co2_total, co2_energy, co2_afolu, scenario, model)
+
+    drop_total = all_reported
+    for co2_other, compare in (
+        (co2_energy, has_co2_total & has_co2_energy & ~has_co2_afolu),
+        (co2_afolu, has_co2_total & ~has_co2_energy & has_co2_afolu),
+    ):
+        same = _get_same_as(ts, scenarios[compare], co2_total, co2_other)
+        for model, scenario in same:
             message = (
-                "%s is provided in addition to "
-                "%s and %s for scenario "
-                "`%s` produced by `%s` hence is removed to "
-                "avoid any potential inconsistencies being introduced "
-                "during harmonization"
+                "%s is the same as %s for scenario `%s` produced by `%s` "
+                "hence is removed"
             )
-            LOGGER.info(message, co2_total, co2_energy, co2_afolu, scenario, model)
-            df_scen = df_scen.filter(variable=co2_total, keep=False)
-        elif has_co2_total and has_co2_energy:
-            df_scen = _check_difference(df_scen, co2_total, co2_energy, scenario, model)
-        elif has_co2_total and has_co2_afolu:
-            df_scen = _check_difference(df_scen, co2_total, co2_afolu, scenario, model)
-
-        if co2_energy not in df_scen._data.index.get_level_values("variable").unique():
-            # Check for Emissions|CO2 having the required years
-            has_required_co2 = "Emissions|CO2" in df_scen.variable
-
-            if has_required_co2:
-                # further check that all the required years are there
-                required_years = [
-                    2020,
-                    2030,
-                    2040,
-                    2050,
-                    2060,
-                    2070,
-                    2080,
-                    2090,
-                    2100,
-                ]
-                df_scen_co2_ts = df_scen.filter(variable="Emissions|CO2").timeseries()
-                has_all_years = all(y in df_scen_co2_ts for y in required_years)
-                nans = df_scen_co2_ts[required_years].isnull().any().any()
-                has_required_co2 = has_all_years and not nans
-
-            if has_required_co2:
-                df_withco2.append(df_scen)
-            else:
-                LOGGER.info(
-                    "\n==================================\n"
-                    + "No Emissions|CO2 or Emissions|CO2|Energy and Industrial Processes found in "
-                    + "scenario "
-                    + scenario
-                    + " produced by "
-                    + model
-                    + "!\n"
-                    + "=================================="
-                )
-                df_noco2.append(df_scen)
+            LOGGER.info(message, co2_total, co2_other, scenario, model)
+
+        drop_total = drop_total | scenarios.isin(same)
+
+    # without CO2 from energy and industrial processes, total CO2 is required
+    # in all the required years
+    co2_total_complete = (
+        ts[ts_variables == co2_total]
+        .reindex(columns=required_years)
+        .notna()
+        .all(axis=1)
+        .groupby(level=["model", "scenario"])
+        .all()
+    )
+    has_required_co2 = (
+        has_co2_total
+        & ~drop_total
+        & scenarios.isin(co2_total_complete.index[co2_total_complete])
+    )
+    keep = has_co2_energy | has_required_co2
 
-        else:
-            df_withco2.append(df_scen)
+    for model, scenario in scenarios[~keep]:
+        LOGGER.info(
+            "\n==================================\n"
+            + "No Emissions|CO2 or Emissions|CO2|Energy and Industrial Processes found in "
+            + "scenario "
+            + scenario
+            + " produced by "
+            + model
+            + "!\n"
+            + "=================================="
+        )
+
+    df = df.filter(index=scenarios[drop_total], variable=co2_total, keep=False)
 
-    if df_noco2 and output_csv:
-        df_noco2 = pyam.concat(df_noco2)
+    if not keep.all() and output_csv:
+        # one scenario at a time so the file is in the same order as when
+        # scenarios were checked one by one
+        df_noco2 = pyam.concat(
+            [
+                df.filter(model=model, scenario=scenario)
+                for model, scenario in scenarios[~keep]
+            ]
+        )
         _write_file(
             outdir,
             df_noco2,
             f"{filename}_excluded_scenarios_noCO2orCO2EnIPreported.csv",
         )
 
-    if not df_withco2:
+    if not keep.any():
         # return empty df for later processing
         return df.copy().filter(variable="*", keep=False)
 
-    return pyam.concat(df_withco2)
+    return df.filter(index=scenarios[~keep], keep=False)
 
 
 def check_against_historical(df, filename, instance, output_csv=False, outdir="output"):
     """Check against historical data.
     Currently requires 2015 to already be in the dataframe.
     """
-    HISTORY_FOLDER_name = "harmonization"
-    HISTORY_FOLDER = os.path.join(
-        os.path.dirname(os.path.abspath(__file__)), HISTORY_FOLDER_name
-    )
-    history = os.path.join(HISTORY_FOLDER, str("history_" + instance + ".csv"))
-    dfhist = pyam.IamDataFrame(history)
+    historical_values = get_historical_values(instance, 2015)
 
     strict_emissionscheck = [
         "Emissions|CO2",
@@ -463,52 +525,40 @@ def check_against_historical(df, filename, instance, output_csv=False, outdir="o
         "Emissions|VOC",
     ]
 
-    # mark all scenarios with negative non-CO2 values
-    df.exclude = False
-    for y in [2015]:
-        for e in strict_emissionscheck:
-            hist = dfhist.filter(
-                variable=str("AR6 climate diagnostics|" + e + "|Unharmonized"), year=y
-            )["value"]
-            low_hist = float(0.7 * hist)
-            high_hist = float(1.3 * hist)
-            df.validate(criteria={e: {"lo": low_hist, "year": y}}, exclude_on_fail=True)
-            df.validate(
-                criteria={e: {"up": high_hist, "year": y}}, exclude_on_fail=True
-            )
-        for e in medium_emissionscheck:
-            hist = dfhist.filter(
-                variable=str("AR6 climate diagnostics|" + e + "|Unharmonized"), year=y
-            )["value"]
-            low_hist = float(0.5 * hist)
-            high_hist = float(1.5 * hist)
-            df.validate(criteria={e: {"lo": low_hist, "year": y}}, exclude_on_fail=True)
-            df.validate(
-                criteria={e: {"up": high_hist, "year": y}}, exclude_on_fail=True
-            )
-        for e in afolu_emissionscheck:
-            hist = dfhist.filter(
-                variable=str("AR6 climate diagnostics|" + e + "|Unharmonized"), year=y
-            )["value"]
-            low_hist = float(0.3 * hist)
-            high_hist = float(2.0 * hist)
-            df.validate(criteria={e: {"lo": low_hist, "year": y}}, exclude_on_fail=True)
-            df.validate(
-                criteria={e: {"up": high_hist, "year": y}}, exclude_on_fail=True
-            )
-        for e in loose_emissionscheck:
-            hist = dfhist.filter(
-                variable=str("AR6 climate diagnostics|" + e + "|Unharmonized"), year=y
-            )["value"]
-            low_hist = float(0.2 * hist)
-            high_hist = float(5.0 * hist)
-            df.validate(criteria={e: {"lo": low_hist, "year": y}}, exclude_on_fail=True)
-            df.validate(
-                criteria={e: {"up": high_hist, "year": y}}, exclude_on_fail=True
+    # (variables, lower bound factor, upper bound factor) relative to history
+    tiers = [
+        (strict_emissionscheck, 0.7, 1.3),
+        (medium_emissionscheck, 0.5, 1.5),
+        (afolu_emissionscheck, 0.3, 2.0),
+        (loose_emissionscheck, 0.2, 5.0),
+    ]
+    bounds = []
+    for variables, lo_factor, up_factor in tiers:
+        for e in variables:
+            hist = historical_values[f"AR6 climate diagnostics|{e}|Unharmonized"]
+            bounds.append(
+                {
+                    "variable": e,
+                    "lo": float(lo_factor * hist),
+                    "up": float(up_factor * hist),
+                }
             )
 
-    df_nondivergent = df.filter(exclude=False)
-    divergent = df.filter(exclude=True)
+    bounds = pd.DataFrame(bounds).set_index("variable")
+
+    # find all scenarios with any value outside the bounds (as pyam's validate
+    # does, but in one pass over the data)
+    y = 2015
+    df.exclude = False
+    data = df.filter(year=y).data
+    data = data[data["variable"].isin(bounds.index)].join(bounds, on="variable")
+    outside = (data["value"] < data["lo"]) | (data["value"] > data["up"])
+    divergent_index = pd.MultiIndex.from_frame(
+        data.loc[outside, ["model", "scenario"]].drop_duplicates()
+    )
+
+    df_nondivergent = df.filter(index=divergent_index, keep=False)
+    divergent = df.filter(index=divergent_index)
 
     if output_csv:
         _write_file(
@@ -532,6 +582,36 @@ def check_against_historical(df, filename, instance, output_csv=False, outdir="o
     return df_nondivergent
 
 
+# TODO: only checking for negatives in these variables, not in cfcs/minor gases
+_NEGATIVES_CHECKED_VARIABLES = [
+    "Emissions|BC",
+    "Emissions|PFC|C2F6",
+    "Emissions|PFC|C6F14",
+    "Emissions|PFC|CF4",
+    "Emissions|CO",
+    "Emissions|CH4",
+    "Emissions|F-Gases",
+    "Emissions|HFC",
+    "Emissions|HFC|HFC125",
+    "Emissions|HFC|HFC134a",
+    "Emissions|HFC|HFC143a",
+    "Emissions|HFC|HFC227ea",
+    "Emissions|HFC|HFC23",
+    # 'Emissions|HFC|HFC245ca',  # not in historical dataset (RCMIP)
+    # "Emissions|HFC|HFC245fa",  # all nan in historical dataset (RCMIP)
+    "Emissions|HFC|HFC32",
+    "Emissions|HFC|HFC43-10",
+    "Emissions|N2O",
+    "Emissions|NH3",
+    "Emissions|NOx",
+    "Emissions|OC",
+    "Emissions|PFC",
+    "Emissions|SF6",
+    "Emissions|Sulfur",
+    "Emissions|VOC",
+]
+
+
 def check_negatives(
     df,
     filename=None,
@@ -546,40 +626,12 @@ def check_negatives(
     df_co2 = df.filter(variable=f"{prefix}Emissions|CO2*").timeseries()
     df_nonco2 = df.filter(variable=f"{prefix}Emissions|CO2*", keep=False).timeseries()
     df_nonco2 = df_nonco2.where(
-        (df_nonco2 > 0) | (df_nonco2 < negativethreshold) | df_nonco2.isnull(), other=0
+        (df_nonco2 > 0) | (df_nonco2 < negativethreshold) | df_nonco2.isna(), other=0
     )
     df = pyam.IamDataFrame(pd.concat([df_co2, df_nonco2]))
 
-    # TODO: only checking for negatives in these variables, not in cfcs/minor gases
-    emissions_noco2 = [
-        "Emissions|BC",
-        "Emissions|PFC|C2F6",
-        "Emissions|PFC|C6F14",
-        "Emissions|PFC|CF4",
-        "Emissions|CO",
-        "Emissions|CH4",
-        "Emissions|F-Gases",
-        "Emissions|HFC",
-        "Emissions|HFC|HFC125",
-        "Emissions|HFC|HFC134a",
-        "Emissions|HFC|HFC143a",
-        "Emissions|HFC|HFC227ea",
-        "Emissions|HFC|HFC23",
-        # 'Emissions|HFC|HFC245ca',  # not in historical dataset (RCMIP)
-        # "Emissions|HFC|HFC245fa",  # all nan in historical dataset (RCMIP)
-        "Emissions|HFC|HFC32",
-        "Emissions|HFC|HFC43-10",
-        "Emissions|N2O",
-        "Emissions|NH3",
-        "Emissions|NOx",
-        "Emissions|OC",
-        "Emissions|PFC",
-        "Emissions|SF6",
-        "Emissions|Sulfur",
-        "Emissions|VOC",
-    ]
     df_nonco2 = df.filter(
-        variable=[f"{prefix}{s}" for s in emissions_noco2]
+        variable=[f"{prefix}{s}" for s in _NEGATIVES_CHECKED_VARIABLES]
     ).timeseries()
 
     # remove any timeseries which still have negative non-CO2 values
@@ -616,6 +668,49 @@ def check_negatives(
     return df_no_negatives
 
 
+def get_nonco2_negatives(df, negativethreshold=-0.1, prefix=""):
+    """
+    Get the timeseries which :func:`check_negatives` would change or remove
+
+    This is the same as comparing ``df`` with the output of
+    :func:`check_negatives` but doesn't build a new data frame. Values which
+    are close to zero (e.g. numerical noise from infilling) are ignored.
+
+    Parameters
+    ----------
+    df : :class:`pyam.IamDataFrame`
+        Emissions to check
+
+    negativethreshold : float
+        Non-CO2 values between this threshold and zero would be set to zero,
+        values below it would remove the scenario
+
+    prefix : str
+        Prefix of the emissions variables
+
+    Returns
+    -------
+    :class:`pandas.DataFrame`
+        Non-CO2 timeseries with small negative values (which would be set to
+        zero) and timeseries of the checked variables with larger negative
+        values (whose scenarios would be removed)
+    """
+    ts = df.timeseries()
+    variables = ts.index.get_level_values("variable")
+    co2 = variables.isin(df.filter(variable=f"{prefix}Emissions|CO2*").variable)
+    checked = variables.isin(
+        df.filter(
+            variable=[f"{prefix}{s}" for s in _NEGATIVES_CHECKED_VARIABLES]
+        ).variable
+    )
+
+    negative = (ts < 0) & ~np.isclose(ts, 0)
+    small_negatives = (negative & (ts >= negativethreshold)).any(axis=1)
+    negatives = (ts < negativethreshold).any(axis=1)
+
+    return ts[(~co2 & small_negatives) | (checked & negatives)]
+
+
 def remove_rows_with_zero_in_harmonization_year(
     df, filename=None, harmonization_year=2015, outdir="output"
 ):
@@ -655,11 +750,14 @@ def remove_rows_with_only_zero(df, filename=None, outdir="output"):
     """
     Check and remove rows with zero emissions.
     """
-    dfp = df.timeseries()
+    return pyam.IamDataFrame(
+        _remove_rows_with_only_zero(df.timeseries(), filename=filename, outdir=outdir)
+    )
 
-    zero_rows = ((dfp == 0) | dfp.isnull()).all(axis=1)
+
+def _remove_rows_with_only_zero(dfp, filename=None, outdir="output"):
+    zero_rows = ((dfp == 0) | dfp.isna()).all(axis=1)
     zeros = dfp[zero_rows]
-    df = pyam.IamDataFrame(dfp.loc[~zero_rows])
 
     if not zeros.empty:
         LOGGER.info(
@@ -678,7 +776,7 @@ def remove_rows_with_only_zero(df, filename=None, outdir="output"):
             f"{filename}_excluded_timeseries_all_zero.csv",
         )
 
-    return df
+    return dfp.loc[~zero_rows]
 
 
 def require_allyears(
@@ -691,42 +789,42 @@ def require_allyears(
     low_yr=2010,
 ):
     """Check if some variables are reported for the required years (drops per variable)"""
-    # translate to pandas to do the tests per row. NaN is not reported
-    dft = df.timeseries().reset_index()
-    dft_out = pd.DataFrame()
-
-    for required_yr in [base_yr, low_yr] + required_years:
-        if required_yr not in dft:
-            dft[required_yr] = np.nan
-
-    # check for baseyear
-    if output_csv:
-        dft_out = pd.concat(
-            [
-                dft_out,
-                dft[(dft[base_yr].isna()) & (dft[low_yr].isna())],
-            ]
+    return pyam.IamDataFrame(
+        _require_allyears(
+            df.timeseries(),
+            filename=filename,
+            output_csv=output_csv,
+            outdir=outdir,
+            required_years=required_years,
+            base_yr=base_yr,
+            low_yr=low_yr,
         )
+    )
 
-    dft = dft[~((dft[base_yr].isna()) & (dft[low_yr].isna()))]
-
-    # check for model years
-    # TODO: find better way than doing loop
-    for yr in required_years:
-        if output_csv:
-            dft_out = pd.concat(
-                [
-                    dft_out,
-                    dft[(dft[yr].isna())],
-                ]
-            )
-        dft = dft[~(dft[yr].isna())]
+
+def _require_allyears(
+    dft,
+    filename="test",
+    output_csv=False,
+    outdir="output",
+    required_years=[2020, 2030, 2040, 2050, 2060, 2070, 2080, 2090, 2100],
+    base_yr=2015,
+    low_yr=2010,
+):
+    # do the tests per row of the timeseries table. NaN is not reported
+    reported = dft.notna().reindex(
+        columns=sorted({base_yr, low_yr, *required_years}), fill_value=False
+    )
+    complete = (reported[base_yr] | reported[low_yr]) & reported[required_years].all(
+        axis=1
+    )
 
     # write out if wanted
-    if output_csv:
-        dft_out = pyam.IamDataFrame(dft_out)
+    if output_csv and not complete.all():
+        dft_out = pyam.IamDataFrame(dft[~complete])
         _write_file(outdir, dft_out, f"{filename}_excluded_variables_notallyears.csv")
-    return pyam.IamDataFrame(dft)
+
+    return dft[complete]
 
 
 def reclassify_waste_and_other_co2_ar6(df: IamDataFrame) -> IamDataFrame:
@@ -747,74 +845,27 @@ def reclassify_waste_and_other_co2_ar6(df: IamDataFrame) -> IamDataFrame:
     :class:`pyam.IamDataFrame`
         Reclassified set of emissions.
     """
-    # 1. filter all scenarios that have either emissions variable by df.filter(variable=["Emissions|CO2|Other", "Emissions|CO2|Waste"])
-    #     + get list of indices
-    # 2. do df.filter(index=indices, exclude=False) and df.filter(index=indices, exclude=True)
-
-    # list scenarios that do need changes (as they report variables that we reclassify under "Energy and Industrial Processes")
-    df_change_scenarios = df.filter(
-        variable=["Emissions|CO2|Other", "Emissions|CO2|Waste"]
-    ).index
-    # dataframe with scenarios that DO need changes
-    df_change = df.filter(index=df_change_scenarios, keep=True)
-    df_change.exclude = False
-    # dataframe with scenarios that DO NOT need changes
-    df_nochange = df.filter(index=df_change_scenarios, keep=False)
-    df_nochange.exclude = False
-
-    # if no change is necessary, just return the dataframe
-    # - possible test: df == df_nochange
-    if df_change.empty:
-        return df_nochange
-
-    # rename old CO2|Energy and Industrial Processes, to be replaced
-    df_change.rename(
-        variable={
-            "Emissions|CO2|Energy and Industrial Processes": "Emissions|CO2|Energy and Industrial Processes|Incomplete"
-        },
-        inplace=True,
+    return IamDataFrame(
+        _reclassify_waste_and_other_co2_ar6(df.timeseries()), meta=df.meta
     )
 
-    # use pandas to create new CO2|Energy and Industrial Processes by adding CO2|Other and CO2|Waste
-    df_change_pd = df_change.as_pandas()
-    # which variables to sum
-    varsum = [
-        "Emissions|CO2|Waste",
-        "Emissions|CO2|Other",
-        "Emissions|CO2|Energy and Industrial Processes|Incomplete",
-    ]
-    # not affected variables of the same scenario:
-    df_change_notaffected_pd = df_change_pd[~df_change_pd.variable.isin(varsum)]
-    try:
-        df_change_notaffected_pd = df_change_notaffected_pd.drop(
-            columns=["exclude"]
-        )  # drop exclude column in this timeseries
-    except KeyError:
-        pass
-    df_change_notaffected_pyam = pyam.IamDataFrame(df_change_notaffected_pd)
-
-    # group and sum the variables that are affected
-    df_change_pd = df_change_pd[df_change_pd.variable.isin(varsum)]
-    try:
-        df_change_pd = df_change_pd.drop(
-            columns=["exclude"]
-        )  # drop exclude column in this timeseries
-    except KeyError:
-        pass
-    df_change_pd = df_change_pd.groupby(
-        by=["model", "scenario", "region", "unit", "year"], as_index=False
-    )
-    df_change_pd = df_change_pd.sum(numeric_only=True)
-    df_change_pd["variable"] = "Emissions|CO2|Energy and Industrial Processes"
 
-    # recombine variables of the scenarios that were changed (and change back to pyam IamDataFrame)
-    df_change_pyam = pyam.IamDataFrame(df_change_pd)
-    df_change = pyam.concat([df_change_pyam, df_change_notaffected_pyam])
+def _reclassify_waste_and_other_co2_ar6(ts):
+    # scenarios that do need changes (as they report variables that we
+    # reclassify under "Energy and Industrial Processes")
+    co2_eip = "Emissions|CO2|Energy and Industrial Processes"
+    reclassified = ["Emissions|CO2|Waste", "Emissions|CO2|Other"]
+    to_change = _get_reporting_scenarios(ts, reclassified)
 
-    # recombine scenarios with and without changes dataframes
-    df_new = pyam.concat([df_change, df_nochange])
+    # create the new CO2|Energy and Industrial Processes by adding CO2|Other
+    # and CO2|Waste to the old one, the other variables are not affected
+    rows = to_change & ts.index.get_level_values("variable").isin(
+        [*reclassified, co2_eip]
+    )
+    if not rows.any():
+        return ts
 
-    return df_new
+    return pd.concat([ts[~rows], _sum_variables(ts, rows, co2_eip)])
 
 
 def perform_input_checks(
@@ -857,26 +908,27 @@ def perform_input_checks(
     LOGGER.info("CHECK: if no non-co2 negatives are reported.")
     df = check_negatives(df, output_filename, outdir=outdir)
 
+    # the following checks all work on the same timeseries table, which is
+    # only turned back into an IamDataFrame once they are done
+    dft = df.timeseries()
+
     LOGGER.info("CHECK: report emissions for all minimally required years.")
-    df = require_allyears(
-        df, output_filename, output_csv=output_csv_files, outdir=outdir
+    dft = _require_allyears(
+        dft, output_filename, output_csv=output_csv_files, outdir=outdir
     )
 
     LOGGER.info("CHECK: combine E&IP if reported separately.")
-    # TODO: find better way than doing loop
-    dfnew = []
-    for _, df_scen in df.timeseries().groupby(["model", "scenario"]):
-        df_scen, _ = co2_energyandindustrialprocesses(df_scen)
-        dfnew.append(df_scen)
-
-    df = pyam.IamDataFrame(pd.concat(dfnew))
+    dft = _add_co2_energyandindustrialprocesses(dft)
 
     LOGGER.info("CHECK: reclassify Waste and Other CO2 under E&IP.")
-    df.exclude = False
-    df = reclassify_waste_and_other_co2_ar6(df)
+    dft = _reclassify_waste_and_other_co2_ar6(dft)
 
     LOGGER.info("CHECK: delete rows only reporting zero for the entire timeframe.")
-    df = remove_rows_with_only_zero(df)
+    # only keep the years which are still reported, as if starting from an
+    # IamDataFrame
+    dft = _remove_rows_with_only_zero(dft.dropna(axis=1, how="all"))
+
+    df = pyam.IamDataFrame(dft)
 
     if lead_variable_check and historical_check:
         typechecks = "leadhist"
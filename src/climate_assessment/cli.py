@@ -13,12 +13,22 @@ from .checks import (
     sanity_check_bounds_kyoto_emissions,
     sanity_check_comparison_kyoto_gases,
 )
-from .climate import DEFAULT_MAGICC_VERSION, climate_assessment
+from .climate import climate_assessment
 from .climate.post_process import check_hist_warming_period
-from .harmonization import run_harmonization
-from .harmonization_and_infilling import harmonization_and_infilling
+from .harmonization import HARMONIZATION_BACKENDS, HARMONIZERS, run_harmonization
+from .harmonization_and_infilling import (
+    run_harmonization_and_infilling,
+    write_harmonized_infilled,
+)
 from .infilling import postprocess_infilled_for_climate, run_infilling
+from .output import (
+    DEFAULT_OUTPUT_FORMATS,
+    OUTPUT_FORMATS,
+    read_iamc,
+    write_iamc,
+)
 from .postprocess import do_postprocess
+from .profiling import Profiler
 from .utils import (
     _add_variables,
     add_gwp100_kyoto_wrapper,
@@ -31,6 +41,38 @@ from .utils import (
 
 LOGGER = logging.getLogger(__name__)
 
+DEFAULT_INFILLING_DATABASE = os.path.abspath(
+    os.path.join(
+        os.path.dirname(__file__),
+        "infilling",
+        "cmip6-ssps-workflow-emissions.csv",
+    )
+)
+"""str: Infilling database used by :func:`run_workflow` unless another is given"""
+
+
+class ScenarioBatchSize(click.ParamType):
+    """
+    Scenario batch size, either a positive integer or "auto"
+    """
+
+    name = "integer|auto"
+
+    def convert(self, value, param, ctx):
+        if value == "auto" or isinstance(value, int):
+            return value
+
+        try:
+            out = int(value)
+        except ValueError:
+            self.fail(f"{value!r} is not a valid integer or 'auto'", param, ctx)
+
+        if out < 1:
+            self.fail(f"{value!r} is not a positive integer", param, ctx)
+
+        return out
+
+
 input_emissions_file_arg = click.argument(
     "input_emissions_file",
     required=True,
@@ -82,6 +124,65 @@ infilling_database_option = click.option(
     type=click.Path(exists=True, file_okay=True, readable=True, resolve_path=True),
     show_default=True,
 )
+harmonization_n_jobs_option = click.option(
+    "--harmonization-n-jobs",
+    help="Number of workers used to harmonise scenarios (as for joblib, -1 "
+    "means all CPUs, -2 all CPUs but one etc.)",
+    required=False,
+    default=-1,
+    type=int,
+    show_default=True,
+)
+harmonization_backend_option = click.option(
+    "--harmonization-backend",
+    help="How to run the harmonisation tasks",
+    required=False,
+    default="processes",
+    type=click.Choice(HARMONIZATION_BACKENDS),
+    show_default=True,
+)
+harmonization_chunk_size_option = click.option(
+    "--harmonization-chunk-size",
+    help="Number of scenarios harmonised in each task (if not given, chosen "
+    "based on the number of scenarios and workers)",
+    required=False,
+    default=None,
+    type=click.IntRange(min=1),
+)
+harmonizer_option = click.option(
+    "--harmonizer",
+    help="Implementation used to harmonise (with native, aneris is only used "
+    "for timeseries which need special handling)",
+    required=False,
+    default="aneris",
+    type=click.Choice(HARMONIZERS),
+    show_default=True,
+)
+infilling_n_jobs_option = click.option(
+    "--infilling-n-jobs",
+    help="Number of worker processes used to infill scenarios (as for joblib, -1 "
+    "means all CPUs, -2 all CPUs but one etc.)",
+    required=False,
+    default=1,
+    type=int,
+    show_default=True,
+)
+infilling_chunk_size_option = click.option(
+    "--infilling-chunk-size",
+    help="Number of scenarios infilled in each task (if not given, chosen based "
+    "on the number of scenarios and workers)",
+    required=False,
+    default=None,
+    type=click.IntRange(min=1),
+)
+compile_infilling_database_option = click.option(
+    "--compile-infilling-database/--no-compile-infilling-database",
+    help="Compile the relationships used for infilling once and store them next "
+    "to the infilling database, so later runs only have to look them up",
+    required=False,
+    default=False,
+    show_default=True,
+)
 harmonization_instance_option = click.option(
     "--harmonization-instance",
     help="Harmonisation settings to use",
@@ -92,7 +193,8 @@ harmonization_instance_option = click.option(
 )
 model_option = click.option(
     "--model",
-    help="Climate model to run scenarios with",
+    help="Climate model to run scenarios with. Several models can be run together "
+    "by separating them with commas (e.g. 'magicc,fair')",
     required=False,
     default="magicc",
     type=str,
@@ -100,15 +202,18 @@ model_option = click.option(
 )
 model_version_option = click.option(
     "--model-version",
-    help="Expected model version (just used to check env is working as intended)",
-    default=DEFAULT_MAGICC_VERSION,
+    help="Expected model version (just used to check env is working as intended), "
+    "comma-separated with one version per model if running several models. "
+    "Defaults to the default version of each model",
+    default=None,
     type=str,
-    show_default=True,
 )
 probabilistic_file_option = click.option(
     "--probabilistic-file",
-    help="json file containing climate model probabilistic config",
+    help="json file containing climate model probabilistic config. If running "
+    "several models, give once per model (in the same order as `--model`)",
     required=True,  # currenlty no default here, users need to locate it
+    multiple=True,
     type=click.Path(exists=True, dir_okay=False, readable=True, resolve_path=True),
 )
 magicc_extra_config_option = click.option(
@@ -164,12 +269,80 @@ test_run_option = click.option(
 )
 scenario_batch_size_option = click.option(
     "--scenario-batch-size",
-    help="Number of scenarios to run at a time",
+    help="Number of scenarios to run at a time. If 'auto', the batch size is "
+    "chosen based on the memory used by a first, small batch and `--max-memory`",
     required=False,
     default=20,
-    type=int,
+    type=ScenarioBatchSize(),
+    show_default=True,
+)
+max_memory_option = click.option(
+    "--max-memory",
+    help="Memory budget (e.g. '48GB') used when `--scenario-batch-size` is 'auto'",
+    required=False,
+    default=None,
+    type=str,
+)
+post_process_queue_depth_option = click.option(
+    "--post-process-queue-depth",
+    help="Number of batches of climate output which can wait to be "
+    "post-processed while the next batch is run (0 means no overlap)",
+    required=False,
+    default=0,
+    type=click.IntRange(min=0),
+    show_default=True,
+)
+checkpoint_dir_option = click.option(
+    "--checkpoint-dir",
+    help="Directory in which to checkpoint finished climate batches. Batches "
+    "which already have a checkpoint are skipped, so an interrupted run can be "
+    "resumed by running it again with the same directory",
+    required=False,
+    default=None,
+    type=click.Path(file_okay=False, writable=True, resolve_path=True),
+)
+config_cache_dir_option = click.option(
+    "--config-cache-dir",
+    help="Directory in which to cache the climate model configurations built "
+    "from the probabilistic file(s), so they only have to be parsed once",
+    required=False,
+    default=None,
+    type=click.Path(file_okay=False, writable=True, resolve_path=True),
+)
+result_cache_dir_option = click.option(
+    "--result-cache-dir",
+    help="Directory in which to cache the climate assessment of each scenario. "
+    "Scenarios with unchanged emissions and climate model configuration are "
+    "read from the cache instead of being run again",
+    required=False,
+    default=None,
+    type=click.Path(file_okay=False, writable=True, resolve_path=True),
+)
+deduplicate_scenarios_option = click.option(
+    "--deduplicate-scenarios/--no-deduplicate-scenarios",
+    help="Only run scenarios with identical emissions once",
+    required=False,
+    default=True,
+    type=bool,
     show_default=True,
 )
+duplicate_emissions_rtol_option = click.option(
+    "--duplicate-emissions-rtol",
+    help="Relative tolerance within which emissions are considered identical when "
+    "deduplicating scenarios (0 means emissions must match exactly)",
+    required=False,
+    default=0.0,
+    type=click.FloatRange(min=0),
+    show_default=True,
+)
+result_cache_max_size_option = click.option(
+    "--result-cache-max-size",
+    help="Maximum size of the result cache (e.g. '10GB'), least recently used "
+    "results are removed once it is exceeded",
+    required=False,
+    default=None,
+    type=str,
+)
 save_raw_climate_output_option = click.option(
     "--save-raw-climate-output/--dont-save-raw-climate-output",
     help="Save raw climate output to disk",
@@ -254,6 +427,45 @@ save_csv_combined_output_option = click.option(
     type=bool,
     show_default=True,
 )
+save_harmonized_infilled_option = click.option(
+    "--save-harmonized-infilled/--no-save-harmonized-infilled",
+    help="Write the harmonized and infilled emissions to disk (they are passed "
+    "to the climate models in memory either way)",
+    required=False,
+    default=True,
+    show_default=True,
+)
+profile_option = click.option(
+    "--profile",
+    help="Record the wall time, CPU time and memory use of each stage of the "
+    "run (and of each climate batch) and write them to "
+    "``{key_string}_profile.json`` and ``{key_string}_profile.csv`` in the "
+    "output directory",
+    is_flag=True,
+    required=False,
+    default=False,
+    type=bool,
+    show_default=True,
+)
+output_format_option = click.option(
+    "--output-format",
+    "output_formats",
+    help="Format in which to write output, can be given multiple times (parquet "
+    "and feather require pyarrow)",
+    multiple=True,
+    default=DEFAULT_OUTPUT_FORMATS,
+    type=click.Choice(OUTPUT_FORMATS),
+    show_default=True,
+)
+extra_output_format_option = click.option(
+    "--output-format",
+    "output_formats",
+    help="Additional format in which to write output, can be given multiple "
+    "times (CSV output is always written, parquet and feather require pyarrow)",
+    multiple=True,
+    default=(),
+    type=click.Choice(OUTPUT_FORMATS),
+)
 
 
 def _setup_logging(logger):
@@ -294,7 +506,7 @@ def _load_emissions_convert_to_basic(input_emissions_file, logger):
     return input_df
 
 
-def _input_checks(input_df, inputcheck, key_string, outdir):
+def _input_checks(input_df, inputcheck, key_string, outdir, profiler=None):
     """
     Simple wrapper to call climate assessment workflow native emissions input
     checks, for a chosen set of checks.
@@ -306,15 +518,19 @@ def _input_checks(input_df, inputcheck, key_string, outdir):
     For more information, see the code description under
     :func:`climate_assessment.checks.perform_input_checks`.
     """
+    if profiler is None:
+        profiler = Profiler(enabled=False)
+
     if inputcheck:
         LOGGER.info("Performing input data checks")
-        df = perform_input_checks(
-            input_df,
-            output_csv_files=True,
-            output_filename=key_string,
-            lead_variable_check=True,
-            outdir=outdir,
-        )
+        with profiler.stage("input_checks"):
+            df = perform_input_checks(
+                input_df,
+                output_csv_files=True,
+                output_filename=key_string,
+                lead_variable_check=True,
+                outdir=outdir,
+            )
 
     else:
         df = input_df.copy()
@@ -331,37 +547,62 @@ def _harmonize_and_infill(
     harmonize,
     prefix,
     harmonization_instance,
+    output_formats=DEFAULT_OUTPUT_FORMATS,
+    profiler=None,
+    save_harmonized_infilled=True,
+    harmonization_n_jobs=-1,
+    harmonization_backend="processes",
+    harmonization_chunk_size=None,
+    harmonizer="aneris",
+    infilling_n_jobs=1,
+    infilling_chunk_size=None,
+    compile_infilling_database=False,
 ):
     """
     Thin wrapper function for running both harmonization and infilling.
 
-    Returns True if there are scenarios that can be run by a climate
-    emulator. Those scenarios are not returned by this function, but rather
-    written to the outdir. Returns False if there are no complete scenarios
-    to be run.
+    Returns the scenarios that can be run by a climate emulator. If
+    ``save_harmonized_infilled`` is True, they are also written to the outdir.
+    Returns None if there are no complete scenarios to be run.
 
     For more information, see the code description under
     :func:`climate_assessment.harmonization_and_infilling.harmonization_and_infilling`.
     """
-    df = _input_checks(input_df, inputcheck, key_string, outdir)
+    df = _input_checks(input_df, inputcheck, key_string, outdir, profiler=profiler)
 
     ##################################
-    # run HARMONIZATION and INFILLING (writes out results, returns True or False, includes some post-infilling checks)
+    # run HARMONIZATION and INFILLING (returns None if there is nothing to
+    # assess, includes some post-infilling checks)
     ##################################
     # TODO: split harmonization and infilling steps
     # TODO: remove 'instance' and put config somewhere more sane
     # TODO: remove prefix when we change to the new aneris interface
-    assessable = harmonization_and_infilling(
+    infilled = run_harmonization_and_infilling(
         df,
-        key_string,
         infilling_database,
-        outdir=outdir,
         do_harmonization=harmonize,
         prefix=prefix,
         instance=harmonization_instance,
+        harmonization_n_jobs=harmonization_n_jobs,
+        harmonization_backend=harmonization_backend,
+        harmonization_chunk_size=harmonization_chunk_size,
+        harmonizer=harmonizer,
+        infilling_n_jobs=infilling_n_jobs,
+        infilling_chunk_size=infilling_chunk_size,
+        compile_infilling_database=compile_infilling_database,
+        profiler=profiler,
     )
 
-    return assessable
+    if infilled is not None and save_harmonized_infilled:
+        write_harmonized_infilled(
+            infilled,
+            key_string,
+            outdir,
+            output_formats=output_formats,
+            profiler=profiler,
+        )
+
+    return infilled
 
 
 @click.command(context_settings={"help_option_names": ["-h", "--help"]})
@@ -379,6 +620,14 @@ def _harmonize_and_infill(
 @hist_warming_eval_period_option
 @test_run_option
 @scenario_batch_size_option
+@max_memory_option
+@post_process_queue_depth_option
+@checkpoint_dir_option
+@config_cache_dir_option
+@result_cache_dir_option
+@result_cache_max_size_option
+@deduplicate_scenarios_option
+@duplicate_emissions_rtol_option
 @infilling_database_option
 @save_raw_climate_output_option
 @postprocess_option
@@ -388,7 +637,17 @@ def _harmonize_and_infill(
 @prefix_option
 @gwp_option
 @harmonization_instance_option
+@harmonization_n_jobs_option
+@harmonization_backend_option
+@harmonization_chunk_size_option
+@harmonizer_option
+@infilling_n_jobs_option
+@infilling_chunk_size_option
+@compile_infilling_database_option
 @nonco2_warming_option
+@output_format_option
+@save_harmonized_infilled_option
+@profile_option
 def workflow(
     input_emissions_file,
     outdir,
@@ -404,6 +663,14 @@ def workflow(
     historical_warming_evaluation_period,
     test_run,
     scenario_batch_size,
+    max_memory,
+    post_process_queue_depth,
+    checkpoint_dir,
+    config_cache_dir,
+    result_cache_dir,
+    result_cache_max_size,
+    deduplicate_scenarios,
+    duplicate_emissions_rtol,
     infilling_database,
     save_raw_climate_output,
     postprocess,
@@ -412,8 +679,18 @@ def workflow(
     harmonize,
     prefix,
     harmonization_instance,
+    harmonization_n_jobs,
+    harmonization_backend,
+    harmonization_chunk_size,
+    harmonizer,
+    infilling_n_jobs,
+    infilling_chunk_size,
+    compile_infilling_database,
     co2_and_non_co2_warming,
     gwp,
+    output_formats,
+    save_harmonized_infilled,
+    profile,
 ):
     # TODO: remove "model_version" and `num_cfgs` as mandatory
     #  options for AR6 release, as there should only be one option per emulator.
@@ -442,6 +719,14 @@ def workflow(
         historical_warming_evaluation_period=historical_warming_evaluation_period,
         test_run=test_run,
         scenario_batch_size=scenario_batch_size,
+        max_memory=max_memory,
+        post_process_queue_depth=post_process_queue_depth,
+        checkpoint_dir=checkpoint_dir,
+        config_cache_dir=config_cache_dir,
+        result_cache_dir=result_cache_dir,
+        result_cache_max_size=result_cache_max_size,
+        deduplicate_scenarios=deduplicate_scenarios,
+        duplicate_emissions_rtol=duplicate_emissions_rtol,
         infilling_database=infilling_database,
         save_raw_climate_output=save_raw_climate_output,
         postprocess=postprocess,
@@ -450,8 +735,18 @@ def workflow(
         harmonize=harmonize,
         prefix=prefix,
         harmonization_instance=harmonization_instance,
+        harmonization_n_jobs=harmonization_n_jobs,
+        harmonization_backend=harmonization_backend,
+        harmonization_chunk_size=harmonization_chunk_size,
+        harmonizer=harmonizer,
+        infilling_n_jobs=infilling_n_jobs,
+        infilling_chunk_size=infilling_chunk_size,
+        compile_infilling_database=compile_infilling_database,
         co2_and_non_co2_warming=co2_and_non_co2_warming,
         gwp=gwp,
+        output_formats=output_formats,
+        save_harmonized_infilled=save_harmonized_infilled,
+        profile=profile,
     )
 
 
@@ -471,13 +766,7 @@ def run_workflow(
     historical_warming_evaluation_period="1995-2014",
     test_run=False,
     scenario_batch_size=10,
-    infilling_database=os.path.abspath(
-        os.path.join(
-            os.path.dirname(__file__),
-            "infilling",
-            "cmip6-ssps-workflow-emissions.csv",
-        )
-    ),
+    infilling_database=DEFAULT_INFILLING_DATABASE,
     save_raw_climate_output=False,
     postprocess=True,
     categorisation=True,
@@ -487,6 +776,25 @@ def run_workflow(
     harmonization_instance="ar6",
     co2_and_non_co2_warming=False,
     gwp=True,
+    *,
+    max_memory=None,
+    post_process_queue_depth=0,
+    checkpoint_dir=None,
+    config_cache_dir=None,
+    result_cache_dir=None,
+    result_cache_max_size=None,
+    deduplicate_scenarios=True,
+    duplicate_emissions_rtol=0.0,
+    harmonization_n_jobs=-1,
+    harmonization_backend="processes",
+    harmonization_chunk_size=None,
+    harmonizer="aneris",
+    infilling_n_jobs=1,
+    infilling_chunk_size=None,
+    compile_infilling_database=False,
+    output_formats=DEFAULT_OUTPUT_FORMATS,
+    save_harmonized_infilled=True,
+    profile=False,
 ):
     """
     Run the workflow
@@ -494,21 +802,24 @@ def run_workflow(
     Parameters
     ----------
     input_emissions_file : str
-        Path to input emissions file. This must be read off disk because we use
-        the filename to help name output files. PRs welcome to split off an interface
-        which runs in memory.
+        Path to input emissions file. The filename is used to help name output
+        files. To run emissions which are already in memory, use
+        :func:`run_workflow_from_df`.
 
     outdir : str
         Where to save the output
 
-    model : str
-        Climate model to run
+    model : str, list[str]
+        Climate model to run. Several models (e.g. "magicc,fair") are run
+        together (see :func:`climate_assessment.climate.climate_assessment`).
 
-    model_version : str
-        Version of the climate model to run
+    model_version : str, list[str], None
+        Version of the climate model to run (one per model if running several
+        models). If None, the default version of each model.
 
-    probabilistic_file : str
+    probabilistic_file : str, list[str]
         File containing the probabilistic configuration of the climate model
+        (one per model if running several models)
 
     num_cfgs : int
         Number of climate model configurations to run
@@ -535,9 +846,10 @@ def run_workflow(
         Are we doing a test run (if yes, we don't check that historical
         warming from the climate models comes out consistently)?
 
-    scenario_batch_size : int
+    scenario_batch_size : int, str
         How many scenarios to run at once (smaller number means less memory
-        is needed)?
+        is needed)? If "auto", choose based on ``max_memory`` (see
+        :func:`climate_assessment.climate.climate_assessment`).
 
     infilling_database : str
         Path to file to use for infilling
@@ -570,14 +882,231 @@ def run_workflow(
 
     gwp : bool
         Calculate GWP equivalents too
+
+    max_memory : int, str, None
+        Memory budget (e.g. "48GB") used if ``scenario_batch_size`` is "auto"
+
+    post_process_queue_depth : int
+        How many batches of climate output can wait to be post-processed while
+        the next batch is run? If zero, batches are run and post-processed one
+        after the other (see
+        :func:`climate_assessment.climate.climate_assessment`).
+
+    checkpoint_dir : str, None
+        Directory in which to checkpoint finished climate batches so that an
+        interrupted run can be resumed (see
+        :func:`climate_assessment.climate.climate_assessment`)
+
+    config_cache_dir : str, None
+        Directory in which to cache the climate model configurations built from
+        the probabilistic file(s) (see
+        :func:`climate_assessment.climate.climate_assessment`)
+
+    result_cache_dir : str, None
+        Directory in which to cache the climate assessment of each scenario
+        (see :func:`climate_assessment.climate.climate_assessment`)
+
+    result_cache_max_size : int, str, None
+        Maximum size of the result cache (e.g. "10GB")
+
+    deduplicate_scenarios : bool
+        Only run scenarios with identical emissions once?
+
+    duplicate_emissions_rtol : float
+        Relative tolerance within which emissions are considered identical when
+        deduplicating scenarios
+
+    harmonization_n_jobs : int
+        Number of workers used to harmonise scenarios (see
+        :func:`climate_assessment.harmonization.harmonise_scenarios`)
+
+    harmonization_backend : str
+        How to run the harmonisation tasks (see
+        :data:`climate_assessment.harmonization.HARMONIZATION_BACKENDS`)
+
+    harmonization_chunk_size : int, None
+        Number of scenarios harmonised in each task. If ``None``, chosen based
+        on the number of scenarios and workers.
+
+    harmonizer : str
+        Implementation used to harmonise (see
+        :func:`climate_assessment.harmonization.run_harmonization`)
+
+    infilling_n_jobs : int
+        Number of worker processes used to infill scenarios (see
+        :func:`climate_assessment.infilling.run_infilling`)
+
+    infilling_chunk_size : int, None
+        Number of scenarios infilled in each task. If ``None``, chosen based
+        on the number of scenarios and workers.
+
+    compile_infilling_database : bool
+        Compile the relationships used for infilling once and store them next
+        to the infilling database (see
+        :func:`climate_assessment.infilling.run_infilling`)
+
+    output_formats : list[str]
+        Formats in which to write output (see
+        :data:`climate_assessment.output.OUTPUT_FORMATS`). Intermediate CSV
+        files are always written.
+
+    save_harmonized_infilled : bool
+        Should the harmonized and infilled emissions be written to
+        ``{key_string}_harmonized_infilled.csv`` (and the files of
+        ``output_formats``)? They are passed to the climate models in memory
+        so they are only needed to re-run the climate assessment by itself.
+
+    profile : bool
+        Record the wall time, CPU time and memory use of each stage of the
+        workflow and each climate batch and write them to
+        ``{key_string}_profile.json`` and ``{key_string}_profile.csv`` in
+        ``outdir`` (see :class:`climate_assessment.profiling.Profiler`)
+
+    Returns
+    -------
+    :class:`pyam.IamDataFrame`, None
+        Output of the workflow (see :func:`run_workflow_from_df`)
     """
     key_string = _get_key_string_and_log_outdir(input_emissions_file, outdir, LOGGER)
+    profiler = Profiler(enabled=profile)
+
+    with profiler.stage("load_emissions"):
+        input_df = _load_emissions_convert_to_basic(input_emissions_file, LOGGER)
+
+    return run_workflow_from_df(
+        input_df,
+        key_string,
+        outdir,
+        model,
+        model_version,
+        probabilistic_file,
+        num_cfgs,
+        inputcheck=inputcheck,
+        magicc_extra_config=magicc_extra_config,
+        fair_extra_config=fair_extra_config,
+        historical_warming=historical_warming,
+        historical_warming_reference_period=historical_warming_reference_period,
+        historical_warming_evaluation_period=historical_warming_evaluation_period,
+        test_run=test_run,
+        scenario_batch_size=scenario_batch_size,
+        max_memory=max_memory,
+        post_process_queue_depth=post_process_queue_depth,
+        checkpoint_dir=checkpoint_dir,
+        config_cache_dir=config_cache_dir,
+        result_cache_dir=result_cache_dir,
+        result_cache_max_size=result_cache_max_size,
+        deduplicate_scenarios=deduplicate_scenarios,
+        duplicate_emissions_rtol=duplicate_emissions_rtol,
+        infilling_database=infilling_database,
+        save_raw_climate_output=save_raw_climate_output,
+        postprocess=postprocess,
+        categorisation=categorisation,
+        reporting_completeness_categorisation=reporting_completeness_categorisation,
+        harmonize=harmonize,
+        prefix=prefix,
+        harmonization_instance=harmonization_instance,
+        harmonization_n_jobs=harmonization_n_jobs,
+        harmonization_backend=harmonization_backend,
+        harmonization_chunk_size=harmonization_chunk_size,
+        harmonizer=harmonizer,
+        infilling_n_jobs=infilling_n_jobs,
+        infilling_chunk_size=infilling_chunk_size,
+        compile_infilling_database=compile_infilling_database,
+        co2_and_non_co2_warming=co2_and_non_co2_warming,
+        gwp=gwp,
+        output_formats=output_formats,
+        save_harmonized_infilled=save_harmonized_infilled,
+        profiler=profiler,
+    )
+
+
+def run_workflow_from_df(
+    input_df,
+    key_string,
+    outdir,
+    model,
+    model_version,
+    probabilistic_file,
+    num_cfgs,
+    inputcheck=True,
+    magicc_extra_config=None,
+    fair_extra_config=None,
+    historical_warming=0.85,
+    historical_warming_reference_period="1850-1900",
+    historical_warming_evaluation_period="1995-2014",
+    test_run=False,
+    scenario_batch_size=10,
+    max_memory=None,
+    post_process_queue_depth=0,
+    checkpoint_dir=None,
+    config_cache_dir=None,
+    result_cache_dir=None,
+    result_cache_max_size=None,
+    deduplicate_scenarios=True,
+    duplicate_emissions_rtol=0.0,
+    infilling_database=DEFAULT_INFILLING_DATABASE,
+    save_raw_climate_output=False,
+    postprocess=True,
+    categorisation=True,
+    reporting_completeness_categorisation=False,
+    harmonize=True,
+    prefix="AR6 climate diagnostics",
+    harmonization_instance="ar6",
+    harmonization_n_jobs=-1,
+    harmonization_backend="processes",
+    harmonization_chunk_size=None,
+    harmonizer="aneris",
+    infilling_n_jobs=1,
+    infilling_chunk_size=None,
+    compile_infilling_database=False,
+    co2_and_non_co2_warming=False,
+    gwp=True,
+    output_formats=DEFAULT_OUTPUT_FORMATS,
+    save_harmonized_infilled=True,
+    profiler=None,
+):
+    """
+    Run the workflow on emissions which are already in memory
+
+    The data is passed from one stage of the workflow to the next in memory.
+    Output files are still written to ``outdir``, apart from the harmonized and
+    infilled emissions, which are only written if ``save_harmonized_infilled``
+    is True.
+
+    Parameters
+    ----------
+    input_df : :class:`pyam.IamDataFrame`
+        Input emissions, with only the basic IAMC columns (see
+        :func:`climate_assessment.utils.columns_to_basic`)
+
+    key_string : str
+        String to use to identify output files
+
+    save_harmonized_infilled : bool
+        Should the harmonized and infilled emissions be written to
+        ``{key_string}_harmonized_infilled.csv`` (and the files of
+        ``output_formats``)?
+
+    profiler : :class:`climate_assessment.profiling.Profiler`, None
+        If supplied, the time and memory used by each stage of the workflow are
+        recorded with this profiler and, if it is enabled, a report is written
+        to ``outdir`` at the end
+
+    For the other parameters, see :func:`run_workflow`.
+
+    Returns
+    -------
+    :class:`pyam.IamDataFrame`, None
+        Output of the workflow (post-processed if ``postprocess`` is True).
+        None if there are no scenarios which can be assessed.
+    """
+    if profiler is None:
+        profiler = Profiler(enabled=False)
 
     check_hist_warming_period(historical_warming_reference_period)
     check_hist_warming_period(historical_warming_evaluation_period)
-    input_df = _load_emissions_convert_to_basic(input_emissions_file, LOGGER)
 
-    assessable = _harmonize_and_infill(
+    df_infilled = _harmonize_and_infill(
         input_df,
         inputcheck,
         key_string,
@@ -586,75 +1115,118 @@ def run_workflow(
         harmonize,
         prefix,
         harmonization_instance,
+        output_formats=output_formats,
+        profiler=profiler,
+        save_harmonized_infilled=save_harmonized_infilled,
+        harmonization_n_jobs=harmonization_n_jobs,
+        harmonization_backend=harmonization_backend,
+        harmonization_chunk_size=harmonization_chunk_size,
+        harmonizer=harmonizer,
+        infilling_n_jobs=infilling_n_jobs,
+        infilling_chunk_size=infilling_chunk_size,
+        compile_infilling_database=compile_infilling_database,
     )
 
-    if not assessable:
+    if df_infilled is None:
         LOGGER.warning("No assessable scenarios")
-        return
+        if profiler.enabled:
+            profiler.write_report(outdir, key_string)
+
+        return None
 
-    # read in infilled database
-    infilled_emissions = os.path.join(outdir, f"{key_string}_harmonized_infilled.csv")
-    LOGGER.info("Reading in infilled scenarios from: %s", infilled_emissions)
-    df_infilled = pyam.IamDataFrame(infilled_emissions)
+    # only pass the data on, as if it had been read back from the csv file of
+    # the harmonized and infilled emissions, in a new object so the meta of the
+    # harmonized and infilled emissions isn't changed
+    df_infilled = pyam.IamDataFrame(df_infilled.timeseries())
 
     LOGGER.info(df_infilled.timeseries())
 
     ####################
     # run climate models
     ####################
-    df_climate = climate_assessment(
-        df_infilled,
-        key_string,
-        outdir,
-        magicc_extra_config=magicc_extra_config,
-        fair_extra_config=fair_extra_config,
-        model=model,
-        model_version=model_version,
-        probabilistic_file=probabilistic_file,
-        num_cfgs=num_cfgs,
-        historical_warming=historical_warming,
-        historical_warming_reference_period=historical_warming_reference_period,
-        historical_warming_evaluation_period=historical_warming_evaluation_period,
-        test_run=test_run,
-        scenario_batch_size=scenario_batch_size,
-        save_raw_output=save_raw_climate_output,
-        co2_and_non_co2_warming=co2_and_non_co2_warming,
-        prefix=prefix,
-    )
+    with profiler.stage("climate_assessment"):
+        df_climate = climate_assessment(
+            df_infilled,
+            key_string,
+            outdir,
+            magicc_extra_config=magicc_extra_config,
+            fair_extra_config=fair_extra_config,
+            model=model,
+            model_version=model_version,
+            probabilistic_file=probabilistic_file,
+            num_cfgs=num_cfgs,
+            historical_warming=historical_warming,
+            historical_warming_reference_period=historical_warming_reference_period,
+            historical_warming_evaluation_period=historical_warming_evaluation_period,
+            test_run=test_run,
+            scenario_batch_size=scenario_batch_size,
+            max_memory=max_memory,
+            save_raw_output=save_raw_climate_output,
+            co2_and_non_co2_warming=co2_and_non_co2_warming,
+            prefix=prefix,
+            post_process_queue_depth=post_process_queue_depth,
+            checkpoint_dir=checkpoint_dir,
+            config_cache_dir=config_cache_dir,
+            result_cache_dir=result_cache_dir,
+            result_cache_max_size=result_cache_max_size,
+            deduplicate_scenarios=deduplicate_scenarios,
+            duplicate_emissions_rtol=duplicate_emissions_rtol,
+            output_formats=output_formats,
+            profiler=profiler,
+        )
     LOGGER.info(df_climate.timeseries())
 
     LOGGER.info("Concatenating infilled df, climate df and input df")
-    results = pyam.concat([df_infilled, df_climate])
-    output = pyam.concat(
-        [input_df.filter(variable=results.variable, keep=False), results]
-    )
+    with profiler.stage("concatenate"):
+        results = pyam.concat([df_infilled, df_climate])
+        output = pyam.concat(
+            [input_df.filter(variable=results.variable, keep=False), results]
+        )
 
     LOGGER.info("write out raw output")
-    output.to_excel(os.path.join(outdir, str(key_string + "_" + "rawoutput.xlsx")))
-
-    if postprocess:
-        output_postprocess = do_postprocess(
+    with profiler.stage("write_raw_output"):
+        write_iamc(
             output,
-            outdir=outdir,
-            key_string=key_string,
-            categorisation=categorisation,
-            reporting_completeness_categorisation=reporting_completeness_categorisation,
-            prefix=prefix,
-            gwp=gwp,
-            model_version=model_version,
-            model=model,
+            os.path.join(outdir, f"{key_string}_rawoutput"),
+            output_formats=output_formats,
         )
 
+    if postprocess:
+        with profiler.stage("postprocess"):
+            output_postprocess = do_postprocess(
+                output,
+                outdir=outdir,
+                key_string=key_string,
+                categorisation=categorisation,
+                reporting_completeness_categorisation=(
+                    reporting_completeness_categorisation
+                ),
+                prefix=prefix,
+                gwp=gwp,
+                model_version=model_version,
+                model=model,
+                output_formats=output_formats,
+            )
+
         # Sanity checks
-        sanity_check_bounds_kyoto_emissions(
-            output_postprocess,
-            out_kyoto_infilled=f"{prefix}|Infilled|Emissions|Kyoto Gases",
-        )
-        sanity_check_comparison_kyoto_gases(
-            output_postprocess,
-            out_kyoto_harmonized=f"{prefix}|Harmonized|Emissions|Kyoto Gases",
-            out_kyoto_infilled=f"{prefix}|Infilled|Emissions|Kyoto Gases",
-        )
+        with profiler.stage("sanity_checks"):
+            sanity_check_bounds_kyoto_emissions(
+                output_postprocess,
+                out_kyoto_infilled=f"{prefix}|Infilled|Emissions|Kyoto Gases",
+            )
+            sanity_check_comparison_kyoto_gases(
+                output_postprocess,
+                out_kyoto_harmonized=f"{prefix}|Harmonized|Emissions|Kyoto Gases",
+                out_kyoto_infilled=f"{prefix}|Infilled|Emissions|Kyoto Gases",
+            )
+
+    else:
+        output_postprocess = output
+
+    if profiler.enabled:
+        profiler.write_report(outdir, key_string)
+
+    return output_postprocess
 
 
 @click.command(context_settings={"help_option_names": ["-h", "--help"]})
@@ -664,6 +1236,14 @@ def run_workflow(
 @infilling_database_option
 @prefix_option
 @harmonization_instance_option
+@harmonization_n_jobs_option
+@harmonization_backend_option
+@harmonization_chunk_size_option
+@harmonizer_option
+@infilling_n_jobs_option
+@infilling_chunk_size_option
+@compile_infilling_database_option
+@output_format_option
 def harmonize_and_infill(
     input_emissions_file,
     outdir,
@@ -672,6 +1252,14 @@ def harmonize_and_infill(
     prefix,
     # gwp,
     harmonization_instance,
+    harmonization_n_jobs,
+    harmonization_backend,
+    harmonization_chunk_size,
+    harmonizer,
+    infilling_n_jobs,
+    infilling_chunk_size,
+    compile_infilling_database,
+    output_formats,
 ):
     """
     Harmonise and infill data in ``input_emissions_file``, saving output in ``outdir``
@@ -696,7 +1284,15 @@ def harmonize_and_infill(
         prefix=prefix,
         # gwp=gwp,  # TODO: implement downstream
         harmonization_instance=harmonization_instance,
+        harmonization_n_jobs=harmonization_n_jobs,
+        harmonization_backend=harmonization_backend,
+        harmonization_chunk_size=harmonization_chunk_size,
+        harmonizer=harmonizer,
+        infilling_n_jobs=infilling_n_jobs,
+        infilling_chunk_size=infilling_chunk_size,
+        compile_infilling_database=compile_infilling_database,
         harmonize=True,
+        output_formats=output_formats,
     )
 
 
@@ -707,6 +1303,11 @@ def harmonize_and_infill(
 @prefix_option
 @gwp_option
 @harmonization_instance_option
+@harmonization_n_jobs_option
+@harmonization_backend_option
+@harmonization_chunk_size_option
+@harmonizer_option
+@extra_output_format_option
 def harmonize(
     input_emissions_file,
     outdir,
@@ -714,6 +1315,11 @@ def harmonize(
     prefix,
     gwp,
     harmonization_instance,
+    harmonization_n_jobs,
+    harmonization_backend,
+    harmonization_chunk_size,
+    harmonizer,
+    output_formats,
 ):
     """
     Harmonise data in ``input_emissions_file``, saving output in ``outdir``
@@ -732,7 +1338,13 @@ def harmonize(
     df = _input_checks(input_df, inputcheck, key_string, outdir)
 
     df_harmonized = run_harmonization(
-        df, instance=harmonization_instance, prefix=prefix
+        df,
+        instance=harmonization_instance,
+        prefix=prefix,
+        n_jobs=harmonization_n_jobs,
+        backend=harmonization_backend,
+        chunk_size=harmonization_chunk_size,
+        harmonizer=harmonizer,
     )
 
     if gwp:
@@ -742,7 +1354,9 @@ def harmonize(
             prefixes=[f"{prefix}|Harmonized|"],
         )
 
-    df_harmonized.to_csv(os.path.join(outdir, f"{key_string}_harmonized.csv"))
+    out_stem = os.path.join(outdir, f"{key_string}_harmonized")
+    df_harmonized.to_csv(f"{out_stem}.csv")
+    write_iamc(df_harmonized, out_stem, output_formats=output_formats)
 
 
 @click.command(context_settings={"help_option_names": ["-h", "--help"]})
@@ -752,6 +1366,11 @@ def harmonize(
 @prefix_option
 @gwp_def_false_option
 @harmonization_instance_option
+@harmonization_n_jobs_option
+@harmonization_backend_option
+@harmonization_chunk_size_option
+@harmonizer_option
+@extra_output_format_option
 def create_infiller_database(
     input_emissions_file,
     outdir,
@@ -759,6 +1378,11 @@ def create_infiller_database(
     prefix,
     gwp,
     harmonization_instance,
+    harmonization_n_jobs,
+    harmonization_backend,
+    harmonization_chunk_size,
+    harmonizer,
+    output_formats,
 ):
     """
     Creates infiller database by harmonizing data in ``input_emissions_file``
@@ -778,7 +1402,13 @@ def create_infiller_database(
     df = _input_checks(input_df, inputcheck, key_string, outdir)
 
     df_harmonized = run_harmonization(
-        df, instance=harmonization_instance, prefix=prefix
+        df,
+        instance=harmonization_instance,
+        prefix=prefix,
+        n_jobs=harmonization_n_jobs,
+        backend=harmonization_backend,
+        chunk_size=harmonization_chunk_size,
+        harmonizer=harmonizer,
     )
 
     df_infiller_database = infiller_vetting(df_harmonized)
@@ -810,9 +1440,9 @@ def create_infiller_database(
     df_infiller_database = df_infiller_database.append(co2_totals, inplace=False)
 
     LOGGER.info("Saving output")
-    df_infiller_database.to_csv(
-        os.path.join(outdir, f"{key_string}_infillerdatabase.csv")
-    )
+    out_stem = os.path.join(outdir, f"{key_string}_infillerdatabase")
+    df_infiller_database.to_csv(f"{out_stem}.csv")
+    write_iamc(df_infiller_database, out_stem, output_formats=output_formats)
 
 
 @click.command(context_settings={"help_option_names": ["-h", "--help"]})
@@ -821,12 +1451,20 @@ def create_infiller_database(
 @infilling_database_option
 @prefix_option
 @gwp_option
+@extra_output_format_option
+@infilling_n_jobs_option
+@infilling_chunk_size_option
+@compile_infilling_database_option
 def infill(
     input_emissions_file,
     outdir,
     infilling_database,
     prefix,
     gwp,
+    output_formats,
+    infilling_n_jobs,
+    infilling_chunk_size,
+    compile_infilling_database,
 ):
     """
     Infill harmonized data in ``input_emissions_file``, saving output in ``outdir``
@@ -849,6 +1487,9 @@ def infill(
         prefix=prefix,
         database_filepath=infilling_database,
         start_year=harmonized_start_year,
+        n_jobs=infilling_n_jobs,
+        chunk_size=infilling_chunk_size,
+        compile_database=compile_infilling_database,
     )
 
     LOGGER.info("Post-processing for the climate model step")
@@ -866,6 +1507,9 @@ def infill(
     outfile = os.path.join(outdir, "infilled.csv")
     LOGGER.info("Saving output to %s", outfile)
     infilled.to_csv(outfile)
+    write_iamc(
+        infilled, os.path.join(outdir, "infilled"), output_formats=output_formats
+    )
 
 
 @click.command(context_settings={"help_option_names": ["-h", "--help"]})
@@ -882,11 +1526,21 @@ def infill(
 @fair_extra_config_option
 @probabilistic_file_option
 @scenario_batch_size_option
+@max_memory_option
+@post_process_queue_depth_option
+@checkpoint_dir_option
+@config_cache_dir_option
+@result_cache_dir_option
+@result_cache_max_size_option
+@deduplicate_scenarios_option
+@duplicate_emissions_rtol_option
 @prefix_option
 @gwp_def_false_option
 @nonco2_warming_option
 @save_raw_climate_output_option
 @save_csv_combined_output_option
+@output_format_option
+@profile_option
 def clim_cli(
     harmonizedinfilledemissions,
     outdir,
@@ -901,11 +1555,21 @@ def clim_cli(
     fair_extra_config,
     probabilistic_file,
     scenario_batch_size,
+    max_memory,
+    post_process_queue_depth,
+    checkpoint_dir,
+    config_cache_dir,
+    result_cache_dir,
+    result_cache_max_size,
+    deduplicate_scenarios,
+    duplicate_emissions_rtol,
     prefix,
     gwp,
     co2_and_non_co2_warming,
     save_raw_climate_output,
     save_csv_combined_output,
+    output_formats,
+    profile,
 ):
     """
     Run the climate emulator step of the IPCC AR6 climate asessment workflow.
@@ -929,37 +1593,53 @@ def clim_cli(
 
     check_hist_warming_period(historical_warming_reference_period)
     check_hist_warming_period(historical_warming_evaluation_period)
+    profiler = Profiler(enabled=profile)
 
     LOGGER.info(
         "Loading harmonized, infilled scenarios: %s", harmonizedinfilledemissions
     )
-    df_infilled = pyam.IamDataFrame(harmonizedinfilledemissions)
-    df_climate = climate_assessment(
-        df_infilled,
-        key_string,
-        outdir,
-        magicc_extra_config=magicc_extra_config,
-        fair_extra_config=fair_extra_config,
-        model=model,
-        model_version=model_version,
-        probabilistic_file=probabilistic_file,
-        num_cfgs=num_cfgs,
-        historical_warming=historical_warming,
-        historical_warming_reference_period=historical_warming_reference_period,
-        historical_warming_evaluation_period=historical_warming_evaluation_period,
-        test_run=test_run,
-        scenario_batch_size=scenario_batch_size,
-        save_raw_output=save_raw_climate_output,
-        co2_and_non_co2_warming=co2_and_non_co2_warming,
-        prefix=prefix,
-    )
+    with profiler.stage("read_harmonized_infilled"):
+        df_infilled = pyam.IamDataFrame(harmonizedinfilledemissions)
+    with profiler.stage("climate_assessment"):
+        df_climate = climate_assessment(
+            df_infilled,
+            key_string,
+            outdir,
+            magicc_extra_config=magicc_extra_config,
+            fair_extra_config=fair_extra_config,
+            model=model,
+            model_version=model_version,
+            probabilistic_file=probabilistic_file,
+            num_cfgs=num_cfgs,
+            historical_warming=historical_warming,
+            historical_warming_reference_period=historical_warming_reference_period,
+            historical_warming_evaluation_period=historical_warming_evaluation_period,
+            test_run=test_run,
+            scenario_batch_size=scenario_batch_size,
+            max_memory=max_memory,
+            save_raw_output=save_raw_climate_output,
+            co2_and_non_co2_warming=co2_and_non_co2_warming,
+            prefix=prefix,
+            post_process_queue_depth=post_process_queue_depth,
+            checkpoint_dir=checkpoint_dir,
+            config_cache_dir=config_cache_dir,
+            result_cache_dir=result_cache_dir,
+            result_cache_max_size=result_cache_max_size,
+            deduplicate_scenarios=deduplicate_scenarios,
+            duplicate_emissions_rtol=duplicate_emissions_rtol,
+            output_formats=output_formats,
+            profiler=profiler,
+        )
     if df_climate is None:
         LOGGER.error("Climate assessment failed, exiting")
+        if profile:
+            profiler.write_report(outdir, key_string)
 
         return
 
     LOGGER.info("Concatenating infilled df and climate df")
-    results = pyam.concat([df_infilled, df_climate])
+    with profiler.stage("concatenate"):
+        results = pyam.concat([df_infilled, df_climate])
 
     if gwp:
         LOGGER.info("Adding extra Kyoto Gases variables in GWP100 for each scenario")
@@ -974,26 +1654,38 @@ def clim_cli(
         )
 
     LOGGER.info("write out raw output")
-    results.to_excel(os.path.join(outdir, str(key_string + "_" + "rawoutput.xlsx")))
+    with profiler.stage("write_raw_output"):
+        write_iamc(
+            results,
+            os.path.join(outdir, f"{key_string}_rawoutput"),
+            output_formats=output_formats,
+        )
+
+        if save_csv_combined_output:
+            LOGGER.info("write out raw output in csv")
+            results.to_csv(
+                os.path.join(outdir, str(key_string + "_" + "rawoutput.csv"))
+            )
 
-    if save_csv_combined_output:
-        LOGGER.info("write out raw output in csv")
-        results.to_csv(os.path.join(outdir, str(key_string + "_" + "rawoutput.csv")))
+    if profile:
+        profiler.write_report(outdir, key_string)
 
     LOGGER.info("COMPLETE")
 
 
 def _postprocess_worker(fname, outdir, **kwargs):
     """
-    Helper function which takes a file that ends with "_rawoutput.xlsx" and the output
+    Helper function which takes a file that ends with "_rawoutput" followed by the
+    extension of one of the output formats (e.g. "_rawoutput.xlsx") and the output
     location, and then calls the function `do_postprocess(output, outdir, key_string, prefix)`.
     """
-    if not fname.endswith("_rawoutput.xlsx"):
+    stem, ext = os.path.splitext(fname.rstrip(os.sep))
+    if not stem.endswith("_rawoutput") or ext[1:] not in OUTPUT_FORMATS:
         raise AssertionError(fname)
 
-    output = pyam.IamDataFrame(fname)
+    output = read_iamc(fname)
 
-    key_string = os.path.basename(fname).replace("_rawoutput.xlsx", "")
+    key_string = os.path.basename(stem).replace("_rawoutput", "")
 
     return do_postprocess(output, outdir=outdir, key_string=key_string, **kwargs)
 
@@ -1009,6 +1701,7 @@ def _postprocess_worker(fname, outdir, **kwargs):
 @model_version_option
 @categorisation_option
 @report_completeness_option
+@output_format_option
 def postprocess(
     rawoutput_files,
     outdir,
@@ -1020,6 +1713,7 @@ def postprocess(
     model_version,
     categorisation,
     reporting_completeness_categorisation,
+    output_formats,
 ):
     """
     Merge and postprocess a collection of rawoutput into a single set of output files
@@ -1049,6 +1743,7 @@ def postprocess(
                 reporting_completeness_categorisation=reporting_completeness_categorisation,
                 gwp=kyoto_ghgs,
                 prefix=prefix,
+                output_formats=output_formats,
             )
             for fname in rawoutput_files
         ]
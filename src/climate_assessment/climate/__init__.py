@@ -1,5 +1,8 @@
+import contextlib
 import logging
 import os.path
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
 import openscm_runner.run
@@ -7,18 +10,105 @@ import pandas as pd
 import pyam
 import tqdm.autonotebook as tqdman
 
+from ..output import DEFAULT_OUTPUT_FORMATS, check_output_formats
+from ..profiling import Profiler
+from .cache import ScenarioResultCache
+from .checkpoint import (
+    get_batch_checkpoint_key,
+    get_batch_sizes_key,
+    get_climate_config_hash,
+    load_batch_checkpoint,
+    load_batch_sizes,
+    save_batch_checkpoint,
+    save_batch_sizes,
+)
 from .ciceroscm import DEFAULT_CICEROSCM_VERSION, get_ciceroscm_configurations
+from .combine import (
+    read_combined_output,
+    scmrun_to_pyam_style_wide,
+    streaming_batch_combiner,
+)
+from .dedup import add_duplicate_scenario_results, find_duplicate_scenarios
 from .fair import DEFAULT_FAIR_VERSION, get_fair_configurations
 from .magicc7 import (
     DEFAULT_MAGICC_DRAWNSET,
     DEFAULT_MAGICC_VERSION,
     get_magicc7_configurations,
 )
+from .memory import (
+    BatchMemoryMonitor,
+    calculate_scenario_batch_size,
+    get_current_rss,
+    get_initial_scenario_batch_size,
+    parse_memory_size,
+    record_memory_per_scenario,
+)
 from .post_process import post_process
 from .wg3 import clean_wg3_scenarios
 
 LOGGER = logging.getLogger(__name__)
 
+CLIMATE_MODELS = ("magicc", "fair", "ciceroscm")
+"""tuple[str]: Climate models which can be run"""
+
+_DEFAULT_VERSIONS = {
+    "magicc": DEFAULT_MAGICC_VERSION,
+    "fair": DEFAULT_FAIR_VERSION,
+    "ciceroscm": DEFAULT_CICEROSCM_VERSION,
+}
+
+# variables requested from the climate models (OpenSCM-Runner names)
+OUTPUT_VARIABLES = (
+    # GSAT
+    "Surface Air Temperature Change",
+    # GMST
+    "Surface Air Ocean Blended Temperature Change",
+    # ERFs
+    "Effective Radiative Forcing",
+    "Effective Radiative Forcing|Anthropogenic",
+    "Effective Radiative Forcing|Aerosols",
+    "Effective Radiative Forcing|Aerosols|Direct Effect",
+    "Effective Radiative Forcing|Aerosols|Direct Effect|BC",
+    "Effective Radiative Forcing|Aerosols|Direct Effect|OC",
+    "Effective Radiative Forcing|Aerosols|Direct Effect|SOx",
+    "Effective Radiative Forcing|Aerosols|Indirect Effect",
+    "Effective Radiative Forcing|Greenhouse Gases",
+    "Effective Radiative Forcing|CO2",
+    "Effective Radiative Forcing|CH4",
+    "Effective Radiative Forcing|N2O",
+    "Effective Radiative Forcing|F-Gases",
+    "Effective Radiative Forcing|Montreal Protocol Halogen Gases",
+    "Effective Radiative Forcing|CFC11",
+    "Effective Radiative Forcing|CFC12",
+    "Effective Radiative Forcing|HCFC22",
+    "Effective Radiative Forcing|Ozone",
+    "Effective Radiative Forcing|HFC125",
+    "Effective Radiative Forcing|HFC134a",
+    "Effective Radiative Forcing|HFC143a",
+    "Effective Radiative Forcing|HFC227ea",
+    "Effective Radiative Forcing|HFC23",
+    "Effective Radiative Forcing|HFC245fa",
+    "Effective Radiative Forcing|HFC32",
+    "Effective Radiative Forcing|HFC4310mee",
+    "Effective Radiative Forcing|CF4",
+    "Effective Radiative Forcing|C6F14",
+    "Effective Radiative Forcing|C2F6",
+    "Effective Radiative Forcing|SF6",
+    # Heat uptake
+    "Heat Uptake",
+    # "Heat Uptake|Ocean",
+    # Atmospheric concentrations
+    "Atmospheric Concentrations|CO2",
+    "Atmospheric Concentrations|CH4",
+    "Atmospheric Concentrations|N2O",
+    # carbon cycle
+    "Net Atmosphere to Land Flux|CO2",
+    "Net Atmosphere to Ocean Flux|CO2",
+    # permafrost
+    "Net Land to Atmosphere Flux|CO2|Earth System Feedbacks|Permafrost",
+    "Net Land to Atmosphere Flux|CH4|Earth System Feedbacks|Permafrost",
+)
+
 
 class MissingVariableFilter(logging.Filter):
     def filter(self, record):
@@ -38,11 +128,23 @@ def climate_assessment(
     test_run=False,
     scenario_batch_size=20,
     save_raw_output=False,
-    probabilistic_file=DEFAULT_MAGICC_DRAWNSET,
+    probabilistic_file=None,
     magicc_extra_config=None,
     fair_extra_config=None,
     co2_and_non_co2_warming=False,
     prefix="AR6 climate diagnostics",
+    *,
+    max_memory=None,
+    post_process_queue_depth=0,
+    checkpoint_dir=None,
+    config_cache_dir=None,
+    result_cache_dir=None,
+    result_cache_max_size=None,
+    deduplicate_scenarios=True,
+    duplicate_emissions_rtol=0.0,
+    output_formats=DEFAULT_OUTPUT_FORMATS,
+    return_output=True,
+    profiler=None,
 ):
     """
     Run the climate assessment
@@ -58,14 +160,20 @@ def climate_assessment(
     outdir : str
         Directory in which to save the output
 
-    model : str
-        Reduced-complexity climate model to run assessment with
+    model : str, list[str]
+        Reduced-complexity climate model to run assessment with. Several
+        models can be given as a list or comma-separated string (e.g.
+        ``"magicc,fair"``), in which case they are all run together and the
+        output contains the results of every model (see
+        :func:`parse_climate_models`).
 
-    model_version : str, None
-        Version of the climate model. If None, use default
+    model_version : str, list[str], None
+        Version of the climate model, one per model if running several models.
+        If None, use default
 
-    num_cfgs : int
-        Number of model configs to run. Multiply this number by the number of
+    num_cfgs : int, list[int]
+        Number of model configs to run (either for all models or one per
+        model). Multiply this number by the number of
         scenarios to get total runs. The full drawnset is 600 so if you're
         just testing it's probably worth using a smaller number unless you
         want to wait for 58 000 runs (of course by using a smaller subset the
@@ -89,13 +197,22 @@ def climate_assessment(
         How many scenarios do you want to run at once? This should be adjusted
         to balance the amount of RAM and number of cores available on your
         system. The limit depends mostly on the RAM available.
+        If "auto", a first, small batch is run to measure the memory required
+        per scenario and the remaining batches are sized to fit in
+        ``max_memory``. The measurement is re-used by later calls in the same
+        process with the same model configuration.
 
     save_raw_output : bool
         Should we also save the raw climate output (i.e. every ensemble member) to disk?
+        It is saved in ``outdir/raw_climate_output`` as memory-mappable arrays,
+        see :class:`climate_assessment.climate.raw_output.RawEnsembleStore`.
 
-    probabilistic_file : str
+    probabilistic_file : str, list[str]
         Path to file containing parameters to run climate model with (will be passed to
-         `openscm-runner`). Currently, only json files are supported.
+         `openscm-runner`). Currently, only json files are supported. If running
+         several models, one file per model. If None, MAGICC uses
+         :data:`climate_assessment.climate.magicc7.DEFAULT_MAGICC_DRAWNSET`, the
+         other models have no default file.
 
     co2_and_non_co2_warming : bool
         Include assessment of CO2 and non-CO2 warming (requires 3x as many runs)?
@@ -103,11 +220,79 @@ def climate_assessment(
     prefix : str
         Prefix for all variable names
 
+    max_memory : int, str, None
+        Memory budget used if ``scenario_batch_size`` is "auto", either in
+        bytes or as a string like "48GB" (see
+        :func:`climate_assessment.climate.memory.parse_memory_size`)
+
+    post_process_queue_depth : int
+        If greater than zero, post-process and save each batch in a separate
+        worker while the climate models are already running the next batch.
+        At most this many batches of raw climate output are held while waiting
+        to be post-processed, which bounds the extra memory required. If zero,
+        each batch is run, post-processed and saved before the next one starts.
+
+    checkpoint_dir : str, None
+        If supplied, the output of each finished batch is saved in this
+        directory, keyed by a hash of the batch's emissions, the climate model
+        configuration, the historical warming settings and the version of
+        ``climate-assessment``. Batches for which a checkpoint already exists
+        are not run again, so an interrupted run can be resumed by running it
+        again with the same ``checkpoint_dir``. If ``scenario_batch_size`` is
+        'auto', the chosen batch sizes are saved too so a resumed run uses the
+        same batches.
+
+    config_cache_dir : str, None
+        If supplied, the climate model configurations built from
+        ``probabilistic_file`` are cached in this directory so the probabilistic
+        file only has to be parsed once (see
+        :func:`climate_assessment.climate.config_cache.get_cached_configurations`)
+
+    result_cache_dir : str, None
+        If supplied, the results of each scenario are cached in this
+        directory, keyed by a hash of the scenario's (cleaned) emissions and
+        the same configuration as used for ``checkpoint_dir``. Only scenarios
+        which are not in the cache are run (see
+        :class:`climate_assessment.climate.cache.ScenarioResultCache`).
+
+    result_cache_max_size : int, str, None
+        Maximum size of the result cache, either in bytes or as a string like
+        "10GB". Once the cache is bigger, the least recently used results are
+        removed. If ``None``, the cache's size is not limited.
+
+    deduplicate_scenarios : bool
+        Should scenarios with identical emissions only be run once? If so, the
+        results of the first such scenario are copied to all the others.
+
+    duplicate_emissions_rtol : float
+        Relative tolerance within which emissions are considered identical when
+        deduplicating scenarios (zero means emissions must match exactly)
+
+    output_formats : list[str]
+        Formats in which to write the combined output, in addition to CSV (see
+        :data:`climate_assessment.output.OUTPUT_FORMATS`)
+
+    return_output : bool
+        Should the combined output be returned? This requires reading it all
+        into memory and converting it to long format. If ``False``, the output
+        is only written to disk and the path of the combined CSV is returned
+        instead.
+
+    profiler : :class:`climate_assessment.profiling.Profiler`, None
+        If supplied, the time and memory used by each stage of each batch (running
+        the climate models, post-processing and saving) are recorded with this
+        profiler
+
     Returns
     -------
-    :class:`pyam.IamDataFrame`
-        :class:`pyam.IamDataFrame` containing climate assessment
+    :class:`pyam.IamDataFrame`, str, None
+        :class:`pyam.IamDataFrame` containing climate assessment. If
+        ``return_output`` is ``False``, the path of the combined CSV output
+        instead. ``None`` if there are no scenarios to assess.
     """
+    if profiler is None:
+        profiler = Profiler(enabled=False)
+
     ## Setup bits and pieces
     datafile_output_name = f"{key_string}_IAMC_climateassessment.csv"
     datafile_output_meta_name = (
@@ -117,155 +302,391 @@ def climate_assessment(
     )
     data_file_output = os.path.join(outdir, datafile_output_name)
     data_file_output_meta = os.path.join(outdir, datafile_output_meta_name)
+    output_formats = check_output_formats(output_formats)
+
+    with profiler.stage("clean_scenarios"):
+        clean_scenarios = clean_wg3_scenarios(df)
 
-    clean_scenarios = clean_wg3_scenarios(df)
     if clean_scenarios is None:
         return None
 
-    climate_model_cfgs, climate_models_out_config = _get_model_configs_and_out_configs(
-        model=model,
-        model_version=model_version,
-        probabilistic_file=probabilistic_file,
-        magicc_extra_config=magicc_extra_config,
-        fair_extra_config=fair_extra_config,
-        num_cfgs=num_cfgs,
-        co2_and_non_co2_warming=co2_and_non_co2_warming,
-    )
+    if probabilistic_file is None:
+        probabilistic_file = [
+            DEFAULT_MAGICC_DRAWNSET if climate_model == "magicc" else None
+            for climate_model, _ in parse_climate_models(model, model_version)
+        ]
+
+    with profiler.stage("climate_model_configurations"):
+        (
+            climate_model_cfgs,
+            climate_models_out_config,
+        ) = _get_model_configs_and_out_configs(
+            model=model,
+            model_version=model_version,
+            probabilistic_file=probabilistic_file,
+            magicc_extra_config=magicc_extra_config,
+            fair_extra_config=fair_extra_config,
+            num_cfgs=num_cfgs,
+            co2_and_non_co2_warming=co2_and_non_co2_warming,
+            config_cache_dir=config_cache_dir,
+        )
+
+    duplicate_scenarios = {}
+    if deduplicate_scenarios:
+        clean_scenarios, duplicate_scenarios = find_duplicate_scenarios(
+            clean_scenarios, rtol=duplicate_emissions_rtol
+        )
+        n_duplicates = sum(len(v) for v in duplicate_scenarios.values())
+        if n_duplicates > 0:
+            runs_per_scenario = sum(len(v) for v in climate_model_cfgs.values())
+            LOGGER.info(
+                "%s scenarios have the same emissions as another scenario and will "
+                "not be run separately, saving %s climate model runs",
+                n_duplicates,
+                n_duplicates * runs_per_scenario,
+            )
 
-    # define auxiliary functions to circumvent the big memory requirements
-    #   for storing in pyam long format
-    def add_batch_id_to_outpath(ipath):
+    def add_batch_id_to_outpath(ipath, batch_no):
         _, ext = os.path.splitext(ipath)
 
         return ipath.replace(ext, f"{batch_no:04d}{ext}")
 
-    def save_pyam_style_csv(outpath, scmdf, meta=False):
-        """
-        Save pyam style without converting to long data first
-        """
-        df = scmdf.timeseries()
-        if set(df.index.names) != set(pyam.IAMC_IDX):
-            raise AssertionError(
-                f"Only meta cols should be `{pyam.IAMC_IDX}` in order to keep everyone sane"
+    def post_process_and_save_batch(
+        res, batch_no, checkpoint_key, cached_results=(), result_cache_keys=None
+    ):
+        batch_results = list(cached_results)
+        if res is not None:
+            with profiler.stage("post_process", batch=batch_no):
+                _, res_percentiles, meta_table = post_process(
+                    res,
+                    outdir,
+                    test_run=test_run,
+                    save_raw_output=save_raw_output,
+                    co2_and_non_co2_warming=co2_and_non_co2_warming,
+                    historical_warming=historical_warming,
+                    historical_warming_reference_period=(
+                        historical_warming_reference_period
+                    ),
+                    historical_warming_evaluation_period=(
+                        historical_warming_evaluation_period
+                    ),
+                    return_raw=False,
+                )
+
+                LOGGER.info(
+                    f"\n\n Batch run finished - now saving batch number {batch_no}."
+                    + "\n\n"
+                )
+                res_percentiles = scmrun_to_pyam_style_wide(res_percentiles)
+
+            for (iam, scenario), key in (result_cache_keys or {}).items():
+                result_cache.save(
+                    key,
+                    res_percentiles[
+                        (res_percentiles["Model"] == iam)
+                        & (res_percentiles["Scenario"] == scenario)
+                    ],
+                    meta_table.loc[[(iam, scenario)]],
+                )
+
+            batch_results.append((res_percentiles, meta_table))
+
+        if len(batch_results) == 1:
+            res_percentiles, meta_table = batch_results[0]
+        else:
+            res_percentiles = pd.concat([v[0] for v in batch_results]).sort_values(
+                ["Model", "Scenario", "Region", "Variable", "Unit"]
             )
+            res_percentiles = res_percentiles.reset_index(drop=True)
+            meta_table = pd.concat([v[1] for v in batch_results]).sort_index()
 
-        # convert columns to years
-        df.columns = df.columns.map(lambda x: x.year)
-        if df.columns.duplicated().any():
-            raise AssertionError(
-                "Somehow you've got more than one output for a single year..."
+        if checkpoint_key is not None:
+            save_batch_checkpoint(
+                checkpoint_dir, checkpoint_key, res_percentiles, meta_table
             )
 
-        df = df.reset_index()
+        save_batch(res_percentiles, meta_table, batch_no)
 
-        df = df.rename(columns={c: str(c).title() for c in df.columns})
-        df.to_csv(outpath, index=False)
+    def save_batch(res_percentiles, meta_table, batch_no):
+        with profiler.stage("save_batch", batch=batch_no):
+            res_percentiles, meta_table = add_duplicate_scenario_results(
+                res_percentiles, meta_table, duplicate_scenarios
+            )
+            res_percentiles.to_csv(
+                add_batch_id_to_outpath(data_file_output, batch_no), index=False
+            )
+            meta_table.to_csv(add_batch_id_to_outpath(data_file_output_meta, batch_no))
 
-    def save_pyam_style_meta_table(outpath, meta_table):
-        """
-        Save meta table without going through a :obj:`pyam.IamDataFrame`
-        """
-        # excel writing for meta can be used here instead if you want...
-        meta_table.to_csv(outpath)
+            append_batch(res_percentiles, meta_table)
 
-    # run script climate model in batches
+    # run script climate model in batches, streaming each batch into the
+    # combined output as we go to circumvent the big memory requirements of
+    # joining everything in pyam long format at the end
     batch_no = 0
     batch_dfs = []
     total_mod_scens = clean_scenarios[["model", "scenario"]].drop_duplicates().shape[0]
 
     LOGGER.info(f"\n\n\nTotal mod_scens: {total_mod_scens}\n\n\n")
-
-    for j, (_, model_scenario_df) in tqdman.tqdm(
-        enumerate(clean_scenarios.groupby(["model", "scenario"])),
-        desc=f"{total_mod_scens} model-scenario pairs (running in batches of {scenario_batch_size})",
-        total=total_mod_scens,
-    ):
-        batch_dfs.append(model_scenario_df)
-        if np.equal((j + 1) % scenario_batch_size, 0) or np.equal(
-            (j + 1), total_mod_scens
-        ):
-            scenarios_to_run = pyam.IamDataFrame(pd.concat(batch_dfs))
-
-            ##################################
-            # run climate models
-            ##################################
-            _, res_percentiles, meta_table = run_and_post_process(
-                scenarios_to_run,
-                climate_model_cfgs,
-                climate_models_out_config,
-                historical_warming=historical_warming,
-                historical_warming_reference_period=historical_warming_reference_period,
-                historical_warming_evaluation_period=historical_warming_evaluation_period,
-                save_raw_output=save_raw_output,
-                outdir=outdir,
-                test_run=test_run,
-                co2_and_non_co2_warming=co2_and_non_co2_warming,
-            )
-
-            LOGGER.info(
-                f"\n\n Batch run finished - now saving batch number {batch_no}."
-                + "\n\n"
-            )
-            save_pyam_style_csv(
-                add_batch_id_to_outpath(data_file_output),
-                res_percentiles,
+    measure_batch_memory = False
+    if scenario_batch_size == "auto":
+        if max_memory is None:
+            raise ValueError(
+                "`max_memory` must be supplied if `scenario_batch_size` is 'auto'"
             )
-            save_pyam_style_meta_table(
-                add_batch_id_to_outpath(data_file_output_meta),
-                meta_table,
-            )
-
-            #  batch count
-            batch_dfs = []
-            batch_no += 1
 
-    LOGGER.info("All batches have been run. Let us combine them.")
-
-    ## Join everything back together
-    full_output = []
-    meta = []
-
-    for i in tqdman.tqdm(range(batch_no), desc="Reading batches"):
-        # combine the IAMC dataframe
-        _, ext = os.path.splitext(data_file_output)
-        batch_df_string = data_file_output.replace(ext, f"{i:04d}{ext}")
-        full_output.append(pd.read_csv(batch_df_string))
-
-        # combine the meta file with exceedance probabilities
-        _, ext = os.path.splitext(data_file_output_meta)
-        batch_df_meta_string = data_file_output_meta.replace(ext, f"{i:04d}{ext}")
-        meta.append(pd.read_csv(batch_df_meta_string))
+        max_memory = parse_memory_size(max_memory)
+        memory_key = (
+            tuple((name, len(cfgs)) for name, cfgs in climate_model_cfgs.items()),
+            str(model_version),
+            OUTPUT_VARIABLES,
+            co2_and_non_co2_warming,
+        )
+        baseline_memory = get_current_rss()
+        current_batch_size, measure_batch_memory = get_initial_scenario_batch_size(
+            memory_key,
+            max_memory,
+            baseline_memory,
+            post_process_queue_depth=post_process_queue_depth,
+        )
+    elif isinstance(scenario_batch_size, int) and scenario_batch_size > 0:
+        current_batch_size = scenario_batch_size
+    else:
+        raise ValueError(
+            "`scenario_batch_size` must be a positive integer or 'auto', "
+            f"received {scenario_batch_size}"
+        )
 
-    LOGGER.info("Joining meta using pandas")
-    meta = pd.concat(meta, ignore_index=True)
+    if checkpoint_dir is not None or result_cache_dir is not None:
+        config_hash = get_climate_config_hash(
+            model=model,
+            model_version=model_version,
+            probabilistic_file=probabilistic_file,
+            magicc_extra_config=magicc_extra_config,
+            fair_extra_config=fair_extra_config,
+            num_cfgs=num_cfgs,
+            co2_and_non_co2_warming=co2_and_non_co2_warming,
+            historical_warming=historical_warming,
+            historical_warming_reference_period=historical_warming_reference_period,
+            historical_warming_evaluation_period=historical_warming_evaluation_period,
+        )
 
-    LOGGER.info("Writing meta to excel")
-    meta["exclude"] = ""
-    meta.to_excel(
-        os.path.join(
-            outdir,
-            f"{key_string}_full_exceedance_probabilities.xlsx",
+    # batch sizes to use after the current batch, the last is kept for all
+    # remaining batches
+    next_batch_sizes = []
+    run_batch_sizes = []
+    if checkpoint_dir is not None:
+        LOGGER.info("Checkpointing batches in %s", checkpoint_dir)
+        if scenario_batch_size == "auto":
+            # the batch boundaries determine the checkpoint keys so a resumed
+            # run has to use the batch sizes of the original run
+            batch_sizes_key = get_batch_sizes_key(
+                config_hash, max_memory, post_process_queue_depth
+            )
+            saved_batch_sizes = load_batch_sizes(checkpoint_dir, batch_sizes_key)
+            if saved_batch_sizes is not None:
+                LOGGER.info(
+                    "Using scenario batch sizes of the checkpointed run: %s",
+                    saved_batch_sizes,
+                )
+                current_batch_size, *next_batch_sizes = saved_batch_sizes
+                measure_batch_memory = False
+            elif not measure_batch_memory:
+                save_batch_sizes(checkpoint_dir, batch_sizes_key, [current_batch_size])
+
+    if result_cache_dir is not None:
+        LOGGER.info("Using result cache in %s", result_cache_dir)
+        result_cache = ScenarioResultCache(
+            result_cache_dir,
+            config_hash,
+            max_size=(
+                None
+                if result_cache_max_size is None
+                else parse_memory_size(result_cache_max_size)
+            ),
+        )
+    else:
+        result_cache = None
+
+    if post_process_queue_depth > 0:
+        LOGGER.info(
+            "Post-processing batches in parallel with climate model runs "
+            "(queue depth: %s)",
+            post_process_queue_depth,
         )
-    )
 
-    LOGGER.info("Joining batches using pyam (slow as requires converting to long data)")
-    full_output = pyam.IamDataFrame(pd.concat(full_output)).data
-    # add prefix
-    full_output["variable"] = prefix + "|" + full_output["variable"].astype(str)
-    full_output = pyam.IamDataFrame(full_output)
+    # a single worker ensures batches are saved in the order they were run
+    with (
+        streaming_batch_combiner(
+            data_file_output,
+            data_file_output_meta,
+            os.path.join(outdir, f"{key_string}_IAMC_climateassessment"),
+            os.path.join(outdir, f"{key_string}_full_exceedance_probabilities"),
+            prefix=prefix,
+            output_formats=output_formats,
+        ) as append_batch,
+        ThreadPoolExecutor(max_workers=1) as post_process_executor,
+    ):
+        post_process_queue = deque()
 
-    # include relevant meta in output
-    meta_mod_scen = meta.set_index(["model", "scenario"])
-    for c in meta_mod_scen:
-        if c == "exclude":
-            continue
+        def process_in_order(func, *args):
+            if post_process_queue_depth > 0:
+                while len(post_process_queue) >= post_process_queue_depth:
+                    post_process_queue.popleft().result()
 
-        full_output.set_meta(meta_mod_scen[c])
+                post_process_queue.append(post_process_executor.submit(func, *args))
+            else:
+                func(*args)
 
-    LOGGER.info("Writing output to excel")
-    full_output.to_excel(
-        os.path.join(outdir, f"{key_string}_IAMC_climateassessment.xlsx")
-    )
+        for j, (_, model_scenario_df) in tqdman.tqdm(
+            enumerate(clean_scenarios.groupby(["model", "scenario"])),
+            desc=f"{total_mod_scens} model-scenario pairs (running in batches of {scenario_batch_size})",
+            total=total_mod_scens,
+        ):
+            batch_dfs.append(model_scenario_df)
+            if len(batch_dfs) >= current_batch_size or np.equal(
+                (j + 1), total_mod_scens
+            ):
+                batch_scenarios = pd.concat(batch_dfs)
+                if checkpoint_dir is not None:
+                    checkpoint_key = get_batch_checkpoint_key(
+                        batch_scenarios, config_hash
+                    )
+                    checkpoint = load_batch_checkpoint(checkpoint_dir, checkpoint_key)
+                else:
+                    checkpoint_key = None
+                    checkpoint = None
+
+                if checkpoint is not None:
+                    LOGGER.info(
+                        "Batch number %s has already been run (checkpoint %s), "
+                        "skipping",
+                        batch_no,
+                        checkpoint_key,
+                    )
+                    process_in_order(save_batch, *checkpoint, batch_no)
+
+                else:
+                    cached_results = []
+                    result_cache_keys = {}
+                    scenarios_to_run = batch_scenarios
+                    if result_cache is not None:
+                        scenarios_to_run = []
+                        scenario_groups = batch_scenarios.groupby(["model", "scenario"])
+                        for (iam, scenario), scenario_emissions in scenario_groups:
+                            key = result_cache.get_key(scenario_emissions)
+                            cached = result_cache.load(key, iam, scenario)
+                            if cached is None:
+                                result_cache_keys[(iam, scenario)] = key
+                                scenarios_to_run.append(scenario_emissions)
+                            else:
+                                cached_results.append(cached)
+
+                        LOGGER.info(
+                            "Found %s of %s scenarios of batch number %s in the "
+                            "result cache",
+                            len(cached_results),
+                            len(batch_dfs),
+                            batch_no,
+                        )
+                        if scenarios_to_run:
+                            scenarios_to_run = pd.concat(scenarios_to_run)
+
+                    if len(scenarios_to_run) == 0:
+                        process_in_order(
+                            post_process_and_save_batch,
+                            None,
+                            batch_no,
+                            checkpoint_key,
+                            cached_results,
+                        )
+
+                    else:
+                        memory_monitor = (
+                            BatchMemoryMonitor()
+                            if measure_batch_memory
+                            else contextlib.nullcontext()
+                        )
+                        with memory_monitor:
+                            ##################################
+                            # run climate models
+                            ##################################
+                            with profiler.stage("run_climate_models", batch=batch_no):
+                                res = run_climate_models(
+                                    pyam.IamDataFrame(scenarios_to_run),
+                                    climate_model_cfgs,
+                                    climate_models_out_config,
+                                )
+
+                            process_in_order(
+                                post_process_and_save_batch,
+                                res,
+                                batch_no,
+                                checkpoint_key,
+                                cached_results,
+                                result_cache_keys,
+                            )
+
+                            # drop our reference so the raw output can be freed
+                            # as soon as it has been post-processed
+                            del res
+
+                            if measure_batch_memory:
+                                # include post-processing in the measurement
+                                while post_process_queue:
+                                    post_process_queue.popleft().result()
+
+                        if measure_batch_memory:
+                            memory_per_scenario = record_memory_per_scenario(
+                                memory_key,
+                                len(batch_dfs) - len(cached_results),
+                                memory_monitor.used_memory,
+                            )
+                            current_batch_size = calculate_scenario_batch_size(
+                                memory_per_scenario,
+                                max_memory,
+                                baseline_memory,
+                                post_process_queue_depth=post_process_queue_depth,
+                            )
+                            LOGGER.info(
+                                "Measured ~%.1f MB per scenario, using scenario "
+                                "batch size of %s for the remaining batches",
+                                memory_per_scenario / 1e6,
+                                current_batch_size,
+                            )
+                            measure_batch_memory = False
+                            if checkpoint_dir is not None:
+                                save_batch_sizes(
+                                    checkpoint_dir,
+                                    batch_sizes_key,
+                                    [
+                                        *run_batch_sizes,
+                                        len(batch_dfs),
+                                        current_batch_size,
+                                    ],
+                                )
+
+                #  batch count
+                run_batch_sizes.append(len(batch_dfs))
+                batch_dfs = []
+                batch_no += 1
+                if next_batch_sizes:
+                    current_batch_size = next_batch_sizes.pop(0)
+
+        if post_process_queue:
+            LOGGER.info("Waiting for post-processing of the remaining batches")
+
+        while post_process_queue:
+            post_process_queue.popleft().result()
+
+    LOGGER.info("All batches have been run and combined")
+    if result_cache is not None:
+        result_cache.log_stats()
+
+    if not return_output:
+        return data_file_output
+
+    with profiler.stage("read_combined_output"):
+        full_output = read_combined_output(data_file_output, data_file_output_meta)
 
     return full_output
 
@@ -324,57 +745,41 @@ def run_and_post_process(
     -------
 
     """
-    output_variables = (
-        # GSAT
-        "Surface Air Temperature Change",
-        # GMST
-        "Surface Air Ocean Blended Temperature Change",
-        # ERFs
-        "Effective Radiative Forcing",
-        "Effective Radiative Forcing|Anthropogenic",
-        "Effective Radiative Forcing|Aerosols",
-        "Effective Radiative Forcing|Aerosols|Direct Effect",
-        "Effective Radiative Forcing|Aerosols|Direct Effect|BC",
-        "Effective Radiative Forcing|Aerosols|Direct Effect|OC",
-        "Effective Radiative Forcing|Aerosols|Direct Effect|SOx",
-        "Effective Radiative Forcing|Aerosols|Indirect Effect",
-        "Effective Radiative Forcing|Greenhouse Gases",
-        "Effective Radiative Forcing|CO2",
-        "Effective Radiative Forcing|CH4",
-        "Effective Radiative Forcing|N2O",
-        "Effective Radiative Forcing|F-Gases",
-        "Effective Radiative Forcing|Montreal Protocol Halogen Gases",
-        "Effective Radiative Forcing|CFC11",
-        "Effective Radiative Forcing|CFC12",
-        "Effective Radiative Forcing|HCFC22",
-        "Effective Radiative Forcing|Ozone",
-        "Effective Radiative Forcing|HFC125",
-        "Effective Radiative Forcing|HFC134a",
-        "Effective Radiative Forcing|HFC143a",
-        "Effective Radiative Forcing|HFC227ea",
-        "Effective Radiative Forcing|HFC23",
-        "Effective Radiative Forcing|HFC245fa",
-        "Effective Radiative Forcing|HFC32",
-        "Effective Radiative Forcing|HFC4310mee",
-        "Effective Radiative Forcing|CF4",
-        "Effective Radiative Forcing|C6F14",
-        "Effective Radiative Forcing|C2F6",
-        "Effective Radiative Forcing|SF6",
-        # Heat uptake
-        "Heat Uptake",
-        # "Heat Uptake|Ocean",
-        # Atmospheric concentrations
-        "Atmospheric Concentrations|CO2",
-        "Atmospheric Concentrations|CH4",
-        "Atmospheric Concentrations|N2O",
-        # carbon cycle
-        "Net Atmosphere to Land Flux|CO2",
-        "Net Atmosphere to Ocean Flux|CO2",
-        # permafrost
-        "Net Land to Atmosphere Flux|CO2|Earth System Feedbacks|Permafrost",
-        "Net Land to Atmosphere Flux|CH4|Earth System Feedbacks|Permafrost",
+    res = run_climate_models(scenarios, climate_models_cfgs, climate_models_out_config)
+
+    return post_process(
+        res,
+        outdir,
+        test_run=test_run,
+        save_raw_output=save_raw_output,
+        co2_and_non_co2_warming=co2_and_non_co2_warming,
+        historical_warming=historical_warming,
+        historical_warming_reference_period=historical_warming_reference_period,
+        historical_warming_evaluation_period=historical_warming_evaluation_period,
     )
-    LOGGER.info("`output_variables`: %s", output_variables)
+
+
+def run_climate_models(scenarios, climate_models_cfgs, climate_models_out_config):
+    """
+    Run the climate models probabilistically, without any post-processing
+
+    Parameters
+    ----------
+    scenarios: [:obj:`scmdata.ScmRun`, :class:`pyam.IamDataFrame`]
+        Emissions  for the scenarios of interest
+
+    climate_models_cfgs : dict
+        Configuration as expected by openscm-runner
+
+    climate_models_out_config : dict
+        Climate models output config as expected by OpenSCM-Runner
+
+    Returns
+    -------
+    :obj:`scmdata.ScmRun`
+        Raw climate model output
+    """
+    LOGGER.info("`output_variables`: %s", OUTPUT_VARIABLES)
 
     LOGGER.debug("Adding custom filter to FaIR run logger")
     # Filter out missing variable warnings from FaIR logger,
@@ -388,7 +793,7 @@ def run_and_post_process(
         climate_models_cfgs=climate_models_cfgs,
         out_config=climate_models_out_config,
         scenarios=scenarios,
-        output_variables=output_variables,
+        output_variables=OUTPUT_VARIABLES,
     )
 
     LOGGER.debug("Removing custom filters from run loggers")
@@ -400,15 +805,74 @@ def run_and_post_process(
     fair_run_logger.filters.pop(mvf)
 
     LOGGER.info("Finished running climate models")
-    return post_process(
-        res,
-        outdir,
-        test_run=test_run,
-        save_raw_output=save_raw_output,
-        co2_and_non_co2_warming=co2_and_non_co2_warming,
-        historical_warming=historical_warming,
-        historical_warming_reference_period=historical_warming_reference_period,
-        historical_warming_evaluation_period=historical_warming_evaluation_period,
+    return res
+
+
+def parse_climate_models(model, model_version=None):
+    """
+    Parse the climate model(s) to run
+
+    Parameters
+    ----------
+    model : str, list[str]
+        Climate model(s) to run, either a list or a comma-separated string
+        (e.g. ``"magicc,fair"``). See :data:`CLIMATE_MODELS` for the available
+        models.
+
+    model_version : str, list[str], None
+        Version of each climate model, either a list or a comma-separated
+        string with one entry per model. If None, the default version of each
+        model is used. A single version can only be given for a single model.
+
+    Returns
+    -------
+    list[tuple[str, str]]
+        Climate model (lower case) and its version for each model to run
+
+    Raises
+    ------
+    ValueError
+        A model is unknown or given more than once or the number of versions
+        doesn't match the number of models
+    """
+    models = model.split(",") if isinstance(model, str) else list(model)
+    models = [m.strip().lower() for m in models]
+    unknown = [m for m in models if m not in CLIMATE_MODELS]
+    if unknown:
+        raise ValueError(
+            f"Unknown climate model(s): {unknown}. Available models: {CLIMATE_MODELS}"
+        )
+
+    if len(set(models)) != len(models):
+        raise ValueError(f"Climate models must only be given once, received {models}")
+
+    if isinstance(model_version, str):
+        model_version = model_version.split(",")
+
+    model_versions = _get_per_model_values(model_version, models, "model_version")
+    model_versions = [
+        _DEFAULT_VERSIONS[m] if v is None else str(v).strip()
+        for m, v in zip(models, model_versions)
+    ]
+
+    return list(zip(models, model_versions))
+
+
+def _get_per_model_values(value, models, name, broadcast=False):
+    if value is None or isinstance(value, (str, int)):
+        value = [value]
+    else:
+        value = list(value)
+
+    if len(value) == len(models):
+        return value
+
+    if len(value) == 1 and (broadcast or value[0] is None):
+        return value * len(models)
+
+    raise ValueError(
+        f"`{name}` must have one value for each climate model ({models}), "
+        f"received {value}"
     )
 
 
@@ -420,46 +884,65 @@ def _get_model_configs_and_out_configs(
     fair_extra_config,
     num_cfgs,
     co2_and_non_co2_warming,
+    config_cache_dir=None,
 ):
-    # in #67, refactor so this can handle multiple models at once
+    models = parse_climate_models(model, model_version)
+    probabilistic_files = _get_per_model_values(
+        probabilistic_file, models, "probabilistic_file"
+    )
+    num_cfgs = _get_per_model_values(num_cfgs, models, "num_cfgs", broadcast=True)
+
+    # one config for all the models so they are all run (and share the
+    # available cores) in a single call to openscm-runner
     climate_model_cfgs = {}
-    if model.lower() == "magicc":
-        if model_version is None:
-            model_version = DEFAULT_MAGICC_VERSION
-        magicc7_cfgs, magicc7_out_config = get_magicc7_configurations(
-            magicc_version=model_version,
-            magicc_probabilistic_file=probabilistic_file,
-            magicc_extra_config=magicc_extra_config,
-            num_cfgs=num_cfgs,
-            co2_and_non_co2_warming=co2_and_non_co2_warming,
-        )
-        climate_model_cfgs["MAGICC7"] = magicc7_cfgs
-        climate_models_out_config = {"MAGICC7": magicc7_out_config}
-        LOGGER.info(f"Running MAGICC7 {len(magicc7_cfgs)} configs")
-
-    elif model.lower() == "fair":
-        if model_version is None:
-            model_version = DEFAULT_FAIR_VERSION
-        fair_cfgs = get_fair_configurations(
-            fair_version=model_version,
-            fair_probabilistic_file=probabilistic_file,
-            fair_extra_config=fair_extra_config,
-            num_cfgs=num_cfgs,
-        )
-        climate_model_cfgs["FAIR"] = fair_cfgs
-        climate_models_out_config = None
-        LOGGER.info(f"Running FAIR {len(fair_cfgs)} configs")
-
-    elif model.lower() == "ciceroscm":
-        if model_version is None:
-            model_version = DEFAULT_CICEROSCM_VERSION
-        ciceroscm_cfgs = get_ciceroscm_configurations(
-            ciceroscm_version=model_version,
-            ciceroscm_probabilistic_file=probabilistic_file,
-            num_cfgs=num_cfgs,
-        )
-        climate_model_cfgs["CICEROSCM"] = ciceroscm_cfgs
+    climate_models_out_config = {}
+    for (climate_model, version), cm_probabilistic_file, cm_num_cfgs in zip(
+        models, probabilistic_files, num_cfgs
+    ):
+        if cm_probabilistic_file is None:
+            raise ValueError(
+                f"`probabilistic_file` must be supplied for {climate_model}"
+            )
+
+        if climate_model == "magicc":
+            magicc7_cfgs, magicc7_out_config = get_magicc7_configurations(
+                magicc_version=version,
+                magicc_probabilistic_file=cm_probabilistic_file,
+                magicc_extra_config=magicc_extra_config,
+                num_cfgs=cm_num_cfgs,
+                co2_and_non_co2_warming=co2_and_non_co2_warming,
+                config_cache_dir=config_cache_dir,
+            )
+            climate_model_cfgs["MAGICC7"] = magicc7_cfgs
+            climate_models_out_config["MAGICC7"] = magicc7_out_config
+            LOGGER.info(f"Running MAGICC7 {len(magicc7_cfgs)} configs")
+
+        elif climate_model == "fair":
+            fair_cfgs = get_fair_configurations(
+                fair_version=version,
+                fair_probabilistic_file=cm_probabilistic_file,
+                fair_extra_config=fair_extra_config,
+                num_cfgs=cm_num_cfgs,
+                config_cache_dir=config_cache_dir,
+            )
+            climate_model_cfgs["FAIR"] = fair_cfgs
+            LOGGER.info(f"Running FAIR {len(fair_cfgs)} configs")
+
+        elif climate_model == "ciceroscm":
+            ciceroscm_cfgs = get_ciceroscm_configurations(
+                ciceroscm_version=version,
+                ciceroscm_probabilistic_file=cm_probabilistic_file,
+                num_cfgs=cm_num_cfgs,
+                config_cache_dir=config_cache_dir,
+            )
+            climate_model_cfgs["CICEROSCM"] = ciceroscm_cfgs
+            LOGGER.info(f"Running CICEROSCM {len(ciceroscm_cfgs)} configs")
+
+    if climate_models_out_config:
+        # models without any extra output config
+        for climate_model in climate_model_cfgs:
+            climate_models_out_config.setdefault(climate_model, ())
+    else:
         climate_models_out_config = None
-        LOGGER.info(f"Running CICEROSCM {len(ciceroscm_cfgs)} configs")
 
     return climate_model_cfgs, climate_models_out_config
@@ -0,0 +1,169 @@
+import logging
+import os
+import os.path
+import threading
+
+import pandas as pd
+
+from .checkpoint import (
+    _get_checkpoint_paths,
+    get_batch_checkpoint_key,
+    load_batch_checkpoint,
+    save_batch_checkpoint,
+)
+
+LOGGER = logging.getLogger(__name__)
+
+
+class ScenarioResultCache:
+    """
+    On-disk cache of climate assessment results for individual scenarios
+
+    Results are keyed by a hash of the scenario's (cleaned) emissions and the
+    climate model configuration, ignoring the scenario's model and scenario
+    names, so a scenario which is re-submitted unchanged (even under a
+    different name) does not have to be run again. Once the cache is bigger
+    than its maximum size, the least recently used results are removed.
+    """
+
+    def __init__(self, cache_dir, config_hash, max_size=None):
+        """
+        Initialise
+
+        Parameters
+        ----------
+        cache_dir : str
+            Directory in which to store the cached results
+
+        config_hash : str
+            Hash of the climate model configuration (see
+            :func:`climate_assessment.climate.checkpoint.get_climate_config_hash`)
+
+        max_size : int, None
+            Maximum size of the cache in bytes. If ``None``, the cache's size
+            is not limited.
+        """
+        self.cache_dir = cache_dir
+        self.config_hash = config_hash
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        # results are saved from the post-processing worker
+        self._lock = threading.Lock()
+
+    def get_key(self, scenario_emissions):
+        """
+        Get the key of a scenario's results
+
+        Parameters
+        ----------
+        scenario_emissions : :class:`pandas.DataFrame`
+            Emissions of a single scenario in wide format (as returned by
+            :func:`climate_assessment.climate.wg3.clean_wg3_scenarios`)
+
+        Returns
+        -------
+        str
+            Key of the scenario's results
+        """
+        emissions = scenario_emissions.drop(["model", "scenario"], axis="columns")
+        emissions = emissions.sort_values(["region", "variable", "unit"])
+
+        return get_batch_checkpoint_key(emissions, self.config_hash)
+
+    def load(self, key, model, scenario):
+        """
+        Load a scenario's results
+
+        Parameters
+        ----------
+        key : str
+            Key of the scenario's results (see :meth:`get_key`)
+
+        model : str
+            Model to label the results with
+
+        scenario : str
+            Scenario to label the results with
+
+        Returns
+        -------
+        :class:`pandas.DataFrame`, :class:`pandas.DataFrame`
+            Results in pyam's wide file format and the meta table. If the
+            results are not in the cache, ``None`` is returned instead.
+        """
+        with self._lock:
+            cached = load_batch_checkpoint(self.cache_dir, key)
+            if cached is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            # mark as recently used
+            for fname in _get_checkpoint_paths(self.cache_dir, key):
+                os.utime(fname)
+
+        res_wide, meta_table = cached
+        res_wide["Model"] = model
+        res_wide["Scenario"] = scenario
+        meta_table.index = pd.MultiIndex.from_tuples(
+            [(model, scenario)] * meta_table.shape[0], names=["model", "scenario"]
+        )
+
+        return res_wide, meta_table
+
+    def save(self, key, res_wide, meta_table):
+        """
+        Save a scenario's results
+
+        If the cache is then bigger than its maximum size, the least recently
+        used results are removed.
+
+        Parameters
+        ----------
+        key : str
+            Key of the scenario's results (see :meth:`get_key`)
+
+        res_wide : :class:`pandas.DataFrame`
+            Results in pyam's wide file format
+
+        meta_table : :class:`pandas.DataFrame`
+            Meta table of the scenario
+        """
+        with self._lock:
+            save_batch_checkpoint(self.cache_dir, key, res_wide, meta_table)
+            if self.max_size is not None:
+                self._evict()
+
+    def log_stats(self):
+        """
+        Log the cache's hit and miss statistics
+        """
+        total = self.hits + self.misses
+        LOGGER.info(
+            "Result cache: %s hits, %s misses (hit rate: %.1f%%)",
+            self.hits,
+            self.misses,
+            100 * self.hits / total if total else 0,
+        )
+
+    def _evict(self):
+        entries = {}
+        for fname in os.listdir(self.cache_dir):
+            key = fname.split("_")[0]
+            path = os.path.join(self.cache_dir, fname)
+            stat = os.stat(path)
+            size, last_used = entries.get(key, (0, 0))
+            entries[key] = (size + stat.st_size, max(last_used, stat.st_mtime))
+
+        total_size = sum(size for size, _ in entries.values())
+        for key, (size, _) in sorted(entries.items(), key=lambda v: v[1][1]):
+            if total_size <= self.max_size:
+                break
+
+            LOGGER.debug("Evicting %s from result cache", key)
+            for fname in _get_checkpoint_paths(self.cache_dir, key):
+                if os.path.isfile(fname):
+                    os.remove(fname)
+
+            total_size -= size
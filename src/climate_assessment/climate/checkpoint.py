@@ -0,0 +1,249 @@
+import hashlib
+import json
+import logging
+import os.path
+
+import pandas as pd
+
+from .. import __version__
+
+LOGGER = logging.getLogger(__name__)
+
+
+def _hash_file(fname):
+    if fname is None:
+        return None
+
+    if not isinstance(fname, str):
+        # one file per climate model
+        return [_hash_file(f) for f in fname]
+
+    sha = hashlib.sha256()
+    with open(fname, "rb") as fh:
+        for chunk in iter(lambda: fh.read(2**20), b""):
+            sha.update(chunk)
+
+    return sha.hexdigest()
+
+
+def get_climate_config_hash(
+    model,
+    model_version,
+    probabilistic_file,
+    magicc_extra_config,
+    fair_extra_config,
+    num_cfgs,
+    co2_and_non_co2_warming,
+    historical_warming,
+    historical_warming_reference_period,
+    historical_warming_evaluation_period,
+):
+    """
+    Get a hash which identifies a climate model configuration
+
+    The hash includes the content of all configuration files and the version
+    of ``climate-assessment`` so it changes whenever anything which affects
+    the results of a run changes. See
+    :func:`climate_assessment.climate.climate_assessment` for a description
+    of the parameters.
+
+    Returns
+    -------
+    str
+        Hash of the configuration
+    """
+    config = {
+        "model": model,
+        "model_version": model_version,
+        "probabilistic_file": _hash_file(probabilistic_file),
+        "magicc_extra_config": _hash_file(magicc_extra_config),
+        "fair_extra_config": _hash_file(fair_extra_config),
+        "num_cfgs": num_cfgs,
+        "co2_and_non_co2_warming": co2_and_non_co2_warming,
+        "historical_warming": historical_warming,
+        "historical_warming_reference_period": historical_warming_reference_period,
+        "historical_warming_evaluation_period": historical_warming_evaluation_period,
+        "climate_assessment_version": __version__,
+    }
+
+    return hashlib.sha256(
+        json.dumps(config, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+def get_batch_checkpoint_key(scenarios, config_hash):
+    """
+    Get the key which identifies the checkpoint of a batch
+
+    Parameters
+    ----------
+    scenarios : :class:`pandas.DataFrame`
+        Emissions of the batch in wide format (as returned by
+        :func:`climate_assessment.climate.wg3.clean_wg3_scenarios`)
+
+    config_hash : str
+        Hash of the climate model configuration (see
+        :func:`get_climate_config_hash`)
+
+    Returns
+    -------
+    str
+        Key of the batch's checkpoint
+    """
+    sha = hashlib.sha256(config_hash.encode())
+    sha.update(json.dumps([str(c) for c in scenarios.columns]).encode())
+    sha.update(pd.util.hash_pandas_object(scenarios, index=False).values.tobytes())
+
+    return sha.hexdigest()
+
+
+def get_batch_sizes_key(config_hash, max_memory, post_process_queue_depth):
+    """
+    Get the key which identifies the batch sizes chosen for an auto-sized run
+
+    Parameters
+    ----------
+    config_hash : str
+        Hash of the climate model configuration (see
+        :func:`get_climate_config_hash`)
+
+    max_memory : int
+        Memory budget of the run in bytes
+
+    post_process_queue_depth : int
+        Number of batches which can be waiting to be post-processed
+
+    Returns
+    -------
+    str
+        Key of the batch sizes
+    """
+    return hashlib.sha256(
+        json.dumps([config_hash, max_memory, post_process_queue_depth]).encode()
+    ).hexdigest()
+
+
+def save_batch_sizes(checkpoint_dir, key, batch_sizes):
+    """
+    Save the scenario batch sizes chosen for an auto-sized run
+
+    The batch boundaries determine the checkpoint keys (see
+    :func:`get_batch_checkpoint_key`), so a resumed run must use the same
+    batch sizes as the original run to find its checkpoints.
+
+    Parameters
+    ----------
+    checkpoint_dir : str
+        Directory in which to save checkpoints
+
+    key : str
+        Key of the batch sizes (see :func:`get_batch_sizes_key`)
+
+    batch_sizes : list[int]
+        Size of each batch, the last size is used for all remaining batches
+    """
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    fname = os.path.join(checkpoint_dir, f"{key}_batch_sizes.json")
+    tmp_file = f"{fname}.tmp"
+    with open(tmp_file, "w") as fh:
+        json.dump(batch_sizes, fh)
+
+    os.replace(tmp_file, fname)
+
+
+def load_batch_sizes(checkpoint_dir, key):
+    """
+    Load the scenario batch sizes chosen for an auto-sized run
+
+    Parameters
+    ----------
+    checkpoint_dir : str
+        Directory in which checkpoints are saved
+
+    key : str
+        Key of the batch sizes (see :func:`get_batch_sizes_key`)
+
+    Returns
+    -------
+    list[int]
+        Size of each batch (see :func:`save_batch_sizes`). If no batch sizes
+        have been saved for ``key``, ``None`` is returned instead.
+    """
+    fname = os.path.join(checkpoint_dir, f"{key}_batch_sizes.json")
+    if not os.path.isfile(fname):
+        return None
+
+    with open(fname) as fh:
+        return json.load(fh)
+
+
+def _get_checkpoint_paths(checkpoint_dir, key):
+    return (
+        os.path.join(checkpoint_dir, f"{key}_data.csv"),
+        os.path.join(checkpoint_dir, f"{key}_meta.csv"),
+    )
+
+
+def save_batch_checkpoint(checkpoint_dir, key, res_wide, meta_table):
+    """
+    Save a finished batch so it can be skipped when the run is restarted
+
+    The meta table is written last so a checkpoint is only complete (see
+    :func:`load_batch_checkpoint`) once both files have been written in full.
+
+    Parameters
+    ----------
+    checkpoint_dir : str
+        Directory in which to save checkpoints
+
+    key : str
+        Key of the batch (see :func:`get_batch_checkpoint_key`)
+
+    res_wide : :class:`pandas.DataFrame`
+        Batch output in pyam's wide file format
+
+    meta_table : :class:`pandas.DataFrame`
+        Batch meta table
+    """
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    data_file, meta_file = _get_checkpoint_paths(checkpoint_dir, key)
+
+    for df, fname, index in (
+        (res_wide, data_file, False),
+        (meta_table, meta_file, True),
+    ):
+        tmp_file = f"{fname}.tmp"
+        df.to_csv(tmp_file, index=index)
+        os.replace(tmp_file, fname)
+
+    LOGGER.debug("Saved checkpoint %s", key)
+
+
+def load_batch_checkpoint(checkpoint_dir, key):
+    """
+    Load a finished batch
+
+    Parameters
+    ----------
+    checkpoint_dir : str
+        Directory in which checkpoints are saved
+
+    key : str
+        Key of the batch (see :func:`get_batch_checkpoint_key`)
+
+    Returns
+    -------
+    :class:`pandas.DataFrame`, :class:`pandas.DataFrame`
+        Batch output in pyam's wide file format and the batch's meta table. If
+        there is no complete checkpoint for ``key``, ``None`` is returned
+        instead.
+    """
+    data_file, meta_file = _get_checkpoint_paths(checkpoint_dir, key)
+    if not (os.path.isfile(data_file) and os.path.isfile(meta_file)):
+        return None
+
+    res_wide = pd.read_csv(data_file)
+    res_wide.columns = [int(c) if c.isdigit() else c for c in res_wide.columns]
+    meta_table = pd.read_csv(meta_file, index_col=["model", "scenario"])
+
+    return res_wide, meta_table
@@ -3,6 +3,8 @@ import logging
 
 from openscm_runner.adapters import CICEROSCM
 
+from .config_cache import get_cached_configurations
+
 LOGGER = logging.getLogger(__name__)
 DEFAULT_CICEROSCM_VERSION = "v2019vCH4"
 
@@ -11,14 +13,28 @@ def get_ciceroscm_configurations(
     ciceroscm_version,
     ciceroscm_probabilistic_file,
     num_cfgs,
+    config_cache_dir=None,
 ):
     """
     Get configuration for CICERO-SCM
+
+    If ``config_cache_dir`` is supplied, the configurations are cached there
+    (see :func:`climate_assessment.climate.config_cache.get_cached_configurations`).
     """
     if CICEROSCM.get_version() != ciceroscm_version:
         # version strings for linux and windows might be different!
         raise AssertionError(CICEROSCM.get_version())
 
+    return get_cached_configurations(
+        config_cache_dir,
+        "ciceroscm",
+        lambda: _build_ciceroscm_configurations(ciceroscm_probabilistic_file, num_cfgs),
+        files=(ciceroscm_probabilistic_file,),
+        num_cfgs=num_cfgs,
+    )
+
+
+def _build_ciceroscm_configurations(ciceroscm_probabilistic_file, num_cfgs):
     with open(ciceroscm_probabilistic_file) as fh:
         cfgs_raw = json.load(fh)
     ciceroscm_cfgs = [c for c in cfgs_raw[:num_cfgs][:]]
@@ -0,0 +1,251 @@
+import contextlib
+import logging
+
+import openpyxl
+import pandas as pd
+import pyam
+
+from ..output import (
+    DEFAULT_OUTPUT_FORMATS,
+    StreamingTableWriter,
+    check_output_formats,
+    remove_existing_output,
+    write_parquet_dataset,
+)
+
+LOGGER = logging.getLogger(__name__)
+
+# number of rows of the combined CSV files which are copied to xlsx at once
+_XLSX_CHUNK_SIZE = 10_000
+
+
+def scmrun_to_pyam_style_wide(scmdf):
+    """
+    Convert to pyam's wide file format without converting to long data first
+
+    Parameters
+    ----------
+    scmdf : :obj:`scmdata.ScmRun`
+        Data to convert. The only meta columns must be :obj:`pyam.IAMC_IDX`.
+
+    Returns
+    -------
+    :class:`pandas.DataFrame`
+        Data in the format pyam writes to disk i.e. title-cased IAMC columns
+        followed by one column per year, sorted by the IAMC columns
+    """
+    df = scmdf.timeseries()
+    if set(df.index.names) != set(pyam.IAMC_IDX):
+        raise AssertionError(
+            f"Only meta cols should be `{pyam.IAMC_IDX}` in order to keep everyone sane"
+        )
+
+    # convert columns to years
+    df.columns = df.columns.map(lambda x: x.year)
+    if df.columns.duplicated().any():
+        raise AssertionError(
+            "Somehow you've got more than one output for a single year..."
+        )
+
+    df = df.reorder_levels(pyam.IAMC_IDX).sort_index().reset_index()
+
+    # the years stay integers, like pyam (and the checkpoints, see
+    # :func:`climate_assessment.climate.checkpoint.load_batch_checkpoint`)
+    # read them
+    return df.rename(columns={c: c.title() for c in df.columns if isinstance(c, str)})
+
+
+def _write_xlsx_from_csvs(xlsx_file, sheets):
+    # openpyxl's write-only workbooks stream rows to disk so copying the
+    # combined CSV files only ever holds one chunk in memory
+    workbook = openpyxl.Workbook(write_only=True)
+    for sheet_name, csv_file, convert in sheets:
+        worksheet = workbook.create_sheet(sheet_name)
+        for i, chunk in enumerate(pd.read_csv(csv_file, chunksize=_XLSX_CHUNK_SIZE)):
+            chunk = convert(chunk)
+            if i == 0:
+                worksheet.append(
+                    [int(c) if str(c).isdigit() else c for c in chunk.columns]
+                )
+
+            chunk = chunk.astype(object).where(chunk.notna(), None)
+            for row in chunk.itertuples(index=False):
+                worksheet.append(list(row))
+
+    workbook.save(xlsx_file)
+
+
+@contextlib.contextmanager
+def streaming_batch_combiner(
+    data_file_output,
+    data_file_output_meta,
+    output_stem,
+    meta_output_stem,
+    prefix,
+    output_formats=DEFAULT_OUTPUT_FORMATS,
+):
+    """
+    Stream batches of climate assessment output into combined output files
+
+    Each batch is appended to the combined files as soon as it is finished so
+    that the full output never has to be held in memory (or converted to long
+    format) at once. Batches must be passed in (model, scenario) order for the
+    combined output to be sorted. xlsx files can't be appended to, so they are
+    written from the combined CSV files once all batches have been appended,
+    again without holding more than a chunk of rows in memory.
+
+    Parameters
+    ----------
+    data_file_output : str
+        CSV file in which to write the combined (prefixed) wide climate output
+
+    data_file_output_meta : str
+        CSV file in which to write the combined meta table (exceedance
+        probabilities, peak warming etc.)
+
+    output_stem : str
+        Path, without file extension, at which to write the combined climate
+        output and meta table in each of ``output_formats``, in the same layout
+        as :func:`climate_assessment.output.write_iamc` (e.g. ``data`` and
+        ``meta`` sheets of ``{output_stem}.xlsx``)
+
+    meta_output_stem : str
+        Path, without file extension, at which to write the combined meta
+        table in each of ``output_formats``
+
+    prefix : str
+        Prefix for all variable names
+
+    output_formats : list[str]
+        Output formats to write (see
+        :data:`climate_assessment.output.OUTPUT_FORMATS`)
+
+    Yields
+    ------
+    func
+        Function with signature ``append_batch(res_wide, meta_table)``, where
+        ``res_wide`` is the batch output in pyam's wide file format (see
+        :func:`scmrun_to_pyam_style_wide`) and ``meta_table`` is the batch's
+        meta table, indexed by model and scenario
+    """
+    output_formats = check_output_formats(output_formats)
+    columns = {}
+    rows_written = {"data": 0, "meta": 0}
+
+    def _align_columns(name, df):
+        if name not in columns:
+            columns[name] = df.columns
+            return df
+
+        extra_columns = df.columns.difference(columns[name])
+        if not extra_columns.empty:
+            raise AssertionError(
+                f"Batch {name} has columns which are not in the first batch: "
+                f"{extra_columns.tolist()}"
+            )
+
+        return df.reindex(columns=columns[name])
+
+    def _meta_sheet(meta):
+        return meta.rename(columns={"model": "Model", "scenario": "Scenario"})
+
+    def _meta_exceedance(meta):
+        meta = meta.copy()
+        # left empty for users to fill in
+        meta["exclude"] = None
+        meta.insert(0, None, meta.index)
+
+        return meta
+
+    def _write_xlsx():
+        LOGGER.info("Writing combined output to xlsx")
+        _write_xlsx_from_csvs(
+            f"{output_stem}.xlsx",
+            [
+                ("data", data_file_output, lambda df: df),
+                ("meta", data_file_output_meta, _meta_sheet),
+            ],
+        )
+        _write_xlsx_from_csvs(
+            f"{meta_output_stem}.xlsx",
+            [("Sheet1", data_file_output_meta, _meta_exceedance)],
+        )
+
+    def append_batch(res_wide, meta_table):
+        first = rows_written["data"] == 0
+
+        res_wide = res_wide.copy()
+        res_wide["Variable"] = prefix + "|" + res_wide["Variable"].astype(str)
+        res_wide = _align_columns("data", res_wide)
+
+        meta_table = _align_columns("meta", meta_table.sort_index())
+
+        LOGGER.debug("Appending %s rows to %s", res_wide.shape[0], data_file_output)
+        res_wide.to_csv(
+            data_file_output, mode="w" if first else "a", header=first, index=False
+        )
+        meta_table.to_csv(
+            data_file_output_meta, mode="w" if first else "a", header=first
+        )
+
+        if "parquet" in output_formats:
+            write_parquet_dataset(res_wide, f"{output_stem}.parquet")
+
+        if "feather" in output_formats:
+            data_writers["feather"].write(res_wide)
+
+        for writer in meta_writers:
+            writer.write(meta_table.reset_index())
+
+        rows_written["data"] += res_wide.shape[0]
+        rows_written["meta"] += meta_table.shape[0]
+
+    with contextlib.ExitStack() as stack:
+        data_writers = {}
+        meta_writers = []
+        for output_format in output_formats:
+            if output_format == "xlsx":
+                continue
+
+            remove_existing_output(f"{output_stem}.{output_format}")
+            if output_format == "feather":
+                data_writers[output_format] = stack.enter_context(
+                    StreamingTableWriter(f"{output_stem}.feather", output_format)
+                )
+
+            for meta_file in (
+                f"{output_stem}_meta.{output_format}",
+                f"{meta_output_stem}.{output_format}",
+            ):
+                meta_writers.append(
+                    stack.enter_context(StreamingTableWriter(meta_file, output_format))
+                )
+
+        yield append_batch
+
+        LOGGER.info("Closing combined output files")
+
+    if "xlsx" in output_formats and rows_written["data"] > 0:
+        _write_xlsx()
+
+
+def read_combined_output(data_file_output, data_file_output_meta):
+    """
+    Read the output written by :func:`streaming_batch_combiner`
+
+    Parameters
+    ----------
+    data_file_output : str
+        CSV file containing the combined wide climate output
+
+    data_file_output_meta : str
+        CSV file containing the combined meta table
+
+    Returns
+    -------
+    :class:`pyam.IamDataFrame`
+        Combined climate output, including the meta table as meta indicators
+    """
+    meta = pd.read_csv(data_file_output_meta, index_col=["model", "scenario"])
+
+    return pyam.IamDataFrame(data_file_output, meta=meta)
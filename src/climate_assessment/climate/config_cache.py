@@ -0,0 +1,93 @@
+import hashlib
+import json
+import logging
+import os
+import os.path
+import pickle
+
+from .. import __version__
+from .checkpoint import _hash_file
+
+LOGGER = logging.getLogger(__name__)
+
+
+def _get_config_cache_key(name, files, params):
+    key = {
+        "name": name,
+        "files": [_hash_file(f) for f in files],
+        "params": params,
+        "climate_assessment_version": __version__,
+    }
+
+    return hashlib.sha256(
+        json.dumps(key, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+def get_cached_configurations(cache_dir, name, build, files=(), **params):
+    """
+    Get climate model configurations, only building them if they aren't cached
+
+    Building configurations requires parsing the (large) probabilistic JSON
+    files, which is slow, so the built configurations are pickled in
+    ``cache_dir``, keyed by a hash of ``name``, the content of ``files``,
+    ``params`` and the version of ``climate-assessment``. Only use cache
+    directories which you trust, as loading pickle files can execute
+    arbitrary code.
+
+    Parameters
+    ----------
+    cache_dir : str, None
+        Directory in which to cache configurations. If ``None``, the
+        configurations are always built.
+
+    name : str
+        Name of the configurations (e.g. the climate model)
+
+    build : func
+        Function without arguments which builds the configurations
+
+    files : list[str]
+        Files from which the configurations are built (``None`` entries are
+        ignored)
+
+    **params
+        Any other parameters which affect the configurations (e.g. the number
+        of configurations)
+
+    Returns
+    -------
+    object
+        Configurations, as returned by ``build``
+    """
+    if cache_dir is None:
+        return build()
+
+    key = _get_config_cache_key(name, files, params)
+    cache_file = os.path.join(cache_dir, f"{name}_{key}.pkl")
+    try:
+        with open(cache_file, "rb") as fh:
+            cfgs = pickle.load(fh)  # noqa: S301
+
+        LOGGER.info("Loaded %s configurations from %s", name, cache_file)
+
+        return cfgs
+
+    except FileNotFoundError:
+        pass
+
+    except (EOFError, pickle.UnpicklingError):
+        LOGGER.warning("Could not read %s, rebuilding configurations", cache_file)
+
+    cfgs = build()
+
+    os.makedirs(cache_dir, exist_ok=True)
+    # many jobs may share the cache so only ever replace complete files
+    tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+    with open(tmp_file, "wb") as fh:
+        pickle.dump(cfgs, fh, protocol=pickle.HIGHEST_PROTOCOL)
+
+    os.replace(tmp_file, cache_file)
+    LOGGER.info("Cached %s configurations in %s", name, cache_file)
+
+    return cfgs
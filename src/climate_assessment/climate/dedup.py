@@ -0,0 +1,139 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+LOGGER = logging.getLogger(__name__)
+
+_ID_COLS = ["model", "scenario"]
+
+
+def find_duplicate_scenarios(clean_scenarios, rtol=0.0):
+    """
+    Find scenarios with identical emissions
+
+    Parameters
+    ----------
+    clean_scenarios : :class:`pandas.DataFrame`
+        Scenarios in wide format (as returned by
+        :func:`climate_assessment.climate.wg3.clean_wg3_scenarios`)
+
+    rtol : float
+        Relative tolerance within which emissions are considered identical. If
+        zero, emissions must be exactly identical.
+
+    Returns
+    -------
+    :class:`pandas.DataFrame`, dict[tuple[str, str], list[tuple[str, str]]]
+        Scenarios with only the first of each group of scenarios with
+        identical emissions kept and a map from the (model, scenario) of each
+        kept scenario to the (model, scenario) of the scenarios it duplicates
+        (only kept scenarios which have duplicates are included)
+    """
+    other_meta_cols = [
+        c for c in clean_scenarios.columns if isinstance(c, str) and c not in _ID_COLS
+    ]
+
+    kept = []
+    kept_exact = {}
+    duplicates = {}
+    for label, scenario_emissions in clean_scenarios.groupby(_ID_COLS, sort=False):
+        scenario_emissions = (
+            scenario_emissions.drop(_ID_COLS, axis="columns")
+            .set_index(other_meta_cols)
+            .sort_index()
+        )
+        rows = tuple(scenario_emissions.index)
+        values = scenario_emissions.values
+
+        if rtol == 0:
+            exact_key = (rows, values.tobytes())
+            duplicate_of = kept_exact.setdefault(exact_key, label)
+            if duplicate_of == label:
+                duplicate_of = None
+        else:
+            duplicate_of = next(
+                (
+                    kept_label
+                    for kept_label, kept_rows, kept_values in kept
+                    if kept_rows == rows
+                    and np.allclose(
+                        values, kept_values, rtol=rtol, atol=0, equal_nan=True
+                    )
+                ),
+                None,
+            )
+
+        if duplicate_of is None:
+            kept.append((label, rows, values))
+        else:
+            LOGGER.debug("%s has the same emissions as %s", label, duplicate_of)
+            duplicates.setdefault(duplicate_of, []).append(label)
+
+    kept_labels = pd.MultiIndex.from_tuples(
+        [label for label, _, _ in kept], names=_ID_COLS
+    )
+    keep = pd.MultiIndex.from_frame(clean_scenarios[_ID_COLS]).isin(kept_labels)
+
+    return clean_scenarios[keep], duplicates
+
+
+def add_duplicate_scenario_results(res_wide, meta_table, duplicates):
+    """
+    Copy the results of scenarios to the scenarios which duplicate them
+
+    Parameters
+    ----------
+    res_wide : :class:`pandas.DataFrame`
+        Results in pyam's wide file format
+
+    meta_table : :class:`pandas.DataFrame`
+        Meta table, indexed by model and scenario
+
+    duplicates : dict[tuple[str, str], list[tuple[str, str]]]
+        Map from the (model, scenario) of each scenario which was run to the
+        (model, scenario) of the scenarios it duplicates (see
+        :func:`find_duplicate_scenarios`)
+
+    Returns
+    -------
+    :class:`pandas.DataFrame`, :class:`pandas.DataFrame`
+        Results and meta table including the duplicate scenarios, sorted by
+        model and scenario
+    """
+    res_wide_out = [res_wide]
+    meta_table_out = [meta_table]
+    for (model, scenario), duplicate_labels in duplicates.items():
+        if (model, scenario) not in meta_table.index:
+            # not part of this batch
+            continue
+
+        res_wide_scenario = res_wide[
+            (res_wide["Model"] == model) & (res_wide["Scenario"] == scenario)
+        ]
+        meta_table_scenario = meta_table.loc[[(model, scenario)]]
+        for duplicate_model, duplicate_scenario in duplicate_labels:
+            res_wide_out.append(
+                res_wide_scenario.assign(
+                    Model=duplicate_model, Scenario=duplicate_scenario
+                )
+            )
+            meta_table_out.append(
+                meta_table_scenario.set_axis(
+                    pd.MultiIndex.from_tuples(
+                        [(duplicate_model, duplicate_scenario)], names=_ID_COLS
+                    )
+                )
+            )
+
+    if len(res_wide_out) == 1:
+        return res_wide, meta_table
+
+    res_wide_out = (
+        pd.concat(res_wide_out)
+        .sort_values(["Model", "Scenario", "Region", "Variable", "Unit"])
+        .reset_index(drop=True)
+    )
+    meta_table_out = pd.concat(meta_table_out).sort_index()
+
+    return res_wide_out, meta_table_out
@@ -0,0 +1,346 @@
+import numpy as np
+import pandas as pd
+import scmdata
+from scmdata.units import UnitConverter
+
+
+def _quantiles_over_members(arr, quantiles):
+    """
+    Calculate quantiles over the second axis of ``arr``
+
+    The calculation is the same as pandas' (linear interpolation)
+    groupby-quantile calculation, including skipping nan values, so results
+    are identical to using
+    :meth:`pandas.core.groupby.DataFrameGroupBy.quantile`.
+
+    Returns
+    -------
+    :class:`numpy.ndarray`
+        Quantiles, the second axis of ``arr`` is replaced by an axis with one
+        entry per quantile
+    """
+    sorted_arr = np.sort(arr, axis=1)
+    n_valid = (~np.isnan(arr)).sum(axis=1, keepdims=True)
+
+    quantiles = np.asarray(quantiles).reshape((1, -1) + (1,) * (arr.ndim - 2))
+    q_idx = quantiles * (n_valid - 1)
+    lower = np.maximum(q_idx, 0).astype(int)
+    upper = np.minimum(lower + 1, np.maximum(n_valid - 1, 0))
+    frac = q_idx % 1
+
+    lower_vals = np.take_along_axis(sorted_arr, lower, axis=1)
+    upper_vals = np.take_along_axis(sorted_arr, upper, axis=1)
+
+    out = np.where(frac == 0, lower_vals, lower_vals + (upper_vals - lower_vals) * frac)
+    out[np.broadcast_to(n_valid == 0, out.shape)] = np.nan
+
+    return out
+
+
+class DenseEnsemble:
+    """
+    Ensemble of climate model output held in dense arrays
+
+    Each variable's data is stored as a (group, ensemble member, time) array,
+    where a group is a unique combination of all meta columns other than
+    variable, unit and the ensemble member column (e.g. climate model, model,
+    scenario and region). All variables share the same groups, ensemble members
+    and time axis and each variable has a single unit. Operating on these
+    arrays avoids the index bookkeeping which dominates when doing the same
+    operations with :class:`scmdata.ScmRun`.
+    """
+
+    def __init__(self, data, units, groups, members, time, member_col="run_id"):
+        """
+        Initialise
+
+        Parameters
+        ----------
+        data : dict[str, :class:`numpy.ndarray`]
+            Data for each variable, each with shape (group, member, time)
+
+        units : dict[str, str]
+            Unit of each variable
+
+        groups : :class:`pandas.MultiIndex`
+            Labels of the groups
+
+        members : :class:`pandas.Index`
+            Labels of the ensemble members
+
+        time : :class:`pandas.Index`
+            Time axis
+
+        member_col : str
+            Meta column which identifies the ensemble members
+        """
+        self.data = data
+        self.units = units
+        self.groups = groups
+        self.members = members
+        self.time = time
+        self.member_col = member_col
+
+    @classmethod
+    def from_scmrun(cls, scmrun, member_col="run_id", allow_missing=False):
+        """
+        Initialise from an :class:`scmdata.ScmRun`
+
+        Parameters
+        ----------
+        scmrun : :class:`scmdata.ScmRun`
+            Data to convert. Every variable must be available for every group
+            and ensemble member. If a variable is reported in more than one
+            unit, it is converted to the first unit (in sorted order).
+
+        member_col : str
+            Meta column which identifies the ensemble members
+
+        allow_missing : bool
+            If ``True``, the data does not have to be complete. Missing data is
+            filled with nan.
+
+        Returns
+        -------
+        :class:`DenseEnsemble`
+
+        Raises
+        ------
+        ValueError
+            The data is not complete (and ``allow_missing`` is ``False``) or
+            contains duplicates so cannot be represented as dense arrays
+        """
+        ts = scmrun.timeseries()
+        meta = ts.index.to_frame(index=False)
+        values = ts.values
+
+        units = {}
+        for variable, var_units in meta.groupby("variable")["unit"].unique().items():
+            units[variable] = sorted(var_units)[0]
+            for unit in var_units:
+                if unit == units[variable]:
+                    continue
+
+                to_convert = (
+                    (meta["variable"] == variable) & (meta["unit"] == unit)
+                ).values
+                values[to_convert, :] = UnitConverter(
+                    unit, units[variable]
+                ).convert_from(values[to_convert, :])
+
+        group_cols = [
+            c for c in meta.columns if c not in ("variable", "unit", member_col)
+        ]
+        row_groups = pd.MultiIndex.from_frame(meta[group_cols])
+        groups = row_groups.unique().sort_values()
+        members = pd.Index(meta[member_col].unique(), name=member_col).sort_values()
+        variables = pd.Index(sorted(units))
+
+        shape = (len(variables), len(groups), len(members), ts.shape[1])
+        flat_idx = np.ravel_multi_index(
+            (
+                variables.get_indexer(meta["variable"]),
+                groups.get_indexer(row_groups),
+                members.get_indexer(meta[member_col]),
+            ),
+            shape[:3],
+        )
+        n_unique = np.unique(flat_idx).size
+        if n_unique != flat_idx.size or (
+            not allow_missing and n_unique != np.prod(shape[:3])
+        ):
+            raise ValueError(
+                "Every variable must be reported exactly once for every group and "
+                f"{member_col} to create a dense ensemble"
+            )
+
+        arr = np.full(shape, np.nan) if allow_missing else np.empty(shape)
+        arr.reshape(-1, shape[3])[flat_idx, :] = values
+
+        return cls(
+            data={v: arr[i] for i, v in enumerate(variables)},
+            units=units,
+            groups=groups,
+            members=members,
+            time=ts.columns,
+            member_col=member_col,
+        )
+
+    @property
+    def variables(self):
+        """
+        list[str]: Variables in the ensemble
+        """
+        return list(self.data)
+
+    @property
+    def years(self):
+        """
+        :class:`numpy.ndarray`: Year of each point in the time axis
+        """
+        return np.array([t.year for t in self.time])
+
+    def __getitem__(self, variable):
+        return self.data[variable]
+
+    def add_variable(self, variable, values, unit):
+        """
+        Add a variable (inplace)
+
+        Parameters
+        ----------
+        variable : str
+            Name of the variable
+
+        values : :class:`numpy.ndarray`
+            Data, must have shape (group, member, time)
+
+        unit : str
+            Unit of the data
+        """
+        expected_shape = (len(self.groups), len(self.members), len(self.time))
+        if values.shape != expected_shape:
+            raise ValueError(
+                f"Data for {variable} has shape {values.shape}, expected "
+                f"{expected_shape}"
+            )
+
+        self.data[variable] = values
+        self.units[variable] = unit
+
+    def convert_unit(self, variable, unit):
+        """
+        Convert a variable's units (inplace)
+
+        Parameters
+        ----------
+        variable : str
+            Variable to convert
+
+        unit : str
+            Unit to convert to
+
+        Raises
+        ------
+        :class:`pint.errors.DimensionalityError`
+            The variable's current unit cannot be converted to ``unit``
+        """
+        if self.units[variable] == unit:
+            return
+
+        self.data[variable] = UnitConverter(self.units[variable], unit).convert_from(
+            self.data[variable]
+        )
+        self.units[variable] = unit
+
+    def filter_years(self, years):
+        """
+        Keep only the given years
+
+        Parameters
+        ----------
+        years : list[int]
+            Years to keep
+
+        Returns
+        -------
+        :class:`DenseEnsemble`
+            Ensemble with only the given years
+        """
+        keep = np.isin(self.years, years)
+
+        return type(self)(
+            data={v: values[..., keep] for v, values in self.data.items()},
+            units=dict(self.units),
+            groups=self.groups,
+            members=self.members,
+            time=self.time[keep],
+            member_col=self.member_col,
+        )
+
+    def quantiles_over_members(self, quantiles):
+        """
+        Calculate quantiles over the ensemble members
+
+        The results are the same as
+        :meth:`scmdata.ScmRun.quantiles_over` (over ``member_col``).
+
+        Parameters
+        ----------
+        quantiles : list[float]
+            Quantiles to calculate
+
+        Returns
+        -------
+        :class:`pandas.DataFrame`
+            Quantiles with the same layout as
+            :meth:`scmdata.ScmRun.quantiles_over` i.e. the meta, including the
+            quantile, in the index and one column per time
+        """
+        quantiles = np.asarray(quantiles)
+        n_groups = len(self.groups)
+        group_meta = self.groups.to_frame(index=False)
+        group_meta = group_meta.iloc[
+            np.repeat(np.arange(n_groups), quantiles.size)
+        ].reset_index(drop=True)
+        group_meta["quantile"] = np.tile(quantiles, n_groups)
+
+        out = []
+        for variable, values in self.data.items():
+            meta = group_meta.copy()
+            meta["variable"] = variable
+            meta["unit"] = self.units[variable]
+            quantile_values = _quantiles_over_members(values, quantiles)
+            out.append(
+                pd.DataFrame(
+                    quantile_values.reshape(-1, len(self.time)),
+                    index=pd.MultiIndex.from_frame(meta),
+                    columns=self.time,
+                )
+            )
+
+        return pd.concat(out)
+
+    def to_timeseries(self):
+        """
+        Convert to a timeseries :class:`pandas.DataFrame`
+
+        Returns
+        -------
+        :class:`pandas.DataFrame`
+            Data with the same layout as :meth:`scmdata.ScmRun.timeseries`
+        """
+        n_groups = len(self.groups)
+        n_members = len(self.members)
+        n_rows = n_groups * n_members
+
+        group_meta = self.groups.to_frame(index=False)
+        group_meta = group_meta.iloc[np.repeat(np.arange(n_groups), n_members)]
+        group_meta = group_meta.reset_index(drop=True)
+        group_meta[self.member_col] = np.tile(self.members.values, n_groups)
+
+        meta = []
+        for variable in self.data:
+            var_meta = group_meta.copy()
+            var_meta["variable"] = variable
+            var_meta["unit"] = self.units[variable]
+            meta.append(var_meta)
+
+        meta = pd.concat(meta, ignore_index=True)
+        values = np.concatenate(
+            [values.reshape(n_rows, -1) for values in self.data.values()]
+        )
+
+        return pd.DataFrame(
+            values, index=pd.MultiIndex.from_frame(meta), columns=self.time
+        )
+
+    def to_scmrun(self):
+        """
+        Convert to an :class:`scmdata.ScmRun`
+
+        Returns
+        -------
+        :class:`scmdata.ScmRun`
+        """
+        return scmdata.ScmRun(self.to_timeseries())
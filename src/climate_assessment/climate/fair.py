@@ -4,21 +4,42 @@ import logging
 import numpy as np
 from openscm_runner.adapters import FAIR
 
+from .config_cache import get_cached_configurations
+
 LOGGER = logging.getLogger(__name__)
 DEFAULT_FAIR_VERSION = "1.6.2"
 
 
 def get_fair_configurations(
-    fair_version, fair_probabilistic_file, fair_extra_config, num_cfgs
+    fair_version,
+    fair_probabilistic_file,
+    fair_extra_config,
+    num_cfgs,
+    config_cache_dir=None,
 ):
     """
     Get configuration for FaIR
+
+    If ``config_cache_dir`` is supplied, the configurations are cached there
+    (see :func:`climate_assessment.climate.config_cache.get_cached_configurations`).
     """
     if FAIR.get_version() != fair_version:
         raise AssertionError(FAIR.get_version())
 
+    return get_cached_configurations(
+        config_cache_dir,
+        "fair",
+        lambda: _build_fair_configurations(
+            fair_probabilistic_file, fair_extra_config, num_cfgs
+        ),
+        files=(fair_probabilistic_file, fair_extra_config),
+        num_cfgs=num_cfgs,
+    )
+
+
+def _build_fair_configurations(fair_probabilistic_file, fair_extra_config, num_cfgs):
     with open(fair_probabilistic_file) as fh:
-        cfgs_raw = json.load(fh)
+        cfgs_raw = json.load(fh)[:num_cfgs]
 
     with open(fair_extra_config) as fh:
         cfgs_common = json.load(fh)
@@ -27,39 +48,44 @@ def get_fair_configurations(
     for idx in range(5, 12):
         e_pi[idx] = cfgs_common["E_pi"][idx - 5]
 
+    # build the per-configuration arrays for all configurations at once
+    n_cfgs = len(cfgs_raw)
+    cfg_scale = np.array([c["scale"] for c in cfgs_raw]).reshape(n_cfgs, -1)
+    trend_solar = np.array([c["trend_solar"] for c in cfgs_raw])
+
+    scale = np.ones((n_cfgs, 45))
+    scale[:, 1] = cfg_scale[:, 0]
+    scale[:, 2] = cfg_scale[:, 1]
+    scale[:, 3:31] = cfg_scale[:, [2]]
+    scale[:, 15] = scale[:, 15] * cfgs_common["cfc11_adj"]
+    scale[:, 16] = scale[:, 16] * cfgs_common["cfc12_adj"]
+    scale[:, 33] = cfg_scale[:, 3]
+    scale[:, 34] = cfg_scale[:, 4]
+    scale[:, 41] = cfg_scale[:, 5]
+    scale[:, 42] = cfg_scale[:, 6]
+    scale[:, 43] = cfg_scale[:, 7]
+
+    c_pi = np.zeros((n_cfgs, 31))
+    c_pi[:, 0] = [c["C_pi_CO2"] for c in cfgs_raw]
+    for idx, common_idx in ((1, 0), (2, 1), (3, 2), (20, 3), (25, 4), (29, 5), (30, 6)):
+        c_pi[:, idx] = cfgs_common["C_pi"][common_idx]
+
+    default_solar = np.array(cfgs_common["default_solar"])
+    f_solar = np.zeros((n_cfgs, 361))
+    f_solar[:, :270] = (
+        np.linspace(0, trend_solar, 270, axis=1)
+        + default_solar[np.newaxis, :270] * cfg_scale[:, [8]]
+    )
+    f_solar[:, 270:351] = (
+        trend_solar[:, np.newaxis]
+        + default_solar[np.newaxis, 270:351] * cfg_scale[:, [8]]
+    )
+    f_solar[:, 351:361] = default_solar[351:]
+
     fair_cfgs = []
-    for i, c in enumerate(cfgs_raw[:num_cfgs]):
-        scale = [1] * 45
-        c_pi = [0] * 31
-        c_pi[1] = cfgs_common["C_pi"][0]
-        c_pi[2] = cfgs_common["C_pi"][1]
-        c_pi[3] = cfgs_common["C_pi"][2]
-        c_pi[20] = cfgs_common["C_pi"][3]
-        c_pi[25] = cfgs_common["C_pi"][4]
-        c_pi[29] = cfgs_common["C_pi"][5]
-        c_pi[30] = cfgs_common["C_pi"][6]
-        scale[1] = c["scale"][0]
-        scale[2] = c["scale"][1]
-        for idx in range(3, 31):
-            scale[idx] = c["scale"][2]
-        scale[15] = scale[15] * cfgs_common["cfc11_adj"]
-        scale[16] = scale[16] * cfgs_common["cfc12_adj"]
-        scale[33] = c["scale"][3]
-        scale[34] = c["scale"][4]
-        scale[41] = c["scale"][5]
-        scale[42] = c["scale"][6]
-        scale[43] = c["scale"][7]
-        c_pi[0] = c["C_pi_CO2"]
-        f_solar = np.zeros(361)
-        f_solar[:270] = (
-            np.linspace(0, c["trend_solar"], 270)
-            + np.array(cfgs_common["default_solar"])[:270] * c["scale"][8]
-        )
-        f_solar[270:351] = (
-            c["trend_solar"]
-            + np.array(cfgs_common["default_solar"])[270:351] * c["scale"][8]
-        )
-        f_solar[351:361] = cfgs_common["default_solar"][351:]
+    for i, (c, cfg_scale_i, f_solar_i, c_pi_i) in enumerate(
+        zip(cfgs_raw, scale.tolist(), f_solar.tolist(), c_pi.tolist())
+    ):
         this_cfg = {
             "run_id": i,
             "F2x": c["F2x"],
@@ -80,10 +106,10 @@ def get_fair_configurations(
                 c["b_aero"][3],
             ],
             "ghan_params": c["ghan_params"],
-            "scale": scale,
-            "F_solar": f_solar.tolist(),
+            "scale": cfg_scale_i,
+            "F_solar": f_solar_i,
             "F_volcanic": cfgs_common["default_volcanic"],
-            "C_pi": c_pi,
+            "C_pi": c_pi_i,
             "b_tro3": c["b_tro3"],
             "ozone_feedback": c["ozone_feedback"],
             "E_pi": e_pi,
@@ -4,6 +4,8 @@ import logging
 import scmdata
 from openscm_runner.adapters import MAGICC7
 
+from .config_cache import get_cached_configurations
+
 LOGGER = logging.getLogger(__name__)
 DEFAULT_MAGICC_VERSION = "v7.5.3"
 DEFAULT_MAGICC_DRAWNSET = "data/magicc/0fd0f62-derived-metrics-id-f023edb-drawnset.json"
@@ -15,14 +17,36 @@ def get_magicc7_configurations(
     magicc_extra_config,
     num_cfgs,
     co2_and_non_co2_warming,
+    config_cache_dir=None,
 ):
     """
     Get configuration for MAGICC7
+
+    If ``config_cache_dir`` is supplied, the configurations are cached there
+    (see :func:`climate_assessment.climate.config_cache.get_cached_configurations`).
     """
     if MAGICC7.get_version() != magicc_version:
         # version strings for linux and windows might be different!
         raise AssertionError(MAGICC7.get_version())
 
+    return get_cached_configurations(
+        config_cache_dir,
+        "magicc7",
+        lambda: _build_magicc7_configurations(
+            magicc_probabilistic_file,
+            magicc_extra_config,
+            num_cfgs,
+            co2_and_non_co2_warming,
+        ),
+        files=(magicc_probabilistic_file, magicc_extra_config),
+        num_cfgs=num_cfgs,
+        co2_and_non_co2_warming=co2_and_non_co2_warming,
+    )
+
+
+def _build_magicc7_configurations(
+    magicc_probabilistic_file, magicc_extra_config, num_cfgs, co2_and_non_co2_warming
+):
     with open(magicc_probabilistic_file) as fh:
         cfgs_raw = json.load(fh)
 
@@ -0,0 +1,363 @@
+import logging
+import os
+import re
+import sys
+import threading
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    # not available on windows
+    resource = None
+
+LOGGER = logging.getLogger(__name__)
+
+# number of scenarios in the batch used to measure memory requirements
+AUTO_SCENARIO_BATCH_SIZE_PROBE = 5
+
+_MEMORY_SIZE_REGEX = re.compile(
+    r"^\s*(?P<size>\d+(\.\d+)?)\s*((?P<prefix>[kmgt])(?P<binary>i)?)?b?\s*$",
+    flags=re.IGNORECASE,
+)
+_MEMORY_SIZE_EXPONENTS = {"k": 1, "m": 2, "g": 3, "t": 4}
+
+# memory required per scenario, keyed by the configuration which determines it
+_MEMORY_PER_SCENARIO = {}
+
+# seconds between samples of the memory in use while a batch is measured
+_MEMORY_SAMPLE_INTERVAL = 0.1
+
+
+def parse_memory_size(size):
+    """
+    Parse a memory size
+
+    Parameters
+    ----------
+    size : int, str
+        Memory size. Integers are interpreted as bytes. Strings can use decimal
+        (e.g. "48GB" or "48G") or binary (e.g. "48GiB") units.
+
+    Returns
+    -------
+    int
+        Memory size in bytes
+
+    Raises
+    ------
+    ValueError
+        ``size`` cannot be parsed
+    """
+    if isinstance(size, int):
+        return size
+
+    match = _MEMORY_SIZE_REGEX.match(str(size))
+    if match is None:
+        raise ValueError(
+            f"Could not parse memory size: {size}. Expected a value like "
+            "'48GB', '512MiB' or a number of bytes."
+        )
+
+    if match.group("prefix") is None:
+        multiplier = 1
+    else:
+        base = 1024 if match.group("binary") else 1000
+        multiplier = base ** _MEMORY_SIZE_EXPONENTS[match.group("prefix").lower()]
+
+    return int(float(match.group("size")) * multiplier)
+
+
+def get_peak_rss():
+    """
+    Get the peak resident set size of this process and its finished children
+
+    Returns
+    -------
+    int
+        Peak resident set size in bytes
+
+    Raises
+    ------
+    ImportError
+        The ``resource`` module is not available on this platform (i.e.
+        windows)
+    """
+    if resource is None:
+        raise ImportError("The resource module is not available on this platform")
+
+    peak = (
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        + resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    )
+    if sys.platform == "darwin":
+        return peak
+
+    # kilobytes everywhere else
+    return peak * 1024
+
+
+def get_current_rss():
+    """
+    Get the current resident set size of this process
+
+    If the current resident set size is not available on this platform, the
+    peak resident set size (see :func:`get_peak_rss`) is returned instead.
+
+    Returns
+    -------
+    int
+        Resident set size in bytes
+    """
+    try:
+        with open("/proc/self/statm") as fh:
+            resident_pages = int(fh.read().split()[1])
+    except OSError:
+        return get_peak_rss()
+
+    return resident_pages * os.sysconf("SC_PAGE_SIZE")
+
+
+def get_process_tree_rss():
+    """
+    Get the current resident set size of this process and all its descendants
+
+    The descendants include e.g. the workers which run the climate models in
+    parallel. Memory shared between the processes is counted once per process,
+    so the result is an upper bound.
+
+    Returns
+    -------
+    int, None
+        Resident set size in bytes, ``None`` if the processes can't be
+        inspected on this platform (i.e. there is no ``/proc``)
+    """
+    parents = {}
+    try:
+        pids = [int(pid) for pid in os.listdir("/proc") if pid.isdigit()]
+    except OSError:
+        return None
+
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/stat") as fh:
+                # the process name can contain spaces and brackets, the fields
+                # we need follow the last bracket
+                stat = fh.read().rsplit(")", 1)[1].split()
+        except (OSError, IndexError):
+            # process finished in the meantime
+            continue
+
+        parents.setdefault(int(stat[1]), []).append(pid)
+
+    rss = 0
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    to_visit = [os.getpid()]
+    while to_visit:
+        pid = to_visit.pop()
+        to_visit.extend(parents.get(pid, []))
+        try:
+            with open(f"/proc/{pid}/statm") as fh:
+                rss += int(fh.read().split()[1]) * page_size
+        except (OSError, IndexError):
+            continue
+
+    return rss
+
+
+class BatchMemoryMonitor:
+    """
+    Measure the memory used while running a batch of scenarios
+
+    Used as a context manager around the batch. While the batch runs, the
+    resident set size of this process and all its descendants (see
+    :func:`get_process_tree_rss`) is sampled in a background thread. The memory
+    used by the batch is the peak of these samples above the memory in use
+    when the batch started, so it neither includes earlier peaks (e.g. from
+    infilling) nor misses climate models which run in parallel workers.
+
+    Where the processes can't be inspected, the increase of the peak resident
+    set size (see :func:`get_peak_rss`) during the batch is used instead.
+    """
+
+    def __init__(self, interval=_MEMORY_SAMPLE_INTERVAL):
+        """
+        Initialise
+
+        Parameters
+        ----------
+        interval : float
+            Seconds between samples
+        """
+        self.interval = interval
+        self.start_memory = None
+        self.peak_memory = None
+        self._sample = get_process_tree_rss
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.start_memory = self._sample()
+        if self.start_memory is None:
+            self._sample = get_peak_rss
+            self.start_memory = self._sample()
+
+        self.peak_memory = self.start_memory
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._monitor, daemon=True)
+        self._thread.start()
+
+        return self
+
+    def __exit__(self, *args):
+        self._stop.set()
+        self._thread.join()
+        self._update_peak()
+
+    def _update_peak(self):
+        memory = self._sample()
+        if memory is not None:
+            self.peak_memory = max(self.peak_memory, memory)
+
+    def _monitor(self):
+        while not self._stop.wait(self.interval):
+            self._update_peak()
+
+    @property
+    def used_memory(self):
+        """
+        int: Peak memory used during the batch in bytes
+        """
+        return self.peak_memory - self.start_memory
+
+
+def calculate_scenario_batch_size(
+    memory_per_scenario, max_memory, baseline_memory, post_process_queue_depth=0
+):
+    """
+    Calculate the number of scenarios to run at once to fit within a memory budget
+
+    Parameters
+    ----------
+    memory_per_scenario : int
+        Memory required to run (and post-process) a single scenario in bytes
+
+    max_memory : int
+        Total memory budget in bytes
+
+    baseline_memory : int
+        Memory which is in use regardless of the batch size in bytes
+
+    post_process_queue_depth : int
+        Number of batches which can be waiting to be post-processed while the
+        next batch runs (see
+        :func:`climate_assessment.climate.climate_assessment`)
+
+    Returns
+    -------
+    int
+        Number of scenarios to run at once (always at least one)
+    """
+    available = max_memory - baseline_memory
+    # the batch being run plus every batch waiting to be post-processed
+    batches_in_memory = 1 + post_process_queue_depth
+    batch_size = int(available / (batches_in_memory * memory_per_scenario))
+
+    if batch_size < 1:
+        LOGGER.warning(
+            "Memory budget of %s bytes is too small to run even a single scenario "
+            "(~%s bytes per scenario, baseline %s bytes), running one scenario at "
+            "a time",
+            max_memory,
+            memory_per_scenario,
+            baseline_memory,
+        )
+        return 1
+
+    return batch_size
+
+
+def get_initial_scenario_batch_size(
+    key, max_memory, baseline_memory, post_process_queue_depth=0
+):
+    """
+    Get the number of scenarios to run in the first batch when autotuning
+
+    Parameters
+    ----------
+    key : tuple
+        Configuration which determines the memory required per scenario (e.g.
+        climate model, number of configurations and output variables)
+
+    max_memory : int
+        Total memory budget in bytes
+
+    baseline_memory : int
+        Memory which is in use regardless of the batch size in bytes
+
+    post_process_queue_depth : int
+        Number of batches which can be waiting to be post-processed while the
+        next batch runs
+
+    Returns
+    -------
+    int, bool
+        Number of scenarios to run in the first batch and whether the memory
+        use of the first batch needs to be measured (with
+        :func:`record_memory_per_scenario`) because it isn't known for ``key``
+        yet
+    """
+    if key not in _MEMORY_PER_SCENARIO:
+        LOGGER.info(
+            "Running a first batch of %s scenarios to measure memory requirements",
+            AUTO_SCENARIO_BATCH_SIZE_PROBE,
+        )
+        return AUTO_SCENARIO_BATCH_SIZE_PROBE, True
+
+    batch_size = calculate_scenario_batch_size(
+        _MEMORY_PER_SCENARIO[key],
+        max_memory,
+        baseline_memory,
+        post_process_queue_depth=post_process_queue_depth,
+    )
+    LOGGER.info(
+        "Using scenario batch size of %s (~%.1f MB per scenario, measured previously)",
+        batch_size,
+        _MEMORY_PER_SCENARIO[key] / 1e6,
+    )
+
+    return batch_size, False
+
+
+def record_memory_per_scenario(key, n_scenarios, used_memory):
+    """
+    Record the memory required per scenario based on the memory used by a batch
+
+    Parameters
+    ----------
+    key : tuple
+        Configuration which determines the memory required per scenario (see
+        :func:`get_initial_scenario_batch_size`)
+
+    n_scenarios : int
+        Number of scenarios which were run in the batch being measured
+
+    used_memory : int
+        Memory used by the batch in bytes (see :class:`BatchMemoryMonitor`)
+
+    Returns
+    -------
+    int
+        Memory required per scenario in bytes. If nothing could be measured
+        (i.e. ``used_memory`` is not positive), the memory currently in use is
+        used instead, which is an upper bound.
+    """
+    if used_memory <= 0:
+        LOGGER.warning(
+            "Could not measure memory used by batch, assuming all memory in use is "
+            "required by the batch"
+        )
+        used_memory = get_process_tree_rss() or get_current_rss()
+
+    _MEMORY_PER_SCENARIO[key] = int(used_memory / n_scenarios)
+
+    return _MEMORY_PER_SCENARIO[key]
@@ -1,4 +1,3 @@
-import json
 import logging
 import os.path
 from functools import lru_cache
@@ -7,13 +6,14 @@ import numpy as np
 import numpy.testing as npt
 import pandas as pd
 import scmdata
-import scmdata.database
-import scmdata.processing
 from pint.errors import DimensionalityError
+from scmdata.units import UnitConverter
 
 from .ciceroscm import ciceroscm_post_process
+from .ensemble import DenseEnsemble, _quantiles_over_members
 from .fair import fair_post_process
 from .magicc7 import calculate_co2_and_nonco2_warming_magicc, magicc7_post_process
+from .raw_output import RawEnsembleStore
 
 LOGGER = logging.getLogger(__name__)
 _CLIMATE_VARIABLE_DEFINITION_CSV = os.path.join(
@@ -91,20 +91,21 @@ def check_hist_warming_period(period):
     return range(start_year, end_year + 1)
 
 
-def calculate_exceedance_probability_timeseries(
-    res,
+def _mean_over_years(arr, keep):
+    # nan-skipping mean, like pandas
+    selected = arr[..., keep]
+    with np.errstate(invalid="ignore"):
+        return np.nansum(selected, axis=-1) / (~np.isnan(selected)).sum(axis=-1)
+
+
+def _calculate_exceedance_probability_timeseries_dense(
+    ensemble,
     exceedance_probability_calculation_var,
     test_run=False,
     historical_warming=0.85,
     historical_warming_reference_period="1850-1900",
     historical_warming_evaluation_period="1995-2014",
 ):
-    """
-    Calculate the timeseries with which we should determine exceedance probabilities.
-
-    Please note that calculating the statistical properties like the exceedance probability is done on the count of the raw, full ensemble data.
-    It  cannot be derived from from the time series of the final statistical indicator afterwards.
-    """
     hist_temp_ref_period = check_hist_warming_period(
         historical_warming_reference_period
     )
@@ -123,45 +124,46 @@ def calculate_exceedance_probability_timeseries(
         historical_warming_unit,
     )
 
-    exceedance_probability_timeseries_raw = res.filter(
-        variable=f"Raw {exceedance_probability_calculation_var}",
-        unit=historical_warming_unit,
-    )
-    exceedance_probability_timeseries_rel_ref_period = (
-        exceedance_probability_timeseries_raw.relative_to_ref_period_mean(
-            year=hist_temp_ref_period
-        ).drop_meta(["reference_period_start_year", "reference_period_end_year"])
-    )
-    exceedance_probability_timeseries = (
-        exceedance_probability_timeseries_rel_ref_period.adjust_median_to_target(
-            historical_warming,
-            hist_temp_evaluation_period,
-            process_over=("run_id",),
+    raw_var = f"Raw {exceedance_probability_calculation_var}"
+    if ensemble.units[raw_var] != historical_warming_unit:
+        raise ValueError(
+            f"{raw_var} must be in {historical_warming_unit}, "
+            f"received {ensemble.units[raw_var]}"
         )
-    )
 
-    # output checks
-    hist_temp_grouper_cols = exceedance_probability_timeseries.get_meta_columns_except(
-        "run_id"
+    years = ensemble.years
+    in_ref_period = np.isin(years, hist_temp_ref_period)
+    in_evaluation_period = np.isin(years, hist_temp_evaluation_period)
+
+    exceedance_probability_timeseries_raw = ensemble[raw_var]
+    exceedance_probability_timeseries_rel_ref_period = (
+        exceedance_probability_timeseries_raw
+        - _mean_over_years(exceedance_probability_timeseries_raw, in_ref_period)[
+            ..., np.newaxis
+        ]
     )
 
     def _get_median_hist_warming(inp):
-        return (
-            inp.filter(year=hist_temp_evaluation_period)
-            .timeseries()
-            .mean(axis="columns")
-            .groupby(hist_temp_grouper_cols)
-            .median()
+        return pd.Series(
+            np.nanmedian(_mean_over_years(inp, in_evaluation_period), axis=1),
+            index=ensemble.groups,
         )
 
+    median_rel_ref_period = _get_median_hist_warming(
+        exceedance_probability_timeseries_rel_ref_period
+    )
+    exceedance_probability_timeseries = (
+        exceedance_probability_timeseries_rel_ref_period
+        + (historical_warming - median_rel_ref_period.values)[:, np.newaxis, np.newaxis]
+    )
+
+    # output checks
     inp_vals = _get_median_hist_warming(exceedance_probability_timeseries_raw)
     check_vals = _get_median_hist_warming(exceedance_probability_timeseries)
     shifts = check_vals - inp_vals
-    shifts_after_rebase = check_vals - _get_median_hist_warming(
-        exceedance_probability_timeseries_rel_ref_period
-    )
+    shifts_after_rebase = check_vals - median_rel_ref_period
 
-    if not np.isclose(shifts, shifts[0], atol=5 * 1e-3).all():
+    if not np.isclose(shifts, shifts.iloc[0], atol=5 * 1e-3).all():
         LOGGER.exception(
             "Careful of scenarios which break match with history! `shifts`: %s",
             shifts,
@@ -181,18 +183,63 @@ def calculate_exceedance_probability_timeseries(
         except AssertionError:
             LOGGER.exception("Careful of scenarios which break match with history!")
 
-    exceedance_probability_timeseries["variable"] = (
-        exceedance_probability_calculation_var
-    )
     return exceedance_probability_timeseries
 
 
+def calculate_exceedance_probability_timeseries(
+    res,
+    exceedance_probability_calculation_var,
+    test_run=False,
+    historical_warming=0.85,
+    historical_warming_reference_period="1850-1900",
+    historical_warming_evaluation_period="1995-2014",
+):
+    """
+    Calculate the timeseries with which we should determine exceedance probabilities.
+
+    Please note that calculating the statistical properties like the exceedance probability is done on the count of the raw, full ensemble data.
+    It  cannot be derived from from the time series of the final statistical indicator afterwards.
+    """
+    out = []
+    for res_cm in res.filter(
+        variable=f"Raw {exceedance_probability_calculation_var}"
+    ).groupby("climate_model"):
+        ensemble = DenseEnsemble.from_scmrun(res_cm)
+        values = _calculate_exceedance_probability_timeseries_dense(
+            ensemble,
+            exceedance_probability_calculation_var,
+            test_run=test_run,
+            historical_warming=historical_warming,
+            historical_warming_reference_period=historical_warming_reference_period,
+            historical_warming_evaluation_period=historical_warming_evaluation_period,
+        )
+        exceedance_probability_timeseries = DenseEnsemble(
+            data={exceedance_probability_calculation_var: values},
+            units={exceedance_probability_calculation_var: "K"},
+            groups=ensemble.groups,
+            members=ensemble.members,
+            time=ensemble.time,
+            member_col=ensemble.member_col,
+        )
+        out.append(exceedance_probability_timeseries.to_scmrun())
+
+    return scmdata.run_append(out)
+
+
 def calculate_co2_and_nonco2_warming_and_remove_extras(res):
     """
     Calculate non-CO2 warming. Currently only implemented for MAGICC, which can
     be run twice to allow for this calculation, using (the CLI option)
     `co2_and_non_co2_warming`.
+
+    The output of other climate models (e.g. when several climate models are
+    run together) is returned unchanged. If there is no MAGICC output at all,
+    a :class:`NotImplementedError` is raised.
     """
+    climate_models = res.get_unique_meta("climate_model")
+    if not any(cm.startswith("MAGICC") for cm in climate_models):
+        raise NotImplementedError(climate_models)
+
     out = []
     for cmrun in res.groupby("climate_model"):
         climate_model = cmrun.get_unique_meta("climate_model", no_duplicates=True)
@@ -203,11 +250,155 @@ def calculate_co2_and_nonco2_warming_and_remove_extras(res):
             out.append(all_forcers_run)
             out.append(calculate_co2_and_nonco2_warming_magicc(cmrun))
         else:
-            raise NotImplementedError(climate_model)
+            LOGGER.warning("Non-CO2 warming is not available for %s", climate_model)
+            if "rf_total_runmodus" in cmrun.meta_attributes:
+                # only set for the MAGICC runs
+                cmrun = cmrun.drop_meta("rf_total_runmodus")
+
+            out.append(cmrun)
 
     return scmdata.run_append(out)
 
 
+def _calculate_exceedance_probabilities_and_peaks_dense(
+    arr,
+    group_labels,
+    time_axis,
+    temp_thresholds,
+    peak_percentiles,
+    reporting_groups,
+    process_over_col,
+):
+    if np.isnan(arr).all(axis=2).any():
+        raise ValueError("Cannot calculate peaks of all nan timeseries")
+
+    reporting_groups = list(reporting_groups)
+    reporting_index = pd.MultiIndex.from_frame(
+        group_labels.to_frame(index=False)[reporting_groups]
+    )
+    if reporting_index.duplicated().any():
+        raise AssertionError(
+            f"Meta columns other than {reporting_groups} and {process_over_col} "
+            "should be unique for each group"
+        )
+
+    n_members = arr.shape[1]
+    # nan is never greater than the threshold, like pandas
+    peaks = np.nanmax(arr, axis=2)
+    peak_years = np.array([t.year for t in time_axis])[np.nanargmax(arr, axis=2)]
+
+    threshold_names = [f"Exceedance Probability {t}C" for t in temp_thresholds]
+    temp_thresholds = np.asarray(temp_thresholds)
+
+    exceedance_probs_by_temp_threshold = pd.DataFrame(
+        (peaks[:, np.newaxis, :] > temp_thresholds[:, np.newaxis]).sum(axis=2)
+        / n_members,
+        index=reporting_index,
+        columns=threshold_names,
+    )
+
+    exceedance_probs_tss = []
+    tss_meta = group_labels.to_frame(index=False)
+    tss_meta["unit"] = "dimensionless"
+    for threshold, name in zip(temp_thresholds, threshold_names):
+        tss_meta["variable"] = name
+        exceedance_probs_tss.append(
+            pd.DataFrame(
+                (arr > threshold).sum(axis=1) / n_members,
+                index=pd.MultiIndex.from_frame(tss_meta),
+                columns=time_axis,
+            )
+        )
+
+    exceedance_probs_tss = pd.concat(exceedance_probs_tss)
+
+    quantiles = np.array(peak_percentiles) / 100
+    peaks_quantiles = pd.DataFrame(
+        _quantiles_over_members(peaks, quantiles),
+        index=reporting_index,
+        columns=quantiles,
+    )
+    peak_years_quantiles = pd.DataFrame(
+        _quantiles_over_members(peak_years.astype(float), quantiles),
+        index=reporting_index,
+        columns=quantiles,
+    ).astype(int)
+
+    return (
+        exceedance_probs_by_temp_threshold,
+        exceedance_probs_tss,
+        peaks_quantiles,
+        peak_years_quantiles,
+    )
+
+
+def calculate_exceedance_probabilities_and_peaks(
+    res,
+    temp_thresholds,
+    peak_percentiles,
+    reporting_groups=("climate_model", "model", "scenario"),
+    process_over_col="run_id",
+):
+    """
+    Calculate exceedance probabilities and peak warming statistics in one pass
+
+    The ensemble is reshaped into a dense array once and then all statistics
+    are derived from it. The results are the same as using
+    :func:`scmdata.processing.calculate_exceedance_probabilities`,
+    :func:`scmdata.processing.calculate_exceedance_probabilities_over_time`,
+    :func:`scmdata.processing.calculate_peak` and
+    :func:`scmdata.processing.calculate_peak_time` followed by a pandas
+    groupby-quantile.
+
+    Parameters
+    ----------
+    res : :obj:`scmdata.ScmRun`
+        Ensemble of a single variable (in a single unit)
+
+    temp_thresholds : list[float]
+        Thresholds for which to calculate exceedance probabilities
+
+    peak_percentiles : list[float]
+        Percentiles of the peak and year of peak to calculate
+
+    reporting_groups : list[str]
+        Meta columns which identify the groups in the output tables
+
+    process_over_col : str
+        Meta column which identifies the ensemble members
+
+    Returns
+    -------
+    tuple[:class:`pandas.DataFrame`]
+        Exceedance probability of each threshold (one column per threshold),
+        exceedance probability timeseries (with the same layout as
+        :func:`scmdata.processing.calculate_exceedance_probabilities_over_time`),
+        quantiles of peak warming and quantiles of the year of peak warming
+        (one column per quantile)
+
+    Raises
+    ------
+    ValueError
+        ``res`` contains more than one variable or any ensemble member's
+        timeseries is all nan
+    """
+    ensemble = DenseEnsemble.from_scmrun(res, member_col=process_over_col)
+    if len(ensemble.variables) != 1:
+        raise ValueError(
+            f"`res` must contain a single variable, received {ensemble.variables}"
+        )
+
+    return _calculate_exceedance_probabilities_and_peaks_dense(
+        ensemble[ensemble.variables[0]],
+        ensemble.groups,
+        ensemble.time,
+        temp_thresholds=temp_thresholds,
+        peak_percentiles=peak_percentiles,
+        reporting_groups=reporting_groups,
+        process_over_col=process_over_col,
+    )
+
+
 def post_process(
     res,
     outdir,
@@ -236,6 +427,7 @@ def post_process(
     historical_warming=0.85,
     historical_warming_reference_period="1850-1900",
     historical_warming_evaluation_period="1995-2014",
+    return_raw=True,
 ):
     LOGGER.info("Beginning climate post-processing")
     LOGGER.info("Removing unknown units and keeping only World data")
@@ -287,122 +479,103 @@ def post_process(
 
     if save_raw_output:
         LOGGER.info("Saving raw output (with renamed variables) to disk")
-        if "parameters" in res.metadata:
-            res.metadata["parameters"] = json.dumps(res.metadata["parameters"])
-
-        database = scmdata.database.ScmDatabase(
-            os.path.join(outdir, "raw_climate_output"),
-            levels=["climate_model", "model", "scenario"],
-        )
-        for c in [
-            "climate_model",
-            "model",
-            "scenario",
-            "variable",
-            "region",
-            "unit",
-            "rf_total_runmodus",
-        ]:
-            if c in res.meta:
-                res[c] = res[c].apply(str)
-
+        store = RawEnsembleStore(os.path.join(outdir, "raw_climate_output"))
         # TODO: add test for save raw output with non-CO2 on
-        database.save(res)
+        for res_cm in res.groupby("climate_model"):
+            # e.g. the CO2-only runs used for non-CO2 warming don't report
+            # every variable
+            store.save(
+                DenseEnsemble.from_scmrun(res_cm, allow_missing=True),
+                metadata=res_cm.metadata,
+            )
 
     if co2_and_non_co2_warming:
         LOGGER.info("Calculating non-CO2 warming")
         res = calculate_co2_and_nonco2_warming_and_remove_extras(res)
 
+    LOGGER.info("Converting to dense ensemble arrays")
+    ensembles = [
+        DenseEnsemble.from_scmrun(res_cm) for res_cm in res.groupby("climate_model")
+    ]
+
     LOGGER.info("Calculating exceedance probability timeseries")
     exceedance_probability_calculation_var = "Surface Temperature (GSAT)"
-    exceedance_probability_timeseries = calculate_exceedance_probability_timeseries(
-        res,
-        exceedance_probability_calculation_var,
-        test_run=test_run,
-        historical_warming=historical_warming,
-        historical_warming_reference_period=historical_warming_reference_period,
-        historical_warming_evaluation_period=historical_warming_evaluation_period,
-    )
-    res = res.append(exceedance_probability_timeseries)
+    for ensemble in ensembles:
+        ensemble.add_variable(
+            exceedance_probability_calculation_var,
+            _calculate_exceedance_probability_timeseries_dense(
+                ensemble,
+                exceedance_probability_calculation_var,
+                test_run=test_run,
+                historical_warming=historical_warming,
+                historical_warming_reference_period=historical_warming_reference_period,
+                historical_warming_evaluation_period=historical_warming_evaluation_period,
+            ),
+            "K",
+        )
 
     year_filter = range(1995, 2101)
     LOGGER.info("Keeping only data from %s", year_filter)
-    res = res.filter(year=year_filter)
-
-    LOGGER.info("Calculating Non-CO2 GHG ERF")
-    helper = res.filter(variable="Effective Radiative Forcing*")
-    res = [res]
-
-    erf_nonco2_ghg = helper.filter(
-        variable="Effective Radiative Forcing|Basket|Greenhouse Gases"
-    ).subtract(
-        helper.filter(variable="Effective Radiative Forcing|CO2"),
-        op_cols={
-            "variable": "Effective Radiative Forcing|Basket|Non-CO2 Greenhouse Gases"
-        },
-    )
+    ensembles = [ensemble.filter_years(year_filter) for ensemble in ensembles]
 
-    if (
-        erf_nonco2_ghg.get_unique_meta("unit", no_duplicates=True)
-        != "watt / meter ** 2"
-    ):
-        raise AssertionError("Unexpected forcing unit")
-
-    erf_nonco2_ghg["unit"] = "W/m^2"
-    res.append(erf_nonco2_ghg)
-
-    LOGGER.info("Calculating Non-CO2 Anthropogenic ERF")
-    erf_nonco2_anthropogenic = helper.filter(
-        variable="Effective Radiative Forcing|Basket|Anthropogenic"
-    ).subtract(
-        helper.filter(variable="Effective Radiative Forcing|CO2"),
-        op_cols={
-            "variable": "Effective Radiative Forcing|Basket|Non-CO2 Anthropogenic"
-        },
-    )
-    if (
-        erf_nonco2_anthropogenic.get_unique_meta("unit", no_duplicates=True)
-        != "watt / meter ** 2"
-    ):
-        raise AssertionError("Unexpected forcing unit")
-
-    erf_nonco2_anthropogenic["unit"] = "W/m^2"
-    res.append(erf_nonco2_anthropogenic)
-
-    LOGGER.info("Joining derived variables and data back together")
-    res = scmdata.run_append(res)
+    def _get_in_forcing_unit(ensemble, variable):
+        try:
+            return UnitConverter(ensemble.units[variable], "W/m^2").convert_from(
+                ensemble[variable]
+            )
+        except DimensionalityError as exc:
+            raise AssertionError("Unexpected forcing unit") from exc
 
-    # check all variable names
-    LOGGER.info("Converting all variable names and units to standard definitions")
+    for ensemble in ensembles:
+        erf_co2 = _get_in_forcing_unit(ensemble, "Effective Radiative Forcing|CO2")
 
-    def _convert_to_standard_name_and_unit(vdf):
-        climate_variable_definitions = _get_climate_variable_definitions(
-            _CLIMATE_VARIABLE_DEFINITION_CSV
+        LOGGER.info("Calculating Non-CO2 GHG ERF")
+        ensemble.add_variable(
+            "Effective Radiative Forcing|Basket|Non-CO2 Greenhouse Gases",
+            _get_in_forcing_unit(
+                ensemble, "Effective Radiative Forcing|Basket|Greenhouse Gases"
+            )
+            - erf_co2,
+            "W/m^2",
         )
-        variable = vdf.get_unique_meta("variable", True)
 
-        try:
-            standard_unit = climate_variable_definitions.set_index("Variable").loc[
-                variable
-            ]["Unit"]
-        except KeyError as exc:
-            raise ValueError(
-                f"{variable} not in {_CLIMATE_VARIABLE_DEFINITION_CSV}"
-            ) from exc
-        try:
-            return vdf.convert_unit(standard_unit)
-        except DimensionalityError as exc:
-            raise ValueError(
-                "Cannot convert {} units of {} to {}".format(
-                    variable, vdf.get_unique_meta("unit", True), standard_unit
-                )
-            ) from exc
+        LOGGER.info("Calculating Non-CO2 Anthropogenic ERF")
+        ensemble.add_variable(
+            "Effective Radiative Forcing|Basket|Non-CO2 Anthropogenic",
+            _get_in_forcing_unit(
+                ensemble, "Effective Radiative Forcing|Basket|Anthropogenic"
+            )
+            - erf_co2,
+            "W/m^2",
+        )
 
-    res = res.groupby("variable").map(_convert_to_standard_name_and_unit)
+    # check all variable names
+    LOGGER.info("Converting all variable names and units to standard definitions")
+    climate_variable_definitions = _get_climate_variable_definitions(
+        _CLIMATE_VARIABLE_DEFINITION_CSV
+    ).set_index("Variable")
+    for ensemble in ensembles:
+        for variable in ensemble.variables:
+            try:
+                standard_unit = climate_variable_definitions.loc[variable]["Unit"]
+            except KeyError as exc:
+                raise ValueError(
+                    f"{variable} not in {_CLIMATE_VARIABLE_DEFINITION_CSV}"
+                ) from exc
+            try:
+                ensemble.convert_unit(variable, standard_unit)
+            except DimensionalityError as exc:
+                raise ValueError(
+                    f"Cannot convert {variable} units of "
+                    f"{ensemble.units[variable]} to {standard_unit}"
+                ) from exc
 
     LOGGER.info("Calculating percentiles")
-    res_percentiles = res.quantiles_over(
-        "run_id", np.array(percentiles) / 100
+    res_percentiles = pd.concat(
+        [
+            ensemble.quantiles_over_members(np.array(percentiles) / 100)
+            for ensemble in ensembles
+        ]
     ).reset_index()
     res_percentiles["percentile"] = res_percentiles["quantile"] * 100
     res_percentiles = res_percentiles.drop("quantile", axis="columns")
@@ -421,37 +594,30 @@ def post_process(
     )
 
     LOGGER.info(
-        "Calculating exceedance probabilities and exceedance probability timeseries"
+        "Calculating exceedance probabilities, exceedance probability timeseries, "
+        "peak warming and peak warming year"
     )
-    res_exceedance_probs_var = res.filter(
-        variable=exceedance_probability_calculation_var
-    )
-    exceedance_probs_by_temp_threshold = []
-    exceedance_probs_tss = []
-    for threshold in temp_thresholds:
-        LOGGER.info("Calculating %s exceedance probabilities", threshold)
-        for store, func, output_name in (
-            (
-                exceedance_probs_by_temp_threshold,
-                scmdata.processing.calculate_exceedance_probabilities,
-                f"Exceedance Probability {threshold}C",
-            ),
-            (
-                exceedance_probs_tss,
-                scmdata.processing.calculate_exceedance_probabilities_over_time,
-                f"Exceedance Probability {threshold}C",
-            ),
-        ):
-            store.append(
-                func(
-                    res_exceedance_probs_var,
-                    threshold,
-                    process_over_cols=("run_id",),
-                    output_name=output_name,
-                )
-            )
+    reporting_groups = ["climate_model", "model", "scenario"]
+    exceedance_probs_and_peaks = [
+        _calculate_exceedance_probabilities_and_peaks_dense(
+            ensemble[exceedance_probability_calculation_var],
+            ensemble.groups,
+            ensemble.time,
+            temp_thresholds=temp_thresholds,
+            peak_percentiles=peak_percentiles,
+            reporting_groups=reporting_groups,
+            process_over_col=ensemble.member_col,
+        )
+        for ensemble in ensembles
+    ]
+    (
+        exceedance_probs_by_temp_threshold,
+        exceedance_probs_tss,
+        peaks_quantiles,
+        peak_years_quantiles,
+    ) = (pd.concat(dfs) for dfs in zip(*exceedance_probs_and_peaks))
+    exceedance_probs_tss = exceedance_probs_tss.reset_index()
 
-    exceedance_probs_tss = pd.concat(exceedance_probs_tss).reset_index()
     exceedance_probs_tss["variable"] = (
         exceedance_probs_tss["variable"].astype(str)
         + "|"
@@ -460,31 +626,6 @@ def post_process(
     exceedance_probs_tss = exceedance_probs_tss.drop("climate_model", axis="columns")
     res_percentiles = res_percentiles.append(exceedance_probs_tss)
 
-    reporting_groups = ["climate_model", "model", "scenario"]
-    exceedance_probs_by_temp_threshold = pd.concat(
-        exceedance_probs_by_temp_threshold, axis=1
-    )
-    exceedance_probs_by_temp_threshold = exceedance_probs_by_temp_threshold.reset_index(
-        list(
-            set(exceedance_probs_by_temp_threshold.index.names) - set(reporting_groups)
-        ),
-        drop=True,
-    )
-
-    LOGGER.info("Calculating peak warming and peak warming year")
-    peaks = scmdata.processing.calculate_peak(res_exceedance_probs_var)
-    peak_years = scmdata.processing.calculate_peak_time(res_exceedance_probs_var)
-
-    def _get_quantiles(idf):
-        return (
-            idf.groupby(reporting_groups)
-            .quantile(np.array(peak_percentiles) / 100)
-            .unstack()
-        )
-
-    peaks_quantiles = _get_quantiles(peaks)
-    peak_years_quantiles = _get_quantiles(peak_years).astype(int)
-
     def rename_quantiles(quantile):
         percentile = int(quantile * 100)
         if np.isclose(percentile, 50):
@@ -512,18 +653,24 @@ def post_process(
         axis=1,
     )
 
-    def mangle_meta_table_climate_model(idf):
-        out = idf.copy()
-        climate_model = idf.name
-        out.columns = out.columns + f" ({climate_model})"
-
-        return out
-
-    meta_table = (
-        meta_table.groupby("climate_model", group_keys=False)
-        .apply(mangle_meta_table_climate_model)
-        .reset_index("climate_model", drop=True)
+    # one row per model and scenario, with the columns of every climate model
+    meta_table = pd.concat(
+        [
+            cm_meta_table.droplevel("climate_model").rename(
+                columns=lambda c, cm=climate_model: f"{c} ({cm})"
+            )
+            for climate_model, cm_meta_table in meta_table.groupby("climate_model")
+        ],
+        axis=1,
     )
 
+    # rebuilding the full ensemble needs as much memory as the raw output so
+    # only do it if the caller needs it
+    if return_raw:
+        LOGGER.info("Converting dense ensemble arrays back to ScmRun")
+        res = scmdata.run_append([ensemble.to_scmrun() for ensemble in ensembles])
+    else:
+        res = None
+
     LOGGER.info("Exiting post-processing")
     return res, res_percentiles, meta_table
@@ -0,0 +1,236 @@
+import datetime as dt
+import hashlib
+import json
+import logging
+import os
+import os.path
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from .ensemble import DenseEnsemble
+
+LOGGER = logging.getLogger(__name__)
+
+_INDEX_FILE = "index.json"
+
+
+def _json_default(obj):
+    if isinstance(obj, np.generic):
+        return obj.item()
+
+    return str(obj)
+
+
+def _get_chunk_name(ensemble):
+    # groups don't overlap between batches so the chunk of a batch has the
+    # same name every time the batch is run
+    sha = hashlib.sha256()
+    sha.update(json.dumps(list(ensemble.groups.names)).encode())
+    sha.update(json.dumps(ensemble.groups.tolist(), default=_json_default).encode())
+
+    return sha.hexdigest()[:16]
+
+
+class RawEnsembleStore:
+    """
+    On-disk store of raw (i.e. every ensemble member) climate model output
+
+    Each saved :class:`climate_assessment.climate.ensemble.DenseEnsemble` is
+    written to its own chunk, a directory containing one ``.npy`` file per
+    variable with shape (group, member, time) and an ``index.json`` file with
+    the labels of each axis and the unit of each variable. The ``.npy`` files
+    are memory-mapped when read so slices (e.g. the runs of a single scenario)
+    can be read without loading the rest of the ensemble.
+    """
+
+    def __init__(self, path):
+        """
+        Initialise
+
+        Parameters
+        ----------
+        path : str
+            Directory in which the raw output is stored
+        """
+        self.path = path
+
+    def save(self, ensemble, metadata=None):
+        """
+        Save an ensemble as a new chunk
+
+        If the store already contains a chunk with exactly the same groups
+        (e.g. because the batch has been run before), it is overwritten.
+
+        Parameters
+        ----------
+        ensemble : :class:`climate_assessment.climate.ensemble.DenseEnsemble`
+            Ensemble to save
+
+        metadata : dict, None
+            Extra metadata to save with the ensemble (must be JSON serialisable,
+            other values are saved as strings)
+
+        Returns
+        -------
+        str
+            Directory of the chunk
+        """
+        chunk_dir = os.path.join(self.path, _get_chunk_name(ensemble))
+        tmp_dir = f"{chunk_dir}.tmp"
+        if os.path.isdir(tmp_dir):
+            shutil.rmtree(tmp_dir)
+
+        os.makedirs(tmp_dir)
+
+        files = {}
+        for i, (variable, values) in enumerate(ensemble.data.items()):
+            files[variable] = f"{i:03d}.npy"
+            np.save(os.path.join(tmp_dir, files[variable]), values)
+
+        index = {
+            "variables": files,
+            "units": ensemble.units,
+            "group_cols": list(ensemble.groups.names),
+            "groups": ensemble.groups.tolist(),
+            "member_col": ensemble.member_col,
+            "members": ensemble.members.tolist(),
+            "time": [t.isoformat() for t in ensemble.time],
+            "time_name": ensemble.time.name,
+            "metadata": metadata or {},
+        }
+        with open(os.path.join(tmp_dir, _INDEX_FILE), "w") as fh:
+            json.dump(index, fh, default=_json_default)
+
+        # only replace a previous chunk once this one is complete
+        if os.path.isdir(chunk_dir):
+            shutil.rmtree(chunk_dir)
+
+        os.replace(tmp_dir, chunk_dir)
+        LOGGER.debug("Saved raw output chunk %s", chunk_dir)
+
+        return chunk_dir
+
+    def chunks(self):
+        """
+        Get the chunks in the store
+
+        Returns
+        -------
+        list[str]
+            Directory of each complete chunk
+        """
+        if not os.path.isdir(self.path):
+            return []
+
+        return sorted(
+            os.path.join(self.path, d)
+            for d in os.listdir(self.path)
+            if not d.endswith(".tmp")
+            and os.path.isfile(os.path.join(self.path, d, _INDEX_FILE))
+        )
+
+    @staticmethod
+    def load_chunk(chunk_dir, variables=None, mmap_mode="r", **filters):
+        """
+        Load a chunk
+
+        Parameters
+        ----------
+        chunk_dir : str
+            Directory of the chunk (see :meth:`chunks`)
+
+        variables : list[str], None
+            Variables to load. If ``None``, all variables are loaded.
+
+        mmap_mode : str, None
+            Passed to :func:`numpy.load`. With the default, ``"r"``, the data is
+            only read from disk when it is accessed. If ``None``, all the
+            selected data is loaded into memory.
+
+        **filters
+            Values of group columns to keep, e.g. ``scenario="ssp245"`` or
+            ``scenario=["ssp126", "ssp245"]``
+
+        Returns
+        -------
+        :class:`climate_assessment.climate.ensemble.DenseEnsemble`, None
+            Ensemble with the selected variables and groups. If no groups
+            match ``filters``, ``None`` is returned.
+
+        Raises
+        ------
+        KeyError
+            A variable or filter column is not in the chunk
+        """
+        with open(os.path.join(chunk_dir, _INDEX_FILE)) as fh:
+            index = json.load(fh)
+
+        groups = pd.MultiIndex.from_tuples(
+            [tuple(g) for g in index["groups"]], names=index["group_cols"]
+        )
+        keep = np.ones(len(groups), dtype=bool)
+        for col, values in filters.items():
+            if col not in groups.names:
+                raise KeyError(f"{col} is not a group column of {chunk_dir}")
+
+            if isinstance(values, str) or not np.iterable(values):
+                values = [values]
+
+            keep &= groups.get_level_values(col).isin(values)
+
+        if not keep.any():
+            return None
+
+        if variables is None:
+            variables = list(index["variables"])
+
+        data = {}
+        for variable in variables:
+            values = np.load(
+                os.path.join(chunk_dir, index["variables"][variable]),
+                mmap_mode=mmap_mode,
+            )
+            # only copy the data if a subset of the groups is required
+            data[variable] = values if keep.all() else values[keep]
+
+        return DenseEnsemble(
+            data=data,
+            units={v: index["units"][v] for v in variables},
+            groups=groups[keep],
+            members=pd.Index(index["members"], name=index["member_col"]),
+            time=pd.Index(
+                [dt.datetime.fromisoformat(t) for t in index["time"]],
+                name=index["time_name"],
+            ),
+            member_col=index["member_col"],
+        )
+
+    def iter_ensembles(self, variables=None, mmap_mode="r", **filters):
+        """
+        Iterate over the ensembles in the store
+
+        Parameters
+        ----------
+        variables : list[str], None
+            Variables to load. If ``None``, all variables are loaded.
+
+        mmap_mode : str, None
+            Passed to :func:`numpy.load` (see :meth:`load_chunk`)
+
+        **filters
+            Values of group columns to keep (see :meth:`load_chunk`). Chunks
+            without any matching groups are skipped.
+
+        Yields
+        ------
+        :class:`climate_assessment.climate.ensemble.DenseEnsemble`
+            Ensemble of each chunk
+        """
+        for chunk_dir in self.chunks():
+            ensemble = self.load_chunk(
+                chunk_dir, variables=variables, mmap_mode=mmap_mode, **filters
+            )
+            if ensemble is not None:
+                yield ensemble
@@ -1,19 +1,36 @@
 import logging
 import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 
 import aneris.convenience
+import joblib
 import pandas as pd
 import pyam
 import scmdata
 import tqdm
-from joblib import Parallel, delayed
 
 from climate_assessment.checks import remove_rows_with_zero_in_harmonization_year
+from climate_assessment.history import get_harmonization_history
+from climate_assessment.utils import get_chunk_size
 
-from ..utils import parallel_progress_bar
+from .native import (
+    get_harmonisation_methods,
+    get_history_statistics,
+    harmonise_native,
+)
 
 LOGGER = logging.getLogger(__name__)
 
+HARMONIZATION_BACKENDS = ("processes", "threads", "sequential")
+"""tuple[str]: Ways in which scenarios can be harmonised in parallel"""
+
+HARMONIZERS = ("aneris", "native")
+"""tuple[str]: Implementations which can be used to harmonise scenarios"""
+
+# data shared by all the harmonisation tasks of a worker, set once per worker
+# by _init_harmonisation_worker so it isn't sent with every task
+_WORKER_CONTEXT = {}
+
 
 here = os.path.dirname(os.path.realpath(__file__))
 
@@ -123,7 +140,159 @@ def add_year_historical_percentage_offset(df, dfhist, yr=2015, low_yr=2010):
     return df
 
 
-def run_harmonization(df, instance, prefix):
+def _init_harmonisation_worker(history, overrides, harmonisation_year):
+    _WORKER_CONTEXT["history"] = history
+    _WORKER_CONTEXT["overrides"] = overrides
+    _WORKER_CONTEXT["harmonisation_year"] = harmonisation_year
+
+
+def _drop_broken_stuff(indf):
+    # hack around some regression in aneris - pyam stack
+    out = indf.copy()
+    idx_length = len(out.index.names)
+    drop_levels = list(range(idx_length // 2, idx_length))
+    out.index = out.index.droplevel(drop_levels)
+
+    return out
+
+
+def _harmonise_chunk(chunk):
+    return [
+        _drop_broken_stuff(
+            aneris.convenience.harmonise_all(
+                msdf,
+                history=_WORKER_CONTEXT["history"],
+                harmonisation_year=_WORKER_CONTEXT["harmonisation_year"],
+                overrides=_WORKER_CONTEXT["overrides"],
+            )
+        )
+        for msdf in chunk
+    ]
+
+
+def harmonise_scenarios(
+    scenarios,
+    history,
+    overrides,
+    harmonisation_year,
+    n_jobs=-1,
+    backend="processes",
+    chunk_size=None,
+):
+    """
+    Harmonise scenarios with aneris in parallel
+
+    The scenarios are split into chunks, each of which is harmonised in a
+    single task. ``history`` and ``overrides`` are sent to each worker once,
+    when it starts, rather than with every task.
+
+    Parameters
+    ----------
+    scenarios : :class:`pandas.DataFrame`
+        Scenarios to harmonise (in wide format, with model and scenario in the
+        index)
+
+    history : :class:`pandas.DataFrame`
+        Historical emissions to harmonise to
+
+    overrides : :class:`pandas.DataFrame`
+        Harmonisation method to use for each variable (see
+        :func:`aneris.convenience.harmonise_all`)
+
+    harmonisation_year : int
+        Year in which to harmonise
+
+    n_jobs : int
+        Number of workers. As for joblib, negative values count back from the
+        number of CPUs, e.g. -1 means all CPUs and -2 all CPUs but one.
+
+    backend : str
+        How to run the tasks (see :data:`HARMONIZATION_BACKENDS`). Harmonising
+        is mostly pure Python, so only "processes" actually runs in parallel.
+        "sequential" runs everything in the current process, which is useful
+        for debugging.
+
+    chunk_size : int, None
+        Number of scenarios to harmonise in each task (see
+        :func:`climate_assessment.utils.get_chunk_size`)
+
+    Returns
+    -------
+    list[:class:`pandas.DataFrame`]
+        Harmonised scenarios, in the same order as the groups of ``scenarios``
+
+    Raises
+    ------
+    ValueError
+        ``backend`` is not supported
+    """
+    if backend not in HARMONIZATION_BACKENDS:
+        raise ValueError(
+            f"Unknown harmonization backend: {backend}. "
+            f"Supported backends: {HARMONIZATION_BACKENDS}"
+        )
+
+    scenario_dfs = [msdf for _, msdf in scenarios.groupby(["model", "scenario"])]
+    n_workers = 1 if backend == "sequential" else joblib.effective_n_jobs(n_jobs)
+    chunk_size = get_chunk_size(len(scenario_dfs), n_workers, chunk_size=chunk_size)
+    chunks = [
+        scenario_dfs[i : i + chunk_size]
+        for i in range(0, len(scenario_dfs), chunk_size)
+    ]
+    LOGGER.info(
+        "Harmonising %s scenarios in %s chunks with %s %s worker(s)",
+        len(scenario_dfs),
+        len(chunks),
+        n_workers,
+        backend,
+    )
+
+    initargs = (history, overrides, harmonisation_year)
+    results = [None] * len(chunks)
+    with tqdm.tqdm(desc="Harmonisation", total=len(scenario_dfs)) as pbar:
+        if backend == "sequential":
+            _init_harmonisation_worker(*initargs)
+            try:
+                for i, chunk in enumerate(chunks):
+                    results[i] = _harmonise_chunk(chunk)
+                    pbar.update(len(chunk))
+            finally:
+                _WORKER_CONTEXT.clear()
+
+        else:
+            executor_cls = (
+                ProcessPoolExecutor if backend == "processes" else ThreadPoolExecutor
+            )
+            try:
+                with executor_cls(
+                    max_workers=n_workers,
+                    initializer=_init_harmonisation_worker,
+                    initargs=initargs,
+                ) as executor:
+                    futures = {
+                        executor.submit(_harmonise_chunk, chunk): i
+                        for i, chunk in enumerate(chunks)
+                    }
+                    for future in as_completed(futures):
+                        i = futures[future]
+                        results[i] = future.result()
+                        pbar.update(len(chunks[i]))
+            finally:
+                # threads share this process' context
+                _WORKER_CONTEXT.clear()
+
+    return [s for chunk_results in results for s in chunk_results]
+
+
+def run_harmonization(
+    df,
+    instance,
+    prefix,
+    n_jobs=-1,
+    backend="processes",
+    chunk_size=None,
+    harmonizer="aneris",
+):
     """
     Run harmonization.
     Hamronization method overrides by specific species are set within this function too.
@@ -136,17 +305,39 @@ def run_harmonization(df, instance, prefix):
         String used to choose what historical data to use.
     prefix : str
         Prefix used for the variable names
+    n_jobs : int
+        Number of workers to harmonise with (see :func:`harmonise_scenarios`)
+    backend : str
+        How to run the harmonisation tasks (see :func:`harmonise_scenarios`)
+    chunk_size : int, None
+        Number of scenarios to harmonise in each task. If ``None``, chosen
+        based on the number of scenarios and workers.
+    harmonizer : str
+        Implementation to harmonise with (see :data:`HARMONIZERS`). With
+        "native", the methods are chosen and applied to all timeseries at once
+        with :func:`climate_assessment.harmonization.native.harmonise_native`
+        and only the timeseries which need special handling (e.g. those whose
+        history is in different units) are harmonised with aneris. Whichever
+        harmonizer is used, the method chosen for each timeseries (see
+        :func:`climate_assessment.harmonization.native.get_harmonisation_methods`)
+        is logged at debug level so the choices can be audited.
 
     Returns
     -------
     :class:`pyam.IamDataFrame`
         Harmonized scenarios.
+
+    Raises
+    ------
+    ValueError
+        ``harmonizer`` is not supported
     """
-    LOGGER.info(f"Using {instance} instance for harmonization")
+    if harmonizer not in HARMONIZERS:
+        raise ValueError(
+            f"Unknown harmonizer: {harmonizer}. Supported harmonizers: {HARMONIZERS}"
+        )
 
-    df_hist = scmdata.ScmRun(
-        getpath("history_" + instance + ".csv"), lowercase_cols=True
-    )
+    LOGGER.info(f"Using {instance} instance for harmonization")
 
     LOGGER.debug("Emissions to harmonize %s", HARMONIZATION_VARIABLES)
 
@@ -174,11 +365,7 @@ def run_harmonization(df, instance, prefix):
     LOGGER.info("Creating pd.DataFrame's for aneris")
     scenarios = scenarios.timeseries(time_axis="year")
 
-    df_hist["variable"] = df_hist["variable"].apply(
-        lambda x: x.replace(f"{prefix}|", "").replace("|Unharmonized", "")
-    )
-    df_hist["unit"] = df_hist["unit"].str.replace("-equiv", "").str.replace("-", "")
-    history = df_hist.filter(year=range(1990, 2020)).timeseries(time_axis="year")
+    history = get_harmonization_history(instance, prefix, years=range(1990, 2020))
 
     # TODO: remove hard-coding
     historical_offset_add_year = 2015
@@ -301,33 +488,48 @@ def run_harmonization(df, instance, prefix):
     LOGGER.info("Harmonisation overrides:\n%s", overrides)
 
     scenarios = scenarios.filter(year=output_timesteps).timeseries()
-    with parallel_progress_bar(tqdm.tqdm(desc="Harmonisation")):
-        LOGGER.info("Harmonising in parallel")
-        # TODO: remove hard-coding of n_jobs
-        scenarios_harmonized = Parallel(n_jobs=-1)(
-            delayed(aneris.convenience.harmonise_all)(
-                msdf,
-                history=history,
-                harmonisation_year=harmonization_year,
-                overrides=overrides,
-            )
-            for _, msdf in scenarios.groupby(["model", "scenario"])
+    methods = None
+    if harmonizer == "native" or LOGGER.isEnabledFor(logging.DEBUG):
+        # choose the methods of all timeseries at once, rather than per
+        # scenario as aneris does, so they can be audited whichever harmonizer
+        # is used
+        methods = get_harmonisation_methods(
+            scenarios,
+            get_history_statistics(history, harmonization_year),
+            harmonization_year,
+            overrides,
         )
+        LOGGER.debug("Harmonisation methods:\n%s", methods.to_string())
 
-    LOGGER.info("Hacking around some regression in aneris - pyam stack")
-
-    def drop_broken_stuff(indf):
-        out = indf.copy()
-        idx_length = len(out.index.names)
-        drop_levels = list(range(idx_length // 2, idx_length))
-        out.index = out.index.droplevel(drop_levels)
-
-        return out
+    scenarios_harmonized = []
+    if harmonizer == "native":
+        LOGGER.info("Harmonising overridden timeseries natively")
+        native_harmonized, scenarios = harmonise_native(
+            scenarios,
+            history=history,
+            harmonisation_year=harmonization_year,
+            overrides=overrides,
+            methods=methods,
+        )
+        scenarios_harmonized.append(native_harmonized)
 
-    scenarios_harmonized = [drop_broken_stuff(s) for s in scenarios_harmonized]
+    if not scenarios.empty:
+        LOGGER.info("Harmonising in parallel")
+        scenarios_harmonized += harmonise_scenarios(
+            scenarios,
+            history=history,
+            overrides=overrides,
+            harmonisation_year=harmonization_year,
+            n_jobs=n_jobs,
+            backend=backend,
+            chunk_size=chunk_size,
+        )
 
     LOGGER.info("Combining results")
-    scenarios_harmonized = pd.concat(scenarios_harmonized).reset_index()
+    # make sure the year columns of both harmonizers line up
+    scenarios_harmonized = pd.concat(
+        [s.rename(columns=int) for s in scenarios_harmonized]
+    ).reset_index()
 
     LOGGER.info("Putting equiv back in units")
     equiv_rows = scenarios_harmonized["variable"].isin(["Emissions|HFC"])
@@ -0,0 +1,367 @@
+import logging
+import re
+
+import numpy as np
+import pandas as pd
+
+LOGGER = logging.getLogger(__name__)
+
+_REDUCE_METHOD_REGEX = re.compile(
+    r"^reduce_(?P<kind>ratio|offset)_(?P<year>\d{4})(?P<cov>_cov)?$"
+)
+
+# convergence years of aneris' reduce_ratio_YYYY and reduce_offset_YYYY methods
+_REDUCE_METHOD_YEARS = [*range(2020, 2100 + 1, 10), 2150]
+
+# convergence year of aneris' reduce_ratio_2150_cov and reduce_offset_2150_cov
+_COV_METHOD_YEAR = 2150
+
+# kind of the methods which don't converge, aneris harmonises with a constant
+# offset if the model is zero
+_CONSTANT_METHODS = {
+    "constant_ratio": "ratio",
+    "constant_offset": "offset",
+    "model_zero": "offset",
+    "hist_zero": "unchanged",
+}
+
+# settings of aneris' default decision tree (aneris.methods.default_methods)
+_TREE_RATIO_METHOD = "reduce_ratio_2080"
+_TREE_OFFSET_METHOD = "reduce_offset_2080"
+_TREE_LUC_METHOD = "reduce_offset_2150_cov"
+_TREE_LUC_COV_THRESHOLD = 10
+
+
+def parse_native_method(method):
+    """
+    Parse a harmonisation method which can be applied without aneris
+
+    Parameters
+    ----------
+    method : str
+        Name of the aneris harmonisation method
+
+    Returns
+    -------
+    tuple[str, int], None
+        Kind of method ("ratio", "offset" or "unchanged") and the year in
+        which the harmonised timeseries converges to the original (``None``
+        for the constant methods). ``None`` if the method has to be applied by
+        aneris.
+    """
+    if method in _CONSTANT_METHODS:
+        return _CONSTANT_METHODS[method], None
+
+    match = _REDUCE_METHOD_REGEX.match(str(method))
+    if match is None:
+        return None
+
+    final_year = int(match.group("year"))
+    valid_years = [_COV_METHOD_YEAR] if match.group("cov") else _REDUCE_METHOD_YEARS
+    if final_year not in valid_years:
+        return None
+
+    return match.group("kind"), final_year
+
+
+def _get_convergence_factors(kind, years, harmonisation_year, final_year):
+    # same expressions as aneris.methods so results are identical
+    yi, yf = harmonisation_year, final_year
+
+    def f(year):
+        return -(year - yi) / float(yf - yi) + 1
+
+    if kind == "ratio":
+        factors = [
+            f(yi) if year < yi else f(year) if year <= yf else 0.0 for year in years
+        ]
+    else:
+        factors = [f(year) if year <= yf else 0.0 for year in years]
+
+    return np.array(factors)
+
+
+def _get_variable_region_index(idx):
+    return idx.droplevel(
+        [n for n in idx.names if n not in ("variable", "region")]
+    ).reorder_levels(["variable", "region"])
+
+
+def _coeff_of_var(values):
+    # as aneris.methods.coeff_of_var
+    x = np.diff(values)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.abs(np.std(x) / np.mean(x))
+
+
+def get_history_statistics(history, harmonisation_year):
+    """
+    Get the statistics of the history used by aneris' default decision tree
+
+    These only depend on the history so are calculated once, rather than for
+    every timeseries which is harmonised.
+
+    Parameters
+    ----------
+    history : :class:`pandas.DataFrame`
+        Historical emissions (in wide format with integer year columns)
+
+    harmonisation_year : int
+        Year in which to harmonise
+
+    Returns
+    -------
+    :class:`pandas.DataFrame`
+        Unit, value in the harmonisation year ("h") and coefficient of
+        variation ("cov") of each historical timeseries, indexed by variable
+        and region. Timeseries which aren't uniquely identified by their
+        variable and region are left out as aneris can't use them.
+    """
+    keys = _get_variable_region_index(history.index)
+    unique = ~keys.duplicated(keep=False)
+    history = history[unique]
+
+    return pd.DataFrame(
+        {
+            "unit": history.index.get_level_values("unit"),
+            "h": history[harmonisation_year].to_numpy(dtype=float),
+            "cov": [_coeff_of_var(v) for v in history.to_numpy(dtype=float)],
+        },
+        index=keys[unique],
+    )
+
+
+def choose_default_methods(values, m, h, cov):
+    """
+    Choose harmonisation methods with aneris' default decision tree
+
+    The choice is made for all timeseries at once, with the same rules and
+    settings as :func:`aneris.methods.default_methods`.
+
+    Parameters
+    ----------
+    values : :class:`numpy.ndarray`
+        Values of the timeseries to harmonise (one row per timeseries)
+
+    m : :class:`numpy.ndarray`
+        Value of each timeseries in the harmonisation year
+
+    h : :class:`numpy.ndarray`
+        Historical value of each timeseries in the harmonisation year
+
+    cov : :class:`numpy.ndarray`
+        Coefficient of variation of the history of each timeseries (see
+        :func:`get_history_statistics`)
+
+    Returns
+    -------
+    :class:`numpy.ndarray`
+        Name of the method chosen for each timeseries
+    """
+    neg_m = (values < 0).any(axis=1)
+    pos_m = (values > 0).any(axis=1)
+    zero_m = (values == 0).all(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        f = h / m
+        dh = np.abs(h - m) / h
+
+    m_close_to_zero = np.isclose(m, 0)
+    conditions_methods = (
+        (h == 0, "hist_zero"),
+        (zero_m, "model_zero"),
+        # aneris doesn't define this method so fails for such timeseries
+        (np.isinf(f) & neg_m & pos_m, "unicorn"),
+        (m_close_to_zero & neg_m, _TREE_OFFSET_METHOD),
+        (m_close_to_zero, "constant_offset"),
+        (np.isfinite(cov) & (cov > _TREE_LUC_COV_THRESHOLD), _TREE_LUC_METHOD),
+        (dh < 0.5, _TREE_RATIO_METHOD),
+        (neg_m, "reduce_ratio_2100"),
+    )
+
+    return np.select(
+        [c for c, _ in conditions_methods],
+        [method for _, method in conditions_methods],
+        default="constant_ratio",
+    ).astype(object)
+
+
+def get_harmonisation_methods(
+    scenarios, history_statistics, harmonisation_year, overrides
+):
+    """
+    Get the method aneris would use to harmonise each timeseries
+
+    Parameters
+    ----------
+    scenarios : :class:`pandas.DataFrame`
+        Scenarios to harmonise (in wide format with integer year columns)
+
+    history_statistics : :class:`pandas.DataFrame`
+        Statistics of the history (see :func:`get_history_statistics`)
+
+    harmonisation_year : int
+        Year in which to harmonise
+
+    overrides : :class:`pandas.DataFrame`
+        Harmonisation method to use for each variable (columns "variable" and
+        "method")
+
+    Returns
+    -------
+    :class:`pandas.DataFrame`
+        Method, where it comes from ("override" or "default") and the
+        statistics it was chosen from (historical unit, "h" and "cov" from
+        ``history_statistics``, model value in the harmonisation year "m") for
+        each timeseries in ``scenarios``. The method is null if there is no
+        (unique) history for a timeseries without an override or if the
+        override is ambiguous.
+    """
+    out = history_statistics.reindex(
+        _get_variable_region_index(scenarios.index)
+    ).set_axis(scenarios.index)
+    out["m"] = scenarios[harmonisation_year].to_numpy(dtype=float)
+
+    variables = scenarios.index.get_level_values("variable")
+    unique_overrides = overrides.drop_duplicates("variable", keep=False)
+    override_methods = variables.map(
+        unique_overrides.set_index("variable")["method"]
+    ).to_numpy(dtype=object)
+    # aneris refuses ambiguous overrides
+    ambiguous = variables.isin(
+        overrides.loc[overrides["variable"].duplicated(), "variable"]
+    )
+    is_override = pd.notna(override_methods) | ambiguous
+
+    default_methods = choose_default_methods(
+        scenarios.to_numpy(dtype=float),
+        out["m"].to_numpy(),
+        out["h"].to_numpy(),
+        out["cov"].to_numpy(),
+    )
+    default_methods[out["h"].isna().to_numpy()] = None
+    override_methods[ambiguous] = None
+
+    out["method"] = np.where(is_override, override_methods, default_methods)
+    out["source"] = np.where(is_override, "override", "default")
+
+    return out[["method", "source", "unit", "h", "cov", "m"]]
+
+
+def harmonise_native(scenarios, history, harmonisation_year, overrides, methods=None):
+    """
+    Harmonise all the timeseries which don't need aneris
+
+    The method of each timeseries is taken from ``overrides`` or, if it isn't
+    overridden, chosen with aneris' default decision tree (see
+    :func:`get_harmonisation_methods`). Timeseries which are harmonised with
+    ``constant_ratio``, ``constant_offset``, ``reduce_ratio_YYYY``,
+    ``reduce_offset_YYYY``, ``reduce_ratio_2150_cov``,
+    ``reduce_offset_2150_cov``, ``model_zero`` or ``hist_zero`` are
+    harmonised all at once, using the same formulae as aneris. Timeseries
+    where aneris might do something other than apply the formula (e.g. raise
+    an error because there is no history, convert units or handle a zero in
+    the harmonisation year) are returned so they can be harmonised with
+    aneris.
+
+    If ``methods`` isn't supplied, the method used for each timeseries is
+    logged at debug level so the choices can be audited.
+
+    Parameters
+    ----------
+    scenarios : :class:`pandas.DataFrame`
+        Scenarios to harmonise (in wide format with integer year columns)
+
+    history : :class:`pandas.DataFrame`
+        Historical emissions to harmonise to (in wide format with integer year
+        columns)
+
+    harmonisation_year : int
+        Year in which to harmonise
+
+    overrides : :class:`pandas.DataFrame`
+        Harmonisation method to use for each variable (columns "variable" and
+        "method")
+
+    methods : :class:`pandas.DataFrame`, None
+        Method of each timeseries in ``scenarios`` if already known (see
+        :func:`get_harmonisation_methods`), otherwise they are chosen here
+
+    Returns
+    -------
+    :class:`pandas.DataFrame`, :class:`pandas.DataFrame`
+        Harmonised timeseries and the timeseries which still have to be
+        harmonised with aneris
+    """
+    if (
+        scenarios.empty
+        or set(overrides.columns) != {"variable", "method"}
+        or harmonisation_year not in scenarios.columns
+        or harmonisation_year not in history.columns
+    ):
+        return scenarios.iloc[:0], scenarios
+
+    if methods is None:
+        history_statistics = get_history_statistics(history, harmonisation_year)
+        methods = get_harmonisation_methods(
+            scenarios, history_statistics, harmonisation_year, overrides
+        )
+        if LOGGER.isEnabledFor(logging.DEBUG):
+            LOGGER.debug("Harmonisation methods:\n%s", methods.to_string())
+
+    parsed = [
+        parse_native_method(m) if isinstance(m, str) else None
+        for m in methods["method"]
+    ]
+
+    values = scenarios.to_numpy(dtype=float)
+    years = scenarios.columns.to_numpy(dtype=int)
+    model_base = methods["m"].to_numpy()
+    hist_base = methods["h"].to_numpy()
+
+    supported = np.array([p is not None for p in parsed], dtype=bool)
+    is_ratio = np.array([p is not None and p[0] == "ratio" for p in parsed], dtype=bool)
+    native = (
+        supported
+        & np.isfinite(hist_base)
+        & (
+            methods["unit"].to_numpy()
+            == scenarios.index.get_level_values("unit").to_numpy()
+        )
+        & np.isfinite(values).all(axis=1)
+        & ~(is_ratio & (model_base == 0))
+    )
+    if not native.any():
+        return scenarios.iloc[:0], scenarios
+
+    # same factors as aneris.methods.harmonize_factors
+    offsets = hist_base - model_base
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratios = hist_base / model_base
+
+    harmonised = values.copy()
+    for kind, final_year in {parsed[i] for i in np.flatnonzero(native)}:
+        rows = native & np.array([p == (kind, final_year) for p in parsed])
+        if kind == "unchanged":
+            continue
+
+        if final_year is None:
+            if kind == "ratio":
+                harmonised[rows] = values[rows] * ratios[rows, np.newaxis]
+            else:
+                harmonised[rows] = values[rows] + offsets[rows, np.newaxis]
+
+            continue
+
+        factors = _get_convergence_factors(kind, years, harmonisation_year, final_year)
+        if kind == "ratio":
+            harmonised[rows] = values[rows] * (np.outer(ratios[rows] - 1, factors) + 1)
+        else:
+            harmonised[rows] = values[rows] + np.outer(offsets[rows], factors)
+
+    LOGGER.info(
+        "Harmonised %s of %s timeseries without aneris", native.sum(), len(native)
+    )
+    out = scenarios.iloc[native].copy()
+    out.iloc[:, :] = harmonised[native]
+
+    return out, scenarios.iloc[~native]
@@ -7,56 +7,88 @@ import silicone
 from .checks import sanity_check_hierarchy
 from .harmonization import HARMONIZATION_VARIABLES, run_harmonization
 from .infilling import postprocess_infilled_for_climate, run_infilling
+from .output import DEFAULT_OUTPUT_FORMATS, write_iamc
+from .profiling import Profiler
 
 LOGGER = logging.getLogger(__name__)
 
 
-def harmonization_and_infilling(
+def run_harmonization_and_infilling(
     df,
-    key_string,
     infilling_database,
     prefix="AR6 climate diagnostics",
     instance="ar6",
-    outdir="output",
     do_harmonization=True,
-    # TODO: here is the downstream for potentially implementing gwp100 kyoto
+    profiler=None,
+    harmonization_n_jobs=-1,
+    harmonization_backend="processes",
+    harmonization_chunk_size=None,
+    harmonizer="aneris",
+    infilling_n_jobs=1,
+    infilling_chunk_size=None,
+    compile_infilling_database=False,
 ):
     """
-    Arguments
-    ----------
-    input_df : :class:`pyam.IamDataFrame`
-        Input native emissions to harmonize and infill.
+    Harmonize and infill emissions in memory
 
-    inputcheck : bool
-        Perform checks to remove unsuitable emissisons pathways. [Default: True]
-
-    key_string : str
-        Identifier string for writing out results. By default derived from
-        the input_emissions_file string in a CLI command.
+    Unlike :func:`harmonization_and_infilling`, nothing is written to disk.
 
-    outdir : str
-        Path to output folder.
+    Parameters
+    ----------
+    df : :class:`pyam.IamDataFrame`
+        Input native emissions to harmonize and infill.
 
     infilling_database : str
         Path to the infiller database emissions file.
 
-    harmonize : bool
-        Perform harmonization (with False, only infilling is run). [Default: True]
-
     prefix : str
         Prefix used to identify the new variable names of results
         produced by the workflow.
 
-    harmonization_instance : str
+    instance : str
         Config string required by aneris.
 
+    do_harmonization : bool
+        Perform harmonization (with False, only infilling is run). [Default: True]
+
+    profiler : :class:`climate_assessment.profiling.Profiler`, None
+        If supplied, the time and memory used by harmonization and infilling
+        are recorded with this profiler
+
+    harmonization_n_jobs : int
+        Number of workers used to harmonise scenarios (see
+        :func:`climate_assessment.harmonization.harmonise_scenarios`)
+
+    harmonization_backend : str
+        How to run the harmonisation tasks (see
+        :data:`climate_assessment.harmonization.HARMONIZATION_BACKENDS`)
+
+    harmonization_chunk_size : int, None
+        Number of scenarios harmonised in each task. If ``None``, chosen based
+        on the number of scenarios and workers.
+
+    harmonizer : str
+        Implementation used to harmonise (see
+        :data:`climate_assessment.harmonization.HARMONIZERS`)
+
+    infilling_n_jobs : int
+        Number of worker processes used to infill scenarios (see
+        :func:`climate_assessment.infilling.run_infilling`)
+
+    infilling_chunk_size : int, None
+        Number of scenarios infilled in each task. If ``None``, chosen based
+        on the number of scenarios and workers.
+
+    compile_infilling_database : bool
+        Compile the relationships used for infilling once and store them next
+        to the infilling database (see
+        :func:`climate_assessment.infilling.run_infilling`)
+
     Returns
     -------
-    bool
-        Returns True if there are scenarios that can be run by a climate
-        emulator. Those scenarios are not returned by this function, but rather
-        written to the outdir. Returns False if there are no complete scenarios
-        to be run.
+    :class:`pyam.IamDataFrame`, None
+        Harmonized and infilled emissions which can be run by a climate
+        emulator. ``None`` if there are no complete scenarios to be run.
     """
     if instance == "ar6":
         infilled_start_year = 2015
@@ -65,8 +97,20 @@ def harmonization_and_infilling(
     else:
         raise ValueError("Unknown value for instance")
 
+    if profiler is None:
+        profiler = Profiler(enabled=False)
+
     if do_harmonization:
-        harmonized = run_harmonization(df, instance=instance, prefix=prefix)
+        with profiler.stage("harmonization"):
+            harmonized = run_harmonization(
+                df,
+                instance=instance,
+                prefix=prefix,
+                n_jobs=harmonization_n_jobs,
+                backend=harmonization_backend,
+                chunk_size=harmonization_chunk_size,
+                harmonizer=harmonizer,
+            )
     else:
         LOGGER.info("Not performing harmonization")
         harmonized = df.filter(
@@ -79,57 +123,218 @@ def harmonization_and_infilling(
 
     if harmonized.empty:
         LOGGER.warning("No harmonized scenarios passed the checks")
-        return False
+        return None
 
-    infilled, co2_infill_db, _ = run_infilling(
-        harmonized,
-        prefix=prefix,
-        database_filepath=infilling_database,
-        start_year=infilled_start_year,
-    )
+    with profiler.stage("infilling"):
+        infilled, co2_infill_db, _ = run_infilling(
+            harmonized,
+            prefix=prefix,
+            database_filepath=infilling_database,
+            start_year=infilled_start_year,
+            n_jobs=infilling_n_jobs,
+            chunk_size=infilling_chunk_size,
+            compile_database=compile_infilling_database,
+        )
 
     # do post-processing checks after infilling
     # make sure the scenario reports until 2100
-    infilled = postprocess_infilled_for_climate(
-        infilled, prefix=prefix, start_year=infilled_start_year
-    )
+    with profiler.stage("postprocess_infilled"):
+        infilled = postprocess_infilled_for_climate(
+            infilled, prefix=prefix, start_year=infilled_start_year
+        )
 
     if infilled.filter(variable="*Infilled*").empty:
         LOGGER.error("YOUR EMISSION FILE IS EMPTY AFTER INFILLING")
-        return False
-    else:
-        # add meta string to record aneris and silicone versions
-        infilled.set_meta(
-            meta=(
-                f"aneris (version: {aneris.__version__}), silicone (version: {silicone.__version__})"
-            ),
-            name="assessment-tools",
-        )
+        return None
+
+    # add meta string to record aneris and silicone versions
+    infilled.set_meta(
+        meta=(
+            f"aneris (version: {aneris.__version__}), silicone (version: {silicone.__version__})"
+        ),
+        name="assessment-tools",
+    )
 
-        #  write out combined results of harmonization and infilling
-        # write out csv file with all data (no meta)
-        out_file_infilled = os.path.join(
-            outdir, f"{key_string}_harmonized_infilled.csv"
+    # Sanity check for a consistent hierarchy.
+    # Checks that Emissions|CO2 is the sum of AFOLU and Energy emissions
+    # N.B. generally in the AR6 application total co2 co2_infill_db is empty
+    if not co2_infill_db.empty:
+        sanity_check_hierarchy(
+            co2_infill_db,
+            harmonized,
+            infilled,
+            out_afolu="Emissions|CO2|AFOLU",
+            out_fossil="Emissions|CO2|Energy and Industrial Processes",
         )
 
-        LOGGER.info("Writing infilled data as csv to: %s", out_file_infilled)
+    return infilled
+
+
+def write_harmonized_infilled(
+    infilled,
+    key_string,
+    outdir,
+    output_formats=DEFAULT_OUTPUT_FORMATS,
+    profiler=None,
+):
+    """
+    Write harmonized and infilled emissions
+
+    The data is written to ``{key_string}_harmonized_infilled.csv`` (without
+    meta) and in each of ``output_formats`` (with meta).
+
+    Parameters
+    ----------
+    infilled : :class:`pyam.IamDataFrame`
+        Harmonized and infilled emissions (see
+        :func:`run_harmonization_and_infilling`)
+
+    key_string : str
+        Identifier string for writing out results
+
+    outdir : str
+        Path to output folder.
+
+    output_formats : list[str]
+        Formats in which to write the data and meta, in addition to CSV (see
+        :data:`climate_assessment.output.OUTPUT_FORMATS`)
+
+    profiler : :class:`climate_assessment.profiling.Profiler`, None
+        If supplied, the time and memory used to write the output are recorded
+        with this profiler
+    """
+    if profiler is None:
+        profiler = Profiler(enabled=False)
+
+    #  write out combined results of harmonization and infilling
+    # write out csv file with all data (no meta)
+    out_file_infilled = os.path.join(outdir, f"{key_string}_harmonized_infilled.csv")
+
+    LOGGER.info("Writing infilled data as csv to: %s", out_file_infilled)
+    with profiler.stage("write_harmonized_infilled"):
         infilled.to_csv(out_file_infilled)
 
-        # write out excel file with all data as well as meta data
-        out_file_infilled_xlsx = out_file_infilled.replace(".csv", ".xlsx")
-        LOGGER.info("Writing infilled data as xlsx to: %s", out_file_infilled_xlsx)
-        infilled.to_excel(out_file_infilled_xlsx)
-
-        # Sanity check for a consistent hierarchy.
-        # Checks that Emissions|CO2 is the sum of AFOLU and Energy emissions
-        # N.B. generally in the AR6 application total co2 co2_infill_db is empty
-        if not co2_infill_db.empty:
-            sanity_check_hierarchy(
-                co2_infill_db,
-                harmonized,
-                infilled,
-                out_afolu="Emissions|CO2|AFOLU",
-                out_fossil="Emissions|CO2|Energy and Industrial Processes",
-            )
+        # write out all data as well as meta data in the requested formats
+        write_iamc(
+            infilled,
+            os.path.splitext(out_file_infilled)[0],
+            output_formats=output_formats,
+        )
+
+
+def harmonization_and_infilling(
+    df,
+    key_string,
+    infilling_database,
+    prefix="AR6 climate diagnostics",
+    instance="ar6",
+    outdir="output",
+    do_harmonization=True,
+    output_formats=DEFAULT_OUTPUT_FORMATS,
+    profiler=None,
+    harmonization_n_jobs=-1,
+    harmonization_backend="processes",
+    harmonization_chunk_size=None,
+    harmonizer="aneris",
+    infilling_n_jobs=1,
+    infilling_chunk_size=None,
+    compile_infilling_database=False,
+    # TODO: here is the downstream for potentially implementing gwp100 kyoto
+):
+    """
+    Arguments
+    ----------
+    input_df : :class:`pyam.IamDataFrame`
+        Input native emissions to harmonize and infill.
+
+    inputcheck : bool
+        Perform checks to remove unsuitable emissisons pathways. [Default: True]
+
+    key_string : str
+        Identifier string for writing out results. By default derived from
+        the input_emissions_file string in a CLI command.
+
+    outdir : str
+        Path to output folder.
+
+    infilling_database : str
+        Path to the infiller database emissions file.
+
+    harmonize : bool
+        Perform harmonization (with False, only infilling is run). [Default: True]
+
+    prefix : str
+        Prefix used to identify the new variable names of results
+        produced by the workflow.
+
+    harmonization_instance : str
+        Config string required by aneris.
+
+    output_formats : list[str]
+        Formats in which to write the harmonized and infilled data and meta, in
+        addition to CSV (see :data:`climate_assessment.output.OUTPUT_FORMATS`)
+
+    profiler : :class:`climate_assessment.profiling.Profiler`, None
+        If supplied, the time and memory used by harmonization, infilling and
+        writing the output are recorded with this profiler
+
+    harmonization_n_jobs : int
+        Number of workers used to harmonise scenarios
+
+    harmonization_backend : str
+        How to run the harmonisation tasks
+
+    harmonization_chunk_size : int, None
+        Number of scenarios harmonised in each task (see
+        :func:`run_harmonization_and_infilling`)
+
+    harmonizer : str
+        Implementation used to harmonise
+
+    infilling_n_jobs : int
+        Number of worker processes used to infill scenarios
+
+    infilling_chunk_size : int, None
+        Number of scenarios infilled in each task (see
+        :func:`run_harmonization_and_infilling`)
+
+    compile_infilling_database : bool
+        Compile the relationships used for infilling once and store them next
+        to the infilling database
+
+    Returns
+    -------
+    bool
+        Returns True if there are scenarios that can be run by a climate
+        emulator. Those scenarios are not returned by this function, but rather
+        written to the outdir (use :func:`run_harmonization_and_infilling` to
+        get them in memory instead). Returns False if there are no complete
+        scenarios to be run.
+    """
+    infilled = run_harmonization_and_infilling(
+        df,
+        infilling_database,
+        prefix=prefix,
+        instance=instance,
+        do_harmonization=do_harmonization,
+        profiler=profiler,
+        harmonization_n_jobs=harmonization_n_jobs,
+        harmonization_backend=harmonization_backend,
+        harmonization_chunk_size=harmonization_chunk_size,
+        harmonizer=harmonizer,
+        infilling_n_jobs=infilling_n_jobs,
+        infilling_chunk_size=infilling_chunk_size,
+        compile_infilling_database=compile_infilling_database,
+    )
+    if infilled is None:
+        return False
+
+    write_harmonized_infilled(
+        infilled,
+        key_string,
+        outdir,
+        output_formats=output_formats,
+        profiler=profiler,
+    )
 
-        return True
+    return True
@@ -0,0 +1,169 @@
+import logging
+import os.path
+import threading
+
+import pandas as pd
+
+LOGGER = logging.getLogger(__name__)
+
+HISTORY_FOLDER = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "harmonization"
+)
+"""str: Folder containing the historical emissions of each instance"""
+
+HISTORY_INDEX = ["model", "scenario", "region", "variable", "unit"]
+"""list[str]: Index levels of the historical emissions"""
+
+# order of the index levels of scmdata timeseries, used by harmonisation
+_HARMONIZATION_HISTORY_INDEX = sorted(HISTORY_INDEX)
+
+# historical data which has already been loaded in this process, keyed by
+# what was loaded and how it was normalised (re-entrant lock as loading can
+# use other entries)
+_HISTORY_REGISTRY = {}
+_HISTORY_REGISTRY_LOCK = threading.RLock()
+
+
+def get_history_file(instance):
+    """
+    Get the file containing the historical emissions of an instance
+
+    Parameters
+    ----------
+    instance : str
+        Instance (e.g. "ar6" or "sr15")
+
+    Returns
+    -------
+    str
+        Path to the file
+    """
+    return os.path.join(HISTORY_FOLDER, f"history_{instance}.csv")
+
+
+def _get_or_load(key, load):
+    with _HISTORY_REGISTRY_LOCK:
+        if key not in _HISTORY_REGISTRY:
+            LOGGER.debug("Loading %s into the history registry", key)
+            _HISTORY_REGISTRY[key] = load()
+
+        return _HISTORY_REGISTRY[key]
+
+
+def _load_history(instance):
+    out = pd.read_csv(get_history_file(instance))
+    out = out.rename(columns=str.lower).set_index(HISTORY_INDEX)
+    out.columns = out.columns.astype(int)
+
+    return out.astype(float)
+
+
+def get_history(instance):
+    """
+    Get the historical emissions of an instance
+
+    The file is only read the first time the history of an instance is
+    requested in a process.
+
+    Parameters
+    ----------
+    instance : str
+        Instance (e.g. "ar6" or "sr15")
+
+    Returns
+    -------
+    :class:`pandas.DataFrame`
+        Historical emissions (in wide format with integer year columns and
+        :data:`HISTORY_INDEX` as index). This is a copy so can be modified.
+    """
+    return _get_or_load(("raw", instance), lambda: _load_history(instance)).copy()
+
+
+def _load_harmonization_history(instance, prefix, years):
+    out = get_history(instance)
+    out = out.loc[:, out.columns.isin(years)]
+    variables = out.index.get_level_values("variable").str.replace(
+        f"{prefix}|", "", regex=False
+    )
+    units = out.index.get_level_values("unit").str.replace("-equiv", "")
+    out.index = pd.MultiIndex.from_arrays(
+        [
+            out.index.get_level_values("model"),
+            out.index.get_level_values("scenario"),
+            out.index.get_level_values("region"),
+            variables.str.replace("|Unharmonized", "", regex=False),
+            units.str.replace("-", ""),
+        ],
+        names=HISTORY_INDEX,
+    )
+
+    return out.reorder_levels(_HARMONIZATION_HISTORY_INDEX)
+
+
+def get_harmonization_history(instance, prefix, years=range(1990, 2020)):
+    """
+    Get the historical emissions of an instance, ready for harmonisation
+
+    The prefix and "|Unharmonized" suffix are removed from the variables and
+    "-equiv" and "-" are removed from the units, so they match the
+    (similarly normalised) scenarios. The result is only calculated the first
+    time it is requested in a process.
+
+    Parameters
+    ----------
+    instance : str
+        Instance (e.g. "ar6" or "sr15")
+
+    prefix : str
+        Prefix of the historical variables
+
+    years : list[int]
+        Years to keep
+
+    Returns
+    -------
+    :class:`pandas.DataFrame`
+        Historical emissions (in wide format with integer year columns). This
+        is a copy so can be modified.
+    """
+    years = tuple(years)
+
+    return _get_or_load(
+        ("harmonization", instance, prefix, years),
+        lambda: _load_harmonization_history(instance, prefix, years),
+    ).copy()
+
+
+def get_historical_values(instance, year):
+    """
+    Get the historical emissions of an instance in a single year
+
+    Parameters
+    ----------
+    instance : str
+        Instance (e.g. "ar6" or "sr15")
+
+    year : int
+        Year
+
+    Returns
+    -------
+    :class:`pandas.Series`
+        Historical emissions of each (full) variable name in ``year``
+    """
+    return _get_or_load(
+        ("values", instance, year),
+        lambda: get_history(instance)[year].droplevel(
+            [n for n in HISTORY_INDEX if n != "variable"]
+        ),
+    ).copy()
+
+
+def clear_history_registry():
+    """
+    Forget all the historical data which has been loaded in this process
+
+    Useful if the history files have been changed.
+    """
+    with _HISTORY_REGISTRY_LOCK:
+        _HISTORY_REGISTRY.clear()
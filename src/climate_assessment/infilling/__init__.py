@@ -1,25 +1,54 @@
 import logging
 import os.path
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
+import joblib
 import pandas as pd
-import pandas.testing as pdt
 import pyam
 import scmdata
 import silicone.database_crunchers
 from silicone.multiple_infillers import infill_all_required_variables
 
-from ..checks import check_negatives
-from ..utils import _diff_variables, convert_co2_equiv_to_kt_gas, split_df
+from ..checks import get_nonco2_negatives
+from ..utils import (
+    _diff_variables,
+    convert_co2_equiv_to_kt_gas,
+    get_chunk_size,
+    split_df,
+)
+from .quantile_tables import (
+    PrecompiledQuantileRollingWindows,
+    get_quantile_rolling_windows_tables,
+)
+from .rms_closest import IndexedRMSClosest, RMSClosestIndex
 
 LOGGER = logging.getLogger(__name__)
 
+# infilling databases and settings shared by all the infilling tasks of a
+# worker, set once per worker by _init_infilling_worker so they aren't sent
+# with every task
+_WORKER_CONTEXT = {}
+
 
 def run_infilling(
-    harmonised_df, prefix, database_filepath=None, start_year=2015, end_year=2100
+    harmonised_df,
+    prefix,
+    database_filepath=None,
+    start_year=2015,
+    end_year=2100,
+    n_jobs=1,
+    chunk_size=None,
+    compile_database=False,
 ):
     """
     Run infilling
 
+    Given the infilling databases, each scenario is infilled independently.
+    Hence, if more than one worker is used, the scenarios are split into
+    chunks which are infilled in parallel, in separate processes. The
+    (interpolated) infilling databases are sent to each worker once, when it
+    starts, rather than with every chunk.
+
     Parameters
     ----------
     harmonised_df : :class:`pyam.IamDataFrame`
@@ -37,6 +66,21 @@ def run_infilling(
     end_ear : int
         Last year which should be reported in output
 
+    n_jobs : int
+        Number of worker processes used to infill scenarios. As for joblib,
+        negative values count back from the number of CPUs, e.g. -1 means all
+        CPUs. With 1, everything is infilled in the current process.
+
+    chunk_size : int, None
+        Number of scenarios infilled in each task (see
+        :func:`climate_assessment.utils.get_chunk_size`)
+
+    compile_database : bool
+        If ``True``, the relationships used by the ``QuantileRollingWindows``
+        cruncher are compiled once per infilling database and stored next to
+        it, so later runs only have to look them up (see
+        :mod:`climate_assessment.infilling.quantile_tables`)
+
     Returns
     -------
     :class:`pyam.IamDataFrame`
@@ -202,6 +246,111 @@ def run_infilling(
         database_cfcs.filter(year=output_timesteps).timeseries(time_axis="year")
     ).interpolate(output_timesteps, inplace=False)
 
+    qrw_tables = None
+    if compile_database:
+        qrw_tables = get_quantile_rolling_windows_tables(
+            database,
+            database_filepath,
+            leaders=[lead[0] for lead in leader_lists],
+            followers=[
+                *qrw_variables_list,
+                "Emissions|CO2|Energy and Industrial Processes",
+            ],
+        )
+
+    # the closest pathways are searched in the databases as the crunchers
+    # see them, i.e. only in the output timesteps
+    rms_closest_index = RMSClosestIndex(database.filter(year=output_timesteps))
+    rms_closest_index_cfcs = RMSClosestIndex(
+        database_cfcs.filter(year=output_timesteps)
+    )
+
+    settings = {
+        "harmonized_prefix": harmonized_prefix,
+        "qrw_tables": qrw_tables,
+        "rms_closest_index": rms_closest_index,
+        "rms_closest_index_cfcs": rms_closest_index_cfcs,
+        "output_timesteps": output_timesteps,
+        "leader_lists": leader_lists,
+        "types_of_cruncher": types_of_cruncher,
+        "qrw_variables_list": qrw_variables_list,
+        "fgas_cfc_cruncher": fgas_cfc_cruncher,
+        "fgas_cfc_variables_list": fgas_cfc_variables_list,
+        "cfcs_and_other_variables_cruncher": cfcs_and_other_variables_cruncher,
+        "cfcs_and_other_variables_list": cfcs_and_other_variables_list,
+    }
+    infilled = _infill_scenarios_in_chunks(
+        harmonised_df,
+        database,
+        database_cfcs,
+        settings,
+        n_jobs=n_jobs,
+        chunk_size=chunk_size,
+    )
+
+    if infilled is None:
+        raise ValueError("No infilling occured. Check input emissions")
+
+    LOGGER.info("Converting HFC/PFC units back from CO2-equivalent")
+    if convert_hfc_units:
+        infilled = convert_co2_equiv_to_kt_gas(infilled, "*|HFC|*")
+    if convert_pfc_units:
+        infilled = convert_co2_equiv_to_kt_gas(infilled, "*|PFC|*")
+
+    # We want to ensure that the original data is preserved as it was entered and that a
+    # complete copy of the completed data is tagged as such.
+    if infilled_data_prefix:
+        infilled = infilled.data
+        infilled["variable"] = infilled_data_prefix + "|" + infilled["variable"]
+        infilled = pyam.IamDataFrame(infilled)
+
+    # We also want a clone of the original preserved data, unless nothing changed
+    if not pyam.compare(infilled, to_fill_orig).empty:
+        infilled = infilled.append(to_fill_orig)
+    else:
+        LOGGER.warning(
+            "The data was already complete and in the correct format. It has not changed"
+        )
+
+    out = infilled.filter(
+        variable="*Kyoto*", keep=False
+    )  # ad-hoc fix to ensure no Kytoto GWP100 coming in the infilling process
+
+    # remove any infilled CO2 total but return so we can use it in the tests (
+    # this is a hack which should be removed in future but is important now
+    # while our functions are still pretty big)
+    co2_total = out.filter(variable="*Infilled*Emissions|CO2")
+    # Get "Emissions|CO2" of the infiller database of the used models, scenarios and regions
+    co2_infiller_db = database.filter(
+        variable="Emissions|CO2",
+        model=list(set(out["model"])),
+        scenario=list(set(out["scenario"])),
+        region=list(set(out["region"])),
+    )
+    out = out.filter(variable="*Infilled*Emissions|CO2", keep=False)
+
+    return out, co2_infiller_db, co2_total
+
+
+def _infill_scenarios(
+    harmonised_df,
+    database,
+    database_cfcs,
+    harmonized_prefix,
+    output_timesteps,
+    leader_lists,
+    types_of_cruncher,
+    qrw_variables_list,
+    fgas_cfc_cruncher,
+    fgas_cfc_variables_list,
+    cfcs_and_other_variables_cruncher,
+    cfcs_and_other_variables_list,
+    qrw_tables=None,
+    rms_closest_index=None,
+    rms_closest_index_cfcs=None,
+):
+    # infill the scenarios in ``harmonised_df`` (the settings are described in
+    # run_infilling), returns ``None`` if nothing was infilled
     # Handle CO2 reporting
     # ____________________
     co2_total = "Emissions|CO2"
@@ -267,6 +416,8 @@ def run_infilling(
                     lead,
                     output_timesteps,
                     old_prefix=harmonized_prefix,
+                    qrw_tables=qrw_tables,
+                    rms_closest_index=rms_closest_index,
                 )
 
                 # calculate CO2 AFOLU as difference between energy and total
@@ -281,13 +432,14 @@ def run_infilling(
                 infilled = _add_to_infilled(infilled, infilled_energy)
                 infilled = _add_to_infilled(infilled, afolu_inferred)
 
-        for cruncherh, variables, database_here in (
-            (types_of_cruncher[ind], qrw_variables_list, database),
-            (fgas_cfc_cruncher, fgas_cfc_variables_list, database),
+        for cruncherh, variables, database_here, index_here in (
+            (types_of_cruncher[ind], qrw_variables_list, database, rms_closest_index),
+            (fgas_cfc_cruncher, fgas_cfc_variables_list, database, rms_closest_index),
             (
                 cfcs_and_other_variables_cruncher,
                 cfcs_and_other_variables_list,
                 database_cfcs,
+                rms_closest_index_cfcs,
             ),
         ):
             infilled_variables = _infill_variables(
@@ -298,55 +450,79 @@ def run_infilling(
                 lead,
                 output_timesteps,
                 old_prefix=harmonized_prefix,
+                qrw_tables=qrw_tables,
+                rms_closest_index=index_here,
             )
             infilled = _add_to_infilled(infilled, infilled_variables)
 
-    if infilled is None:
-        raise ValueError("No infilling occured. Check input emissions")
+    return infilled
 
-    LOGGER.info("Converting HFC/PFC units back from CO2-equivalent")
-    if convert_hfc_units:
-        infilled = convert_co2_equiv_to_kt_gas(infilled, "*|HFC|*")
-    if convert_pfc_units:
-        infilled = convert_co2_equiv_to_kt_gas(infilled, "*|PFC|*")
 
-    # We want to ensure that the original data is preserved as it was entered and that a
-    # complete copy of the completed data is tagged as such.
-    if infilled_data_prefix:
-        infilled = infilled.data
-        infilled["variable"] = infilled_data_prefix + "|" + infilled["variable"]
-        infilled = pyam.IamDataFrame(infilled)
+def _init_infilling_worker(database, database_cfcs, settings):
+    _WORKER_CONTEXT["database"] = database
+    _WORKER_CONTEXT["database_cfcs"] = database_cfcs
+    _WORKER_CONTEXT["settings"] = settings
 
-    # We also want a clone of the original preserved data, unless nothing changed
-    if not pyam.compare(infilled, to_fill_orig).empty:
-        infilled = infilled.append(to_fill_orig)
-    else:
-        LOGGER.warning(
-            "The data was already complete and in the correct format. It has not changed"
-        )
 
-    out = infilled.filter(
-        variable="*Kyoto*", keep=False
-    )  # ad-hoc fix to ensure no Kytoto GWP100 coming in the infilling process
+def _infill_chunk(chunk):
+    return _infill_scenarios(
+        chunk,
+        _WORKER_CONTEXT["database"],
+        _WORKER_CONTEXT["database_cfcs"],
+        **_WORKER_CONTEXT["settings"],
+    )
 
-    # remove any infilled CO2 total but return so we can use it in the tests (
-    # this is a hack which should be removed in future but is important now
-    # while our functions are still pretty big)
-    co2_total = out.filter(variable="*Infilled*Emissions|CO2")
-    # Get "Emissions|CO2" of the infiller database of the used models, scenarios and regions
-    co2_infiller_db = database.filter(
-        variable="Emissions|CO2",
-        model=list(set(out["model"])),
-        scenario=list(set(out["scenario"])),
-        region=list(set(out["region"])),
+
+def _infill_scenarios_in_chunks(
+    harmonised_df, database, database_cfcs, settings, n_jobs=1, chunk_size=None
+):
+    n_workers = joblib.effective_n_jobs(n_jobs)
+    scenarios = harmonised_df.index
+    chunk_size = get_chunk_size(len(scenarios), n_workers, chunk_size=chunk_size)
+    if n_workers == 1 or chunk_size >= len(scenarios):
+        return _infill_scenarios(harmonised_df, database, database_cfcs, **settings)
+
+    chunks = [
+        harmonised_df.filter(index=scenarios[i : i + chunk_size])
+        for i in range(0, len(scenarios), chunk_size)
+    ]
+    LOGGER.info(
+        "Infilling %s scenarios in %s chunks with %s worker(s)",
+        len(scenarios),
+        len(chunks),
+        n_workers,
     )
-    out = out.filter(variable="*Infilled*Emissions|CO2", keep=False)
 
-    return out, co2_infiller_db, co2_total
+    results = [None] * len(chunks)
+    with ProcessPoolExecutor(
+        max_workers=n_workers,
+        initializer=_init_infilling_worker,
+        initargs=(database, database_cfcs, settings),
+    ) as executor:
+        futures = {
+            executor.submit(_infill_chunk, chunk): i for i, chunk in enumerate(chunks)
+        }
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+
+    # merge the infilled chunks in the order of the scenarios
+    results = [r for r in results if r is not None]
+    if not results:
+        return None
+
+    return pyam.concat(results)
 
 
 def _infill_variables(
-    cruncher, variables, to_infill, db, lead, output_timesteps, old_prefix
+    cruncher,
+    variables,
+    to_infill,
+    db,
+    lead,
+    output_timesteps,
+    old_prefix,
+    qrw_tables=None,
+    rms_closest_index=None,
 ):
     """
     Start core infilling run, using silicone.multiple_infillers.infill_all_required_variables
@@ -375,6 +551,14 @@ def _infill_variables(
         The prefix of harmonized emissions, which will be replaced by a prefix
         for the infilled emissions variables.
 
+    qrw_tables : :class:`.quantile_tables.QuantileRollingWindowsTables`, None
+        Precompiled relationships to use instead of deriving them again if
+        ``cruncher`` is ``QuantileRollingWindows``
+
+    rms_closest_index : :class:`.rms_closest.RMSClosestIndex`, None
+        Index of ``db`` in which to search for the closest pathways if
+        ``cruncher`` is ``RMSClosest``
+
     Returns
     -------
     :class:`pyam.IamDataFrame`
@@ -382,6 +566,22 @@ def _infill_variables(
     """
     LOGGER.info("Infilling using cruncher %s", cruncher)
     LOGGER.info("Infilling %s", variables)
+    cruncher_kwargs = {}
+    if (
+        qrw_tables is not None
+        and cruncher is silicone.database_crunchers.QuantileRollingWindows
+    ):
+        LOGGER.info("Using precompiled QuantileRollingWindows relationships")
+        cruncher = PrecompiledQuantileRollingWindows
+        cruncher_kwargs["tables"] = qrw_tables
+
+    if (
+        rms_closest_index is not None
+        and cruncher is silicone.database_crunchers.RMSClosest
+    ):
+        cruncher = IndexedRMSClosest
+        cruncher_kwargs["index"] = rms_closest_index
+
     infilled_variables = infill_all_required_variables(
         to_infill.copy(),
         db,
@@ -391,6 +591,7 @@ def _infill_variables(
         output_timesteps=output_timesteps,
         to_fill_old_prefix=old_prefix,
         check_data_returned=True,
+        **cruncher_kwargs,
     )
     del infilled_variables.meta["already_filled"]
 
@@ -520,26 +721,37 @@ def postprocess_infilled_for_climate(df_infilled, prefix, start_year=2015):
     # mark the scenarios that are not sufficiently infilled for climate assessment, and filter scenarios
     required_years = list(range(start_year, 2100 + 1))
     LOGGER.info("Checking infilled results have required years and variables")
-    for (model, scenario), msdf in (
-        df_infilled.filter(year=required_years)
-        .timeseries()
+    # a scenario is complete if it reports all the required years of all the
+    # required variables
+    timeseries = df_infilled.timeseries().reindex(columns=required_years)
+    complete_timeseries = timeseries.index[
+        timeseries.notna().all(axis=1)
+        & timeseries.index.get_level_values("variable").isin(required_vars)
+    ]
+    complete_variables = (
+        complete_timeseries.to_frame(index=False)
+        .drop_duplicates(["model", "scenario", "variable"])
         .groupby(["model", "scenario"])
-    ):
-        has_all_years = set(msdf.columns) == set(required_years)
-        has_all_variables = not required_vars - set(
-            msdf.index.get_level_values("variable")
+        .size()
+    )
+    scenarios = df_infilled.index
+    incomplete = scenarios[
+        ~scenarios.isin(
+            complete_variables.index[complete_variables == len(required_vars)]
         )
-        if not (has_all_years and has_all_variables):
+    ]
+    if not incomplete.empty:
+        for model, scenario in incomplete:
             LOGGER.info("Removing %s %s", model, scenario)
-            df_infilled = df_infilled.filter(model=model, scenario=scenario, keep=False)
+
+        df_infilled = df_infilled.filter(index=incomplete, keep=False)
 
     # in case non-CO2 negatives have been introduced here, we want to know!
     LOGGER.info("Check that there are no non-CO2 negatives introduced by infilling")
-    df_infilled_negatives_checked = check_negatives(df_infilled, prefix=f"{prefix}*")
-    pdt.assert_frame_equal(
-        df_infilled.timeseries().T,
-        df_infilled_negatives_checked.timeseries().T,
-        check_like=True,
-    )
+    nonco2_negatives = get_nonco2_negatives(df_infilled, prefix=f"{prefix}*")
+    if not nonco2_negatives.empty:
+        raise AssertionError(
+            f"Non-CO2 negatives introduced by infilling:\n{nonco2_negatives}"
+        )
 
     return df_infilled
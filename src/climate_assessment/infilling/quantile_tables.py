@@ -0,0 +1,469 @@
+import hashlib
+import json
+import logging
+import os
+import os.path
+
+import numpy as np
+import pyam
+import scipy.interpolate
+from silicone.database_crunchers import QuantileRollingWindows
+from silicone.stats import rolling_window_find_quantiles
+
+from .. import __version__
+from ..climate.checkpoint import _hash_file
+
+LOGGER = logging.getLogger(__name__)
+
+# settings of silicone's QuantileRollingWindows cruncher used by run_infilling
+DEFAULT_QRW_SETTINGS = {"quantile": 0.5, "nwindows": 11, "decay_length_factor": 1}
+
+
+def _get_variable_timeseries(ts, variable):
+    # timeseries of ``variable`` in the database, indexed by everything but
+    # the variable and unit (summed like silicone's pivot table)
+    out = ts[ts.index.get_level_values("variable") == variable]
+    groups = [n for n in ts.index.names if n not in ("variable", "unit")]
+
+    return out.groupby(level=groups).sum(min_count=1)
+
+
+def _compile_year(xs, ys, quantile, nwindows, decay_length_factor):
+    # window centres and quantiles in a single year, as calculated by
+    # QuantileRollingWindows.derive_relationship
+    if np.equal(max(xs), min(xs)):
+        # all the points are at the same x value so the relationship is a
+        # constant
+        ys = np.sort(ys)
+        if np.equal(min(ys), max(ys)):
+            return np.array([xs[0]]), np.array([ys[0]])
+
+        cumsum_weights = np.array([(0.5 + x) / len(ys) for x in range(len(ys))])
+        value = scipy.interpolate.interp1d(
+            cumsum_weights,
+            ys,
+            bounds_error=False,
+            fill_value=(ys[0], ys[-1]),
+            assume_sorted=True,
+        )(quantile)
+
+        return np.array([xs[0]]), np.array([value])
+
+    table = rolling_window_find_quantiles(
+        xs, ys, quantile, nwindows, decay_length_factor
+    )
+
+    return (
+        table.index.to_numpy(dtype=float),
+        table.loc[:, quantile].to_numpy(dtype=float).squeeze(),
+    )
+
+
+def _pad(arrays):
+    # pad with the last value, which doesn't change linear interpolation
+    width = max(len(a) for a in arrays)
+
+    return np.array([np.pad(a, (0, width - len(a)), mode="edge") for a in arrays])
+
+
+class QuantileRollingWindowsTables:
+    """
+    Precompiled relationships of silicone's ``QuantileRollingWindows`` cruncher
+
+    ``QuantileRollingWindows`` derives the relationship between a lead and a
+    follower variable from the infilling database every time it is used. The
+    relationship only depends on the database though, so it can be compiled
+    once: for every pair of variables and every year, the quantile of the
+    follower at each of the window centres of the lead. Infilling is then a
+    linear interpolation in these tables, for all scenarios at once.
+
+    Use :meth:`compile` to compile the tables from a database and
+    :meth:`save` and :meth:`load` to store them (see also
+    :func:`get_quantile_rolling_windows_tables`).
+    """
+
+    def __init__(self, relationships, settings):
+        """
+        Initialise
+
+        Parameters
+        ----------
+        relationships : dict
+            Relationship of each (lead, follower) pair of variables, with keys
+            "years", "xs" and "ys" (window centres and follower values in
+            each year, one row per year) and "lead_unit" and "follower_unit"
+
+        settings : dict
+            Settings of ``QuantileRollingWindows`` with which the tables were
+            compiled
+        """
+        self.relationships = relationships
+        self.settings = settings
+
+    @classmethod
+    def compile(cls, database, leaders, followers, **settings):
+        """
+        Compile the relationships between variables in a database
+
+        Parameters
+        ----------
+        database : :class:`pyam.IamDataFrame`
+            Infilling database
+
+        leaders : list[str]
+            Lead variables
+
+        followers : list[str]
+            Follower variables. Variables which aren't in ``database`` are
+            skipped.
+
+        **settings
+            Settings of ``QuantileRollingWindows.derive_relationship``
+            (``quantile``, ``nwindows`` and ``decay_length_factor``, see
+            :data:`DEFAULT_QRW_SETTINGS` for the defaults)
+
+        Returns
+        -------
+        :class:`QuantileRollingWindowsTables`
+            Compiled tables
+        """
+        settings = {**DEFAULT_QRW_SETTINGS, **settings}
+        ts = database.timeseries()
+        units = (
+            ts.index.to_frame(index=False)
+            .drop_duplicates("variable")
+            .set_index("variable")["unit"]
+        )
+
+        relationships = {}
+        for lead in leaders:
+            if lead not in units:
+                continue
+
+            lead_ts = _get_variable_timeseries(ts, lead)
+            for follower in followers:
+                if follower not in units or follower == lead:
+                    continue
+
+                xs, ys = lead_ts.align(
+                    _get_variable_timeseries(ts, follower), join="inner"
+                )
+                years, window_xs, window_ys = [], [], []
+                for year in xs.columns:
+                    reported = xs[year].notnull() & ys[year].notnull()
+                    if not reported.any():
+                        continue
+
+                    wx, wy = _compile_year(
+                        xs.loc[reported, year].to_numpy(dtype=float),
+                        ys.loc[reported, year].to_numpy(dtype=float),
+                        **settings,
+                    )
+                    years.append(year)
+                    window_xs.append(wx)
+                    window_ys.append(wy)
+
+                if not years:
+                    continue
+
+                relationships[(lead, follower)] = {
+                    "years": np.array(years),
+                    "xs": _pad(window_xs),
+                    "ys": _pad(window_ys),
+                    "lead_unit": units[lead],
+                    "follower_unit": units[follower],
+                }
+
+        return cls(relationships, settings)
+
+    def save(self, path):
+        """
+        Save the tables
+
+        The tables are stored as arrays in a (compressed) ``.npz`` file, which
+        can be loaded without unpickling anything.
+
+        Parameters
+        ----------
+        path : str
+            File in which to save the tables
+        """
+        arrays = {}
+        metadata = {"settings": self.settings, "relationships": []}
+        for i, ((lead, follower), rel) in enumerate(self.relationships.items()):
+            metadata["relationships"].append(
+                {
+                    "lead": lead,
+                    "follower": follower,
+                    "lead_unit": rel["lead_unit"],
+                    "follower_unit": rel["follower_unit"],
+                }
+            )
+            for name in ("years", "xs", "ys"):
+                arrays[f"{name}_{i}"] = rel[name]
+
+        arrays["metadata"] = np.array(json.dumps(metadata))
+        with open(path, "wb") as fh:
+            np.savez_compressed(fh, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load tables saved with :meth:`save`
+
+        Parameters
+        ----------
+        path : str
+            File in which the tables were saved
+
+        Returns
+        -------
+        :class:`QuantileRollingWindowsTables`
+            Loaded tables
+        """
+        with np.load(path, allow_pickle=False) as arrays:
+            metadata = json.loads(str(arrays["metadata"]))
+            relationships = {
+                (rel["lead"], rel["follower"]): {
+                    "years": arrays[f"years_{i}"],
+                    "xs": arrays[f"xs_{i}"],
+                    "ys": arrays[f"ys_{i}"],
+                    "lead_unit": rel["lead_unit"],
+                    "follower_unit": rel["follower_unit"],
+                }
+                for i, rel in enumerate(metadata["relationships"])
+            }
+
+        return cls(relationships, metadata["settings"])
+
+    def has_relationship(self, follower, leaders, **settings):
+        """
+        Check whether a relationship has been compiled
+
+        Parameters
+        ----------
+        follower : str
+            Follower variable
+
+        leaders : list[str]
+            Lead variables (only one lead variable is supported)
+
+        **settings
+            Settings of ``QuantileRollingWindows.derive_relationship``
+
+        Returns
+        -------
+        bool
+            ``True`` if the relationship of ``follower`` to ``leaders`` with
+            ``settings`` has been compiled
+        """
+        return (
+            len(leaders) == 1
+            and (leaders[0], follower) in self.relationships
+            and {**DEFAULT_QRW_SETTINGS, **settings} == self.settings
+        )
+
+    def get_filler(self, follower, leaders):
+        """
+        Get a function which infills a variable with a compiled relationship
+
+        The function behaves like the one returned by
+        ``QuantileRollingWindows.derive_relationship``.
+
+        Parameters
+        ----------
+        follower : str
+            Follower variable
+
+        leaders : list[str]
+            Lead variables (only one lead variable is supported)
+
+        Returns
+        -------
+        func
+            Function which takes a :class:`pyam.IamDataFrame` containing the
+            lead timeseries and returns the infilled timeseries of
+            ``follower``
+        """
+        rel = self.relationships[(leaders[0], follower)]
+        year_index = {year: i for i, year in enumerate(rel["years"])}
+
+        def filler(in_iamdf):
+            if in_iamdf.time_col != "year":
+                raise ValueError(
+                    "`in_iamdf` time column must be the same as the time column "
+                    "used to generate this filler function (`year`)"
+                )
+
+            lead_ts = in_iamdf.filter(variable=leaders).timeseries()
+            if lead_ts.empty:
+                raise ValueError(
+                    f"There is no data for {leaders} so it cannot be infilled"
+                )
+
+            lead_unit = lead_ts.index.get_level_values("unit")[0]
+            if lead_unit != rel["lead_unit"]:
+                raise ValueError(
+                    f"Units of lead variable is meant to be `{rel['lead_unit']}`, "
+                    f"found `{lead_unit}`"
+                )
+
+            if not all(year in year_index for year in in_iamdf.timeseries()):
+                raise ValueError(
+                    "Not all required timepoints are present in the database we "
+                    f"crunched, we crunched \n\t`{list(year_index)}`\nbut you "
+                    f"passed in \n\t{in_iamdf.timeseries().columns.tolist()}"
+                )
+
+            values = lead_ts.to_numpy(dtype=float)
+            infilled = np.empty_like(values)
+            for j, year in enumerate(lead_ts.columns):
+                i = year_index[year]
+                infilled[:, j] = np.interp(values[:, j], rel["xs"][i], rel["ys"][i])
+
+            out = lead_ts.copy()
+            out.iloc[:, :] = infilled
+            out = out.reset_index()
+            out["variable"] = follower
+            out["unit"] = rel["follower_unit"]
+
+            return pyam.IamDataFrame(out)
+
+        return filler
+
+
+class PrecompiledQuantileRollingWindows(QuantileRollingWindows):
+    """
+    ``QuantileRollingWindows`` cruncher which uses precompiled relationships
+
+    Relationships which are in the ``tables`` passed to
+    :meth:`derive_relationship` are looked up rather than derived from the
+    database again. Any others are derived as by ``QuantileRollingWindows``.
+    """
+
+    def __init__(self, db):
+        # the database is only used for relationships which haven't been
+        # compiled, which don't modify it, so there is no need to copy it
+        self._db = db
+
+    def derive_relationship(
+        self, variable_follower, variable_leaders, tables=None, **kwargs
+    ):
+        """
+        Derive the relationship between two variables
+
+        Parameters
+        ----------
+        variable_follower : str
+            Follower variable
+
+        variable_leaders : list[str]
+            Lead variables
+
+        tables : :class:`QuantileRollingWindowsTables`, None
+            Precompiled relationships
+
+        **kwargs
+            Passed to ``QuantileRollingWindows.derive_relationship``
+
+        Returns
+        -------
+        func
+            Function which infills ``variable_follower``
+        """
+        if tables is not None and tables.has_relationship(
+            variable_follower, variable_leaders, **kwargs
+        ):
+            self._check_follower_and_leader_in_db(variable_follower, variable_leaders)
+
+            return tables.get_filler(variable_follower, variable_leaders)
+
+        return super().derive_relationship(
+            variable_follower, variable_leaders, **kwargs
+        )
+
+
+def _get_tables_key(database_filepath, leaders, followers, years, settings):
+    key = {
+        "database": _hash_file(database_filepath),
+        "leaders": sorted(leaders),
+        "followers": sorted(followers),
+        "years": [int(y) for y in years],
+        "settings": {**DEFAULT_QRW_SETTINGS, **settings},
+        "climate_assessment_version": __version__,
+    }
+
+    return hashlib.sha256(
+        json.dumps(key, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+def get_quantile_rolling_windows_tables(
+    database, database_filepath, leaders, followers, **settings
+):
+    """
+    Get the compiled relationships of an infilling database
+
+    The tables are stored next to ``database_filepath``, keyed by a hash of
+    the content of the file, the variables, the years in ``database``,
+    ``settings`` and the version of ``climate-assessment``. They are only
+    compiled if they haven't been stored yet (or can't be read). If they can't
+    be stored (e.g. because the folder is read-only), a warning is logged.
+
+    Parameters
+    ----------
+    database : :class:`pyam.IamDataFrame`
+        Infilling database, as prepared for infilling from
+        ``database_filepath``
+
+    database_filepath : str
+        File from which ``database`` was loaded
+
+    leaders : list[str]
+        Lead variables
+
+    followers : list[str]
+        Follower variables
+
+    **settings
+        Settings of ``QuantileRollingWindows.derive_relationship`` (see
+        :meth:`QuantileRollingWindowsTables.compile`)
+
+    Returns
+    -------
+    :class:`QuantileRollingWindowsTables`
+        Compiled tables
+    """
+    key = _get_tables_key(
+        database_filepath, leaders, followers, database.year, settings
+    )
+    tables_file = f"{os.path.splitext(database_filepath)[0]}_qrw-tables_{key[:16]}.npz"
+    try:
+        tables = QuantileRollingWindowsTables.load(tables_file)
+        LOGGER.info("Loaded QuantileRollingWindows tables from %s", tables_file)
+
+        return tables
+
+    except FileNotFoundError:
+        pass
+
+    except (OSError, ValueError, KeyError):
+        LOGGER.warning("Could not read %s, compiling the tables again", tables_file)
+
+    LOGGER.info("Compiling QuantileRollingWindows tables")
+    tables = QuantileRollingWindowsTables.compile(
+        database, leaders, followers, **settings
+    )
+
+    # many jobs may share the database so only ever replace complete files
+    tmp_file = f"{tables_file}.{os.getpid()}.tmp"
+    try:
+        tables.save(tmp_file)
+        os.replace(tmp_file, tables_file)
+        LOGGER.info("Saved QuantileRollingWindows tables in %s", tables_file)
+    except OSError as exc:
+        LOGGER.warning(
+            "Could not save QuantileRollingWindows tables in %s: %s", tables_file, exc
+        )
+
+    return tables
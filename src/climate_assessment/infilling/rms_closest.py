@@ -0,0 +1,311 @@
+import numpy as np
+import pandas as pd
+import pyam
+from silicone.database_crunchers import RMSClosest
+
+from .quantile_tables import _get_variable_timeseries
+
+# number of scenarios whose distances to all pathways are calculated at once,
+# which bounds the memory needed for the differences
+_DISTANCE_CHUNK_SIZE = 64
+
+
+class RMSClosestIndex:
+    """
+    Nearest-pathway index of an infilling database for ``RMSClosest``
+
+    silicone's ``RMSClosest`` cruncher searches the whole database for the
+    pathway closest to each scenario, separately for every follower variable,
+    although the search only depends on the lead variables. The index holds
+    the lead trajectories of the database as arrays and caches the distance of
+    every scenario to every pathway, so the search is done once per scenario
+    and only repeated for the pathways which report each follower.
+
+    The index is built once per database and can be passed to
+    :meth:`IndexedRMSClosest.derive_relationship` as often as needed. The
+    closest pathways are the same as those ``RMSClosest`` finds.
+    """
+
+    def __init__(self, database):
+        """
+        Initialise
+
+        Parameters
+        ----------
+        database : :class:`pyam.IamDataFrame`
+            Infilling database, as passed to the cruncher
+        """
+        self._ts = database.timeseries()
+        self.variables = set(self._ts.index.get_level_values("variable"))
+        self.years = self._ts.columns.to_numpy()
+        self._year_positions = {year: i for i, year in enumerate(self.years)}
+        self._units = (
+            self._ts.index.to_frame(index=False)
+            .drop_duplicates("variable")
+            .set_index("variable")["unit"]
+        )
+        self._leads = {}
+        self._followers = {}
+        self._distances = {}
+
+    def _get_leads(self, leaders):
+        key = tuple(leaders)
+        if key not in self._leads:
+            leads = [_get_variable_timeseries(self._ts, var) for var in leaders]
+            candidates = leads[0].index
+            for lead in leads[1:]:
+                candidates = candidates.union(lead.index)
+
+            # order the pathways like RMSClosest does (by scenario, then
+            # model), so ties are resolved the same way
+            order = ["scenario", "model"]
+            order += [n for n in candidates.names if n not in order]
+            candidates = (
+                candidates.reorder_levels(order)
+                .sort_values()
+                .reorder_levels(candidates.names)
+            )
+
+            self._leads[key] = (
+                candidates,
+                np.stack(
+                    [lead.reindex(candidates).to_numpy(dtype=float) for lead in leads]
+                ),
+            )
+
+        return self._leads[key]
+
+    def _get_follower(self, follower, leaders):
+        key = (follower, tuple(leaders))
+        if key not in self._followers:
+            candidates, lead_values = self._get_leads(leaders)
+            follower_values = (
+                _get_variable_timeseries(self._ts, follower)
+                .reindex(candidates)
+                .to_numpy(dtype=float)
+            )
+            # pathways and years which RMSClosest considers for this follower
+            reported = np.isfinite(lead_values).all(axis=0) & np.isfinite(
+                follower_values
+            )
+            self._followers[key] = (follower_values, reported)
+
+        return self._followers[key]
+
+    def _get_distances(self, leaders, weights, years, targets):
+        # weighted RMS distance of each target (rows of ``targets``, an array
+        # of shape (leaders, targets, years)) to every pathway in ``years``
+        _, lead_values = self._get_leads(leaders)
+        lead_values = lead_values[:, :, [self._year_positions[y] for y in years]]
+
+        key = (tuple(leaders), tuple(weights), tuple(years))
+        cache = self._distances.setdefault(key, {})
+        target_keys = [targets[:, i, :].tobytes() for i in range(targets.shape[1])]
+        missing = [
+            i for i, target_key in enumerate(target_keys) if target_key not in cache
+        ]
+        for start in range(0, len(missing), _DISTANCE_CHUNK_SIZE):
+            chunk = missing[start : start + _DISTANCE_CHUNK_SIZE]
+            squared = (lead_values[:, np.newaxis] - targets[:, chunk, np.newaxis]) ** 2
+            # years which a scenario doesn't report are skipped, like the
+            # mean in RMSClosest does
+            with np.errstate(invalid="ignore", divide="ignore"):
+                rms = (
+                    np.nansum(squared, axis=-1) / np.isfinite(squared).sum(axis=-1)
+                ) ** 0.5
+
+            distances = 0
+            for weight, rms_lead in zip(weights, rms):
+                distances = distances + rms_lead * weight
+
+            for i, distance in zip(chunk, distances):
+                cache[target_keys[i]] = distance
+
+        return np.stack([cache[target_key] for target_key in target_keys])
+
+    def get_filler(self, follower, leaders, weighting=None):
+        """
+        Get a function which infills a variable from the closest pathways
+
+        The function behaves like the one returned by
+        ``RMSClosest.derive_relationship``.
+
+        Parameters
+        ----------
+        follower : str
+            Follower variable
+
+        leaders : list[str]
+            Lead variables
+
+        weighting : dict[str: float]
+            Weight of each lead variable in the distance (all 1 if not given)
+
+        Returns
+        -------
+        func
+            Function which takes a :class:`pyam.IamDataFrame` containing the
+            lead timeseries and returns the timeseries of ``follower`` of the
+            closest pathways
+
+        Raises
+        ------
+        ValueError
+            ``weighting`` does not include all lead variables or no pathway
+            reports both the lead variables and ``follower``
+        """
+        leaders = list(leaders)
+        if not weighting:
+            weighting = {var: 1 for var in leaders}
+
+        if any(var not in weighting for var in leaders):
+            raise ValueError("Weighting does not include all lead variables.")
+
+        weights = [weighting[var] for var in leaders]
+        candidates, _ = self._get_leads(leaders)
+        follower_values, reported = self._get_follower(follower, leaders)
+        if not reported.any():
+            raise ValueError(
+                "No model/scenario overlap between leader and follower data"
+            )
+
+        reported_years = set(self.years[reported.any(axis=0)])
+        lead_units = self._units[leaders].to_dict()
+        follower_unit = self._units[follower]
+
+        def filler(in_iamdf):
+            lead_var = in_iamdf.filter(variable=leaders)
+            if any(var not in lead_var.variable for var in leaders):
+                raise ValueError(
+                    "Not all required variables are present in the infillee database"
+                )
+
+            lead_ts = lead_var.timeseries()
+
+            var_units = lead_ts.index.to_frame(index=False)[
+                ["variable", "unit"]
+            ].drop_duplicates()
+            if any(
+                lead_units[var] != unit
+                for var, unit in var_units.itertuples(index=False)
+            ):
+                raise ValueError(
+                    f"Units of lead variable is meant to be {lead_units}, "
+                    f"found {var_units}"
+                )
+
+            if in_iamdf.time_col != "year":
+                raise ValueError(
+                    "`in_iamdf` time column must be the same as the time column "
+                    "used to generate this filler function (`year`)"
+                )
+
+            years = [year for year in lead_ts.columns if year in reported_years]
+            if not years:
+                raise ValueError(
+                    "No time series overlap between the original and unfilled data"
+                )
+
+            target_levels = [
+                n for n in lead_ts.index.names if n not in ("variable", "unit")
+            ]
+            n_leads = lead_ts.groupby(level=target_levels).size()
+            if (n_leads != len(leaders)).any():
+                insufficient = n_leads.index[n_leads != len(leaders)][0]
+                raise ValueError(
+                    f"Insufficient variables are found to infill {insufficient}. "
+                    f"Only found {n_leads[insufficient]} of {leaders}."
+                )
+
+            targets = n_leads.index
+            target_values = np.stack(
+                [
+                    _get_variable_timeseries(lead_ts, var)
+                    .reindex(targets)
+                    .loc[:, years]
+                    .to_numpy(dtype=float)
+                    for var in leaders
+                ]
+            )
+            distances = self._get_distances(leaders, weights, years, target_values)
+
+            # only pathways which report everything in ``years`` are searched
+            valid = reported[:, [self._year_positions[y] for y in years]].all(axis=1)
+            if not valid.any():
+                raise ValueError(
+                    f"No pathway in the database reports {follower} and {leaders} "
+                    f"in all of {years}"
+                )
+
+            closest = np.argmin(np.where(valid, distances, np.inf), axis=1)
+
+            out_index = candidates[closest].to_frame(index=False)
+            target_frame = targets.to_frame(index=False)
+            for col in ["model", "scenario", *in_iamdf.extra_cols]:
+                out_index[col] = target_frame[col]
+
+            out_index["variable"] = follower
+            out_index["unit"] = follower_unit
+
+            return pyam.IamDataFrame(
+                pd.DataFrame(
+                    np.where(reported[closest], follower_values[closest], np.nan),
+                    index=pd.MultiIndex.from_frame(out_index),
+                    columns=self.years,
+                )
+            )
+
+        return filler
+
+
+class IndexedRMSClosest(RMSClosest):
+    """
+    ``RMSClosest`` cruncher which searches a :class:`RMSClosestIndex`
+
+    If an index is passed to :meth:`derive_relationship`, the closest
+    pathways are looked up in it, otherwise the cruncher behaves like
+    ``RMSClosest``.
+    """
+
+    def __init__(self, db):
+        # the database is only searched without an index, which doesn't
+        # modify it, so there is no need to copy it
+        self._db = db
+
+    def derive_relationship(
+        self, variable_follower, variable_leaders, weighting=None, index=None
+    ):
+        """
+        Derive the relationship between the lead and follower variables
+
+        Parameters
+        ----------
+        variable_follower : str
+            Follower variable
+
+        variable_leaders : list[str]
+            Lead variables
+
+        weighting : dict[str: float]
+            Weight of each lead variable in the distance (all 1 if not given)
+
+        index : :class:`RMSClosestIndex`, None
+            Index of the database to search for the closest pathways
+
+        Returns
+        -------
+        func
+            Function which infills ``variable_follower``
+        """
+        if index is None:
+            return super().derive_relationship(
+                variable_follower, variable_leaders, weighting=weighting
+            )
+
+        self._check_iamdf_lead(variable_leaders)
+        if variable_follower not in index.variables:
+            raise ValueError(
+                f"No data for `variable_follower` ({variable_follower}) in database"
+            )
+
+        return index.get_filler(variable_follower, variable_leaders, weighting)
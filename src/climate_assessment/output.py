@@ -0,0 +1,315 @@
+import logging
+import os.path
+import shutil
+
+import pandas as pd
+import pyam
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover
+    # only needed for parquet and feather output
+    pa = None
+    pq = None
+
+LOGGER = logging.getLogger(__name__)
+
+OUTPUT_FORMATS = ("xlsx", "parquet", "feather")
+"""tuple[str]: Supported output formats"""
+
+DEFAULT_OUTPUT_FORMATS = ("xlsx",)
+"""tuple[str]: Output formats written unless something else is requested"""
+
+# columns by which parquet output of IAMC data is partitioned
+PARQUET_PARTITION_COLS = ["Model", "Scenario"]
+
+_ARROW_FORMATS = ("parquet", "feather")
+
+
+def check_output_formats(output_formats):
+    """
+    Check that output formats are supported
+
+    Parameters
+    ----------
+    output_formats : list[str]
+        Output formats (see :data:`OUTPUT_FORMATS`)
+
+    Returns
+    -------
+    tuple[str]
+        ``output_formats`` with duplicates removed
+
+    Raises
+    ------
+    ValueError
+        An output format is not supported
+
+    ImportError
+        pyarrow, which is required to write parquet and feather output, is not
+        installed
+    """
+    output_formats = tuple(dict.fromkeys(output_formats))
+    unknown = [f for f in output_formats if f not in OUTPUT_FORMATS]
+    if unknown:
+        raise ValueError(
+            f"Unknown output format(s): {unknown}. Supported formats: {OUTPUT_FORMATS}"
+        )
+
+    if pa is None and any(f in _ARROW_FORMATS for f in output_formats):
+        raise ImportError(
+            "pyarrow is required to write parquet or feather output, install "
+            "it with `pip install climate-assessment[arrow]`"
+        )
+
+    return output_formats
+
+
+def _with_str_columns(df):
+    # arrow only supports string column names
+    return df.rename(columns=str)
+
+
+def _to_wide(df):
+    data = df.timeseries().reset_index()
+
+    return data.rename(columns={c: str(c).title() for c in data.columns})
+
+
+def write_parquet_dataset(data, path):
+    """
+    Write (or append) IAMC data in wide format to a partitioned parquet dataset
+
+    The dataset is partitioned by :data:`PARQUET_PARTITION_COLS`. Each call
+    adds new files to the dataset so it can be written one batch at a time.
+
+    Parameters
+    ----------
+    data : :class:`pandas.DataFrame`
+        Data in pyam's wide file format (title-cased IAMC columns followed by
+        one column per year)
+
+    path : str
+        Directory of the dataset
+    """
+    pq.write_to_dataset(
+        pa.Table.from_pandas(_with_str_columns(data), preserve_index=False),
+        path,
+        partition_cols=PARQUET_PARTITION_COLS,
+    )
+
+
+def remove_existing_output(path):
+    """
+    Remove output from a previous run
+
+    Needed before writing parquet datasets, which are otherwise appended to.
+
+    Parameters
+    ----------
+    path : str
+        File or directory to remove (nothing happens if it doesn't exist)
+    """
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.isfile(path):
+        os.remove(path)
+
+
+def write_table(df, path, output_format):
+    """
+    Write a table (without its index) in an arrow-based format
+
+    Parameters
+    ----------
+    df : :class:`pandas.DataFrame`
+        Table to write
+
+    path : str
+        File to write
+
+    output_format : ["parquet", "feather"]
+        Format to write
+    """
+    df = _with_str_columns(df).reset_index(drop=True)
+    if output_format == "parquet":
+        df.to_parquet(path, index=False)
+    elif output_format == "feather":
+        df.to_feather(path)
+    else:
+        raise ValueError(f"Cannot write a table as {output_format}")
+
+
+def write_iamc(df, path_stem, output_formats=DEFAULT_OUTPUT_FORMATS):
+    """
+    Write IAMC data in each of the requested output formats
+
+    The files written for each format are:
+
+    - xlsx: ``{path_stem}.xlsx`` with ``data`` and ``meta`` sheets (see
+      :meth:`pyam.IamDataFrame.to_excel`)
+    - parquet: a ``{path_stem}.parquet`` dataset (i.e. directory) of the data in
+      wide format, partitioned by model and scenario, and the meta table in
+      ``{path_stem}_meta.parquet``
+    - feather: the data in wide format in ``{path_stem}.feather`` and the meta
+      table in ``{path_stem}_meta.feather``
+
+    Parameters
+    ----------
+    df : :class:`pyam.IamDataFrame`
+        Data to write
+
+    path_stem : str
+        Path of the output, without file extension
+
+    output_formats : list[str]
+        Output formats to write (see :data:`OUTPUT_FORMATS`)
+    """
+    output_formats = check_output_formats(output_formats)
+    for output_format in output_formats:
+        path = f"{path_stem}.{output_format}"
+        LOGGER.info("Writing %s", path)
+        if output_format == "xlsx":
+            df.to_excel(path)
+            continue
+
+        remove_existing_output(path)
+        data = _to_wide(df)
+        if output_format == "parquet":
+            write_parquet_dataset(data, path)
+        else:
+            write_table(data, path, output_format)
+
+        write_table(
+            df.meta.reset_index(), f"{path_stem}_meta.{output_format}", output_format
+        )
+
+
+def write_meta(df, path_stem, output_formats=DEFAULT_OUTPUT_FORMATS):
+    """
+    Write the meta table of IAMC data in each of the requested output formats
+
+    Parameters
+    ----------
+    df : :class:`pyam.IamDataFrame`
+        Data of which to write the meta table
+
+    path_stem : str
+        Path of the output, without file extension
+
+    output_formats : list[str]
+        Output formats to write (see :data:`OUTPUT_FORMATS`)
+    """
+    output_formats = check_output_formats(output_formats)
+    for output_format in output_formats:
+        path = f"{path_stem}.{output_format}"
+        LOGGER.info("Writing meta to %s", path)
+        if output_format == "xlsx":
+            df.export_meta(path)
+        else:
+            write_table(df.meta.reset_index(), path, output_format)
+
+
+def read_iamc(path):
+    """
+    Read IAMC data written by :func:`write_iamc`
+
+    Parameters
+    ----------
+    path : str
+        File (or, for parquet, dataset directory) to read. Files which are not
+        parquet or feather are read with :class:`pyam.IamDataFrame`.
+
+    Returns
+    -------
+    :class:`pyam.IamDataFrame`
+        Data, including the meta table if it was written alongside
+    """
+    path_stem, ext = os.path.splitext(path.rstrip(os.sep))
+    if ext == ".parquet":
+        read = pd.read_parquet
+    elif ext == ".feather":
+        read = pd.read_feather
+    else:
+        return pyam.IamDataFrame(path)
+
+    data = read(path)
+    for col in PARQUET_PARTITION_COLS:
+        # partition columns are read back as categories
+        data[col] = data[col].astype(str)
+
+    data.columns = [int(c) if c.isdigit() else c for c in data.columns]
+
+    meta_file = f"{path_stem}_meta{ext}"
+    if os.path.exists(meta_file):
+        meta = read(meta_file).set_index(["model", "scenario"])
+    else:
+        meta = None
+
+    return pyam.IamDataFrame(data, meta=meta)
+
+
+class StreamingTableWriter:
+    """
+    Write a table in an arrow-based format one batch of rows at a time
+
+    The columns (and their types) are set by the first batch, later batches
+    are cast to match. Use as a context manager to make sure the file is
+    closed.
+    """
+
+    def __init__(self, path, output_format):
+        """
+        Initialise
+
+        Parameters
+        ----------
+        path : str
+            File to write
+
+        output_format : ["parquet", "feather"]
+            Format to write
+        """
+        if output_format not in _ARROW_FORMATS:
+            raise ValueError(f"Cannot stream a table as {output_format}")
+
+        self.path = path
+        self.output_format = output_format
+        self._schema = None
+        self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write(self, df):
+        """
+        Append rows to the table
+
+        Parameters
+        ----------
+        df : :class:`pandas.DataFrame`
+            Rows to append (the index is not written)
+        """
+        table = pa.Table.from_pandas(
+            _with_str_columns(df), schema=self._schema, preserve_index=False
+        )
+        if self._writer is None:
+            self._schema = table.schema
+            if self.output_format == "parquet":
+                self._writer = pq.ParquetWriter(self.path, self._schema)
+            else:
+                self._writer = pa.ipc.new_file(self.path, self._schema)
+
+        self._writer.write_table(table)
+
+    def close(self):
+        """
+        Close the file
+        """
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
@@ -7,7 +7,8 @@ import silicone
 
 import climate_assessment
 from climate_assessment import checks
-from climate_assessment.climate import DEFAULT_MAGICC_VERSION
+from climate_assessment.climate import parse_climate_models
+from climate_assessment.output import DEFAULT_OUTPUT_FORMATS, write_iamc, write_meta
 from climate_assessment.utils import add_gwp100_kyoto_wrapper
 
 LOGGER = getLogger(__name__)
@@ -18,11 +19,12 @@ def do_postprocess(
     outdir,
     key_string,
     prefix,
-    model_version=DEFAULT_MAGICC_VERSION,
+    model_version=None,
     categorisation=True,
     reporting_completeness_categorisation=True,
     gwp=True,
     model="magicc",
+    output_formats=DEFAULT_OUTPUT_FORMATS,
 ):
     """
     Runs any required postprocessing steps
@@ -33,14 +35,28 @@ def do_postprocess(
      * Add GWP100 Kyoto Gases sums
      * Adding additional metadata
      * Plots
+
+    If several climate models were run (see
+    :func:`climate_assessment.climate.parse_climate_models`), scenarios are
+    categorised based on the first one.
+
+    The output and its meta data are saved in each of ``output_formats`` (see
+    :data:`climate_assessment.output.OUTPUT_FORMATS`).
     """
     LOGGER.info("Add diagnostics and meta data")
     if categorisation:
-        LOGGER.info("Adding a temperature category to meta data")
+        # if several climate models were run, categorise with the first one
+        (categorisation_model, categorisation_model_version), *_ = parse_climate_models(
+            model, model_version
+        )
+        LOGGER.info(
+            "Adding a temperature category (based on %s) to meta data",
+            categorisation_model,
+        )
         output = checks.add_categorization(
             output,
-            model_version=model_version,
-            model=model,
+            model_version=categorisation_model_version,
+            model=categorisation_model,
             prefix=prefix,
         )
     if reporting_completeness_categorisation:
@@ -82,12 +98,16 @@ def do_postprocess(
         name="workflow",
     )
 
-    outfile = os.path.join(outdir, f"{key_string}_alloutput.xlsx")
-    LOGGER.info("Saving all output to: %s", outfile)
-    output.to_excel(outfile)
-
-    outfile = os.path.join(outdir, f"{key_string}_meta.xlsx")
-    LOGGER.info("Saving all meta to: %s", outfile)
-    output.export_meta(outfile)
+    LOGGER.info("Saving all output and meta")
+    write_iamc(
+        output,
+        os.path.join(outdir, f"{key_string}_alloutput"),
+        output_formats=output_formats,
+    )
+    write_meta(
+        output,
+        os.path.join(outdir, f"{key_string}_meta"),
+        output_formats=output_formats,
+    )
 
     return output
@@ -0,0 +1,210 @@
+import contextlib
+import datetime as dt
+import json
+import logging
+import os
+import os.path
+import platform
+import threading
+import time
+
+import pandas as pd
+
+from . import __version__
+
+LOGGER = logging.getLogger(__name__)
+
+PROFILE_COLUMNS = [
+    "stage",
+    "batch",
+    "start",
+    "wall_time",
+    "cpu_time",
+    "children_cpu_time",
+    "rss_start",
+    "rss_end",
+    "peak_rss",
+]
+"""list[str]: Columns of the profiling report (times in seconds, memory in bytes)"""
+
+
+# the memory helpers are imported when needed as the climate module itself
+# uses the profiler (importing them at the top would be circular)
+def _get_current_rss():
+    from .climate.memory import get_current_rss  # noqa: PLC0415
+
+    try:
+        return get_current_rss()
+    except ImportError:
+        # no resource module on windows
+        return None
+
+
+def _get_peak_rss():
+    from .climate.memory import get_peak_rss  # noqa: PLC0415
+
+    try:
+        return get_peak_rss()
+    except ImportError:
+        # no resource module on windows
+        return None
+
+
+def _get_memory_monitor():
+    from .climate.memory import (  # noqa: PLC0415
+        BatchMemoryMonitor,
+        get_process_tree_rss,
+        resource,
+    )
+
+    if resource is None and get_process_tree_rss() is None:
+        # the memory in use can't be sampled (i.e. on windows)
+        return contextlib.nullcontext()
+
+    return BatchMemoryMonitor()
+
+
+def _get_cpu_times():
+    times = os.times()
+
+    return times.user + times.system, times.children_user + times.children_system
+
+
+class Profiler:
+    """
+    Record the wall time, CPU time and memory use of each stage of a run
+
+    CPU time and memory are measured for the whole process, so stages which
+    run at the same time (e.g. post-processing a batch while the next batch is
+    run) include each other's use. The CPU time of child processes (e.g.
+    MAGICC) is only counted once they have finished and is reported
+    separately. The peak resident set size of each stage is sampled while the
+    stage runs and includes all child processes (see
+    :class:`climate_assessment.climate.memory.BatchMemoryMonitor`). The peak
+    of the whole run is only given in the report's summary (see
+    :meth:`write_report`).
+    """
+
+    def __init__(self, enabled=True):
+        """
+        Initialise
+
+        Parameters
+        ----------
+        enabled : bool
+            Should anything be recorded? If not, :meth:`stage` does nothing,
+            which means profiling code can stay in place without any overhead.
+        """
+        self.enabled = enabled
+        self.records = []
+        self._start = time.perf_counter()
+        self._started_at = dt.datetime.now(dt.timezone.utc)
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def stage(self, name, batch=None):
+        """
+        Profile a stage
+
+        Use as a context manager around the code of the stage. The stage is
+        recorded even if it raises an error.
+
+        Parameters
+        ----------
+        name : str
+            Name of the stage
+
+        batch : int, None
+            Number of the climate batch the stage belongs to (if any)
+        """
+        if not self.enabled:
+            yield
+            return
+
+        rss_start = _get_current_rss()
+        memory_monitor = _get_memory_monitor()
+        cpu_start, children_cpu_start = _get_cpu_times()
+        start = time.perf_counter()
+        try:
+            with memory_monitor:
+                yield
+        finally:
+            end = time.perf_counter()
+            cpu_end, children_cpu_end = _get_cpu_times()
+            record = {
+                "stage": name,
+                "batch": batch,
+                "start": start - self._start,
+                "wall_time": end - start,
+                "cpu_time": cpu_end - cpu_start,
+                "children_cpu_time": children_cpu_end - children_cpu_start,
+                "rss_start": rss_start,
+                "rss_end": _get_current_rss(),
+                "peak_rss": getattr(memory_monitor, "peak_memory", None),
+            }
+            LOGGER.debug("Profiled %s", record)
+            with self._lock:
+                self.records.append(record)
+
+    def to_dataframe(self):
+        """
+        Get the recorded stages
+
+        Returns
+        -------
+        :class:`pandas.DataFrame`
+            One row per stage with the columns :data:`PROFILE_COLUMNS`, in the
+            order in which the stages started
+        """
+        with self._lock:
+            records = list(self.records)
+
+        out = pd.DataFrame(records, columns=PROFILE_COLUMNS)
+
+        return out.sort_values("start", kind="stable").reset_index(drop=True)
+
+    def write_report(self, outdir, key_string):
+        """
+        Write the profiling report
+
+        Two files are written: ``{key_string}_profile.csv``, with one row per
+        stage (see :meth:`to_dataframe`), and ``{key_string}_profile.json``,
+        which contains the same stages plus information about the run (the
+        version of ``climate-assessment``, platform, number of CPUs, peak
+        resident set size of the whole run etc.) so reports from different
+        releases and machines can be compared.
+
+        Parameters
+        ----------
+        outdir : str
+            Directory in which to write the report
+
+        key_string : str
+            String to use to identify the report
+
+        Returns
+        -------
+        list[str]
+            Files which were written
+        """
+        stages = self.to_dataframe()
+        out_csv = os.path.join(outdir, f"{key_string}_profile.csv")
+        out_json = os.path.join(outdir, f"{key_string}_profile.json")
+
+        LOGGER.info("Writing profiling report to %s and %s", out_csv, out_json)
+        stages.to_csv(out_csv, index=False)
+
+        report = {
+            "climate_assessment_version": __version__,
+            "python_version": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "started_at": self._started_at.isoformat(),
+            "wall_time": time.perf_counter() - self._start,
+            "peak_rss": _get_peak_rss(),
+            "stages": json.loads(stages.to_json(orient="records")),
+        }
+        with open(out_json, "w") as fh:
+            json.dump(report, fh, indent=2)
+
+        return [out_csv, out_json]
@@ -1,5 +1,6 @@
 import contextlib
 import logging
+import math
 import os
 
 import joblib
@@ -11,6 +12,10 @@ import tqdm.autonotebook as tqdman
 
 LOGGER = logging.getLogger(__name__)
 
+# number of chunks per worker if the chunk size isn't given, enough to balance
+# the load between workers without too much overhead per chunk
+_CHUNKS_PER_WORKER = 4
+
 
 def init_logging(logger):
     # TODO: remove hard-coded level
@@ -308,6 +313,42 @@ def parallel_progress_bar(tqdm_bar):
         tqdm_bar.close()
 
 
+def get_chunk_size(n_items, n_workers, chunk_size=None):
+    """
+    Get the number of items (e.g. scenarios) to process in each parallel task
+
+    Parameters
+    ----------
+    n_items : int
+        Number of items to process
+
+    n_workers : int
+        Number of workers
+
+    chunk_size : int, None
+        Requested chunk size. If ``None``, the items are split so that each
+        worker gets a few chunks, which balances the load without too much
+        overhead per task.
+
+    Returns
+    -------
+    int
+        Number of items per task
+
+    Raises
+    ------
+    ValueError
+        ``chunk_size`` is not a positive integer
+    """
+    if chunk_size is None:
+        return max(1, math.ceil(n_items / (n_workers * _CHUNKS_PER_WORKER)))
+
+    if chunk_size < 1:
+        raise ValueError(f"`chunk_size` must be positive, received {chunk_size}")
+
+    return chunk_size
+
+
 def split_df(df, **filter_options):
     """
     This function splits the dataframe into model/scenario sets that fulfill
@@ -2,6 +2,7 @@ import logging
 import os.path
 
 import numpy as np
+import pandas as pd
 import pandas.testing as pdt
 import pyam
 import pytest
@@ -9,12 +10,14 @@ import scmdata
 
 from climate_assessment.checks import (
     add_completeness_category,
+    check_against_historical,
     check_reported_co2,
     perform_input_checks,
     sanity_check_bounds_kyoto_emissions,
     sanity_check_comparison_kyoto_gases,
     sanity_check_hierarchy,
 )
+from climate_assessment.history import get_historical_values
 
 
 def test_add_completeness_category():
@@ -58,6 +61,63 @@ def test_perform_input_checks_negative_kyoto():
     assert pyam.compare(res, start).empty
 
 
+def test_perform_input_checks_many_scenarios(tmpdir):
+    years = [2010, 2015, 2020, 2030, 2040, 2050, 2060, 2070, 2080, 2090, 2100]
+    values = np.arange(1.0, 12.0)
+    co2 = "Mt CO2/yr"
+    co2_eip = "Emissions|CO2|Energy and Industrial Processes"
+    ch4 = ["Emissions|CH4", "Mt CH4/yr", *values]
+
+    def _get_df(rows):
+        return pyam.IamDataFrame(
+            pd.DataFrame(
+                [["a_model", scenario, "World", *row] for scenario, *row in rows],
+                columns=["model", "scenario", "region", "variable", "unit", *years],
+            )
+        )
+
+    start = _get_df(
+        [
+            # Energy and Industrial Processes is the sum of its parts
+            ["split", "Emissions|CO2|Energy", co2, *values],
+            ["split", "Emissions|CO2|Industrial Processes", co2, *(2 * values)],
+            ["split", *ch4],
+            # Waste is added to Energy and Industrial Processes, Other is removed
+            # as it doesn't report all the required years
+            ["waste", co2_eip, co2, *values],
+            ["waste", "Emissions|CO2|Waste", co2, *values],
+            ["waste", "Emissions|CO2|Other", co2, *([np.nan] * 10), 1.0],
+            ["waste", *ch4],
+            # timeseries without all the required years or with only zeros are
+            # removed
+            ["incomplete", co2_eip, co2, *values[:5], np.nan, *values[6:]],
+            ["incomplete", "Emissions|CO2|AFOLU", co2, *([0.0] * 11)],
+            ["incomplete", *ch4],
+        ]
+    )
+
+    res = perform_input_checks(start, outdir=str(tmpdir))
+
+    exp = _get_df(
+        [
+            ["split", "Emissions|CO2|Energy", co2, *values],
+            ["split", "Emissions|CO2|Industrial Processes", co2, *(2 * values)],
+            ["split", co2_eip, co2, *(3 * values)],
+            ["split", *ch4],
+            ["waste", co2_eip, co2, *(2 * values)],
+            ["waste", *ch4],
+            ["incomplete", *ch4],
+        ]
+    )
+    assert pyam.compare(res, exp).empty
+
+    notallyears = pyam.IamDataFrame(
+        os.path.join(str(tmpdir), "checks_excluded_variables_notallyears.csv")
+    )
+    assert notallyears.scenario == ["incomplete", "waste"]
+    assert notallyears.variable == [co2_eip, "Emissions|CO2|Other"]
+
+
 CO2_AFOLU = "CO2|AFOLU"
 CO2_ENERGY = "CO2|Energy and Industrial Processes"
 CO2_TOTAL = "CO2"
@@ -320,6 +380,62 @@ def test_check_reported_co2_total_energy_and_afolu(caplog):
     )
 
 
+def test_check_reported_co2_many_scenarios(tmpdir):
+    years = [2015, 2020, 2030, 2040, 2050, 2060, 2070, 2080, 2090, 2100]
+    energy = [15, 20, 10, 5, 0, 0, 0, 0, 0, 0]
+    afolu = [1, 1, 0.5, 0, -1, -1, -1, -1, -1, -1]
+    other = [14, 19, 9, 5, 1, 1, 1, 1, 1, 1]
+    scenarios = {
+        "energy_only": {CO2_ENERGY: energy},
+        "afolu_only": {CO2_AFOLU: afolu},
+        "total_same_as_energy": {CO2_TOTAL: energy, CO2_ENERGY: energy},
+        "total_same_as_afolu": {CO2_TOTAL: afolu, CO2_AFOLU: afolu},
+        "total_and_afolu": {CO2_TOTAL: other, CO2_AFOLU: afolu},
+        "all_three": {CO2_TOTAL: other, CO2_ENERGY: energy, CO2_AFOLU: afolu},
+        "total_missing_year": {CO2_TOTAL: energy[:-1] + [np.nan]},
+    }
+    rows = [
+        ["a_model", scenario, "World", f"Emissions|{variable}", "Mt CO2/yr", *values]
+        for scenario, variables in scenarios.items()
+        for variable, values in variables.items()
+    ]
+    start = pyam.IamDataFrame(
+        pd.DataFrame(
+            rows, columns=["model", "scenario", "region", "variable", "unit", *years]
+        )
+    )
+
+    res = check_reported_co2(start, "test", output_csv=True, outdir=str(tmpdir))
+
+    assert sorted(res.scenario) == [
+        "all_three",
+        "energy_only",
+        "total_and_afolu",
+        "total_same_as_energy",
+    ]
+    assert sorted(res.filter(variable=f"Emissions|{CO2_TOTAL}").scenario) == [
+        "total_and_afolu"
+    ]
+    pdt.assert_frame_equal(
+        res.filter(scenario="total_and_afolu").data,
+        start.filter(scenario="total_and_afolu").data,
+        check_like=True,
+    )
+
+    excluded = pyam.IamDataFrame(
+        os.path.join(str(tmpdir), "test_excluded_scenarios_noCO2orCO2EnIPreported.csv")
+    )
+    assert sorted(excluded.scenario) == [
+        "afolu_only",
+        "total_missing_year",
+        "total_same_as_afolu",
+    ]
+    # total CO2 is removed before the scenario is excluded
+    assert excluded.filter(scenario="total_same_as_afolu").variable == [
+        f"Emissions|{CO2_AFOLU}"
+    ]
+
+
 def test_sanity_check_bounds_kyoto_emissions():
     """Check that `sanity_check_bounds_kyoto_emissions` raises an error if the
     emissions are out of bound"""
@@ -552,3 +668,52 @@ def test_sanity_check_hierarchy():
             out_afolu=out_afolu,
             out_fossil=out_fossil,
         )
+
+
+def test_check_against_historical(tmpdir):
+    hist = get_historical_values("ar6", 2015)
+
+    def _hist(variable):
+        return hist[f"AR6 climate diagnostics|{variable}|Unharmonized"]
+
+    variables = ["Emissions|CO2", "Emissions|N2O", "Emissions|CO2|AFOLU"]
+    units = ["Mt CO2/yr", "kt N2O/yr", "Mt CO2/yr"]
+    factors = {
+        "ok": [1.2, 0.6, 1.9],
+        "co2_too_high": [1.35, 1.0, 1.0],
+        "n2o_too_low": [1.0, 0.45, 1.0],
+        # bounds are inclusive
+        "on_bounds": [1.3, 1.5, 0.3],
+    }
+    rows = []
+    for scenario, scenario_factors in factors.items():
+        for variable, unit, factor in zip(variables, units, scenario_factors):
+            rows.append(
+                [
+                    "a_model",
+                    scenario,
+                    "World",
+                    variable,
+                    unit,
+                    factor * _hist(variable),
+                    factor * _hist(variable),
+                ]
+            )
+
+    start = pyam.IamDataFrame(
+        pd.DataFrame(
+            rows,
+            columns=["model", "scenario", "region", "variable", "unit", 2015, 2020],
+        )
+    )
+
+    res = check_against_historical(
+        start, "test", instance="ar6", output_csv=True, outdir=str(tmpdir)
+    )
+
+    assert sorted(res.scenario) == ["ok", "on_bounds"]
+    excluded = pyam.IamDataFrame(
+        os.path.join(str(tmpdir), "test_excluded_scenarios_toofarfromhistorical.csv")
+    )
+    assert sorted(excluded.scenario) == ["co2_too_high", "n2o_too_low"]
+    assert not res.exclude.any()
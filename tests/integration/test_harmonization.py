@@ -1,4 +1,9 @@
+import logging
+import os.path
+
 import numpy as np
+import pandas.testing as pdt
+import pyam
 import pytest
 import scmdata
 
@@ -86,3 +91,128 @@ def test_harmonization_sr15(sr15_harmonized, rcmip_emissions, variable):
     ).convert_unit(res_v.get_unique_meta("unit", True), context="NOx_conversions")
 
     np.testing.assert_allclose(rcmip_v.values, res_v.values, rtol=1e-3)
+
+
+@pytest.mark.parametrize(
+    "backend,n_jobs,chunk_size",
+    (
+        ("sequential", 1, None),
+        ("threads", 2, 1),
+        ("processes", 2, 3),
+    ),
+)
+def test_harmonization_backends(
+    ar6_emissions, ar6_harmonized, backend, n_jobs, chunk_size
+):
+    emissions = columns_to_basic(ar6_emissions)
+    res = run_harmonization(
+        emissions,
+        instance="ar6",
+        prefix="AR6 climate diagnostics",
+        n_jobs=n_jobs,
+        backend=backend,
+        chunk_size=chunk_size,
+    )
+
+    pdt.assert_frame_equal(
+        scmdata.ScmRun(res.timeseries()).timeseries(),
+        ar6_harmonized.timeseries(),
+        check_like=True,
+    )
+
+
+def test_harmonization_unknown_backend(ar6_emissions):
+    with pytest.raises(ValueError, match="Unknown harmonization backend: dask"):
+        run_harmonization(
+            columns_to_basic(ar6_emissions),
+            instance="ar6",
+            prefix="AR6 climate diagnostics",
+            backend="dask",
+        )
+
+
+@pytest.mark.parametrize(
+    "instance,prefix,harmonized",
+    (
+        ("ar6", "AR6 climate diagnostics", "ar6_harmonized"),
+        ("sr15", "SR15 climate diagnostics", "sr15_harmonized"),
+    ),
+)
+def test_harmonization_native(request, instance, prefix, harmonized):
+    emissions = columns_to_basic(request.getfixturevalue(f"{instance}_emissions"))
+    res = run_harmonization(
+        emissions, instance=instance, prefix=prefix, harmonizer="native"
+    )
+
+    pdt.assert_frame_equal(
+        scmdata.ScmRun(res.timeseries()).timeseries(),
+        request.getfixturevalue(harmonized).timeseries(),
+        check_like=True,
+    )
+
+
+@pytest.mark.parametrize(
+    "filename",
+    (
+        "ex2.csv",
+        "ex2_adjusted-waste-other.csv",
+        "ex2_starting2015.csv",
+        "ar6_IPs_emissions.csv",
+    ),
+)
+def test_harmonization_native_matches_aneris(test_data_dir, filename):
+    emissions = columns_to_basic(
+        pyam.IamDataFrame(os.path.join(test_data_dir, filename))
+    )
+    res = {
+        harmonizer: run_harmonization(
+            emissions,
+            instance="ar6",
+            prefix="AR6 climate diagnostics",
+            harmonizer=harmonizer,
+            backend="sequential",
+        )
+        for harmonizer in ("aneris", "native")
+    }
+
+    pdt.assert_frame_equal(
+        scmdata.ScmRun(res["native"].timeseries()).timeseries(),
+        scmdata.ScmRun(res["aneris"].timeseries()).timeseries(),
+        check_like=True,
+    )
+
+
+@pytest.mark.parametrize("harmonizer", ("aneris", "native"))
+def test_harmonization_methods_logged(test_data_dir, harmonizer, caplog):
+    emissions = columns_to_basic(
+        pyam.IamDataFrame(os.path.join(test_data_dir, "ex2.csv"))
+    )
+    with caplog.at_level(logging.DEBUG, logger="climate_assessment.harmonization"):
+        run_harmonization(
+            emissions,
+            instance="ar6",
+            prefix="AR6 climate diagnostics",
+            harmonizer=harmonizer,
+            backend="sequential",
+        )
+
+    # the methods are logged once per call, not once per scenario
+    methods_logs = [
+        r for r in caplog.records if r.getMessage().startswith("Harmonisation methods")
+    ]
+    assert len(methods_logs) == 1
+    assert methods_logs[0].name == "climate_assessment.harmonization"
+    for scenario in emissions.scenario:
+        assert scenario in methods_logs[0].getMessage()
+
+    assert "reduce_ratio_2080" in methods_logs[0].getMessage()
+
+
+def test_harmonization_unknown_harmonizer(ar6_emissions):
+    with pytest.raises(ValueError, match="Unknown harmonizer: silicone"):
+        run_harmonization(
+            columns_to_basic(ar6_emissions),
+            instance="ar6",
+            prefix="AR6 climate diagnostics",
+            harmonizer="silicone",
+        )
@@ -1,14 +1,16 @@
 import logging
 import os.path
+import shutil
 
 import numpy as np
 import numpy.testing as npt
+import pandas as pd
 import pandas.testing as pdt
 import pyam
 import pytest
 import scmdata
 
-from climate_assessment.infilling import run_infilling
+from climate_assessment.infilling import postprocess_infilled_for_climate, run_infilling
 
 CO2_AFOLU = "CO2|AFOLU"
 CO2_ENERGY = "CO2|Energy and Industrial Processes"
@@ -211,10 +213,7 @@ def test_infilling_co2_afolu_and_total(test_data_dir, caplog):
     _check_total_is_sum_of_energy_and_afolu(res.append(co2_total))
 
 
-def test_infilling_multiple_timeseries(test_data_dir):
-    # Scenario a is fine and nothing changes
-    # We can infill afolu in scenario b
-    # We can infill energy in scenario c
+def _get_multiple_timeseries_start():
     co2 = f"AR6 climate diagnostics|Harmonized|Emissions|{CO2_TOTAL}"
     energy_ind = f"AR6 climate diagnostics|Harmonized|Emissions|{CO2_ENERGY}"
     afolu = f"AR6 climate diagnostics|Harmonized|Emissions|{CO2_AFOLU}"
@@ -255,7 +254,17 @@ def test_infilling_multiple_timeseries(test_data_dir):
         },
     )
 
-    start = pyam.IamDataFrame(start.timeseries(time_axis="year"))
+    return pyam.IamDataFrame(start.timeseries(time_axis="year"))
+
+
+def test_infilling_multiple_timeseries(test_data_dir):
+    # Scenario a is fine and nothing changes
+    # We can infill afolu in scenario b
+    # We can infill energy in scenario c
+    energy_ind = f"AR6 climate diagnostics|Harmonized|Emissions|{CO2_ENERGY}"
+    afolu = f"AR6 climate diagnostics|Harmonized|Emissions|{CO2_AFOLU}"
+    year = [2015, 2020, 2030, 2040, 2050, 2060, 2070, 2080, 2090, 2100]
+    start = _get_multiple_timeseries_start()
 
     infilled, co2_inf_db, co2_total = _get_res(start, test_data_dir)
 
@@ -280,3 +289,159 @@ def test_infilling_multiple_timeseries(test_data_dir):
         ).data["value"],
         [15, 20, 10, 5, 0, 0, 0, 0, 0, 0],
     )
+
+
+def _assert_run_infilling_equal(res, exp):
+    # the infilled scenarios, then the CO2 of the infiller database and the
+    # infilled CO2 total, which can be empty so are compared as long data
+    pdt.assert_frame_equal(res[0].timeseries(), exp[0].timeseries())
+    for res_df, exp_df in zip(res[1:], exp[1:]):
+        pdt.assert_frame_equal(res_df.data, exp_df.data)
+
+
+def test_infilling_parallel(test_data_dir):
+    start = _get_multiple_timeseries_start()
+    database_filepath = os.path.join(
+        test_data_dir,
+        "cmip6-ssps-workflow-emissions_infillerdatabase_until2100.csv",
+    )
+
+    res_sequential = run_infilling(
+        start, prefix="AR6 climate diagnostics", database_filepath=database_filepath
+    )
+    # one scenario per task so every scenario is infilled in a different task
+    res_parallel = run_infilling(
+        start,
+        prefix="AR6 climate diagnostics",
+        database_filepath=database_filepath,
+        n_jobs=2,
+        chunk_size=1,
+    )
+
+    _assert_run_infilling_equal(res_parallel, res_sequential)
+
+
+def test_infilling_compiled_database(test_data_dir, tmpdir):
+    start = _get_multiple_timeseries_start()
+    # copy the database so the compiled tables are written in tmpdir
+    database_filepath = str(tmpdir.join("infillerdatabase.csv"))
+    shutil.copyfile(
+        os.path.join(
+            test_data_dir,
+            "cmip6-ssps-workflow-emissions_infillerdatabase_until2100.csv",
+        ),
+        database_filepath,
+    )
+
+    res_default = run_infilling(
+        start, prefix="AR6 climate diagnostics", database_filepath=database_filepath
+    )
+    for _ in range(2):
+        # compiles the tables the first time and loads them the second time
+        res_compiled = run_infilling(
+            start,
+            prefix="AR6 climate diagnostics",
+            database_filepath=database_filepath,
+            compile_database=True,
+        )
+
+        _assert_run_infilling_equal(res_compiled, res_default)
+
+    assert len(tmpdir.listdir(lambda p: p.ext == ".npz")) == 1
+
+
+INFILLED_VARIABLES = [
+    "BC",
+    "CH4",
+    "CO",
+    "CO2|AFOLU",
+    "CO2|Energy and Industrial Processes",
+    "HFC|HFC125",
+    "HFC|HFC134a",
+    "HFC|HFC143a",
+    "HFC|HFC227ea",
+    "HFC|HFC23",
+    "HFC|HFC245ca",
+    "HFC|HFC32",
+    "HFC|HFC43-10",
+    "N2O",
+    "NH3",
+    "NOx",
+    "OC",
+    "PFC|C2F6",
+    "PFC|C6F14",
+    "PFC|CF4",
+    "SF6",
+    "Sulfur",
+    "VOC",
+]
+
+
+def _get_infilled(scenarios):
+    years = list(range(2015, 2100 + 1))
+    rows = []
+    for scenario, (variables, values) in scenarios.items():
+        for variable in variables:
+            rows.append(
+                [
+                    "a_model",
+                    scenario,
+                    "World",
+                    f"p|Infilled|Emissions|{variable}",
+                    "unit",
+                    *values.get(variable, np.ones(len(years))),
+                ]
+            )
+
+    return pyam.IamDataFrame(
+        pd.DataFrame(
+            rows, columns=["model", "scenario", "region", "variable", "unit", *years]
+        )
+    )
+
+
+def test_postprocess_infilled_for_climate_removes_incomplete(caplog):
+    missing_year = np.ones(2100 - 2015 + 1)
+    missing_year[10] = np.nan
+    df_infilled = _get_infilled(
+        {
+            "complete": (INFILLED_VARIABLES, {}),
+            "negative_co2": (
+                INFILLED_VARIABLES,
+                {"CO2|AFOLU": -np.ones(len(missing_year))},
+            ),
+            "missing_variable": (INFILLED_VARIABLES[:-1], {}),
+            "missing_year": (INFILLED_VARIABLES, {"CH4": missing_year}),
+        }
+    )
+
+    with caplog.at_level(logging.INFO):
+        res = postprocess_infilled_for_climate(df_infilled, "p")
+
+    assert sorted(res.scenario) == ["complete", "negative_co2"]
+    pdt.assert_frame_equal(
+        res.timeseries(),
+        df_infilled.filter(scenario=["complete", "negative_co2"]).timeseries(),
+    )
+    assert "Removing a_model missing_variable" in caplog.text
+    assert "Removing a_model missing_year" in caplog.text
+
+
+@pytest.mark.parametrize("value", (-0.05, -1))
+def test_postprocess_infilled_for_climate_nonco2_negatives(value):
+    df_infilled = _get_infilled(
+        {"negative": (INFILLED_VARIABLES, {"CH4": value * np.ones(2100 - 2015 + 1)})}
+    )
+
+    with pytest.raises(AssertionError, match="Non-CO2 negatives"):
+        postprocess_infilled_for_climate(df_infilled, "p")
+
+
+def test_postprocess_infilled_for_climate_nonco2_numerical_noise():
+    df_infilled = _get_infilled(
+        {"noise": (INFILLED_VARIABLES, {"CH4": -1e-20 * np.ones(2100 - 2015 + 1)})}
+    )
+
+    res = postprocess_infilled_for_climate(df_infilled, "p")
+
+    pdt.assert_frame_equal(res.timeseries(), df_infilled.timeseries())
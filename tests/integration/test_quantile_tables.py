@@ -0,0 +1,156 @@
+import numpy as np
+import numpy.testing as npt
+import pandas as pd
+import pyam
+import pytest
+from silicone.database_crunchers import QuantileRollingWindows
+
+from climate_assessment.infilling.quantile_tables import (
+    PrecompiledQuantileRollingWindows,
+    QuantileRollingWindowsTables,
+    get_quantile_rolling_windows_tables,
+)
+
+LEAD = "Emissions|CO2"
+FOLLOWER = "Emissions|CH4"
+
+
+def _get_database():
+    rng = np.random.default_rng(0)
+    rows = []
+    for i in range(20):
+        co2 = rng.uniform(-5, 40, size=3)
+        # in 2100 every scenario reports the same lead value
+        co2[-1] = 0
+        ch4 = 100 + 5 * co2 + rng.normal(0, 10, size=3)
+        rows.append(["model", f"scen_{i}", "World", LEAD, "Gt CO2/yr", *co2])
+        rows.append(["model", f"scen_{i}", "World", FOLLOWER, "Mt CH4/yr", *ch4])
+
+    return pyam.IamDataFrame(
+        pd.DataFrame(
+            rows,
+            columns=[
+                "model",
+                "scenario",
+                "region",
+                "variable",
+                "unit",
+                2015,
+                2050,
+                2100,
+            ],
+        )
+    )
+
+
+def _get_to_infill():
+    return pyam.IamDataFrame(
+        pd.DataFrame(
+            [
+                ["model_a", "scen_a", "World", LEAD, "Gt CO2/yr", -10, 20, 0],
+                ["model_a", "scen_b", "World", LEAD, "Gt CO2/yr", 10, 50, 3],
+            ],
+            columns=[
+                "model",
+                "scenario",
+                "region",
+                "variable",
+                "unit",
+                2015,
+                2050,
+                2100,
+            ],
+        )
+    )
+
+
+def test_compiled_filler_matches_silicone():
+    db = _get_database()
+    to_infill = _get_to_infill()
+
+    tables = QuantileRollingWindowsTables.compile(db, [LEAD], [FOLLOWER])
+    res = tables.get_filler(FOLLOWER, [LEAD])(to_infill)
+    exp = QuantileRollingWindows(db).derive_relationship(FOLLOWER, [LEAD])(to_infill)
+
+    assert res.variable == [FOLLOWER]
+    assert res.unit == ["Mt CH4/yr"]
+    npt.assert_allclose(
+        res.timeseries().sort_index().values, exp.timeseries().sort_index().values
+    )
+
+
+def test_precompiled_cruncher_falls_back_to_silicone():
+    db = _get_database()
+    to_infill = _get_to_infill()
+    tables = QuantileRollingWindowsTables.compile(db, [LEAD], [FOLLOWER])
+    cruncher = PrecompiledQuantileRollingWindows(db)
+
+    assert tables.has_relationship(FOLLOWER, [LEAD])
+    # compiled with different settings so has to be derived again
+    assert not tables.has_relationship(FOLLOWER, [LEAD], quantile=0.3)
+
+    res = cruncher.derive_relationship(FOLLOWER, [LEAD], tables=tables, quantile=0.3)(
+        to_infill
+    )
+    exp = QuantileRollingWindows(db).derive_relationship(
+        FOLLOWER, [LEAD], quantile=0.3
+    )(to_infill)
+    npt.assert_allclose(
+        res.timeseries().sort_index().values, exp.timeseries().sort_index().values
+    )
+
+
+def test_compiled_filler_errors():
+    db = _get_database()
+    filler = QuantileRollingWindowsTables.compile(db, [LEAD], [FOLLOWER]).get_filler(
+        FOLLOWER, [LEAD]
+    )
+    to_infill = _get_to_infill()
+
+    with pytest.raises(ValueError, match="Units of lead variable"):
+        filler(to_infill.rename(unit={"Gt CO2/yr": "Mt CO2/yr"}))
+
+    extra_year = to_infill.timeseries()
+    extra_year[2030] = 1.0
+    with pytest.raises(ValueError, match="Not all required timepoints"):
+        filler(pyam.IamDataFrame(extra_year))
+
+
+def test_save_and_load(tmpdir):
+    tables = QuantileRollingWindowsTables.compile(_get_database(), [LEAD], [FOLLOWER])
+    path = str(tmpdir.join("tables.npz"))
+    tables.save(path)
+    loaded = QuantileRollingWindowsTables.load(path)
+
+    assert loaded.settings == tables.settings
+    assert loaded.relationships.keys() == tables.relationships.keys()
+    for key, rel in tables.relationships.items():
+        for name in ("years", "xs", "ys"):
+            npt.assert_array_equal(loaded.relationships[key][name], rel[name])
+
+        assert loaded.relationships[key]["lead_unit"] == rel["lead_unit"]
+        assert loaded.relationships[key]["follower_unit"] == rel["follower_unit"]
+
+
+def test_get_tables_only_compiles_once(tmpdir, monkeypatch):
+    db = _get_database()
+    database_filepath = str(tmpdir.join("database.csv"))
+    db.to_csv(database_filepath)
+
+    first = get_quantile_rolling_windows_tables(
+        db, database_filepath, [LEAD], [FOLLOWER]
+    )
+    assert len(tmpdir.listdir(lambda p: p.ext == ".npz")) == 1
+
+    def _fail(*args, **kwargs):
+        raise AssertionError("tables compiled again")
+
+    monkeypatch.setattr(QuantileRollingWindowsTables, "compile", _fail)
+    second = get_quantile_rolling_windows_tables(
+        db, database_filepath, [LEAD], [FOLLOWER]
+    )
+
+    npt.assert_array_equal(
+        second.relationships[(LEAD, FOLLOWER)]["ys"],
+        first.relationships[(LEAD, FOLLOWER)]["ys"],
+    )
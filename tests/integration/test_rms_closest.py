@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+import pyam
+import pytest
+from silicone.database_crunchers import RMSClosest
+
+from climate_assessment.infilling.rms_closest import IndexedRMSClosest, RMSClosestIndex
+
+LEAD = "Emissions|CO2"
+FOLLOWERS = ["Emissions|HFC|HFC23", "Emissions|SF6"]
+YEARS = [2015, 2050, 2100]
+
+
+def _get_database():
+    rng = np.random.default_rng(0)
+    rows = []
+    for i in range(30):
+        for model in ["model_b", "model_a"]:
+            scen = ["World", LEAD, "Gt CO2/yr", *rng.uniform(-5, 40, size=3).round()]
+            rows.append([model, f"scen_{i}", *scen])
+            for j, follower in enumerate(FOLLOWERS):
+                values = rng.uniform(0, 10, size=3)
+                if (i + j) % 4 == 0:
+                    # not every pathway reports every follower in every year
+                    values[1] = np.nan
+
+                rows.append([model, f"scen_{i}", "World", follower, "kt/yr", *values])
+
+    return pyam.IamDataFrame(
+        pd.DataFrame(
+            rows, columns=["model", "scenario", "region", "variable", "unit", *YEARS]
+        )
+    )
+
+
+def _get_to_infill():
+    rng = np.random.default_rng(1)
+
+    return pyam.IamDataFrame(
+        pd.DataFrame(
+            [
+                ["model_c", f"scen_{i}", "World", LEAD, "Gt CO2/yr", *values]
+                for i, values in enumerate(rng.uniform(-5, 40, size=(10, 3)).round())
+            ],
+            columns=["model", "scenario", "region", "variable", "unit", *YEARS],
+        )
+    )
+
+
+@pytest.mark.parametrize("follower", FOLLOWERS)
+def test_indexed_rms_closest_matches_silicone(follower):
+    db = _get_database()
+    to_infill = _get_to_infill()
+    index = RMSClosestIndex(db)
+
+    res = IndexedRMSClosest(db).derive_relationship(follower, [LEAD], index=index)(
+        to_infill
+    )
+    exp = RMSClosest(db).derive_relationship(follower, [LEAD])(to_infill)
+
+    pdt.assert_frame_equal(
+        res.timeseries().sort_index(), exp.timeseries().sort_index(), check_like=True
+    )
+
+
+def test_index_distances_reused_for_followers():
+    db = _get_database()
+    to_infill = _get_to_infill()
+    index = RMSClosestIndex(db)
+    cruncher = IndexedRMSClosest(db)
+
+    for follower in FOLLOWERS:
+        cruncher.derive_relationship(follower, [LEAD], index=index)(to_infill)
+
+    # the distances of every scenario were only calculated once
+    assert len(index._distances) == 1
+    assert len(next(iter(index._distances.values()))) == len(to_infill.index)
+
+
+def test_indexed_rms_closest_without_index():
+    db = _get_database()
+    to_infill = _get_to_infill()
+
+    res = IndexedRMSClosest(db).derive_relationship(FOLLOWERS[0], [LEAD])(to_infill)
+    exp = RMSClosest(db).derive_relationship(FOLLOWERS[0], [LEAD])(to_infill)
+
+    pdt.assert_frame_equal(res.timeseries(), exp.timeseries())
+
+
+def test_indexed_rms_closest_errors():
+    db = _get_database()
+    index = RMSClosestIndex(db)
+    cruncher = IndexedRMSClosest(db)
+
+    with pytest.raises(ValueError, match="No data for `variable_follower`"):
+        cruncher.derive_relationship("Emissions|CH4", [LEAD], index=index)
+
+    with pytest.raises(ValueError, match="Weighting does not include"):
+        cruncher.derive_relationship(
+            FOLLOWERS[0], [LEAD], weighting={"Emissions|CH4": 1}, index=index
+        )
+
+    filler = cruncher.derive_relationship(FOLLOWERS[0], [LEAD], index=index)
+    to_infill = _get_to_infill()
+    with pytest.raises(ValueError, match="Units of lead variable"):
+        filler(to_infill.rename(unit={"Gt CO2/yr": "Mt CO2/yr"}))
+
+    with pytest.raises(ValueError, match="Not all required variables"):
+        filler(to_infill.rename(variable={LEAD: "Emissions|CH4"}))
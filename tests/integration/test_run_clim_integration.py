@@ -1,11 +1,17 @@
 import os.path
 
 import numpy.testing as npt
+import pandas as pd
+import pandas.testing as pdt
+import pyam
 import pytest
 import scmdata
 from click.testing import CliRunner
 
 import climate_assessment.cli
+from climate_assessment.climate import climate_assessment as run_climate_assessment
+from climate_assessment.output import read_iamc
+from climate_assessment.postprocess import do_postprocess
 from climate_assessment.testing import _format_traceback_and_stdout_from_click_result
 
 
@@ -249,3 +255,366 @@ def test_combined_csv_output(
     assert os.path.isfile(out_csv_fname), (
         "--save-csv-combined-output was set but CSV output not written"
     )
+
+
+def test_parquet_feather_output(
+    tmpdir, test_data_dir, fair_slim_configs_filepath, fair_common_configs_filepath
+):
+    pytest.importorskip("pyarrow")
+
+    out_dir = str(tmpdir)
+    inp_file = os.path.join(
+        test_data_dir,
+        "workflow-fair",
+        "ex2_harmonized_infilled.csv",
+    )
+
+    runner = CliRunner()
+    result = runner.invoke(
+        climate_assessment.cli.clim_cli,
+        [
+            inp_file,
+            out_dir,
+            "--num-cfgs",
+            1,
+            "--test-run",
+            "--model",
+            "fair",
+            "--model-version",
+            "1.6.2",
+            "--probabilistic-file",
+            fair_slim_configs_filepath,
+            "--fair-extra-config",
+            fair_common_configs_filepath,
+            "--scenario-batch-size",
+            4,
+            "--output-format",
+            "parquet",
+            "--output-format",
+            "feather",
+            "--save-csv-combined-output",
+        ],
+    )
+
+    assert result.exit_code == 0, _format_traceback_and_stdout_from_click_result(result)
+
+    assert not [f for f in os.listdir(out_dir) if f.endswith(".xlsx")]
+
+    exp = pyam.IamDataFrame(
+        os.path.join(out_dir, "ex2_harmonized_infilled_rawoutput.csv")
+    )
+    for output_format in ("parquet", "feather"):
+        for stem in (
+            "ex2_harmonized_infilled_rawoutput",
+            "ex2_harmonized_infilled_IAMC_climateassessment",
+        ):
+            res = read_iamc(os.path.join(out_dir, f"{stem}.{output_format}"))
+            pdt.assert_frame_equal(
+                res.timeseries().sort_index(),
+                exp.filter(variable=res.variable).timeseries().sort_index(),
+            )
+
+
+def test_post_process_queue_depth(
+    tmpdir, test_data_dir, fair_slim_configs_filepath, fair_common_configs_filepath
+):
+    inp_file = os.path.join(
+        test_data_dir,
+        "workflow-fair",
+        "ex2_harmonized_infilled.csv",
+    )
+
+    fair_version = "1.6.2"
+
+    runner = CliRunner()
+    res = {}
+    for queue_depth in (0, 2):
+        out_dir = os.path.join(str(tmpdir), f"queue-depth-{queue_depth}")
+        os.mkdir(out_dir)
+
+        result = runner.invoke(
+            climate_assessment.cli.clim_cli,
+            [
+                inp_file,
+                out_dir,
+                "--num-cfgs",
+                1,
+                "--test-run",
+                "--model",
+                "fair",
+                "--model-version",
+                fair_version,
+                "--probabilistic-file",
+                fair_slim_configs_filepath,
+                "--fair-extra-config",
+                fair_common_configs_filepath,
+                "--scenario-batch-size",
+                1,
+                "--post-process-queue-depth",
+                queue_depth,
+            ],
+        )
+
+        assert result.exit_code == 0, _format_traceback_and_stdout_from_click_result(
+            result
+        )
+
+        res[queue_depth] = pd.read_csv(
+            os.path.join(out_dir, "ex2_harmonized_infilled_IAMC_climateassessment.csv")
+        )
+
+    pdt.assert_frame_equal(res[0], res[2])
+
+
+def test_checkpoint_resume(
+    tmpdir, test_data_dir, fair_slim_configs_filepath, fair_common_configs_filepath
+):
+    inp_file = os.path.join(
+        test_data_dir,
+        "workflow-fair",
+        "ex2_harmonized_infilled.csv",
+    )
+    checkpoint_dir = os.path.join(str(tmpdir), "checkpoints")
+
+    runner = CliRunner()
+
+    def _run(out_dir):
+        os.mkdir(out_dir)
+        result = runner.invoke(
+            climate_assessment.cli.clim_cli,
+            [
+                inp_file,
+                out_dir,
+                "--num-cfgs",
+                1,
+                "--test-run",
+                "--model",
+                "fair",
+                "--model-version",
+                "1.6.2",
+                "--probabilistic-file",
+                fair_slim_configs_filepath,
+                "--fair-extra-config",
+                fair_common_configs_filepath,
+                "--scenario-batch-size",
+                1,
+                "--checkpoint-dir",
+                checkpoint_dir,
+            ],
+        )
+
+        assert result.exit_code == 0, _format_traceback_and_stdout_from_click_result(
+            result
+        )
+
+        return pd.read_csv(
+            os.path.join(out_dir, "ex2_harmonized_infilled_IAMC_climateassessment.csv")
+        )
+
+    res_first = _run(os.path.join(str(tmpdir), "first"))
+
+    checkpoint_files = sorted(os.listdir(checkpoint_dir))
+    # a data and meta file for each scenario
+    assert len(checkpoint_files) > 2
+    assert len(checkpoint_files) % 2 == 0
+
+    # simulate the first run having been interrupted before the last batch
+    # was saved
+    os.remove(os.path.join(checkpoint_dir, checkpoint_files[-1]))
+    mtimes = {
+        f: os.path.getmtime(os.path.join(checkpoint_dir, f))
+        for f in checkpoint_files[:-2]
+    }
+
+    res_resumed = _run(os.path.join(str(tmpdir), "resumed"))
+
+    assert sorted(os.listdir(checkpoint_dir)) == checkpoint_files
+    for f, mtime in mtimes.items():
+        # finished batches are not re-run
+        assert os.path.getmtime(os.path.join(checkpoint_dir, f)) == mtime
+
+    pdt.assert_frame_equal(res_first, res_resumed)
+
+
+def test_checkpoint_resume_auto_batch_size(
+    tmpdir, test_data_dir, fair_slim_configs_filepath, fair_common_configs_filepath
+):
+    inp_file = os.path.join(
+        test_data_dir,
+        "workflow-fair",
+        "ex2_harmonized_infilled.csv",
+    )
+    checkpoint_dir = os.path.join(str(tmpdir), "checkpoints")
+
+    runner = CliRunner()
+
+    def _run(out_dir):
+        os.mkdir(out_dir)
+        result = runner.invoke(
+            climate_assessment.cli.clim_cli,
+            [
+                inp_file,
+                out_dir,
+                "--num-cfgs",
+                1,
+                "--test-run",
+                "--model",
+                "fair",
+                "--model-version",
+                "1.6.2",
+                "--probabilistic-file",
+                fair_slim_configs_filepath,
+                "--fair-extra-config",
+                fair_common_configs_filepath,
+                "--scenario-batch-size",
+                "auto",
+                "--max-memory",
+                "64GB",
+                "--checkpoint-dir",
+                checkpoint_dir,
+            ],
+        )
+
+        assert result.exit_code == 0, _format_traceback_and_stdout_from_click_result(
+            result
+        )
+
+        return pd.read_csv(
+            os.path.join(out_dir, "ex2_harmonized_infilled_IAMC_climateassessment.csv")
+        )
+
+    res_first = _run(os.path.join(str(tmpdir), "first"))
+
+    checkpoint_files = sorted(os.listdir(checkpoint_dir))
+    batch_sizes_files = [f for f in checkpoint_files if f.endswith("_batch_sizes.json")]
+    assert len(batch_sizes_files) == 1
+    first_batch_files = [
+        f for f in checkpoint_files if f.endswith(("_data.csv", "_meta.csv"))
+    ]
+    # the first batch measures the memory, then the remaining scenarios fit in
+    # one batch
+    assert len(first_batch_files) == 4
+
+    # simulate the first run having been interrupted before the last batch
+    # was saved, the memory measured by the first run is known in this process
+    # so the batch sizes would differ without the saved batch sizes
+    last_batch_meta = max(
+        (f for f in first_batch_files if f.endswith("_meta.csv")),
+        key=lambda f: os.path.getmtime(os.path.join(checkpoint_dir, f)),
+    )
+    os.remove(os.path.join(checkpoint_dir, last_batch_meta))
+    mtimes = {
+        f: os.path.getmtime(os.path.join(checkpoint_dir, f))
+        for f in first_batch_files
+        if not f.startswith(last_batch_meta.replace("_meta.csv", ""))
+    }
+
+    res_resumed = _run(os.path.join(str(tmpdir), "resumed"))
+
+    assert sorted(os.listdir(checkpoint_dir)) == checkpoint_files
+    for f, mtime in mtimes.items():
+        # finished batches are not re-run
+        assert os.path.getmtime(os.path.join(checkpoint_dir, f)) == mtime
+
+    pdt.assert_frame_equal(res_first, res_resumed)
+
+
+def test_result_cache(
+    tmpdir, test_data_dir, fair_slim_configs_filepath, fair_common_configs_filepath
+):
+    inp_file = os.path.join(
+        test_data_dir,
+        "workflow-fair",
+        "ex2_harmonized_infilled.csv",
+    )
+    cache_dir = os.path.join(str(tmpdir), "cache")
+
+    runner = CliRunner()
+    res = []
+    for run in ("first", "cached"):
+        out_dir = os.path.join(str(tmpdir), run)
+        os.mkdir(out_dir)
+        result = runner.invoke(
+            climate_assessment.cli.clim_cli,
+            [
+                inp_file,
+                out_dir,
+                "--num-cfgs",
+                1,
+                "--test-run",
+                "--model",
+                "fair",
+                "--model-version",
+                "1.6.2",
+                "--probabilistic-file",
+                fair_slim_configs_filepath,
+                "--fair-extra-config",
+                fair_common_configs_filepath,
+                "--result-cache-dir",
+                cache_dir,
+            ],
+        )
+
+        assert result.exit_code == 0, _format_traceback_and_stdout_from_click_result(
+            result
+        )
+
+        res.append(
+            pd.read_csv(
+                os.path.join(
+                    out_dir, "ex2_harmonized_infilled_IAMC_climateassessment.csv"
+                )
+            )
+        )
+
+    # a data and meta file for each scenario
+    assert len(os.listdir(cache_dir)) == 2 * res[0]["Scenario"].nunique()
+    pdt.assert_frame_equal(res[0], res[1])
+
+
+def test_several_climate_models(
+    tmpdir,
+    test_data_dir,
+    data_dir,
+    fair_slim_configs_filepath,
+    fair_common_configs_filepath,
+):
+    out_dir = str(tmpdir)
+    inp = pyam.IamDataFrame(
+        os.path.join(test_data_dir, "workflow-fair", "ex2_harmonized_infilled.csv")
+    )
+    model = "fair,ciceroscm"
+
+    res = run_climate_assessment(
+        inp,
+        "ex2",
+        out_dir,
+        model=model,
+        num_cfgs=1,
+        test_run=True,
+        scenario_batch_size=4,
+        probabilistic_file=[
+            fair_slim_configs_filepath,
+            os.path.join(data_dir, "cicero", "subset_cscm_configfile.json"),
+        ],
+        fair_extra_config=fair_common_configs_filepath,
+    )
+
+    # one row per scenario with the meta of every climate model
+    meta = res.meta
+    assert meta.index.is_unique
+    assert meta.shape[0] == len(inp.index)
+    assert not meta.isna().any().any()
+    for climate_model in ("FaIRv1.6.2", "CICERO-SCM"):
+        assert f"Exceedance Probability 1.5C ({climate_model})" in meta.columns
+
+    # the default version of each model is used for the categorisation
+    output = do_postprocess(
+        pyam.concat([inp, res]),
+        outdir=out_dir,
+        key_string="ex2",
+        prefix="AR6 climate diagnostics",
+        model=model,
+        gwp=False,
+    )
+    assert not output.meta["Category"].isna().any()
@@ -2,12 +2,15 @@ import os.path
 import traceback
 
 import numpy.testing as npt
+import pandas.testing as pdt
+import pyam
 import pytest
 import scmdata
 from click.testing import CliRunner
 
 import climate_assessment.cli
 from climate_assessment.testing import _format_traceback_and_stdout_from_click_result
+from climate_assessment.utils import columns_to_basic
 
 
 def test_workflow_no_valid(
@@ -323,3 +326,62 @@ def test_historical_eval_period_badly_formed(
         f"`period` must be a string of the form 'YYYY-YYYY' (with the first year being "
         f"less than or equal to the second), we received {hist_eval_period}"
     )
+
+
+def test_run_workflow_from_df(
+    tmpdir, test_data_dir, fair_slim_configs_filepath, fair_common_configs_filepath
+):
+    out_dir = str(tmpdir)
+    input_df = columns_to_basic(
+        pyam.IamDataFrame(os.path.join(test_data_dir, "ex2.csv"))
+    )
+    input_df.set_meta("test", name="source")
+    input_meta = input_df.meta.copy()
+
+    res = climate_assessment.cli.run_workflow_from_df(
+        input_df,
+        "ex2",
+        out_dir,
+        model="fair",
+        model_version="1.6.2",
+        probabilistic_file=fair_slim_configs_filepath,
+        num_cfgs=1,
+        fair_extra_config=fair_common_configs_filepath,
+        test_run=True,
+        infilling_database=os.path.join(
+            test_data_dir,
+            "cmip6-ssps-workflow-emissions_infillerdatabase_until2100.csv",
+        ),
+        scenario_batch_size=40,
+        save_harmonized_infilled=False,
+    )
+
+    # the caller's data is not changed
+    pdt.assert_frame_equal(input_df.meta, input_meta)
+    assert not [f for f in os.listdir(out_dir) if "harmonized_infilled" in f]
+    assert "Category" in res.meta
+    assert not res.filter(variable="*|Infilled|*").empty
+    assert not res.filter(variable="*|Surface Temperature (GSAT)*").empty
+
+    # same output as when the infilled emissions are read back from disk
+    climate_assessment.cli.run_workflow(
+        os.path.join(test_data_dir, "ex2.csv"),
+        out_dir,
+        model="fair",
+        model_version="1.6.2",
+        probabilistic_file=fair_slim_configs_filepath,
+        num_cfgs=1,
+        fair_extra_config=fair_common_configs_filepath,
+        test_run=True,
+        infilling_database=os.path.join(
+            test_data_dir,
+            "cmip6-ssps-workflow-emissions_infillerdatabase_until2100.csv",
+        ),
+        scenario_batch_size=40,
+    )
+    assert os.path.isfile(os.path.join(out_dir, "ex2_harmonized_infilled.csv"))
+    pdt.assert_frame_equal(
+        res.timeseries(),
+        pyam.IamDataFrame(os.path.join(out_dir, "ex2_alloutput.xlsx")).timeseries(),
+        check_like=True,
+    )
@@ -0,0 +1,93 @@
+import os
+
+import pandas as pd
+import pandas.testing as pdt
+
+from climate_assessment.climate.cache import ScenarioResultCache
+
+
+def _get_emissions(model, scenario, value=1.0):
+    return pd.DataFrame(
+        [
+            [model, scenario, "World", "Emissions|CO2", "Mt CO2/yr", value, 2.0],
+            [model, scenario, "World", "Emissions|CH4", "Mt CH4/yr", 3.0, 4.0],
+        ],
+        columns=["model", "scenario", "region", "variable", "unit", 2015, 2020],
+    )
+
+
+def _get_results(model, scenario):
+    res_wide = pd.DataFrame(
+        [[model, scenario, "World", "Surface Temperature", "K", 1.0, 1.1]],
+        columns=["Model", "Scenario", "Region", "Variable", "Unit", 2015, 2016],
+    )
+    meta_table = pd.DataFrame(
+        [[0.5]],
+        columns=["Exceedance Probability 1.5C (FaIRv1.6.2)"],
+        index=pd.MultiIndex.from_tuples(
+            [(model, scenario)], names=["model", "scenario"]
+        ),
+    )
+
+    return res_wide, meta_table
+
+
+def test_result_cache_key():
+    cache = ScenarioResultCache("not_used", "config")
+    key = cache.get_key(_get_emissions("model_a", "scen_a"))
+
+    # names and row order don't matter
+    assert key == cache.get_key(_get_emissions("model_b", "scen_b"))
+    assert key == cache.get_key(_get_emissions("model_a", "scen_a").iloc[::-1])
+
+    assert key != cache.get_key(_get_emissions("model_a", "scen_a", value=1.1))
+    assert key != ScenarioResultCache("not_used", "other_config").get_key(
+        _get_emissions("model_a", "scen_a")
+    )
+
+
+def test_result_cache_round_trip(tmpdir):
+    cache = ScenarioResultCache(str(tmpdir), "config")
+    key = cache.get_key(_get_emissions("model_a", "scen_a"))
+
+    assert cache.load(key, "model_a", "scen_a") is None
+
+    cache.save(key, *_get_results("model_a", "scen_a"))
+
+    # results are relabelled with the requested names
+    res_wide, meta_table = cache.load(key, "model_b", "scen_b")
+    exp_res_wide, exp_meta_table = _get_results("model_b", "scen_b")
+    pdt.assert_frame_equal(res_wide, exp_res_wide)
+    pdt.assert_frame_equal(meta_table, exp_meta_table)
+
+    assert cache.hits == 1
+    assert cache.misses == 1
+
+
+def test_result_cache_lru_eviction(tmpdir):
+    cache_dir = str(tmpdir)
+    cache = ScenarioResultCache(cache_dir, "config")
+    keys = [
+        cache.get_key(_get_emissions("model_a", "scen_a", value=v)) for v in range(3)
+    ]
+    for i, key in enumerate(keys):
+        cache.save(key, *_get_results("model_a", "scen_a"))
+        for f in os.listdir(cache_dir):
+            if f.startswith(key):
+                os.utime(os.path.join(cache_dir, f), (i, i))
+
+    entry_size = sum(
+        os.path.getsize(os.path.join(cache_dir, f))
+        for f in os.listdir(cache_dir)
+        if f.startswith(keys[0])
+    )
+
+    # use the first entry so the second is now the least recently used
+    cache.load(keys[0], "model_a", "scen_a")
+
+    cache.max_size = 2 * entry_size
+    new_key = cache.get_key(_get_emissions("model_a", "scen_a", value=10))
+    cache.save(new_key, *_get_results("model_a", "scen_a"))
+
+    remaining = {f.split("_")[0] for f in os.listdir(cache_dir)}
+    assert remaining == {keys[0], new_key}
@@ -0,0 +1,62 @@
+import pandas as pd
+import pandas.testing as pdt
+
+from climate_assessment.climate.checkpoint import (
+    get_batch_checkpoint_key,
+    get_batch_sizes_key,
+    load_batch_checkpoint,
+    load_batch_sizes,
+    save_batch_checkpoint,
+    save_batch_sizes,
+)
+
+
+def _get_scenarios(value=1.0):
+    return pd.DataFrame(
+        [["model_a", "scen_a", "World", "Emissions|CO2", "Mt CO2/yr", value, 2.0]],
+        columns=["model", "scenario", "region", "variable", "unit", 2015, 2020],
+    )
+
+
+def test_get_batch_checkpoint_key():
+    key = get_batch_checkpoint_key(_get_scenarios(), "config")
+
+    assert key == get_batch_checkpoint_key(_get_scenarios(), "config")
+    assert key != get_batch_checkpoint_key(_get_scenarios(), "other_config")
+    assert key != get_batch_checkpoint_key(_get_scenarios(value=1.1), "config")
+
+
+def test_batch_checkpoint_round_trip(tmpdir):
+    checkpoint_dir = str(tmpdir)
+    res_wide = pd.DataFrame(
+        [["model_a", "scen_a", "World", "Surface Temperature", "K", 1.0, 1.1]],
+        columns=["Model", "Scenario", "Region", "Variable", "Unit", 2015, 2016],
+    )
+    meta_table = pd.DataFrame(
+        [[0.5, 2050]],
+        columns=["Exceedance Probability 1.5C (FaIRv1.6.2)", "year (FaIRv1.6.2)"],
+        index=pd.MultiIndex.from_tuples(
+            [("model_a", "scen_a")], names=["model", "scenario"]
+        ),
+    )
+
+    assert load_batch_checkpoint(checkpoint_dir, "key") is None
+
+    save_batch_checkpoint(checkpoint_dir, "key", res_wide, meta_table)
+    res_wide_loaded, meta_table_loaded = load_batch_checkpoint(checkpoint_dir, "key")
+
+    pdt.assert_frame_equal(res_wide_loaded, res_wide)
+    pdt.assert_frame_equal(meta_table_loaded, meta_table)
+
+
+def test_batch_sizes_round_trip(tmpdir):
+    checkpoint_dir = str(tmpdir)
+    key = get_batch_sizes_key("config", 10**9, 0)
+
+    assert key != get_batch_sizes_key("config", 2 * 10**9, 0)
+    assert key != get_batch_sizes_key("config", 10**9, 1)
+    assert load_batch_sizes(checkpoint_dir, key) is None
+
+    save_batch_sizes(checkpoint_dir, key, [5, 20])
+
+    assert load_batch_sizes(checkpoint_dir, key) == [5, 20]
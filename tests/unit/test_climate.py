@@ -1,8 +1,24 @@
 import re
 
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
 import pytest
+import scmdata
+import scmdata.processing
 
-from climate_assessment.climate.post_process import check_hist_warming_period
+from climate_assessment.climate import (
+    DEFAULT_CICEROSCM_VERSION,
+    DEFAULT_FAIR_VERSION,
+    DEFAULT_MAGICC_VERSION,
+    _get_per_model_values,
+    parse_climate_models,
+)
+from climate_assessment.climate.post_process import (
+    calculate_exceedance_probabilities_and_peaks,
+    check_hist_warming_period,
+    post_process,
+)
 
 
 @pytest.mark.parametrize(
@@ -34,3 +50,181 @@ def test_check_hist_warming_period_malformed(inp):
     )
     with pytest.raises(ValueError, match=error_msg):
         check_hist_warming_period(inp)
+
+
+def test_calculate_exceedance_probabilities_and_peaks():
+    rng = np.random.default_rng(42)
+    n_runs = 7
+    years = range(2000, 2011)
+    res = scmdata.ScmRun(
+        data=rng.normal(1.5, 0.7, size=(len(years), 2 * 2 * n_runs)),
+        index=years,
+        columns={
+            "model": "iam",
+            "scenario": [s for s in ["scen_b", "scen_a"] for _ in range(2 * n_runs)],
+            "region": "World",
+            "variable": "Surface Temperature (GSAT)",
+            "unit": "K",
+            "run_id": list(range(n_runs)) * 4,
+            "climate_model": [
+                cm
+                for _ in range(2)
+                for cm in ["model_a", "model_b"]
+                for _ in range(n_runs)
+            ],
+        },
+    )
+    temp_thresholds = (1.5, 2.0)
+    peak_percentiles = (5, 33, 50, 66, 95)
+    reporting_groups = ["climate_model", "model", "scenario"]
+
+    (
+        res_probs,
+        res_probs_tss,
+        res_peaks_quantiles,
+        res_peak_years_quantiles,
+    ) = calculate_exceedance_probabilities_and_peaks(
+        res,
+        temp_thresholds=temp_thresholds,
+        peak_percentiles=peak_percentiles,
+        reporting_groups=reporting_groups,
+    )
+
+    for threshold in temp_thresholds:
+        name = f"Exceedance Probability {threshold}C"
+
+        exp_probs = scmdata.processing.calculate_exceedance_probabilities(
+            res, threshold, process_over_cols=("run_id",), output_name=name
+        )
+        exp_probs = exp_probs.reset_index(
+            list(set(exp_probs.index.names) - set(reporting_groups)), drop=True
+        )
+        pdt.assert_series_equal(res_probs[name], exp_probs, check_like=True)
+
+        exp_probs_tss = scmdata.processing.calculate_exceedance_probabilities_over_time(
+            res, threshold, process_over_cols=("run_id",), output_name=name
+        )
+        res_probs_tss_name = res_probs_tss[
+            res_probs_tss.index.get_level_values("variable") == name
+        ]
+        pdt.assert_frame_equal(
+            res_probs_tss_name.reorder_levels(exp_probs_tss.index.names),
+            exp_probs_tss,
+            check_like=True,
+        )
+
+    quantiles = np.array(peak_percentiles) / 100
+
+    exp_peaks_quantiles = (
+        scmdata.processing.calculate_peak(res)
+        .groupby(reporting_groups)
+        .quantile(quantiles)
+        .unstack()
+    )
+    pdt.assert_frame_equal(res_peaks_quantiles, exp_peaks_quantiles, check_like=True)
+
+    exp_peak_years_quantiles = (
+        scmdata.processing.calculate_peak_time(res)
+        .groupby(reporting_groups)
+        .quantile(quantiles)
+        .unstack()
+        .astype(int)
+    )
+    pdt.assert_frame_equal(
+        res_peak_years_quantiles, exp_peak_years_quantiles, check_like=True
+    )
+
+
+@pytest.mark.parametrize(
+    "model,model_version,exp",
+    (
+        ("magicc", None, [("magicc", DEFAULT_MAGICC_VERSION)]),
+        ("FaIR", "1.6.2", [("fair", "1.6.2")]),
+        (
+            "magicc,fair",
+            "v7.5.3, 1.6.2",
+            [("magicc", "v7.5.3"), ("fair", "1.6.2")],
+        ),
+        (
+            ["fair", "ciceroscm"],
+            None,
+            [("fair", DEFAULT_FAIR_VERSION), ("ciceroscm", DEFAULT_CICEROSCM_VERSION)],
+        ),
+    ),
+)
+def test_parse_climate_models(model, model_version, exp):
+    assert parse_climate_models(model, model_version) == exp
+
+
+@pytest.mark.parametrize(
+    "model,model_version,error_msg",
+    (
+        ("magicc,hector", None, "Unknown climate model(s): ['hector']"),
+        ("fair,FaIR", None, "Climate models must only be given once"),
+        ("magicc,fair", "v7.5.3", "`model_version` must have one value for each"),
+    ),
+)
+def test_parse_climate_models_error(model, model_version, error_msg):
+    with pytest.raises(ValueError, match=re.escape(error_msg)):
+        parse_climate_models(model, model_version)
+
+
+def test_get_per_model_values():
+    models = ["magicc", "fair"]
+
+    assert _get_per_model_values(("a.json", "b.json"), models, "f") == [
+        "a.json",
+        "b.json",
+    ]
+    assert _get_per_model_values(10, models, "n", broadcast=True) == [10, 10]
+
+    with pytest.raises(ValueError, match="`f` must have one value for each"):
+        _get_per_model_values("a.json", models, "f")
+
+
+def test_post_process_several_climate_models(tmpdir):
+    climate_models = ["model_a", "model_b"]
+    variables = {
+        "Surface Air Temperature Change": "K",
+        "Effective Radiative Forcing|CO2": "W/m^2",
+        "Effective Radiative Forcing|Greenhouse Gases": "W/m^2",
+        "Effective Radiative Forcing|Anthropogenic": "W/m^2",
+    }
+    meta = pd.DataFrame(
+        [
+            (climate_model, "iam", scenario, "World", variable, unit, run_id)
+            for climate_model in climate_models
+            for scenario in ["scen_a", "scen_b"]
+            for variable, unit in variables.items()
+            for run_id in range(10)
+        ],
+        columns=[
+            "climate_model",
+            "model",
+            "scenario",
+            "region",
+            "variable",
+            "unit",
+            "run_id",
+        ],
+    )
+    years = range(1850, 2101)
+    rng = np.random.default_rng(0)
+    res = scmdata.ScmRun(
+        data=np.linspace(0, 3, len(years))[:, np.newaxis]
+        * rng.uniform(0.5, 1.5, size=meta.shape[0]),
+        index=years,
+        columns=meta.to_dict("list"),
+    )
+
+    _, res_percentiles, meta_table = post_process(res, str(tmpdir), return_raw=False)
+
+    # one row per model and scenario with the columns of every climate model
+    assert meta_table.index.names == ["model", "scenario"]
+    assert meta_table.index.tolist() == [("iam", "scen_a"), ("iam", "scen_b")]
+    assert not meta_table.isna().any().any()
+    for climate_model in climate_models:
+        assert f"Exceedance Probability 1.5C ({climate_model})" in meta_table.columns
+        assert f"median peak warming ({climate_model})" in meta_table.columns
+
+    assert meta_table.loc[[("iam", "scen_a")]].shape[0] == 1
@@ -0,0 +1,114 @@
+import os.path
+
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+
+from climate_assessment.climate.combine import (
+    read_combined_output,
+    streaming_batch_combiner,
+)
+from climate_assessment.output import read_iamc
+
+
+def _get_batch(scenario):
+    res_wide = pd.DataFrame(
+        [
+            ["model_a", scenario, "World", "Surface Temperature", "K", 1.0, 1.1],
+            ["model_a", scenario, "World", "Heat Uptake", "W/m^2", 2.0, 2.1],
+        ],
+        columns=["Model", "Scenario", "Region", "Variable", "Unit", 2015, 2016],
+    )
+    meta_table = pd.DataFrame(
+        [[0.5, 1.6]],
+        columns=[
+            "Exceedance Probability 1.5C (FaIRv1.6.2)",
+            "median peak warming (FaIRv1.6.2)",
+        ],
+        index=pd.MultiIndex.from_tuples(
+            [("model_a", scenario)], names=["model", "scenario"]
+        ),
+    )
+
+    return res_wide, meta_table
+
+
+def test_streaming_batch_combiner(tmpdir):
+    out_csv = os.path.join(tmpdir, "ex_IAMC_climateassessment.csv")
+    out_meta_csv = os.path.join(tmpdir, "ex_exceedance_probabilities.csv")
+    out_stem = os.path.join(tmpdir, "ex_IAMC_climateassessment")
+    out_meta_stem = os.path.join(tmpdir, "ex_full_exceedance_probabilities")
+    out_xlsx = f"{out_stem}.xlsx"
+    out_meta_xlsx = f"{out_meta_stem}.xlsx"
+
+    batches = [_get_batch("scen_a"), _get_batch("scen_b")]
+    with streaming_batch_combiner(
+        out_csv, out_meta_csv, out_stem, out_meta_stem, prefix="prefix"
+    ) as append_batch:
+        for res_wide, meta_table in batches:
+            append_batch(res_wide, meta_table)
+
+    exp_data = pd.concat([b[0] for b in batches], ignore_index=True)
+    exp_data["Variable"] = "prefix|" + exp_data["Variable"]
+    exp_meta = pd.concat([b[1] for b in batches])
+
+    res_data = pd.read_csv(out_csv)
+    res_data.columns = exp_data.columns
+    pdt.assert_frame_equal(res_data, exp_data)
+
+    res_data_xlsx = pd.read_excel(out_xlsx, sheet_name="data")
+    res_data_xlsx.columns = exp_data.columns
+    # xlsx doesn't distinguish between whole-number floats and ints
+    pdt.assert_frame_equal(res_data_xlsx, exp_data, check_dtype=False)
+
+    res_meta_sheet = pd.read_excel(out_xlsx, sheet_name="meta")
+    assert res_meta_sheet["Scenario"].tolist() == ["scen_a", "scen_b"]
+
+    res_meta_xlsx = pd.read_excel(out_meta_xlsx, index_col=0)
+    assert res_meta_xlsx.index.tolist() == [0, 1]
+    assert res_meta_xlsx["scenario"].tolist() == ["scen_a", "scen_b"]
+    assert res_meta_xlsx["exclude"].isnull().all()
+
+    res = read_combined_output(out_csv, out_meta_csv)
+    assert sorted(res.scenario) == ["scen_a", "scen_b"]
+    pdt.assert_frame_equal(res.meta, exp_meta, check_like=True)
+
+
+@pytest.mark.parametrize("output_format", ["parquet", "feather"])
+def test_streaming_batch_combiner_arrow_formats(tmpdir, output_format):
+    pytest.importorskip("pyarrow")
+
+    out_csv = os.path.join(tmpdir, "ex_IAMC_climateassessment.csv")
+    out_meta_csv = os.path.join(tmpdir, "ex_exceedance_probabilities.csv")
+    out_stem = os.path.join(tmpdir, "ex_IAMC_climateassessment")
+    out_meta_stem = os.path.join(tmpdir, "ex_full_exceedance_probabilities")
+
+    batches = [_get_batch("scen_a"), _get_batch("scen_b")]
+    with streaming_batch_combiner(
+        out_csv,
+        out_meta_csv,
+        out_stem,
+        out_meta_stem,
+        prefix="prefix",
+        output_formats=[output_format],
+    ) as append_batch:
+        for res_wide, meta_table in batches:
+            append_batch(res_wide, meta_table)
+
+    assert not os.path.exists(f"{out_stem}.xlsx")
+    assert not os.path.exists(f"{out_meta_stem}.xlsx")
+
+    if output_format == "parquet":
+        # partitioned by model and scenario
+        assert os.path.isdir(
+            os.path.join(f"{out_stem}.parquet", "Model=model_a", "Scenario=scen_b")
+        )
+
+    res = read_iamc(f"{out_stem}.{output_format}")
+    exp = read_combined_output(out_csv, out_meta_csv)
+    pdt.assert_frame_equal(res.timeseries().sort_index(), exp.timeseries().sort_index())
+    pdt.assert_frame_equal(res.meta, exp.meta, check_like=True)
+
+    read = pd.read_parquet if output_format == "parquet" else pd.read_feather
+    res_meta = read(f"{out_meta_stem}.{output_format}")
+    assert res_meta["scenario"].tolist() == ["scen_a", "scen_b"]
@@ -0,0 +1,161 @@
+import json
+import os.path
+
+import numpy as np
+import numpy.testing as npt
+
+from climate_assessment.climate.config_cache import get_cached_configurations
+from climate_assessment.climate.fair import _build_fair_configurations
+
+
+class _Builder:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+
+        return [{"run_id": 0, "value": 1.0}]
+
+
+def _write_json(path, content):
+    with open(path, "w") as fh:
+        json.dump(content, fh)
+
+    return path
+
+
+def test_get_cached_configurations(tmpdir):
+    cache_dir = str(tmpdir.join("cache"))
+    probabilistic_file = _write_json(str(tmpdir.join("cfgs.json")), [{"a": 1}])
+    build = _Builder()
+
+    res = get_cached_configurations(
+        cache_dir, "model", build, files=(probabilistic_file,), num_cfgs=1
+    )
+    res_cached = get_cached_configurations(
+        cache_dir, "model", build, files=(probabilistic_file,), num_cfgs=1
+    )
+
+    assert res == res_cached == [{"run_id": 0, "value": 1.0}]
+    assert build.calls == 1
+
+
+def test_get_cached_configurations_key_changes(tmpdir):
+    cache_dir = str(tmpdir.join("cache"))
+    probabilistic_file = _write_json(str(tmpdir.join("cfgs.json")), [{"a": 1}])
+    build = _Builder()
+
+    get_cached_configurations(
+        cache_dir, "model", build, files=(probabilistic_file,), num_cfgs=1
+    )
+    get_cached_configurations(
+        cache_dir, "model", build, files=(probabilistic_file,), num_cfgs=2
+    )
+    get_cached_configurations(
+        cache_dir, "other_model", build, files=(probabilistic_file,), num_cfgs=1
+    )
+    _write_json(probabilistic_file, [{"a": 2}])
+    get_cached_configurations(
+        cache_dir, "model", build, files=(probabilistic_file,), num_cfgs=1
+    )
+
+    assert build.calls == 4
+
+
+def test_get_cached_configurations_no_cache_dir():
+    build = _Builder()
+
+    get_cached_configurations(None, "model", build)
+    get_cached_configurations(None, "model", build)
+
+    assert build.calls == 2
+
+
+def test_get_cached_configurations_corrupt(tmpdir):
+    cache_dir = str(tmpdir)
+    build = _Builder()
+
+    get_cached_configurations(cache_dir, "model", build, num_cfgs=1)
+    (cache_file,) = [f for f in os.listdir(cache_dir) if f.endswith(".pkl")]
+    with open(os.path.join(cache_dir, cache_file), "wb") as fh:
+        fh.write(b"")
+
+    res = get_cached_configurations(cache_dir, "model", build, num_cfgs=1)
+
+    assert res == [{"run_id": 0, "value": 1.0}]
+    assert build.calls == 2
+
+
+def test_build_fair_configurations(tmpdir):
+    cfg_raw = {
+        "F2x": 3.7,
+        "r0": 35.0,
+        "rt": 4.0,
+        "rc": 0.02,
+        "lambda_global": -0.5,
+        "ocean_heat_capacity": [8.0, 100.0],
+        "ocean_heat_exchange": 0.7,
+        "deep_ocean_efficacy": 1.2,
+        "b_aero": [0.1, 0.2, 0.3, 0.4],
+        "ghan_params": [1.0, 2.0, 3.0],
+        "scale": [1.1, 1.2, 1.3, 1.4, 1.5, 1.6, 1.7, 1.8, 0.5],
+        "C_pi_CO2": 278.0,
+        "b_tro3": [0.1] * 6,
+        "ozone_feedback": -0.03,
+        "trend_solar": 0.1,
+    }
+    cfgs_common = {
+        "E_pi": list(range(1, 8)),
+        "C_pi": [722.0, 270.0, 0.0, 34.0, 0.02, 3.0, 8.0],
+        "cfc11_adj": 2.0,
+        "cfc12_adj": 3.0,
+        "default_solar": np.linspace(0, 1, 361).tolist(),
+        "default_volcanic": [0.0] * 361,
+        "ghg_forcing": "Meinshausen",
+        "aCO2land": 0.0006,
+        "stwv_from_ch4": 0.079,
+        "F_ref_BC": 0.08,
+        "E_ref_BC": 6.1,
+        "tropO3_forcing": "thornhill-skeie",
+        "natural": [[209.0, 11.0]] * 361,
+    }
+    probabilistic_file = _write_json(
+        str(tmpdir.join("fair.json")),
+        [cfg_raw, {**cfg_raw, "scale": [2.0] * 9, "trend_solar": -0.2}],
+    )
+    extra_config = _write_json(str(tmpdir.join("common.json")), cfgs_common)
+
+    res = _build_fair_configurations(probabilistic_file, extra_config, num_cfgs=1)
+
+    assert len(res) == 1
+    cfg = res[0]
+    assert cfg["run_id"] == 0
+    assert cfg["b_aero"] == [0.1, 0.0, 0.0, 0.0, 0.2, 0.3, 0.4]
+    assert cfg["E_pi"] == [0] * 5 + list(range(1, 8)) + [0] * 28
+
+    exp_scale = [1.0] * 45
+    exp_scale[1:3] = [1.1, 1.2]
+    exp_scale[3:31] = [1.3] * 28
+    exp_scale[15] *= 2.0
+    exp_scale[16] *= 3.0
+    exp_scale[33] = 1.4
+    exp_scale[34] = 1.5
+    exp_scale[41:44] = [1.6, 1.7, 1.8]
+    npt.assert_allclose(cfg["scale"], exp_scale)
+
+    exp_c_pi = [0.0] * 31
+    exp_c_pi[0] = 278.0
+    for idx, value in zip([1, 2, 3, 20, 25, 29, 30], cfgs_common["C_pi"]):
+        exp_c_pi[idx] = value
+    npt.assert_allclose(cfg["C_pi"], exp_c_pi)
+
+    default_solar = np.array(cfgs_common["default_solar"])
+    exp_f_solar = np.concatenate(
+        [
+            np.linspace(0, 0.1, 270) + default_solar[:270] * 0.5,
+            0.1 + default_solar[270:351] * 0.5,
+            default_solar[351:],
+        ]
+    )
+    npt.assert_allclose(cfg["F_solar"], exp_f_solar)
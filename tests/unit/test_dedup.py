@@ -0,0 +1,113 @@
+import datetime as dt
+
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+
+from climate_assessment.climate.dedup import (
+    add_duplicate_scenario_results,
+    find_duplicate_scenarios,
+)
+
+
+def _get_scenario(model, scenario, co2, ch4=3.0):
+    return pd.DataFrame(
+        [
+            [model, scenario, "World", "Emissions|CO2", "Mt CO2/yr", co2, 2.0],
+            [model, scenario, "World", "Emissions|CH4", "Mt CH4/yr", ch4, 4.0],
+        ],
+        columns=[
+            "model",
+            "scenario",
+            "region",
+            "variable",
+            "unit",
+            dt.datetime(2015, 1, 1),
+            dt.datetime(2020, 1, 1),
+        ],
+    )
+
+
+@pytest.mark.parametrize(
+    "rtol,exp_duplicates",
+    (
+        (0, {("model_a", "scen_a"): [("model_b", "scen_a")]}),
+        (
+            1e-3,
+            {
+                ("model_a", "scen_a"): [
+                    ("model_b", "scen_a"),
+                    ("model_a", "scen_close"),
+                ]
+            },
+        ),
+    ),
+)
+def test_find_duplicate_scenarios(rtol, exp_duplicates):
+    scenarios = pd.concat(
+        [
+            _get_scenario("model_a", "scen_a", 1.0),
+            _get_scenario("model_a", "scen_b", 1.1),
+            # same emissions, different row order
+            _get_scenario("model_b", "scen_a", 1.0).iloc[::-1],
+            _get_scenario("model_a", "scen_close", 1.0 + 1e-5),
+            _get_scenario("model_a", "scen_ch4", 1.0, ch4=3.1),
+        ],
+        ignore_index=True,
+    )
+
+    res, duplicates = find_duplicate_scenarios(scenarios, rtol=rtol)
+
+    assert duplicates == exp_duplicates
+    exp_dropped = [label for v in exp_duplicates.values() for label in v]
+    exp = scenarios[
+        ~scenarios[["model", "scenario"]].apply(tuple, axis=1).isin(exp_dropped)
+    ]
+    pdt.assert_frame_equal(res, exp)
+
+
+def test_add_duplicate_scenario_results():
+    res_wide = pd.DataFrame(
+        [
+            ["model_a", "scen_a", "World", "Surface Temperature", "K", 1.0],
+            ["model_a", "scen_b", "World", "Surface Temperature", "K", 2.0],
+        ],
+        columns=["Model", "Scenario", "Region", "Variable", "Unit", 2015],
+    )
+    meta_table = pd.DataFrame(
+        [[0.5], [0.7]],
+        columns=["Exceedance Probability 1.5C (FaIRv1.6.2)"],
+        index=pd.MultiIndex.from_tuples(
+            [("model_a", "scen_a"), ("model_a", "scen_b")],
+            names=["model", "scenario"],
+        ),
+    )
+    duplicates = {
+        ("model_a", "scen_a"): [("model_0", "scen_z")],
+        # not in this batch
+        ("model_c", "scen_c"): [("model_d", "scen_d")],
+    }
+
+    res_wide_out, meta_table_out = add_duplicate_scenario_results(
+        res_wide, meta_table, duplicates
+    )
+
+    exp_res_wide = pd.DataFrame(
+        [
+            ["model_0", "scen_z", "World", "Surface Temperature", "K", 1.0],
+            ["model_a", "scen_a", "World", "Surface Temperature", "K", 1.0],
+            ["model_a", "scen_b", "World", "Surface Temperature", "K", 2.0],
+        ],
+        columns=res_wide.columns,
+    )
+    pdt.assert_frame_equal(res_wide_out, exp_res_wide)
+
+    exp_meta_table = pd.DataFrame(
+        [[0.5], [0.5], [0.7]],
+        columns=meta_table.columns,
+        index=pd.MultiIndex.from_tuples(
+            [("model_0", "scen_z"), ("model_a", "scen_a"), ("model_a", "scen_b")],
+            names=["model", "scenario"],
+        ),
+    )
+    pdt.assert_frame_equal(meta_table_out, exp_meta_table)
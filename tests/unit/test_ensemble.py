@@ -0,0 +1,164 @@
+import numpy as np
+import numpy.testing as npt
+import pandas.testing as pdt
+import pytest
+import scmdata
+
+from climate_assessment.climate.ensemble import DenseEnsemble
+
+
+def _get_ensemble_scmrun(n_runs=5):
+    rng = np.random.default_rng(0)
+    years = range(2000, 2011)
+    variables = ["Surface Temperature", "Effective Radiative Forcing"]
+    scenarios = ["scen_b", "scen_a"]
+
+    return scmdata.ScmRun(
+        data=rng.normal(1.0, 0.5, size=(len(years), 2 * 2 * n_runs)),
+        index=years,
+        columns={
+            "climate_model": "model_a",
+            "model": "iam",
+            "scenario": [
+                s for _ in variables for s in scenarios for _ in range(n_runs)
+            ],
+            "region": "World",
+            "variable": [v for v in variables for _ in range(2 * n_runs)],
+            "unit": [u for u in ["K", "W/m^2"] for _ in range(2 * n_runs)],
+            "run_id": list(range(n_runs)) * 4,
+        },
+    )
+
+
+def _assert_timeseries_equal(res, exp):
+    res = res.reorder_levels(exp.index.names).sort_index()
+    pdt.assert_frame_equal(res, exp.sort_index())
+
+
+def test_dense_ensemble_round_trip():
+    start = _get_ensemble_scmrun()
+
+    ensemble = DenseEnsemble.from_scmrun(start)
+    assert ensemble.variables == ["Effective Radiative Forcing", "Surface Temperature"]
+    assert ensemble["Surface Temperature"].shape == (2, 5, 11)
+    npt.assert_array_equal(ensemble.years, np.arange(2000, 2011))
+
+    _assert_timeseries_equal(ensemble.to_scmrun().timeseries(), start.timeseries())
+
+
+def test_dense_ensemble_mixed_units():
+    start = _get_ensemble_scmrun()
+    mixed = scmdata.run_append(
+        [
+            start.filter(variable="Surface Temperature", scenario="scen_a"),
+            start.filter(
+                variable="Surface Temperature", scenario="scen_b"
+            ).convert_unit("mK"),
+        ]
+    )
+
+    ensemble = DenseEnsemble.from_scmrun(mixed)
+    assert ensemble.units == {"Surface Temperature": "K"}
+    _assert_timeseries_equal(
+        ensemble.to_scmrun().timeseries(),
+        start.filter(variable="Surface Temperature").timeseries(),
+    )
+
+
+def test_dense_ensemble_incomplete_error():
+    start = _get_ensemble_scmrun()
+
+    error_msg = (
+        "Every variable must be reported exactly once for every group and run_id to "
+        "create a dense ensemble"
+    )
+    with pytest.raises(ValueError, match=error_msg):
+        DenseEnsemble.from_scmrun(start.filter(run_id=0, keep=False, scenario="scen_a"))
+
+
+def test_dense_ensemble_allow_missing():
+    start = _get_ensemble_scmrun()
+    incomplete = start.filter(run_id=0, keep=False, scenario="scen_a")
+
+    ensemble = DenseEnsemble.from_scmrun(incomplete, allow_missing=True)
+    assert ensemble["Surface Temperature"].shape == (2, 5, 11)
+
+    scen_a_idx = ensemble.groups.get_level_values("scenario").get_loc("scen_a")
+    assert np.isnan(ensemble["Surface Temperature"][scen_a_idx, 0, :]).all()
+    assert not np.isnan(ensemble["Surface Temperature"][scen_a_idx, 1:, :]).any()
+
+    res = ensemble.to_scmrun().timeseries().dropna(how="all")
+    _assert_timeseries_equal(res, incomplete.timeseries())
+
+
+def test_dense_ensemble_duplicates_error():
+    start = _get_ensemble_scmrun()
+    # scmdata merges exact duplicates, but the same data in another unit is a
+    # duplicate once converted to a common unit
+    duplicated = scmdata.run_append(
+        [
+            start,
+            start.filter(
+                run_id=0, scenario="scen_a", variable="Surface Temperature"
+            ).convert_unit("mK"),
+        ]
+    )
+
+    with pytest.raises(ValueError, match="reported exactly once"):
+        DenseEnsemble.from_scmrun(duplicated, allow_missing=True)
+
+
+def test_dense_ensemble_convert_unit_and_filter_years():
+    start = _get_ensemble_scmrun()
+
+    ensemble = DenseEnsemble.from_scmrun(start)
+    ensemble.convert_unit("Surface Temperature", "mK")
+    ensemble = ensemble.filter_years(range(2005, 2101))
+
+    exp = (
+        start.convert_unit("mK", variable="Surface Temperature")
+        .filter(year=range(2005, 2101))
+        .timeseries()
+    )
+    _assert_timeseries_equal(ensemble.to_scmrun().timeseries(), exp)
+
+
+@pytest.mark.parametrize("n_runs", (1, 5, 12))
+def test_dense_ensemble_quantiles_over_members(n_runs):
+    start = _get_ensemble_scmrun(n_runs=n_runs)
+    quantiles = [0.05, 1 / 6, 0.5, 0.67, 0.95]
+
+    res = DenseEnsemble.from_scmrun(start).quantiles_over_members(quantiles)
+
+    exp = start.quantiles_over("run_id", quantiles)
+    # scmdata returns the time axis as an object Index
+    pdt.assert_frame_equal(
+        res.reorder_levels(exp.index.names),
+        exp,
+        check_like=True,
+        check_names=False,
+        check_column_type=False,
+    )
+
+
+def test_dense_ensemble_quantiles_over_members_skips_nan():
+    start = _get_ensemble_scmrun()
+    ts = start.timeseries()
+    ts.iloc[0, 3] = np.nan
+    start = scmdata.ScmRun(ts)
+    quantiles = [0.05, 0.5, 0.95]
+
+    res = DenseEnsemble.from_scmrun(start).quantiles_over_members(quantiles)
+
+    exp = (
+        start.timeseries()
+        .groupby(start.get_meta_columns_except("run_id"))
+        .quantile(quantiles)
+    )
+    exp.index = exp.index.set_names("quantile", level=-1)
+    pdt.assert_frame_equal(
+        res.reorder_levels(exp.index.names),
+        exp,
+        check_like=True,
+        check_names=False,
+    )
@@ -0,0 +1,293 @@
+import aneris.convenience
+import aneris.methods
+import numpy as np
+import numpy.testing as npt
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+
+from climate_assessment.harmonization import _drop_broken_stuff
+from climate_assessment.harmonization.native import (
+    choose_default_methods,
+    get_harmonisation_methods,
+    get_history_statistics,
+    harmonise_native,
+    parse_native_method,
+)
+
+HARMONISATION_YEAR = 2015
+INDEX_NAMES = ["model", "scenario", "region", "variable", "unit"]
+
+
+@pytest.mark.parametrize(
+    "method,exp",
+    (
+        ("constant_ratio", ("ratio", None)),
+        ("constant_offset", ("offset", None)),
+        ("reduce_ratio_2080", ("ratio", 2080)),
+        ("reduce_offset_2050", ("offset", 2050)),
+        ("reduce_ratio_2150_cov", ("ratio", 2150)),
+        ("reduce_offset_2150_cov", ("offset", 2150)),
+        ("reduce_ratio_2085", None),
+        ("reduce_ratio_2150", ("ratio", 2150)),
+        ("reduce_offset_2080_cov", None),
+        ("model_zero", ("offset", None)),
+        ("hist_zero", ("unchanged", None)),
+        ("budget", None),
+        ("unicorn", None),
+    ),
+)
+def test_parse_native_method(method, exp):
+    assert parse_native_method(method) == exp
+
+
+def _get_timeseries(rows, years):
+    return pd.DataFrame(
+        [r[1] for r in rows],
+        index=pd.MultiIndex.from_tuples([r[0] for r in rows], names=INDEX_NAMES),
+        columns=years,
+    )
+
+
+@pytest.fixture
+def history():
+    years = list(range(2010, 2020))
+    rows = [
+        (("hist", "hist", "World", variable, unit), np.linspace(start, end, 10))
+        for variable, unit, start, end in (
+            ("Emissions|CO2", "Mt CO2/yr", 30, 35),
+            ("Emissions|CO", "Mt CO/yr", 900, 850),
+            ("Emissions|SF6", "kt SF6/yr", 8, 9),
+            ("Emissions|CO2|AFOLU", "Mt CO2/yr", 5, 3),
+            ("Emissions|CH4", "Mt CH4/yr", 380, 390),
+        )
+    ]
+
+    return _get_timeseries(rows, years)
+
+
+@pytest.fixture
+def scenarios():
+    years = list(range(HARMONISATION_YEAR, 2101))
+    rows = []
+    for scenario, scale in (("low", 0.8), ("high", 1.3)):
+        for variable, unit, start in (
+            ("Emissions|CO2", "Mt CO2/yr", 36),
+            ("Emissions|CO", "Mt CO/yr", 800),
+            ("Emissions|SF6", "kt SF6/yr", 7),
+            ("Emissions|CO2|AFOLU", "Mt CO2/yr", 4),
+            ("Emissions|CH4", "Mt CH4/yr", 400),
+        ):
+            rows.append(
+                (
+                    ("model", scenario, "World", variable, unit),
+                    np.linspace(start, start * scale - 2, len(years)),
+                )
+            )
+
+    return _get_timeseries(rows, years)
+
+
+@pytest.fixture
+def overrides():
+    return pd.DataFrame(
+        [
+            {"method": "reduce_ratio_2080", "variable": "Emissions|CO2"},
+            {"method": "reduce_ratio_2150_cov", "variable": "Emissions|CO"},
+            {"method": "constant_ratio", "variable": "Emissions|SF6"},
+            {"method": "reduce_offset_2150_cov", "variable": "Emissions|CO2|AFOLU"},
+        ]
+    )
+
+
+def test_harmonise_native_matches_aneris(scenarios, history, overrides):
+    res, remaining = harmonise_native(scenarios, history, HARMONISATION_YEAR, overrides)
+
+    assert remaining.empty
+    assert len(res) == len(scenarios)
+
+    exp = _drop_broken_stuff(
+        aneris.convenience.harmonise_all(
+            scenarios,
+            history=history,
+            harmonisation_year=HARMONISATION_YEAR,
+            overrides=overrides,
+        )
+    )
+    exp.columns = exp.columns.astype(int)
+
+    pdt.assert_frame_equal(res, exp.loc[res.index], check_exact=True)
+    np.testing.assert_allclose(
+        res[HARMONISATION_YEAR].values,
+        history.reset_index(["model", "scenario", "unit"], drop=True)
+        .reindex(res.index.droplevel(["model", "scenario", "unit"]))[HARMONISATION_YEAR]
+        .values,
+    )
+
+
+def test_harmonise_native_falls_back(scenarios, history, overrides):
+    scenarios = scenarios.copy()
+    zero = scenarios.index.get_level_values("variable") == "Emissions|SF6"
+    scenarios.loc[zero, HARMONISATION_YEAR] = 0
+    nan = scenarios.index.get_level_values("variable") == "Emissions|CO"
+    scenarios.loc[nan, 2050] = np.nan
+
+    history = history[
+        history.index.get_level_values("variable") != "Emissions|CO2|AFOLU"
+    ]
+
+    res, remaining = harmonise_native(scenarios, history, HARMONISATION_YEAR, overrides)
+
+    assert sorted(res.index.get_level_values("variable").unique()) == [
+        "Emissions|CH4",
+        "Emissions|CO2",
+    ]
+    assert sorted(remaining.index.get_level_values("variable").unique()) == [
+        "Emissions|CO",
+        "Emissions|CO2|AFOLU",
+        "Emissions|SF6",
+    ]
+
+
+def test_harmonise_native_other_overrides(scenarios, history):
+    overrides = pd.DataFrame(
+        [{"method": "constant_ratio", "variable": "Emissions|CO2", "region": "World"}]
+    )
+
+    res, remaining = harmonise_native(scenarios, history, HARMONISATION_YEAR, overrides)
+
+    assert res.empty
+    pdt.assert_frame_equal(remaining, scenarios)
+
+
+@pytest.mark.parametrize(
+    "hist_values,model_values,exp",
+    (
+        ([2, 1, 0, 1, 2], [0, 1, 2], "hist_zero"),
+        ([2, 2, 3, 3, 4], [0, 0, 0], "model_zero"),
+        ([2, 2, 3, 3, 4], [0, -1, 2], "unicorn"),
+        ([2, 2, 3, 3, 4], [0, -1, -2], "reduce_offset_2080"),
+        ([2, 2, 3, 3, 4], [0, 1, 2], "constant_offset"),
+        ([2, 5, 3, 1, 2.5], [3, 2, 1], "reduce_offset_2150_cov"),
+        ([2, 2, 3, 3, 4], [4, 2, 1], "reduce_ratio_2080"),
+        ([2, 2, 3, 3, 4], [9, 2, -1], "reduce_ratio_2100"),
+        ([2, 2, 3, 3, 4], [9, 2, 1], "constant_ratio"),
+    ),
+)
+def test_choose_default_methods(hist_values, model_values, exp):
+    idx = pd.MultiIndex.from_tuples(
+        [("model", "scenario", "World", "Emissions|CH4", "Mt CH4/yr")],
+        names=INDEX_NAMES,
+    )
+    hist = pd.DataFrame(
+        [hist_values], index=idx, columns=range(2013, 2018), dtype=float
+    )
+    model = pd.DataFrame(
+        [model_values], index=idx, columns=[2015, 2050, 2100], dtype=float
+    )
+
+    aneris_methods, _ = aneris.methods.default_methods(
+        hist, model, base_year=HARMONISATION_YEAR
+    )
+    assert aneris_methods.tolist() == [exp]
+
+    stats = get_history_statistics(hist, HARMONISATION_YEAR)
+    res = choose_default_methods(
+        model.to_numpy(),
+        model[HARMONISATION_YEAR].to_numpy(),
+        stats["h"].to_numpy(),
+        stats["cov"].to_numpy(),
+    )
+    assert res.tolist() == [exp]
+
+
+def test_choose_default_methods_many_timeseries():
+    rng = np.random.default_rng(0)
+    n_timeseries = 300
+    idx = pd.MultiIndex.from_tuples(
+        [
+            ("model", f"scenario_{i}", "World", f"Emissions|{i}", "Mt/yr")
+            for i in range(n_timeseries)
+        ],
+        names=INDEX_NAMES,
+    )
+    hist = pd.DataFrame(
+        rng.uniform(1, 10, size=(n_timeseries, 5)), index=idx, columns=range(2013, 2018)
+    )
+    # very variable histories and zero history in the harmonisation year
+    hist.iloc[::7] = rng.normal(0, 5, size=hist.iloc[::7].shape)
+    hist.iloc[::11, 2] = 0
+
+    model = pd.DataFrame(
+        rng.uniform(-5, 15, size=(n_timeseries, 3)),
+        index=idx,
+        columns=[2015, 2050, 2100],
+    )
+    # zero model in the harmonisation year or throughout
+    model.iloc[::5, 0] = 0
+    model.iloc[::13] = 0
+    # models close to the history
+    close = hist.iloc[::3][[HARMONISATION_YEAR]].to_numpy()
+    model.iloc[::3] = close * rng.uniform(0.8, 1.2, size=(close.shape[0], 3))
+
+    aneris_methods, _ = aneris.methods.default_methods(
+        hist, model, base_year=HARMONISATION_YEAR
+    )
+    # every branch of the decision tree is tested
+    assert set(aneris_methods) == {
+        "hist_zero",
+        "model_zero",
+        "unicorn",
+        "reduce_offset_2080",
+        "constant_offset",
+        "reduce_offset_2150_cov",
+        "reduce_ratio_2080",
+        "reduce_ratio_2100",
+        "constant_ratio",
+    }
+
+    stats = get_history_statistics(hist, HARMONISATION_YEAR)
+    res = choose_default_methods(
+        model.to_numpy(),
+        model[HARMONISATION_YEAR].to_numpy(),
+        stats["h"].to_numpy(),
+        stats["cov"].to_numpy(),
+    )
+    npt.assert_array_equal(res, aneris_methods.to_numpy())
+
+
+def test_get_harmonisation_methods(scenarios, history, overrides):
+    overrides = pd.concat(
+        [
+            overrides,
+            pd.DataFrame([{"method": "constant_offset", "variable": "Emissions|SF6"}]),
+        ]
+    )
+    history = history[
+        history.index.get_level_values("variable") != "Emissions|CO2|AFOLU"
+    ]
+
+    res = get_harmonisation_methods(
+        scenarios,
+        get_history_statistics(history, HARMONISATION_YEAR),
+        HARMONISATION_YEAR,
+        overrides,
+    )
+
+    res = res.xs("low", level="scenario").reset_index("variable")
+    assert res.set_index("variable")["method"].to_dict() == {
+        "Emissions|CO2": "reduce_ratio_2080",
+        "Emissions|CO": "reduce_ratio_2150_cov",
+        # ambiguous override
+        "Emissions|SF6": None,
+        # an override doesn't need history
+        "Emissions|CO2|AFOLU": "reduce_offset_2150_cov",
+        "Emissions|CH4": "reduce_ratio_2080",
+    }
+    assert res.set_index("variable")["source"].to_dict() == {
+        "Emissions|CO2": "override",
+        "Emissions|CO": "override",
+        "Emissions|SF6": "override",
+        "Emissions|CO2|AFOLU": "override",
+        "Emissions|CH4": "default",
+    }
@@ -0,0 +1,100 @@
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+import scmdata
+
+import climate_assessment.history
+from climate_assessment.history import (
+    HISTORY_INDEX,
+    clear_history_registry,
+    get_harmonization_history,
+    get_historical_values,
+    get_history,
+    get_history_file,
+)
+
+
+@pytest.fixture(autouse=True)
+def empty_registry():
+    clear_history_registry()
+    yield
+    clear_history_registry()
+
+
+@pytest.mark.parametrize("instance", ("ar6", "sr15"))
+def test_get_history(instance):
+    res = get_history(instance)
+
+    assert res.index.names == HISTORY_INDEX
+    assert res.columns[0] == 1750
+    assert res.columns[-1] == 2015
+
+    pdt.assert_frame_equal(
+        res.reset_index(),
+        pd.read_csv(get_history_file(instance))
+        .rename(columns=str.lower)
+        .astype({str(y): float for y in res.columns})
+        .set_axis(HISTORY_INDEX + res.columns.tolist(), axis="columns"),
+    )
+
+
+def test_get_history_only_loaded_once(monkeypatch):
+    calls = []
+    read_csv = pd.read_csv
+
+    def counting_read_csv(*args, **kwargs):
+        calls.append(args)
+        return read_csv(*args, **kwargs)
+
+    monkeypatch.setattr(climate_assessment.history.pd, "read_csv", counting_read_csv)
+
+    get_history("ar6")
+    get_harmonization_history("ar6", "AR6 climate diagnostics")
+    get_historical_values("ar6", 2015)
+    get_history("ar6")
+    assert len(calls) == 1
+
+    get_history("sr15")
+    assert len(calls) == 2
+
+    clear_history_registry()
+    get_history("ar6")
+    assert len(calls) == 3
+
+
+def test_get_history_returns_copy():
+    res = get_history("ar6")
+    exp = res.copy()
+    res.iloc[:, :] = -1
+
+    pdt.assert_frame_equal(get_history("ar6"), exp)
+
+
+@pytest.mark.parametrize(
+    "instance,prefix",
+    (("ar6", "AR6 climate diagnostics"), ("sr15", "SR15 climate diagnostics")),
+)
+def test_get_harmonization_history(instance, prefix):
+    res = get_harmonization_history(instance, prefix)
+
+    # as previously loaded by run_harmonization
+    df_hist = scmdata.ScmRun(get_history_file(instance), lowercase_cols=True)
+    df_hist["variable"] = df_hist["variable"].apply(
+        lambda x: x.replace(f"{prefix}|", "").replace("|Unharmonized", "")
+    )
+    df_hist["unit"] = df_hist["unit"].str.replace("-equiv", "").str.replace("-", "")
+    exp = df_hist.filter(year=range(1990, 2020)).timeseries(time_axis="year")
+
+    pdt.assert_frame_equal(res, exp, check_like=True, check_names=False)
+    assert "Emissions|HFC" in res.index.get_level_values("variable")
+    assert "kt HFC134a/yr" in res.index.get_level_values("unit")
+
+
+def test_get_historical_values():
+    res = get_historical_values("ar6", 2015)
+
+    assert res.index.name == "variable"
+    variable = "AR6 climate diagnostics|Emissions|CO2|Unharmonized"
+    assert res[variable] == float(
+        get_history("ar6").xs(variable, level="variable")[2015].iloc[0]
+    )
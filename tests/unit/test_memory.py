@@ -0,0 +1,116 @@
+import os
+import re
+import subprocess
+import sys
+import time
+
+import pytest
+
+from climate_assessment.climate.memory import (
+    BatchMemoryMonitor,
+    calculate_scenario_batch_size,
+    get_current_rss,
+    get_process_tree_rss,
+    parse_memory_size,
+    record_memory_per_scenario,
+)
+
+linux_only = pytest.mark.skipif(
+    not os.path.exists("/proc/self/statm"), reason="requires /proc"
+)
+
+
+@pytest.mark.parametrize(
+    "inp,exp",
+    (
+        (1024, 1024),
+        ("1024", 1024),
+        ("48GB", 48 * 10**9),
+        ("48 gb", 48 * 10**9),
+        ("48G", 48 * 10**9),
+        ("1.5GiB", int(1.5 * 1024**3)),
+        ("512MiB", 512 * 1024**2),
+        ("2TB", 2 * 10**12),
+        ("10kB", 10 * 10**3),
+    ),
+)
+def test_parse_memory_size(inp, exp):
+    assert parse_memory_size(inp) == exp
+
+
+@pytest.mark.parametrize("inp", ("GB", "48 XB", "-1GB", "auto"))
+def test_parse_memory_size_error(inp):
+    error_msg = re.escape(f"Could not parse memory size: {inp}")
+    with pytest.raises(ValueError, match=error_msg):
+        parse_memory_size(inp)
+
+
+@pytest.mark.parametrize(
+    "memory_per_scenario,max_memory,baseline_memory,post_process_queue_depth,exp",
+    (
+        (10, 1000, 0, 0, 100),
+        (10, 1000, 500, 0, 50),
+        (10, 1000, 500, 1, 25),
+        (10, 1005, 500, 0, 50),
+        # budget too small, still run one scenario at a time
+        (10, 1000, 995, 0, 1),
+        (10, 1000, 1500, 0, 1),
+    ),
+)
+def test_calculate_scenario_batch_size(
+    memory_per_scenario, max_memory, baseline_memory, post_process_queue_depth, exp
+):
+    res = calculate_scenario_batch_size(
+        memory_per_scenario,
+        max_memory,
+        baseline_memory,
+        post_process_queue_depth=post_process_queue_depth,
+    )
+
+    assert res == exp
+
+
+@linux_only
+def test_get_process_tree_rss_includes_children():
+    child = subprocess.Popen(  # noqa: S603
+        [sys.executable, "-c", "import sys; sys.stdin.read()"],
+        stdin=subprocess.PIPE,
+    )
+    try:
+        res = get_process_tree_rss()
+    finally:
+        child.communicate()
+
+    assert res > get_current_rss()
+
+
+@linux_only
+def test_batch_memory_monitor():
+    with BatchMemoryMonitor(interval=0.01) as monitor:
+        data = bytearray(200 * 1024**2)
+        # touch the pages so they are resident
+        data[::4096] = b"1" * len(data[::4096])
+        # hold on to the memory for a few samples
+        time.sleep(0.1)
+        del data
+
+    assert monitor.used_memory > 150 * 1024**2
+
+
+@linux_only
+def test_batch_memory_monitor_ignores_earlier_peak():
+    data = bytearray(200 * 1024**2)
+    data[::4096] = b"1" * len(data[::4096])
+    del data
+
+    with BatchMemoryMonitor(interval=0.01) as monitor:
+        pass
+
+    assert monitor.used_memory < 50 * 1024**2
+
+
+def test_record_memory_per_scenario():
+    key = ("test_record_memory_per_scenario",)
+    res = record_memory_per_scenario(key, 5, 1000)
+
+    assert res == 200
@@ -0,0 +1,112 @@
+import os.path
+import re
+
+import pandas as pd
+import pandas.testing as pdt
+import pyam
+import pytest
+
+from climate_assessment.output import (
+    StreamingTableWriter,
+    check_output_formats,
+    read_iamc,
+    write_iamc,
+    write_meta,
+)
+
+
+@pytest.fixture
+def iamc_df():
+    df = pyam.IamDataFrame(
+        pd.DataFrame(
+            [
+                ["model_a", "scen_a", "World", "Emissions|CO2", "Mt CO2/yr", 1.0, 2.0],
+                ["model_a", "scen_b", "World", "Emissions|CO2", "Mt CO2/yr", 3.0, 4.0],
+                ["model_b", "scen_a", "World", "Emissions|CO2", "Mt CO2/yr", 5.0, 6.0],
+            ],
+            columns=pyam.IAMC_IDX + [2015, 2020],
+        )
+    )
+    df.set_meta([1.5, 2.0, 2.5], name="peak warming")
+
+    return df
+
+
+def test_check_output_formats():
+    assert check_output_formats(["xlsx", "xlsx"]) == ("xlsx",)
+
+
+def test_check_output_formats_unknown():
+    error_msg = re.escape("Unknown output format(s): ['xls']")
+    with pytest.raises(ValueError, match=error_msg):
+        check_output_formats(["xlsx", "xls"])
+
+
+@pytest.mark.parametrize("output_format", ["xlsx", "parquet", "feather"])
+def test_write_read_iamc_round_trip(tmpdir, iamc_df, output_format):
+    if output_format != "xlsx":
+        pytest.importorskip("pyarrow")
+
+    path_stem = os.path.join(tmpdir, "ex_rawoutput")
+    write_iamc(iamc_df, path_stem, output_formats=[output_format])
+
+    # nothing written in formats which weren't requested
+    assert os.listdir(tmpdir) == [
+        f for f in os.listdir(tmpdir) if f.endswith(f".{output_format}")
+    ]
+
+    res = read_iamc(f"{path_stem}.{output_format}")
+    pyam.assert_iamframe_equal(res, iamc_df)
+
+
+def test_write_parquet_partitioned(tmpdir, iamc_df):
+    pytest.importorskip("pyarrow")
+
+    path_stem = os.path.join(tmpdir, "ex_rawoutput")
+    write_iamc(iamc_df, path_stem, output_formats=["parquet"])
+    # writing again overwrites rather than appends
+    write_iamc(iamc_df, path_stem, output_formats=["parquet"])
+
+    assert sorted(os.listdir(f"{path_stem}.parquet")) == [
+        "Model=model_a",
+        "Model=model_b",
+    ]
+    model_a_dir = os.path.join(f"{path_stem}.parquet", "Model=model_a")
+    assert sorted(os.listdir(model_a_dir)) == ["Scenario=scen_a", "Scenario=scen_b"]
+
+    res = read_iamc(f"{path_stem}.parquet")
+    pyam.assert_iamframe_equal(res, iamc_df)
+
+
+@pytest.mark.parametrize("output_format", ["parquet", "feather"])
+def test_write_meta(tmpdir, iamc_df, output_format):
+    pytest.importorskip("pyarrow")
+
+    path_stem = os.path.join(tmpdir, "ex_meta")
+    write_meta(iamc_df, path_stem, output_formats=[output_format])
+
+    read = pd.read_parquet if output_format == "parquet" else pd.read_feather
+    res = read(f"{path_stem}.{output_format}").set_index(["model", "scenario"])
+    pdt.assert_frame_equal(res, iamc_df.meta, check_like=True)
+
+
+@pytest.mark.parametrize("output_format", ["parquet", "feather"])
+def test_streaming_table_writer(tmpdir, output_format):
+    pytest.importorskip("pyarrow")
+
+    path = os.path.join(tmpdir, f"table.{output_format}")
+    batches = [
+        pd.DataFrame({"scenario": ["a", "b"], "value": [1.0, 2.0]}),
+        pd.DataFrame({"scenario": ["c"], "value": [3.0]}),
+    ]
+    with StreamingTableWriter(path, output_format) as writer:
+        for batch in batches:
+            writer.write(batch)
+
+    read = pd.read_parquet if output_format == "parquet" else pd.read_feather
+    pdt.assert_frame_equal(read(path), pd.concat(batches, ignore_index=True))
+
+
+def test_streaming_table_writer_unsupported_format(tmpdir):
+    with pytest.raises(ValueError, match="Cannot stream a table as xlsx"):
+        StreamingTableWriter(os.path.join(tmpdir, "table.xlsx"), "xlsx")
@@ -0,0 +1,82 @@
+import json
+import os.path
+
+import pytest
+
+from climate_assessment.profiling import PROFILE_COLUMNS, Profiler
+
+
+def test_profiler_stage():
+    profiler = Profiler()
+    with profiler.stage("harmonization"):
+        sum(range(10**5))
+
+    with profiler.stage("run_climate_models", batch=0):
+        pass
+
+    res = profiler.to_dataframe()
+
+    assert res.columns.tolist() == PROFILE_COLUMNS
+    assert res["stage"].tolist() == ["harmonization", "run_climate_models"]
+    assert res["batch"].isnull().tolist() == [True, False]
+    assert (res["wall_time"] >= 0).all()
+    assert (res["cpu_time"] >= 0).all()
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/statm"), reason="requires /proc")
+def test_profiler_stage_peak_rss():
+    profiler = Profiler()
+    with profiler.stage("infilling"):
+        data = bytearray(200 * 1024**2)
+        # touch the pages so they are resident
+        data[::4096] = b"1" * len(data[::4096])
+
+    del data
+    with profiler.stage("run_climate_models", batch=0):
+        pass
+
+    res = profiler.to_dataframe().set_index("stage")["peak_rss"]
+
+    # the peak is measured per stage, not since the start of the process
+    assert res["infilling"] - res["run_climate_models"] > 150 * 1024**2
+
+
+def test_profiler_stage_error():
+    profiler = Profiler()
+    with pytest.raises(ValueError, match="failed"):
+        with profiler.stage("infilling"):
+            raise ValueError("failed")
+
+    assert profiler.to_dataframe()["stage"].tolist() == ["infilling"]
+
+
+def test_profiler_disabled():
+    profiler = Profiler(enabled=False)
+    with profiler.stage("harmonization"):
+        pass
+
+    assert profiler.records == []
+    assert profiler.to_dataframe().empty
+
+
+def test_profiler_write_report(tmpdir):
+    profiler = Profiler()
+    with profiler.stage("climate_assessment"):
+        with profiler.stage("run_climate_models", batch=0):
+            pass
+
+    out_csv, out_json = profiler.write_report(str(tmpdir), "ex")
+
+    assert out_csv == os.path.join(tmpdir, "ex_profile.csv")
+    assert out_json == os.path.join(tmpdir, "ex_profile.json")
+
+    with open(out_json) as fh:
+        report = json.load(fh)
+
+    assert "climate_assessment_version" in report
+    # sorted by start of the stage, not the end
+    assert [s["stage"] for s in report["stages"]] == [
+        "climate_assessment",
+        "run_climate_models",
+    ]
+    assert report["stages"][1]["batch"] == 0
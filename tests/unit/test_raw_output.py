@@ -0,0 +1,93 @@
+import os.path
+
+import numpy as np
+import numpy.testing as npt
+import pandas.testing as pdt
+import pytest
+import scmdata
+
+from climate_assessment.climate.ensemble import DenseEnsemble
+from climate_assessment.climate.raw_output import RawEnsembleStore
+
+
+def _get_ensemble(scenarios, n_runs=4):
+    rng = np.random.default_rng(0)
+    years = range(2000, 2011)
+
+    return DenseEnsemble.from_scmrun(
+        scmdata.ScmRun(
+            data=rng.normal(1.0, 0.5, size=(len(years), len(scenarios) * n_runs)),
+            index=years,
+            columns={
+                "climate_model": "model_a",
+                "model": "iam",
+                "scenario": [s for s in scenarios for _ in range(n_runs)],
+                "region": "World",
+                "variable": "Surface Temperature",
+                "unit": "K",
+                "run_id": list(range(n_runs)) * len(scenarios),
+            },
+        )
+    )
+
+
+def _assert_ensemble_equal(res, exp):
+    pdt.assert_frame_equal(res.to_timeseries(), exp.to_timeseries())
+
+
+def test_raw_ensemble_store_round_trip(tmpdir):
+    store = RawEnsembleStore(os.path.join(tmpdir, "raw_climate_output"))
+    batches = [_get_ensemble(["scen_a", "scen_b"]), _get_ensemble(["scen_c"])]
+    for ensemble in batches:
+        store.save(ensemble, metadata={"parameters": {"a": 1}})
+
+    assert len(store.chunks()) == 2
+
+    res = list(store.iter_ensembles())
+    assert len(res) == 2
+    res = sorted(res, key=lambda e: e.groups[0])
+    for res_ensemble, exp_ensemble in zip(res, batches):
+        # memory-mapped rather than loaded
+        assert isinstance(res_ensemble["Surface Temperature"], np.memmap)
+        _assert_ensemble_equal(res_ensemble, exp_ensemble)
+
+
+def test_raw_ensemble_store_filter(tmpdir):
+    store = RawEnsembleStore(str(tmpdir))
+    ensemble = _get_ensemble(["scen_a", "scen_b", "scen_c"])
+    chunk_dir = store.save(ensemble)
+
+    res = store.load_chunk(chunk_dir, scenario=["scen_a", "scen_c"])
+    assert res.groups.get_level_values("scenario").tolist() == ["scen_a", "scen_c"]
+    npt.assert_array_equal(
+        res["Surface Temperature"], ensemble["Surface Temperature"][[0, 2]]
+    )
+
+    assert store.load_chunk(chunk_dir, scenario="scen_d") is None
+    assert [e.groups.tolist() for e in store.iter_ensembles(scenario="scen_b")] == [
+        [("model_a", "iam", "World", "scen_b")]
+    ]
+
+    with pytest.raises(KeyError):
+        store.load_chunk(chunk_dir, variables=["Heat Uptake"])
+
+    with pytest.raises(KeyError, match="variable is not a group column"):
+        store.load_chunk(chunk_dir, variable="Surface Temperature")
+
+
+def test_raw_ensemble_store_overwrites_rerun_batch(tmpdir):
+    store = RawEnsembleStore(str(tmpdir))
+    ensemble = _get_ensemble(["scen_a"])
+    store.save(ensemble)
+    ensemble.data["Surface Temperature"] = ensemble["Surface Temperature"] + 1
+    store.save(ensemble)
+
+    assert len(store.chunks()) == 1
+    _assert_ensemble_equal(next(store.iter_ensembles(mmap_mode=None)), ensemble)
+
+
+def test_raw_ensemble_store_empty(tmpdir):
+    store = RawEnsembleStore(os.path.join(tmpdir, "missing"))
+
+    assert store.chunks() == []
+    assert list(store.iter_ensembles()) == []
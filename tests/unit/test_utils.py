@@ -0,0 +1,21 @@
+import pytest
+
+from climate_assessment.utils import get_chunk_size
+
+
+@pytest.mark.parametrize(
+    "n_items,n_workers,chunk_size,exp",
+    (
+        (3000, 8, None, 94),
+        (10, 8, None, 1),
+        (0, 8, None, 1),
+        (3000, 8, 50, 50),
+    ),
+)
+def test_get_chunk_size(n_items, n_workers, chunk_size, exp):
+    assert get_chunk_size(n_items, n_workers, chunk_size) == exp
+
+
+def test_get_chunk_size_not_positive():
+    with pytest.raises(ValueError, match="`chunk_size` must be positive"):
+        get_chunk_size(10, 2, chunk_size=0)